@@ -0,0 +1,299 @@
+"""Benchmark serial and parallel folder transfers against an in-memory container.
+
+The fake container keeps blobs in a dictionary and sleeps for a fixed round trip on every request, standing in for a
+cross-region link where latency rather than bandwidth dominates the transfer of small Terraform files. Each folder is
+uploaded to an empty container and downloaded back with each worker count, a single worker being the serial baseline.
+
+Run with:
+
+    python benchmarks/bench_folder_transfers.py
+"""
+import dataclasses
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import IO, Any, Dict, Iterator, List, Optional, Union
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobProperties
+
+from matcha_ml.storage.azure_storage import AzureStorage, TransferConfig
+from matcha_ml.storage.exclusion_rules import ExclusionRules
+
+ROUND_TRIP_SECONDS = 0.03
+FILE_COUNTS = [10, 50, 200]
+FILE_SIZE = 4 * 1024
+WORKER_COUNTS = [1, 4, 8, 16]
+
+
+class FakeDownload:
+    """Fake of the StorageStreamDownloader returned by BlobClient.download_blob."""
+
+    def __init__(self, data: bytes) -> None:
+        """Initialize the download with the blob's contents.
+
+        Args:
+            data (bytes): the blob's contents.
+        """
+        self.data = data
+
+    def readall(self) -> bytes:
+        """Read the blob's contents.
+
+        Returns:
+            bytes: the blob's contents.
+        """
+        return self.data
+
+    def readinto(self, stream: IO[bytes]) -> int:
+        """Write the blob's contents to a stream.
+
+        Args:
+            stream (IO[bytes]): the stream to write to.
+
+        Returns:
+            int: the number of bytes written.
+        """
+        return stream.write(self.data)
+
+
+class FakeBlobClient:
+    """Fake of a BlobClient, reading and writing the blobs of its container."""
+
+    def __init__(self, container: "FakeContainerClient", name: str) -> None:
+        """Initialize the blob client.
+
+        Args:
+            container (FakeContainerClient): the container of the blob.
+            name (str): the blob name.
+        """
+        self.container = container
+        self.name = name
+
+    def upload_blob(self, data: Union[bytes, IO[bytes]], **kwargs: Any) -> None:
+        """Store the blob.
+
+        Args:
+            data (Union[bytes, IO[bytes]]): the blob's contents.
+            **kwargs (Any): ignored.
+        """
+        contents = data if isinstance(data, bytes) else data.read()
+        self.container.request()
+        with self.container.lock:
+            self.container.blobs[self.name] = contents
+
+    def download_blob(self) -> FakeDownload:
+        """Read the blob.
+
+        Returns:
+            FakeDownload: the blob's contents.
+
+        Raises:
+            ResourceNotFoundError: when the blob does not exist.
+        """
+        self.container.request()
+        with self.container.lock:
+            if self.name not in self.container.blobs:
+                raise ResourceNotFoundError("The specified blob does not exist.")
+            return FakeDownload(self.container.blobs[self.name])
+
+
+@dataclasses.dataclass
+class FakeBatchResponse:
+    """The response to one request of a blob batch."""
+
+    status_code: int = 202
+    reason: str = "Accepted"
+    headers: Dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+class FakeContainerClient:
+    """Fake of a ContainerClient holding its blobs in memory, every request taking one round trip."""
+
+    def __init__(self) -> None:
+        """Initialize an empty container."""
+        self.blobs: Dict[str, bytes] = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def request(self) -> None:
+        """Count a request and wait for its round trip."""
+        with self.lock:
+            self.requests += 1
+        time.sleep(ROUND_TRIP_SECONDS)
+
+    def get_blob_client(self, blob: str) -> FakeBlobClient:
+        """Get a client for a blob.
+
+        Args:
+            blob (str): the blob name.
+
+        Returns:
+            FakeBlobClient: the blob client.
+        """
+        return FakeBlobClient(self, blob)
+
+    def list_blobs(
+        self, name_starts_with: Optional[str] = None
+    ) -> List[BlobProperties]:
+        """List the blobs with their Content-MD5.
+
+        Args:
+            name_starts_with (Optional[str]): only list the blobs whose name starts with this prefix.
+
+        Returns:
+            List[BlobProperties]: the blob properties.
+        """
+        self.request()
+        with self.lock:
+            return [
+                BlobProperties(
+                    name=name,
+                    **{
+                        "Content-Length": len(data),
+                        "Content-MD5": bytearray(hashlib.md5(data).digest()),
+                    },
+                )
+                for name, data in self.blobs.items()
+                if not name_starts_with or name.startswith(name_starts_with)
+            ]
+
+    def list_blob_names(self) -> List[str]:
+        """List the blob names.
+
+        Returns:
+            List[str]: the blob names.
+        """
+        self.request()
+        with self.lock:
+            return list(self.blobs)
+
+    def delete_blob(self, blob: str) -> None:
+        """Delete a blob.
+
+        Args:
+            blob (str): the blob name.
+        """
+        self.request()
+        with self.lock:
+            self.blobs.pop(blob, None)
+
+    def delete_blobs(
+        self, *blobs: str, raise_on_any_failure: bool = True
+    ) -> Iterator[FakeBatchResponse]:
+        """Delete blobs with a single batch request.
+
+        Args:
+            *blobs (str): the blob names.
+            raise_on_any_failure (bool): ignored, every deletion succeeds.
+
+        Returns:
+            Iterator[FakeBatchResponse]: the response of every deletion.
+        """
+        self.request()
+        with self.lock:
+            for blob in blobs:
+                self.blobs.pop(blob, None)
+        return iter(FakeBatchResponse() for _ in blobs)
+
+
+class FakeBlobServiceClient:
+    """Fake of a BlobServiceClient with a single container."""
+
+    def __init__(self, container: FakeContainerClient) -> None:
+        """Initialize the service client.
+
+        Args:
+            container (FakeContainerClient): the container.
+        """
+        self.container = container
+
+    def get_container_client(self, container_name: str) -> FakeContainerClient:
+        """Get the container.
+
+        Args:
+            container_name (str): ignored.
+
+        Returns:
+            FakeContainerClient: the container.
+        """
+        return self.container
+
+
+def build_storage(container: FakeContainerClient, max_workers: int) -> AzureStorage:
+    """Build an AzureStorage that talks to the fake container, without authenticating.
+
+    Args:
+        container (FakeContainerClient): the fake container.
+        max_workers (int): the number of blobs transferred at the same time.
+
+    Returns:
+        AzureStorage: the storage.
+    """
+    storage = AzureStorage.__new__(AzureStorage)
+    storage.account_name = "benchmark"
+    storage.transfer_config = TransferConfig(max_workers=max_workers)
+    storage.exclusion_rules = ExclusionRules()
+    storage.blob_service_client = FakeBlobServiceClient(container)  # type: ignore [assignment]
+    return storage
+
+
+def write_folder(folder: str, file_count: int) -> None:
+    """Write a folder of Terraform-sized files.
+
+    Args:
+        folder (str): the folder.
+        file_count (int): the number of files.
+    """
+    resources_dir = os.path.join(folder, ".matcha", "infrastructure", "resources")
+    os.makedirs(resources_dir)
+    for i in range(file_count):
+        with open(os.path.join(resources_dir, f"module-{i}.tf"), "wb") as f:
+            f.write(os.urandom(FILE_SIZE))
+
+
+def run(file_count: int, max_workers: int) -> None:
+    """Upload and download a folder of `file_count` files with `max_workers` workers, and print the throughput.
+
+    Args:
+        file_count (int): the number of files in the folder.
+        max_workers (int): the number of blobs transferred at the same time.
+    """
+    original_working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as destination:
+        write_folder(source, file_count)
+        container = FakeContainerClient()
+        storage = build_storage(container, max_workers)
+
+        os.chdir(source)
+        try:
+            start = time.perf_counter()
+            storage.upload_folder("benchmark", ".matcha")
+            upload_elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(original_working_directory)
+
+        os.chdir(destination)
+        try:
+            start = time.perf_counter()
+            storage.download_folder("benchmark", destination)
+            download_elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(original_working_directory)
+
+    megabytes = file_count * FILE_SIZE / (1024 * 1024)
+    print(
+        f"{file_count:>4} files, {max_workers:>2} worker(s): "
+        f"upload {upload_elapsed:6.2f} s ({file_count / upload_elapsed:6.1f} blobs/s, "
+        f"{megabytes / upload_elapsed:5.2f} MB/s), "
+        f"download {download_elapsed:6.2f} s ({file_count / download_elapsed:6.1f} blobs/s, "
+        f"{megabytes / download_elapsed:5.2f} MB/s), {container.requests} requests"
+    )
+
+
+if __name__ == "__main__":
+    for count in FILE_COUNTS:
+        for workers in WORKER_COUNTS:
+            run(count, workers)
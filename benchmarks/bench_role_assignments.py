@@ -0,0 +1,168 @@
+"""Benchmark the role assignment check against a large, faked subscription.
+
+The fake authorization client mimics Azure by applying the principal filter server-side, and records how many list
+requests were made and how many assignments were transferred. The previous implementation, which listed every
+assignment in the subscription once per expected role, is reproduced for comparison.
+
+Run with:
+
+    python benchmarks/bench_role_assignments.py
+"""
+import time
+from typing import Any, List, Optional
+from unittest.mock import MagicMock, patch
+
+from matcha_ml.services.azure_service import (
+    ACCEPTED_ROLE_CONFIGURATIONS,
+    ROLE_ID_MAPPING,
+    AzureClient,
+)
+
+SUBSCRIPTION_ID = "id"
+PRINCIPAL_ID = "principal"
+ASSIGNMENT_COUNTS = [1_000, 10_000, 50_000]
+REPEATS = 5
+
+
+class FakeRoleAssignments:
+    """Fake of the role assignments operations of the AuthorizationManagementClient."""
+
+    def __init__(self, assignments: List[Any]) -> None:
+        """Initialize the fake with every assignment in the subscription.
+
+        Args:
+            assignments (List[Any]): the role assignments in the subscription.
+        """
+        self.assignments = assignments
+        self.list_calls = 0
+        self.transferred = 0
+
+    def list_for_subscription(self, filter: Optional[str] = None) -> List[Any]:
+        """List the role assignments, filtered by principal when a filter is given.
+
+        Args:
+            filter (Optional[str]): an OData filter of the form "principalId eq '<id>'".
+
+        Returns:
+            List[Any]: the role assignments returned by the service.
+        """
+        self.list_calls += 1
+        if filter is None:
+            result = self.assignments
+        else:
+            principal_id = filter.split("'")[1]
+            result = [a for a in self.assignments if a.principal_id == principal_id]
+        self.transferred += len(result)
+        return result
+
+
+def build_assignments(count: int) -> List[Any]:
+    """Build a subscription's worth of role assignments, two of which belong to the benchmarked principal.
+
+    Args:
+        count (int): the total number of role assignments.
+
+    Returns:
+        List[Any]: the role assignments.
+    """
+    role_prefix = f"/subscriptions/{SUBSCRIPTION_ID}/providers/Microsoft.Authorization/roleDefinitions"
+    assignments = [
+        MagicMock(
+            principal_id=f"other-{i}",
+            role_definition_id=f"{role_prefix}/{ROLE_ID_MAPPING['Owner']}",
+        )
+        for i in range(count - 2)
+    ]
+    assignments += [
+        MagicMock(
+            principal_id=PRINCIPAL_ID,
+            role_definition_id=f"{role_prefix}/{ROLE_ID_MAPPING['Contributor']}",
+        ),
+        MagicMock(
+            principal_id=PRINCIPAL_ID,
+            role_definition_id=f"{role_prefix}/{ROLE_ID_MAPPING['User Access Administrator']}",
+        ),
+    ]
+    return assignments
+
+
+def previous_check(fake: FakeRoleAssignments) -> bool:
+    """The previous role assignment check, which re-lists the subscription for every expected role.
+
+    Args:
+        fake (FakeRoleAssignments): the fake role assignments operations.
+
+    Returns:
+        bool: True if the required roles are assigned.
+    """
+    for role_configuration in ACCEPTED_ROLE_CONFIGURATIONS:
+        expected_roles = [
+            f"/subscriptions/{SUBSCRIPTION_ID}/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING[role]}"
+            for role in role_configuration
+        ]
+        if all(
+            role
+            in [
+                str(x.role_definition_id)
+                for x in fake.list_for_subscription()
+                if x.principal_id == PRINCIPAL_ID
+            ]
+            for role in expected_roles
+        ):
+            return True
+    return False
+
+
+def report(label: str, count: int, fake: FakeRoleAssignments, elapsed: float) -> None:
+    """Print the results of a benchmark run.
+
+    Args:
+        label (str): the name of the implementation.
+        count (int): the total number of role assignments.
+        fake (FakeRoleAssignments): the fake role assignments operations.
+        elapsed (float): the total time taken in seconds.
+    """
+    print(
+        f"{label:>8} {count:>8} assignments: {fake.list_calls // REPEATS} list call(s), "
+        f"{fake.transferred // REPEATS} assignment(s) transferred, {elapsed / REPEATS * 1000:.2f} ms per check"
+    )
+
+
+def run(count: int) -> None:
+    """Benchmark the role assignment check for a subscription of the given size.
+
+    Args:
+        count (int): the total number of role assignments.
+    """
+    assignments = build_assignments(count)
+
+    fake = FakeRoleAssignments(assignments)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        previous_check(fake)
+    report("previous", count, fake, time.perf_counter() - start)
+
+    fake = FakeRoleAssignments(assignments)
+    client = AzureClient.__new__(AzureClient)
+    client.subscription_id = SUBSCRIPTION_ID
+    client._credential = MagicMock()
+    client._access_token = None
+
+    with patch(
+        "matcha_ml.services.azure_service.AuthorizationManagementClient"
+    ) as authorization_client, patch.object(
+        AzureClient, "_get_principal_id", return_value=PRINCIPAL_ID
+    ):
+        authorization_client.return_value.role_assignments = fake
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            client._check_required_role_assignments()
+        elapsed = time.perf_counter() - start
+
+    report("current", count, fake, elapsed)
+
+
+if __name__ == "__main__":
+    for assignment_count in ASSIGNMENT_COUNTS:
+        run(assignment_count)
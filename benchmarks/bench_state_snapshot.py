@@ -0,0 +1,169 @@
+"""Benchmark the per-file and snapshot storage modes of the remote state on the default and llm stacks.
+
+The state folder is built the way `matcha provision` lays it out: the stack's Terraform templates under
+`.matcha/infrastructure/resources`, the remote state templates under `.matcha/infrastructure/remote_state_storage` and
+the matcha.state file. Each mode is then run through the operations of a matcha session against the in-memory container
+of bench_folder_transfers, which waits one round trip per request:
+
+- first upload: the state is uploaded to an empty container.
+- unchanged upload: the state is uploaded again, as on leaving use_remote_state without changes.
+- changed upload: the state is uploaded after matcha.state changed.
+- in-sync download: the state is downloaded into the folder it was uploaded from.
+- fresh download: the state is downloaded into an empty folder, as on a new machine.
+
+Run with:
+
+    python benchmarks/bench_state_snapshot.py
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+from bench_folder_transfers import FakeContainerClient, build_storage
+
+from matcha_ml.storage.azure_storage import DEFAULT_MAX_WORKERS, AzureStorage
+
+INFRASTRUCTURE_DIR = os.path.join(".matcha", "infrastructure")
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(__file__), os.pardir, "src", "matcha_ml", "infrastructure"
+)
+STACKS = ["default", "llm"]
+CONTAINER_NAME = "benchmark"
+
+
+def build_state_folder(folder: str, stack: str) -> None:
+    """Lay out the state folder of a provisioned stack.
+
+    Args:
+        folder (str): the project folder.
+        stack (str): the name of the stack's templates.
+    """
+    infrastructure_dir = os.path.join(folder, INFRASTRUCTURE_DIR)
+    shutil.copytree(
+        os.path.join(TEMPLATES_DIR, stack),
+        os.path.join(infrastructure_dir, "resources"),
+    )
+    shutil.copytree(
+        os.path.join(TEMPLATES_DIR, "remote_state_storage"),
+        os.path.join(infrastructure_dir, "remote_state_storage"),
+    )
+    write_state(folder, "first")
+
+
+def write_state(folder: str, revision: str) -> None:
+    """Write the matcha.state file.
+
+    Args:
+        folder (str): the project folder.
+        revision (str): a value that changes the file's contents.
+    """
+    with open(os.path.join(folder, INFRASTRUCTURE_DIR, "matcha.state"), "w") as f:
+        json.dump({"cloud": {"flavor": "azure", "revision": revision}}, f)
+
+
+def measure(
+    container: FakeContainerClient, folder: str, operation: Callable[[], object]
+) -> Tuple[int, float]:
+    """Run an operation from a folder, counting the requests it makes.
+
+    Args:
+        container (FakeContainerClient): the in-memory container.
+        folder (str): the folder to run the operation from.
+        operation (Callable[[], object]): the operation.
+
+    Returns:
+        Tuple[int, float]: the number of requests and the seconds taken.
+    """
+    original_working_directory = os.getcwd()
+    requests_before = container.requests
+    os.chdir(folder)
+    try:
+        start = time.perf_counter()
+        operation()
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(original_working_directory)
+
+    return container.requests - requests_before, elapsed
+
+
+def run_session(stack: str, snapshot: bool) -> List[Tuple[str, int, float]]:
+    """Run the operations of a session in one storage mode.
+
+    Args:
+        stack (str): the name of the stack's templates.
+        snapshot (bool): whether the snapshot storage mode is used.
+
+    Returns:
+        List[Tuple[str, int, float]]: the name, number of requests and seconds taken of every operation.
+    """
+    container = FakeContainerClient()
+    storage: AzureStorage = build_storage(container, DEFAULT_MAX_WORKERS)
+    upload = storage.upload_snapshot if snapshot else storage.upload_folder
+    download = storage.download_snapshot if snapshot else storage.download_folder
+    results = []
+
+    with tempfile.TemporaryDirectory() as project, tempfile.TemporaryDirectory() as other_machine:
+        build_state_folder(project, stack)
+
+        def upload_state() -> object:
+            return upload(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+
+        results.append(("first upload", *measure(container, project, upload_state)))
+        results.append(("unchanged upload", *measure(container, project, upload_state)))
+        write_state(project, "second")
+        results.append(("changed upload", *measure(container, project, upload_state)))
+        results.append(
+            (
+                "in-sync download",
+                *measure(container, project, lambda: download(CONTAINER_NAME, project)),
+            )
+        )
+        results.append(
+            (
+                "fresh download",
+                *measure(
+                    container,
+                    other_machine,
+                    lambda: download(CONTAINER_NAME, other_machine),
+                ),
+            )
+        )
+
+    return results
+
+
+def count_files(stack: str) -> int:
+    """Count the files of a stack's state folder.
+
+    Args:
+        stack (str): the name of the stack's templates.
+
+    Returns:
+        int: the number of files.
+    """
+    with tempfile.TemporaryDirectory() as project:
+        build_state_folder(project, stack)
+        return sum(
+            len(filenames)
+            for _, _, filenames in os.walk(os.path.join(project, INFRASTRUCTURE_DIR))
+        )
+
+
+if __name__ == "__main__":
+    for stack_name in STACKS:
+        print(f"{stack_name} stack, {count_files(stack_name)} files")
+        per_file = run_session(stack_name, snapshot=False)
+        snapshots = run_session(stack_name, snapshot=True)
+        for (operation, file_requests, file_elapsed), (
+            _,
+            snapshot_requests,
+            snapshot_elapsed,
+        ) in zip(per_file, snapshots):
+            print(
+                f"  {operation:>16}: per-file {file_requests:>3} requests {file_elapsed:6.3f} s, "
+                f"snapshot {snapshot_requests:>3} requests {snapshot_elapsed:6.3f} s"
+            )
@@ -0,0 +1,188 @@
+"""Benchmark the parallelism and refresh options of the Terraform operations against a fake provider.
+
+The fake provider is Terraform's built-in `terraform_data` resource, which needs no download and no cloud account. Each
+resource waits for a fixed latency when it is created and destroyed, like an ARM deployment waiting on a long-running
+operation. For every setting the stack is run through the operations of a matcha session, with TerraformService:
+
+- provision: the changes are planned and the saved plan is applied to an empty state.
+- replan: the provisioned stack is planned again, which is where a refresh is spent.
+- destroy: every resource is destroyed.
+
+Terraform must be installed. Run with:
+
+    python benchmarks/bench_terraform_options.py [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from matcha_ml.services.terraform_service import TerraformConfig, TerraformService
+
+RESOURCE_COUNT = 40
+LATENCY_SECONDS = 0.5
+PARALLELISM_SETTINGS = [1, 5, 10, 20]
+REFRESH_SETTINGS = [True, False]
+
+FAKE_PROVIDER_TEMPLATE = """
+variable "resource_count" {
+  type = number
+}
+
+variable "latency" {
+  type = number
+}
+
+resource "terraform_data" "resource" {
+  count = var.resource_count
+  input = {
+    index   = count.index
+    latency = var.latency
+  }
+
+  provisioner "local-exec" {
+    command = "sleep ${self.input.latency}"
+  }
+
+  provisioner "local-exec" {
+    when    = destroy
+    command = "sleep ${self.input.latency}"
+  }
+}
+"""
+
+
+def build_working_dir(folder: str) -> None:
+    """Write the fake provider's templates and their variables into a working directory.
+
+    Args:
+        folder (str): the working directory.
+    """
+    with open(os.path.join(folder, "main.tf"), "w") as f:
+        f.write(FAKE_PROVIDER_TEMPLATE)
+
+    with open(os.path.join(folder, "terraform.tfvars.json"), "w") as f:
+        json.dump({"resource_count": RESOURCE_COUNT, "latency": LATENCY_SECONDS}, f)
+
+
+def timed_plan(tfs: TerraformService) -> float:
+    """Plan the changes, failing the benchmark if Terraform failed.
+
+    Args:
+        tfs (TerraformService): the service of the working directory.
+
+    Returns:
+        float: the wall time in seconds.
+
+    Raises:
+        RuntimeError: if `terraform plan` failed.
+    """
+    start = time.perf_counter()
+    plan = tfs.plan()
+    elapsed = time.perf_counter() - start
+
+    if plan.result.return_code != 0:
+        raise RuntimeError(plan.result.std_err)
+
+    return elapsed
+
+
+def run(parallelism: int, refresh: bool) -> Dict[str, Any]:
+    """Run the stack through provision, replan and destroy with the given options.
+
+    Args:
+        parallelism (int): the number of resource operations Terraform runs concurrently.
+        refresh (bool): whether Terraform refreshes the state before planning the changes.
+
+    Returns:
+        Dict[str, Any]: the setting and the wall time of every operation, in seconds.
+
+    Raises:
+        RuntimeError: if a Terraform command failed.
+    """
+    folder = tempfile.mkdtemp()
+    try:
+        build_working_dir(folder)
+        tfs = TerraformService(
+            TerraformConfig(
+                working_dir=folder, parallelism=parallelism, refresh=refresh
+            )
+        )
+
+        init_result = tfs.init()
+        if init_result.return_code != 0:
+            raise RuntimeError(init_result.std_err)
+
+        start = time.perf_counter()
+        timed_plan(tfs)
+        apply_result = asyncio.run(tfs.apply_async(tfs.plan_path))
+        provision_time = time.perf_counter() - start
+        if apply_result.return_code != 0:
+            raise RuntimeError(apply_result.std_err)
+
+        replan_time = timed_plan(tfs)
+        tfs.discard_plan()
+
+        destroy_result = asyncio.run(tfs.destroy_async())
+        if destroy_result.return_code != 0:
+            raise RuntimeError(destroy_result.std_err)
+    finally:
+        shutil.rmtree(folder)
+
+    return {
+        "parallelism": parallelism,
+        "refresh": refresh,
+        "provision_seconds": provision_time,
+        "replan_seconds": replan_time,
+        "destroy_seconds": destroy_result.duration,
+    }
+
+
+def report(result: Dict[str, Any]) -> None:
+    """Print the results of a benchmark run.
+
+    Args:
+        result (Dict[str, Any]): the setting and the wall time of every operation.
+    """
+    print(
+        f"parallelism {result['parallelism']:>3}, refresh {str(result['refresh']):>5}: "
+        f"provision {result['provision_seconds']:7.2f} s, replan {result['replan_seconds']:6.2f} s, "
+        f"destroy {result['destroy_seconds']:7.2f} s"
+    )
+
+
+def main(output: Optional[str]) -> None:
+    """Benchmark every setting, optionally recording the results as JSON.
+
+    Args:
+        output (Optional[str]): the file the results are written to.
+    """
+    if shutil.which("terraform") is None:
+        print("Terraform is not installed, nothing to benchmark.")
+        return
+
+    print(
+        f"{RESOURCE_COUNT} resources, {LATENCY_SECONDS} s latency per create and destroy"
+    )
+    results: List[Dict[str, Any]] = []
+    for parallelism in PARALLELISM_SETTINGS:
+        for refresh in REFRESH_SETTINGS:
+            result = run(parallelism, refresh)
+            report(result)
+            results.append(result)
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Terraform options against a fake provider."
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    main(parser.parse_args().output)
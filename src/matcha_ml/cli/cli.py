@@ -25,6 +25,15 @@ from matcha_ml.cli.ui.status_message_builders import (
 from matcha_ml.cli.ui.user_approval_functions import is_user_approved
 from matcha_ml.config import MatchaConfigService
 from matcha_ml.errors import MatchaError, MatchaInputError
+from matcha_ml.services.metadata_cache_service import MetadataCache
+from matcha_ml.services.terraform_service import (
+    DEFAULT_PARALLELISM,
+    DEFAULT_REFRESH,
+    DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
+    MAX_PARALLELISM,
+    MIN_PARALLELISM,
+)
+from matcha_ml.state.state_lock import DEFAULT_LOCK_TIMEOUT_SECONDS
 
 app = typer.Typer(no_args_is_help=True, pretty_exceptions_show_locals=False)
 analytics_app = typer.Typer(no_args_is_help=True, pretty_exceptions_show_locals=False)
@@ -34,11 +43,17 @@ app.add_typer(
     name="analytics",
     help="Enable or disable the collection of anonymous usage data (enabled by default).",
 )
+state_app = typer.Typer(no_args_is_help=True, pretty_exceptions_show_locals=False)
 app.add_typer(
     stack_app,
     name="stack",
     help="Configure the stack for Matcha to provision.",
 )
+app.add_typer(
+    state_app,
+    name="state",
+    help="List and restore earlier versions of the remote state.",
+)
 
 
 def fill_provision_variables(
@@ -80,7 +95,7 @@ def fill_provision_variables(
 
 
 @app.command(help="Provision cloud resources.")
-def provision(
+def provision(  # noqa: PLR0913, PLR0917
     location: str = typer.Option(
         callback=region_typer_callback,
         default="",
@@ -98,6 +113,27 @@ def provision(
     verbose: Optional[bool] = typer.Option(
         False, help="Get more detailed information from matcha provision!"
     ),
+    lock_timeout: float = typer.Option(
+        DEFAULT_LOCK_TIMEOUT_SECONDS,
+        min=0,
+        help="Seconds to wait for the remote state lock if someone else holds it, 0 to fail straight away.",
+    ),
+    parallelism: int = typer.Option(
+        DEFAULT_PARALLELISM,
+        min=MIN_PARALLELISM,
+        max=MAX_PARALLELISM,
+        help="The number of resources Terraform changes concurrently, lower it when Azure throttles the requests.",
+    ),
+    refresh_state: bool = typer.Option(
+        DEFAULT_REFRESH,
+        "--refresh-state/--skip-refresh-state",
+        help="Have Terraform refresh its state from Azure before changing the resources, skip it when the state is known to be fresh.",
+    ),
+    terraform_lock_timeout: float = typer.Option(
+        DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
+        min=0,
+        help="Seconds Terraform waits for its own state lock, separate from the remote state lock, 0 to fail straight away.",
+    ),
 ) -> None:
     """Provision cloud resources.
 
@@ -106,6 +142,10 @@ def provision(
         prefix (Optional[str]): Prefix used for all resources.
         password (Optional[str]): Password for ZenServer.
         verbose (Optional[bool]): additional output is show when True. Defaults to False.
+        lock_timeout (float): seconds to wait for the remote state lock. Defaults to not waiting.
+        parallelism (int): the number of resources Terraform changes concurrently. Defaults to 10.
+        refresh_state (bool): whether Terraform refreshes its state before changing the resources. Defaults to True.
+        terraform_lock_timeout (float): seconds Terraform waits for its state lock. Defaults to not waiting.
 
     Raises:
         Exit: Exit if resources are already provisioned.
@@ -120,7 +160,16 @@ def provision(
         stack_name=stack,
     ):
         try:
-            _ = core.provision(location, prefix, password, verbose)
+            _ = core.provision(
+                location,
+                prefix,
+                password,
+                verbose,
+                lock_timeout=lock_timeout,
+                parallelism=parallelism,
+                refresh=refresh_state,
+                terraform_lock_timeout=terraform_lock_timeout,
+            )
         except MatchaError as e:
             print_error(str(e))
             raise typer.Exit()
@@ -179,9 +228,37 @@ def get(
 
 
 @app.command()
-def destroy() -> None:
+def destroy(
+    lock_timeout: float = typer.Option(
+        DEFAULT_LOCK_TIMEOUT_SECONDS,
+        min=0,
+        help="Seconds to wait for the remote state lock if someone else holds it, 0 to fail straight away.",
+    ),
+    parallelism: int = typer.Option(
+        DEFAULT_PARALLELISM,
+        min=MIN_PARALLELISM,
+        max=MAX_PARALLELISM,
+        help="The number of resources Terraform changes concurrently, lower it when Azure throttles the requests.",
+    ),
+    refresh_state: bool = typer.Option(
+        DEFAULT_REFRESH,
+        "--refresh-state/--skip-refresh-state",
+        help="Have Terraform refresh its state from Azure before changing the resources, skip it when the state is known to be fresh.",
+    ),
+    terraform_lock_timeout: float = typer.Option(
+        DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
+        min=0,
+        help="Seconds Terraform waits for its own state lock, separate from the remote state lock, 0 to fail straight away.",
+    ),
+) -> None:
     """Destroy the provisioned cloud resources.
 
+    Args:
+        lock_timeout (float): seconds to wait for the remote state lock. Defaults to not waiting.
+        parallelism (int): the number of resources Terraform destroys concurrently. Defaults to 10.
+        refresh_state (bool): whether Terraform refreshes its state before destroying the resources. Defaults to True.
+        terraform_lock_timeout (float): seconds Terraform waits for its state lock. Defaults to not waiting.
+
     Raises:
         Exit: Exit if core.destroy throws a MatchaError.
     """
@@ -194,7 +271,12 @@ def destroy() -> None:
         stack_name=stack,
     ):
         try:
-            core.destroy()
+            core.destroy(
+                lock_timeout=lock_timeout,
+                parallelism=parallelism,
+                refresh=refresh_state,
+                terraform_lock_timeout=terraform_lock_timeout,
+            )
             print_status(build_step_success_status("Destroying resources is complete!"))
         except MatchaError as e:
             print_error(str(e))
@@ -235,6 +317,11 @@ def cli(
     version: Optional[bool] = typer.Option(
         None, "--version", callback=version_callback, help="Matcha version."
     ),
+    refresh: bool = typer.Option(
+        False,
+        "--refresh",
+        help="Ignore cached Azure metadata, such as regions and role assignments, and fetch it again.",
+    ),
 ) -> None:
     """CLI base command for matcha.
 
@@ -242,7 +329,8 @@ def cli(
 
     For more help on how to use matcha, head to https://fuzzylabs.github.io/matcha/
     """
-    pass
+    if refresh:
+        MetadataCache().invalidate()
 
 
 @analytics_app.command()
@@ -281,5 +369,69 @@ def set(stack: str = typer.Argument("default")) -> None:
         raise typer.Exit()
 
 
+@state_app.command(help="List the versions of the remote state, oldest first.")
+def history() -> None:
+    """List the versions of the remote state, oldest first.
+
+    Raises:
+        Exit: Exit if core.state_history throws a MatchaError.
+    """
+    try:
+        entries = core.state_history()
+    except MatchaError as e:
+        print_error(str(e))
+        raise typer.Exit()
+
+    if not entries:
+        print_status(build_status("The remote state has no history yet."))
+        return
+
+    for entry in entries:
+        restored = (
+            f", restored from {entry.restored_from}" if entry.restored_from else ""
+        )
+        print_status(f"{entry.id}  {entry.created}  {len(entry.files)} files{restored}")
+
+
+@state_app.command(
+    help="Restore the remote state to a version listed by 'matcha state history'."
+)
+def restore(
+    entry_id: str = typer.Argument(
+        ..., help="The ID of the version, as listed by 'matcha state history'."
+    ),
+    lock_timeout: float = typer.Option(
+        DEFAULT_LOCK_TIMEOUT_SECONDS,
+        min=0,
+        help="Seconds to wait for the remote state lock if someone else holds it, 0 to fail straight away.",
+    ),
+) -> None:
+    """Restore the remote state to a version listed by 'matcha state history'.
+
+    Args:
+        entry_id (str): the ID of the version to restore.
+        lock_timeout (float): seconds to wait for the remote state lock. Defaults to not waiting.
+
+    Raises:
+        Exit: Exit if core.restore_state throws a MatchaError.
+    """
+    if not typer.confirm(
+        f"Are you sure you want to restore the remote state to '{entry_id}'?"
+    ):
+        raise typer.Exit()
+
+    try:
+        restore_entry = core.restore_state(entry_id, lock_timeout=lock_timeout)
+    except MatchaError as e:
+        print_error(str(e))
+        raise typer.Exit()
+
+    print_status(
+        build_step_success_status(
+            f"The remote state was restored to '{entry_id}', recorded as '{restore_entry.id}'."
+        )
+    )
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,125 @@
+"""UI live progress of the resources Terraform is changing."""
+from typing import Any, Dict
+
+from rich.progress import TaskID
+
+from matcha_ml.cli.ui.emojis import Emojis
+from matcha_ml.cli.ui.spinner import Spinner
+from matcha_ml.cli.ui.status_message_builders import (
+    build_status,
+    build_substep_success_status,
+)
+
+# The verbs shown while a resource is being changed and once it was changed, by the action of the Terraform hook
+ACTION_VERBS = {
+    "create": ("Creating", "Created"),
+    "read": ("Reading", "Read"),
+    "update": ("Updating", "Updated"),
+    "replace": ("Replacing", "Replaced"),
+    "delete": ("Destroying", "Destroyed"),
+}
+
+
+class ResourceProgress(Spinner):
+    """A spinner that also shows a row for every resource Terraform is changing.
+
+    It is fed the machine-readable events of `terraform apply -json` or `terraform destroy -json`. A resource's row
+    spins with its elapsed time while it is being changed, and is replaced by a line printed above the spinner once
+    the resource was changed or failed, so only the resources in flight take up rows.
+    """
+
+    def __init__(self, status: str):
+        """Initialize the progress with the overall status as its first row.
+
+        Args:
+            status (str): task description
+        """
+        super().__init__(status)
+        self.overall_task = self.progress.task_ids[0]
+        self.resource_tasks: Dict[str, TaskID] = {}
+        self.started = 0
+        self.finished = 0
+        self.errored = 0
+
+    def __enter__(self) -> "ResourceProgress":
+        """Start showing the progress when it is used in a `with` statement.
+
+        Returns:
+            ResourceProgress: the instance for a context manager.
+        """
+        super().__enter__()
+        return self
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        """Update the progress with an event of Terraform's machine-readable output.
+
+        Args:
+            event (Dict[str, Any]): the event, one line of Terraform's JSON output.
+        """
+        event_type = event.get("type")
+        hook = event.get("hook", {})
+        address = hook.get("resource", {}).get("addr")
+
+        if event_type == "apply_start" and address is not None:
+            self._start_resource(address, hook.get("action", ""))
+        elif event_type == "apply_complete" and address is not None:
+            self._finish_resource(address, hook.get("action", ""), errored=False)
+        elif event_type == "apply_errored" and address is not None:
+            self._finish_resource(address, hook.get("action", ""), errored=True)
+        elif event_type == "change_summary":
+            self.progress.update(
+                self.overall_task,
+                description=f"{self.status}: {event.get('@message', '')}",
+            )
+
+    def _start_resource(self, address: str, action: str) -> None:
+        """Add a row for a resource Terraform started to change.
+
+        Args:
+            address (str): the resource address.
+            action (str): the action of the change.
+        """
+        verb, _ = ACTION_VERBS.get(action, ("Changing", "Changed"))
+        self.resource_tasks[address] = self.progress.add_task(
+            description=f"  {verb} {address}", total=None
+        )
+        self.started += 1
+        self._update_overall()
+
+    def _finish_resource(self, address: str, action: str, errored: bool) -> None:
+        """Replace the row of a resource that was changed, or failed, with a line above the spinner.
+
+        Args:
+            address (str): the resource address.
+            action (str): the action of the change.
+            errored (bool): whether the change failed.
+        """
+        task_id = self.resource_tasks.pop(address, None)
+        elapsed = ""
+        if task_id is not None:
+            task = next(task for task in self.progress.tasks if task.id == task_id)
+            if task.elapsed is not None:
+                elapsed = f" ({task.elapsed:.0f}s)"
+            self.progress.remove_task(task_id)
+
+        verb, done_verb = ACTION_VERBS.get(action, ("Changing", "Changed"))
+        if errored:
+            self.errored += 1
+            line = build_status(
+                f"{Emojis.CROSS.value} {verb} {address} failed{elapsed}"
+            )
+        else:
+            self.finished += 1
+            line = build_substep_success_status(
+                f"{Emojis.CHECKMARK.value} {done_verb} {address}{elapsed}"
+            )
+        self.progress.console.print(line)
+        self._update_overall()
+
+    def _update_overall(self) -> None:
+        """Show how many of the resources started so far are done."""
+        failed = f", {self.errored} failed" if self.errored else ""
+        self.progress.update(
+            self.overall_task,
+            description=f"{self.status} ({self.finished} of {self.started} resources done{failed})",
+        )
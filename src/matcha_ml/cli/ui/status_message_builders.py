@@ -1,5 +1,5 @@
 """UI status message builders."""
-import time
+import asyncio
 from random import shuffle
 from typing import List, Optional, Tuple
 
@@ -90,8 +90,28 @@ def build_warning_status(status: str) -> str:
     return f"[yellow]{status}[/yellow]"
 
 
-def terraform_status_update(spinner: Spinner) -> None:
-    """Outputs some facts about the deployment and matcha tea while the terraform functions are running.
+def build_plan_summary_status(to_add: int, to_change: int, to_destroy: int) -> str:
+    """Build the status message summarising the resource changes of a Terraform plan.
+
+    Args:
+        to_add (int): the number of resources to create.
+        to_change (int): the number of resources to update in place.
+        to_destroy (int): the number of resources to delete.
+
+    Returns:
+        str: formatted message
+    """
+    if not (to_add or to_change or to_destroy):
+        return build_status("Plan: no resources to change.")
+
+    return build_status(
+        f"Plan: [green]{to_add} to add[/green], [yellow]{to_change} to change[/yellow], "
+        f"[red]{to_destroy} to destroy[/red]."
+    )
+
+
+async def terraform_status_update(spinner: Spinner) -> None:
+    """Outputs some facts about the deployment and matcha tea while the terraform functions are running, until cancelled.
 
     Args:
         spinner: The rich spinner that the messages are printed above.
@@ -99,9 +119,9 @@ def terraform_status_update(spinner: Spinner) -> None:
     infra_facts_shuffled = list(range(len(INFRA_FACTS)))
     shuffle(infra_facts_shuffled)
 
-    time.sleep(10)  # there should be a delay prior to spitting facts.
+    await asyncio.sleep(10)  # there should be a delay prior to spitting facts.
 
-    while True:
+    while infra_facts_shuffled:
         fact = INFRA_FACTS[infra_facts_shuffled.pop()]
         spinner.progress.console.print(build_status(fact))
-        time.sleep(10)
+        await asyncio.sleep(10)
@@ -6,7 +6,9 @@ from .core import (
     get,
     provision,
     remove_state_lock,
+    restore_state,
     stack_set,
+    state_history,
 )
 
 __all__ = [
@@ -17,4 +19,6 @@ __all__ = [
     "destroy",
     "provision",
     "stack_set",
+    "state_history",
+    "restore_state",
 ]
@@ -0,0 +1,89 @@
+"""Preflight checks for the provision command."""
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from matcha_ml.cli._validation import region_validation
+from matcha_ml.core._validation import is_valid_prefix
+from matcha_ml.errors import MatchaInputError
+from matcha_ml.state import RemoteStateManager
+
+# One worker for each independent check: region, prefix and remote state
+PREFLIGHT_MAX_WORKERS = 3
+
+
+@dataclasses.dataclass
+class PreflightResult:
+    """The outcome of the provision preflight checks."""
+
+    is_remote_state_stale: bool = False
+    is_remote_state_provisioned: bool = False
+    input_errors: List[MatchaInputError] = dataclasses.field(default_factory=list)
+
+    def raise_for_input_errors(self) -> None:
+        """Raise the first input error found by the checks, if any.
+
+        Raises:
+            MatchaInputError: when the prefix or region is invalid.
+        """
+        if self.input_errors:
+            raise self.input_errors[0]
+
+
+def _check_remote_state(remote_state_manager: RemoteStateManager) -> Tuple[bool, bool]:
+    """Check whether the remote state is stale or already provisioned.
+
+    Both checks share the same Azure Storage client, so they are run one after the other.
+
+    Args:
+        remote_state_manager (RemoteStateManager): the remote state manager.
+
+    Returns:
+        Tuple[bool, bool]: whether the remote state is stale, and whether it is provisioned.
+    """
+    is_stale = remote_state_manager.is_state_stale()
+    is_provisioned = not is_stale and remote_state_manager.is_state_provisioned()
+
+    return is_stale, is_provisioned
+
+
+def run_provision_preflight(
+    location: str, prefix: str, remote_state_manager: RemoteStateManager
+) -> PreflightResult:
+    """Run the checks needed before provisioning concurrently.
+
+    The region, the prefix and the remote state are checked in parallel, so the time taken is bounded by the slowest
+    check rather than the sum of all of them. Authentication is shared between the checks by the AzureSessionRegistry.
+
+    Args:
+        location (str): Azure location in which all resources will be provisioned.
+        prefix (str): Prefix used for all resources.
+        remote_state_manager (RemoteStateManager): the remote state manager.
+
+    Returns:
+        PreflightResult: the combined result of the checks.
+
+    Raises:
+        MatchaError: when a check fails for a reason other than invalid input, e.g. missing permissions.
+    """
+    with ThreadPoolExecutor(max_workers=PREFLIGHT_MAX_WORKERS) as executor:
+        remote_state_future = executor.submit(_check_remote_state, remote_state_manager)
+        input_futures = [
+            executor.submit(is_valid_prefix, prefix),
+            executor.submit(region_validation, location),
+        ]
+
+    result = PreflightResult()
+    (
+        result.is_remote_state_stale,
+        result.is_remote_state_provisioned,
+    ) = remote_state_future.result()
+
+    for future in input_futures:
+        error = future.exception()
+        if isinstance(error, MatchaInputError):
+            result.input_errors.append(error)
+        elif error is not None:
+            raise error
+
+    return result
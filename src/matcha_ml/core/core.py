@@ -1,7 +1,7 @@
 """The core functionality for Matcha API."""
 import os
 from enum import Enum, EnumMeta
-from typing import Optional
+from typing import List, Optional
 
 from matcha_ml.cli._validation import get_command_validation
 from matcha_ml.cli.ui.print_messages import (
@@ -18,13 +18,21 @@ from matcha_ml.config import (
     MatchaConfigComponentProperty,
     MatchaConfigService,
 )
-from matcha_ml.core._validation import is_valid_prefix, is_valid_region
+from matcha_ml.core._preflight import run_provision_preflight
 from matcha_ml.errors import MatchaError, MatchaInputError
 from matcha_ml.runners import AzureRunner
 from matcha_ml.services.analytics_service import AnalyticsEvent, track
 from matcha_ml.services.global_parameters_service import GlobalParameters
+from matcha_ml.services.terraform_service import (
+    DEFAULT_PARALLELISM,
+    DEFAULT_REFRESH,
+    DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
+    validate_terraform_options,
+)
 from matcha_ml.state import MatchaStateService, RemoteStateManager
 from matcha_ml.state.matcha_state import MatchaState
+from matcha_ml.state.state_lock import DEFAULT_LOCK_TIMEOUT_SECONDS
+from matcha_ml.storage.state_history import HistoryEntry
 from matcha_ml.templates.azure_template import DEFAULT_STACK, LLM_STACK, AzureTemplate
 
 
@@ -88,6 +96,22 @@ def _show_terraform_outputs(matcha_state: MatchaState) -> None:
     print_json(resources_json)
 
 
+def _validate_terraform_options(parallelism: int, lock_timeout: float) -> None:
+    """Check the options of the Terraform operations before anything is changed.
+
+    Args:
+        parallelism (int): the number of resource operations Terraform runs concurrently.
+        lock_timeout (float): the number of seconds Terraform waits for its state lock.
+
+    Raises:
+        MatchaInputError: if the parallelism is out of bounds, or the lock timeout is negative.
+    """
+    try:
+        validate_terraform_options(parallelism, lock_timeout)
+    except ValueError as e:
+        raise MatchaInputError(str(e))
+
+
 @track(event_name=AnalyticsEvent.GET)
 def get(
     resource_name: Optional[str],
@@ -99,6 +123,9 @@ def get(
     The `MatchaStateComponent` objects in turn hold `MatchaResource` and `MatchaResourceProperty` components.
     If no resource name is provided, all resources are returned.
 
+    Reading does not lock the remote state, so it runs alongside other reads and alongside provision or destroy, and
+    returns the state as it was last saved.
+
     Examples:
         >>> get("cloud", "resource-group-name")
         MatchaState(components=[MatchaStateComponent(resource=MatchaResource(name='cloud'),
@@ -135,18 +162,18 @@ def get(
 
     if not MatchaStateService.state_exists():
         # if the state file doesn't exist, then download it from the remote
-        remote_state.download(os.getcwd())
+        remote_state.read_committed_state(os.getcwd())
 
     matcha_state_service = MatchaStateService()
 
-    with remote_state.use_lock():
+    with remote_state.use_read_lock():
         local_hash = matcha_state_service.get_hash_local_state()
         remote_hash = remote_state.get_hash_remote_state(
             matcha_state_service.matcha_state_path
         )
 
         if local_hash != remote_hash:
-            remote_state.download(os.getcwd())
+            remote_state.read_committed_state(os.getcwd())
 
             matcha_state_service = MatchaStateService()
 
@@ -172,16 +199,34 @@ def get(
 
 
 @track(event_name=AnalyticsEvent.DESTROY)
-def destroy() -> None:
+def destroy(
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT_SECONDS,
+    parallelism: int = DEFAULT_PARALLELISM,
+    refresh: bool = DEFAULT_REFRESH,
+    terraform_lock_timeout: float = DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
+) -> None:
     """Destroy the provisioned cloud resources.
 
     Decommission the cloud infrastructure built by Matcha when provision has been called either historically or during
     this session. After calling destroy, the resources provisioned by matcha should no longer be active on your
     chosen provider's UI.
 
+    Args:
+        lock_timeout (float): the number of seconds to wait for the remote state lock if someone else holds it.
+            Defaults to not waiting.
+        parallelism (int): the number of resources Terraform destroys concurrently. Defaults to 10, lower it when the
+            cloud provider throttles the requests.
+        refresh (bool): whether Terraform refreshes the state from the cloud before destroying the resources. Defaults
+            to True, skip it when the state is known to be fresh.
+        terraform_lock_timeout (float): the number of seconds Terraform waits for its own state lock, which matcha's
+            remote state lock already guards. Defaults to not waiting.
+
     Raises:
         Matcha Error: where no state has been provisioned.
+        MatchaInputError: if the parallelism or the lock timeout is invalid.
     """
+    _validate_terraform_options(parallelism, terraform_lock_timeout)
+
     remote_state_manager = RemoteStateManager()
 
     if not remote_state_manager.is_state_provisioned():
@@ -189,9 +234,13 @@ def destroy() -> None:
             "Error - resources that have not been provisioned cannot be destroyed. Run 'matcha provision' to get started!"
         )
 
-    template_runner = AzureRunner()
+    template_runner = AzureRunner(
+        parallelism=parallelism,
+        refresh=refresh,
+        lock_timeout=terraform_lock_timeout,
+    )
     with remote_state_manager.use_lock(
-        destroy=True
+        destroy=True, timeout=lock_timeout
     ), remote_state_manager.use_remote_state(destroy=True):
         template_runner.deprovision()
         remote_state_manager.deprovision_remote_state()
@@ -226,12 +275,67 @@ def remove_state_lock() -> None:
     remote_state.unlock()
 
 
+def state_history() -> List[HistoryEntry]:
+    """List the entries of the history of the remote state, oldest first.
+
+    An entry is recorded every time provision changes the state, and every time the state is restored.
+
+    Returns:
+        List[HistoryEntry]: the entries.
+
+    Raises:
+        MatchaError: where no state has been provisioned.
+    """
+    remote_state_manager = RemoteStateManager()
+
+    if not remote_state_manager.is_state_provisioned():
+        raise MatchaError(
+            "Error - matcha state has not been initialized, there is no history to show."
+        )
+
+    return remote_state_manager.history()
+
+
+def restore_state(
+    entry_id: str, lock_timeout: float = DEFAULT_LOCK_TIMEOUT_SECONDS
+) -> HistoryEntry:
+    """Restore the remote state to an entry of its history, and download the restored state.
+
+    Args:
+        entry_id (str): the ID of the entry to restore, as listed by state_history.
+        lock_timeout (float): the number of seconds to wait for the remote state lock if someone else holds it.
+            Defaults to not waiting.
+
+    Returns:
+        HistoryEntry: the new entry, recording the restore.
+
+    Raises:
+        MatchaError: where no state has been provisioned.
+    """
+    remote_state_manager = RemoteStateManager()
+
+    if not remote_state_manager.is_state_provisioned():
+        raise MatchaError(
+            "Error - matcha state has not been initialized, there is no history to restore."
+        )
+
+    with remote_state_manager.use_lock(timeout=lock_timeout):
+        restore_entry = remote_state_manager.restore(entry_id)
+        remote_state_manager.download(os.getcwd())
+
+    return restore_entry
+
+
 @track(event_name=AnalyticsEvent.PROVISION)
-def provision(
+def provision(  # noqa: PLR0913, PLR0917
     location: str,
     prefix: str,
     password: str,
     verbose: Optional[bool] = False,
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT_SECONDS,
+    parallelism: int = DEFAULT_PARALLELISM,
+    refresh: bool = DEFAULT_REFRESH,
+    terraform_lock_timeout: float = DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
 ) -> MatchaState:
     """Provision cloud resources using existing Matcha Terraform templates.
 
@@ -250,6 +354,14 @@ def provision(
         prefix (str): Prefix used for all resources.
         password (str): Password for the deployment server.
         verbose (bool optional): additional output is show when True. Defaults to False.
+        lock_timeout (float): the number of seconds to wait for the remote state lock if someone else holds it.
+            Defaults to not waiting.
+        parallelism (int): the number of resources Terraform provisions concurrently. Defaults to 10, lower it when
+            the cloud provider throttles the requests.
+        refresh (bool): whether Terraform refreshes the state from the cloud before planning the changes. Defaults to
+            True, skip it when the state is known to be fresh.
+        terraform_lock_timeout (float): the number of seconds Terraform waits for its own state lock, which matcha's
+            remote state lock already guards. Defaults to not waiting.
 
     Returns:
         MatchaState: the information of the provisioned resources.
@@ -258,16 +370,28 @@ def provision(
         MatchaError: If resources are already provisioned.
         MatchaError: If prefix is not valid.
         MatchaError: If region is not valid.
+        MatchaInputError: If the parallelism or the lock timeout is invalid.
     """
+    _validate_terraform_options(parallelism, terraform_lock_timeout)
+
     remote_state_manager = RemoteStateManager()
-    template_runner = AzureRunner()
+    template_runner = AzureRunner(
+        parallelism=parallelism,
+        refresh=refresh,
+        lock_timeout=terraform_lock_timeout,
+    )
 
     if MatchaStateService.state_exists():
         matcha_state_service = MatchaStateService()
         if matcha_state_service.is_local_state_stale():
             template_runner.remove_matcha_dir()
 
-    if remote_state_manager.is_state_stale():
+    prefix = prefix.lower()
+
+    # Validate the inputs and check the remote state concurrently
+    preflight = run_provision_preflight(location, prefix, remote_state_manager)
+
+    if preflight.is_remote_state_stale:
         if verbose:
             print_status(
                 build_warning_status(
@@ -277,18 +401,13 @@ def provision(
         MatchaConfigService.delete_matcha_config()
         template_runner.remove_matcha_dir()
 
-    if remote_state_manager.is_state_provisioned():
+    if preflight.is_remote_state_provisioned:
         raise MatchaError(
             "Error - Matcha has detected that there are resources already provisioned. Use 'matcha destroy' to remove the existing resources before trying to provision again."
         )
 
     # Input variable checks
-    try:
-        prefix = prefix.lower()
-        _ = is_valid_prefix(prefix)
-        _ = is_valid_region(location)
-    except MatchaInputError as e:
-        raise e
+    preflight.raise_for_input_errors()
 
     if MatchaConfigService.get_stack() is None:
         stack_set("default")
@@ -296,7 +415,9 @@ def provision(
     # Provision resource group and remote state storage
     remote_state_manager.provision_remote_state(location, prefix)
 
-    with remote_state_manager.use_lock(), remote_state_manager.use_remote_state():
+    with remote_state_manager.use_lock(
+        timeout=lock_timeout
+    ), remote_state_manager.use_remote_state():
         project_directory = os.getcwd()
         destination = os.path.join(
             project_directory, ".matcha", "infrastructure", "resources"
@@ -3,15 +3,33 @@ import os
 import shutil
 
 from matcha_ml.runners.base_runner import BaseRunner
+from matcha_ml.services.terraform_service import (
+    DEFAULT_PARALLELISM,
+    DEFAULT_REFRESH,
+    DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
+)
 from matcha_ml.state.matcha_state import MatchaStateService
 
 
 class AzureRunner(BaseRunner):
     """A Runner class provides methods that interface with the Terraform service to facilitate the provisioning and deprovisioning of resources."""
 
-    def __init__(self) -> None:
-        """Initialize AzureRunner class."""
-        super().__init__()
+    def __init__(
+        self,
+        parallelism: int = DEFAULT_PARALLELISM,
+        refresh: bool = DEFAULT_REFRESH,
+        lock_timeout: float = DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
+    ) -> None:
+        """Initialize AzureRunner class.
+
+        Args:
+            parallelism (int): the number of resource operations Terraform runs concurrently.
+            refresh (bool): whether Terraform refreshes the state from the cloud before planning the changes.
+            lock_timeout (float): the number of seconds Terraform waits for its state lock.
+        """
+        super().__init__(
+            parallelism=parallelism, refresh=refresh, lock_timeout=lock_timeout
+        )
 
     def remove_matcha_dir(self) -> None:
         """Removes the project's .matcha directory"."""
@@ -1,22 +1,30 @@
 """Run terraform templates to provision and deprovision resources."""
+import asyncio
+import contextlib
 import os
 from abc import abstractmethod
-from multiprocessing.pool import ThreadPool
-from typing import Any, Optional
+from typing import Any, Awaitable, Optional
 
 import typer
 
 from matcha_ml.cli.ui.emojis import Emojis
 from matcha_ml.cli.ui.print_messages import print_error, print_status
+from matcha_ml.cli.ui.resource_progress import ResourceProgress
 from matcha_ml.cli.ui.spinner import Spinner
 from matcha_ml.cli.ui.status_message_builders import (
+    build_plan_summary_status,
     build_status,
     build_substep_success_status,
     terraform_status_update,
 )
 from matcha_ml.errors import MatchaTerraformError
+from matcha_ml.services.terraform_runner import run_interruptible
 from matcha_ml.services.terraform_service import (
+    DEFAULT_PARALLELISM,
+    DEFAULT_REFRESH,
+    DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
     TerraformConfig,
+    TerraformResult,
     TerraformService,
 )
 
@@ -26,17 +34,31 @@ SPINNER = "dots"
 class BaseRunner:
     """A BaseRunner class provides methods that interface with the Terraform service to facilitate the provisioning and deprovisioning of resources."""
 
-    def __init__(self, working_dir: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        working_dir: Optional[str] = None,
+        parallelism: int = DEFAULT_PARALLELISM,
+        refresh: bool = DEFAULT_REFRESH,
+        lock_timeout: float = DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS,
+    ) -> None:
         """Initialize BaseRunner class.
 
         Args:
             working_dir (Optional[str]): Working directory for terraform. Defaults to None.
+            parallelism (int): the number of resource operations Terraform runs concurrently.
+            refresh (bool): whether Terraform refreshes the state from the cloud before planning the changes.
+            lock_timeout (float): the number of seconds Terraform waits for its state lock.
         """
         if working_dir is not None:
             working_dir = working_dir
         else:
             working_dir = TerraformConfig().working_dir
-        self.terraform_config = TerraformConfig(working_dir=working_dir)
+        self.terraform_config = TerraformConfig(
+            working_dir=working_dir,
+            parallelism=parallelism,
+            refresh=refresh,
+            lock_timeout=lock_timeout,
+        )
         self.tfs = TerraformService(self.terraform_config)
         self.tf_state_dir = self.tfs.get_tf_state_dir()
 
@@ -77,16 +99,18 @@ class BaseRunner:
         self.tfs.verify_kubectl_config_file(base_path)
 
     def _initialize_terraform(self, msg: str = "", destroy: bool = False) -> None:
-        """Run terraform init to initialize Terraform .
+        """Run terraform init to initialize Terraform, unless it is initialized for the current templates.
+
+        Init is skipped only when the fingerprint of the modules, the dependency lock file and the backend recorded by
+        the last successful init still matches the working directory.
 
         Raises:
             MatchaTerraformError: if 'terraform init' failed.
             msg (str) : Message to display. Default is empty string.
             destroy (bool): whether this function is being called in a destructive context
         """
-        if self.tf_state_dir.exists():
+        if self.tfs.is_initialized():
             if not destroy:
-                # this directory gets created after a successful init command
                 print_status(
                     build_status(
                         f"matcha {Emojis.MATCHA.value} has already been initialized. Skipping this step..."
@@ -94,11 +118,19 @@ class BaseRunner:
                 )
 
         else:
-            print_status(
-                build_status(
-                    f"\n{Emojis.WAITING.value} Brewing matcha {Emojis.MATCHA.value}...\n"
+            if self.tf_state_dir.exists():
+                # this directory gets created after a successful init command
+                print_status(
+                    build_status(
+                        f"matcha {Emojis.MATCHA.value} templates have changed since they were initialized, initializing again..."
+                    )
+                )
+            else:
+                print_status(
+                    build_status(
+                        f"\n{Emojis.WAITING.value} Brewing matcha {Emojis.MATCHA.value}...\n"
+                    )
                 )
-            )
 
             with Spinner("Initializing"):
                 tf_result = self.tfs.init()
@@ -109,10 +141,31 @@ class BaseRunner:
 
             print_status(
                 build_substep_success_status(
-                    f"{Emojis.CHECKMARK.value} {msg} {Emojis.MATCHA.value} initialized!\n"
+                    f"{Emojis.CHECKMARK.value} {msg} {Emojis.MATCHA.value} initialized! ({tf_result.duration:.1f}s)\n"
                 )
             )
 
+    @staticmethod
+    async def _run_with_status_updates(
+        command: Awaitable[TerraformResult], spinner: Spinner
+    ) -> TerraformResult:
+        """Await a Terraform command while facts are printed above the spinner, which stop with the command.
+
+        Args:
+            command (Awaitable[TerraformResult]): the command.
+            spinner (Spinner): the spinner the facts are printed above.
+
+        Returns:
+            TerraformResult: the result of the command.
+        """
+        status_updates = asyncio.ensure_future(terraform_status_update(spinner))
+        try:
+            return await command
+        finally:
+            status_updates.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await status_updates
+
     def _check_matcha_directory_exists(self) -> None:
         """Checks if .matcha directory exists within the current working directory.
 
@@ -133,24 +186,47 @@ class BaseRunner:
             raise typer.Exit()
 
     def _apply_terraform(self, msg: str = "") -> None:
-        """Run terraform apply to create resources on cloud.
+        """Plan the changes, then apply that exact plan to create resources on cloud, unless it changes nothing.
 
         Args:
             msg (str) : Name of the type of resource (e.g. "Remote State" or "Matcha").
 
         Raises:
-            MatchaTerraformError: if 'terraform apply' failed.
+            MatchaTerraformError: if 'terraform plan' or 'terraform apply' failed.
         """
-        with Spinner("Applying") as spinner:
-            pool = ThreadPool(processes=1)
-            _ = pool.apply_async(terraform_status_update, (spinner,))
+        try:
+            with Spinner("Planning"):
+                plan = self.tfs.plan()
 
-            tf_result = self.tfs.apply()
+                if plan.result.return_code != 0:
+                    raise MatchaTerraformError(tf_error=plan.result.std_err)
 
-            pool.terminate()
+            print_status(
+                build_plan_summary_status(plan.to_add, plan.to_change, plan.to_destroy)
+            )
 
-            if tf_result.return_code != 0:
-                raise MatchaTerraformError(tf_error=tf_result.std_err)
+            if not plan.has_changes:
+                print_status(
+                    build_substep_success_status(
+                        f"{Emojis.CHECKMARK.value} {msg or 'Matcha'} resources are up to date, nothing to apply.\n"
+                    )
+                )
+                return
+
+            with ResourceProgress("Applying") as progress:
+                tf_result = run_interruptible(
+                    self._run_with_status_updates(
+                        self.tfs.apply_async(
+                            self.tfs.plan_path, on_event=progress.handle_event
+                        ),
+                        progress,
+                    )
+                )
+
+                if tf_result.return_code != 0:
+                    raise MatchaTerraformError(tf_error=tf_result.std_err)
+        finally:
+            self.tfs.discard_plan()
 
         if msg:
             print_status(
@@ -177,8 +253,10 @@ class BaseRunner:
             build_status(f"{Emojis.WAITING.value} Destroying {msg} resources...")
         )
         print()
-        with Spinner("Destroying"):
-            tf_result = self.tfs.destroy()
+        with ResourceProgress("Destroying") as progress:
+            tf_result = run_interruptible(
+                self.tfs.destroy_async(on_event=progress.handle_event)
+            )
 
             if tf_result.return_code != 0:
                 raise MatchaTerraformError(tf_error=tf_result.std_err)
@@ -1,4 +1,5 @@
 """init for the services package."""
+from .async_azure_service import AsyncAzureClient
 from .azure_service import AzureClient
 
-__all__ = ["AzureClient"]
+__all__ = ["AsyncAzureClient", "AzureClient"]
@@ -0,0 +1,557 @@
+"""The asynchronous Azure Service interface."""
+import asyncio
+import functools
+from types import TracebackType
+from typing import Any, Callable, Dict, Optional, Set, Type, TypeVar
+
+from azure.core.credentials import AccessToken
+from azure.core.credentials_async import AsyncTokenCredential
+from azure.core.exceptions import (
+    ClientAuthenticationError,
+    HttpResponseError,
+    ResourceNotFoundError,
+)
+from azure.core.pipeline.transport import AsyncHttpTransport, AsyncioRequestsTransport
+from azure.identity import CredentialUnavailableError
+from azure.identity.aio import AzureCliCredential
+from azure.mgmt.authorization.aio import AuthorizationManagementClient
+from azure.mgmt.confluent.models._confluent_management_client_enums import (  # type: ignore [import]
+    ProvisionState,
+)
+from azure.mgmt.resource.resources.aio import ResourceManagementClient
+from azure.mgmt.resource.resources.models import ResourceGroup
+from azure.mgmt.resource.subscriptions.aio import SubscriptionClient
+from azure.mgmt.storage.aio import StorageManagementClient
+
+from matcha_ml.errors import (
+    MatchaAuthenticationError,
+    MatchaError,
+    MatchaPermissionError,
+)
+from matcha_ml.services.azure_service import (
+    MISSING_ROLES_ERROR_MESSAGE,
+    ResourceGroupCache,
+    decode_principal_id,
+    has_accepted_role_configuration,
+)
+from matcha_ml.services.http_transport_service import SharedHttpTransport
+from matcha_ml.services.metadata_cache_service import MetadataCache
+
+try:
+    from azure.core.pipeline.transport import AioHttpTransport
+
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+AsyncTransport = AsyncHttpTransport[Any, Any]
+
+T = TypeVar("T")
+
+
+async def run_blocking(func: Callable[..., T], *args: Any) -> T:
+    """Run a blocking function, such as file I/O or hashing, in the default executor so the event loop keeps running.
+
+    This is asyncio.to_thread, which Python 3.8 does not have.
+
+    Args:
+        func (Callable[..., T]): the blocking function.
+        *args (Any): the arguments of the function.
+
+    Returns:
+        T: the result of the function.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args))
+
+
+def create_async_transport() -> AsyncTransport:
+    """Create the transport used by the aio Azure SDK clients.
+
+    The aio SDKs default to an aiohttp transport. When aiohttp is not installed, a transport that runs requests in
+    the default executor is used instead, so the asynchronous clients are always usable. That transport sends its
+    requests through the pooled session of the SharedHttpTransport.
+
+    Returns:
+        AsyncTransport: a new transport.
+    """
+    if AIOHTTP_AVAILABLE:
+        transport: AsyncTransport = AioHttpTransport()
+    else:
+        transport = AsyncioRequestsTransport(
+            session=SharedHttpTransport.session(), session_owner=False
+        )
+
+    return transport
+
+
+class AsyncAzureClient:
+    """Asynchronous counterpart of the AzureClient, built on the aio Azure SDKs.
+
+    The client exposes the same operations as AzureClient as coroutines, so that independent lookups can run
+    concurrently on one event loop. Use AsyncAzureClient.create to get an authenticated client, and close it, or use it
+    as an async context manager, to release its connections.
+    """
+
+    _regions: Optional[Set[str]] = None
+    _access_token: Optional[AccessToken] = None
+    _resource_client: Optional[ResourceManagementClient] = None
+    _authorization_client: Optional[AuthorizationManagementClient] = None
+    _storage_client: Optional[StorageManagementClient] = None
+
+    def __init__(
+        self,
+        subscription_id: Optional[str] = None,
+        credential: Optional[AsyncTokenCredential] = None,
+        transport: Optional[AsyncTransport] = None,
+    ) -> None:
+        """Constructor for the asynchronous Azure Client object, no requests are made until it is authenticated.
+
+        Args:
+            subscription_id (Optional[str]): the subscription to use, defaults to the first subscription of the account.
+            credential (Optional[AsyncTokenCredential]): the credential to authenticate with, defaults to the Azure CLI.
+            transport (Optional[AsyncTransport]): the transport every SDK client sends its requests with, defaults to
+                a new transport per SDK client.
+        """
+        self._credential = (
+            credential if credential is not None else AzureCliCredential()
+        )
+        self._owns_credential = credential is None
+        self._transport = transport
+        self._metadata_cache = MetadataCache()
+        self._resource_group_cache = ResourceGroupCache()
+        self._client = SubscriptionClient(self._credential, **self._client_options())
+
+        self.authenticated = False
+        self.has_permissions = False
+        self.subscription_id = subscription_id
+
+    @classmethod
+    async def create(
+        cls,
+        subscription_id: Optional[str] = None,
+        credential: Optional[AsyncTokenCredential] = None,
+        transport: Optional[AsyncTransport] = None,
+    ) -> "AsyncAzureClient":
+        """Create an authenticated client.
+
+        Args:
+            subscription_id (Optional[str]): the subscription to use, defaults to the first subscription of the account.
+            credential (Optional[AsyncTokenCredential]): the credential to authenticate with, defaults to the Azure CLI.
+            transport (Optional[AsyncTransport]): the transport every SDK client sends its requests with.
+
+        Returns:
+            AsyncAzureClient: the authenticated client.
+        """
+        client = cls(subscription_id, credential, transport)
+        try:
+            await client.authenticate()
+        except BaseException:
+            await client.close()
+            raise
+
+        return client
+
+    async def __aenter__(self) -> "AsyncAzureClient":
+        """Enter the client's context.
+
+        Returns:
+            AsyncAzureClient: the client.
+        """
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the client when leaving its context.
+
+        Args:
+            exc_type (Optional[Type[BaseException]]): the type of the exception raised in the context, if any.
+            exc_value (Optional[BaseException]): the exception raised in the context, if any.
+            traceback (Optional[TracebackType]): the traceback of the exception raised in the context, if any.
+        """
+        await self.close()
+
+    async def close(self) -> None:
+        """Close every SDK client that was opened, and the credential if it is owned by this client."""
+        for sdk_client in (
+            self._client,
+            self._resource_client,
+            self._authorization_client,
+            self._storage_client,
+        ):
+            if sdk_client is not None:
+                await sdk_client.close()  # type: ignore [no-untyped-call]
+
+        if self._owns_credential:
+            await self._credential.close()
+
+    def _client_options(self) -> Dict[str, Any]:
+        """Keyword arguments shared by every SDK client.
+
+        Returns:
+            Dict[str, Any]: the SDK client options.
+        """
+        return {
+            "transport": self._transport
+            if self._transport is not None
+            else create_async_transport()
+        }
+
+    async def authenticate(self) -> None:
+        """Authenticate, resolve the subscription and check the user's role assignments.
+
+        Raises:
+            MatchaAuthenticationError: when the user is not authenticated with 'az login'.
+            MatchaPermissionError: when the user does not have required roles.
+        """
+        self.authenticated = await self._check_authentication()
+        if self.subscription_id is None:
+            self.subscription_id = await self._subscription_id()
+        self.has_permissions = await self._check_required_role_assignments()
+
+    async def _check_authentication(self) -> bool:
+        """Check whether the user is authenticated with 'az login'.
+
+        Raises:
+            MatchaAuthenticationError: when the Azure CLI is unable to be invoked.
+            MatchaAuthenticationError: when no access token is received.
+
+        Returns:
+            bool: True if the checks pass, an error is raised otherwise.
+        """
+        try:
+            self._access_token = await self._credential.get_token(
+                "https://management.azure.com/.default"
+            )
+        except CredentialUnavailableError:
+            raise MatchaAuthenticationError("unable to invoke the Azure CLI")
+        except ClientAuthenticationError:
+            raise MatchaAuthenticationError("no access token received")
+
+        return True
+
+    def _principal_cache_key(self, name: str) -> Optional[str]:
+        """Build a metadata cache key that is specific to the authenticated user.
+
+        Args:
+            name (str): the name of the cached item.
+
+        Returns:
+            Optional[str]: the cache key, or None if the user can't be identified.
+        """
+        if self._access_token is None:
+            return None
+
+        return f"azure/{name}/{self._get_principal_id()}"
+
+    async def _subscription_id(self) -> str:
+        """Fetch the subscription id, using the metadata cache where possible.
+
+        Returns:
+            str: the subscription id.
+        """
+        cache_key = self._principal_cache_key("subscription_id")
+        if cache_key is not None:
+            cached_subscription_id = await run_blocking(
+                self._metadata_cache.get, cache_key
+            )
+            if cached_subscription_id is not None:
+                return str(cached_subscription_id)
+
+        async for subscription in self._client.subscriptions.list():
+            subscription_id = str(subscription.subscription_id)
+            break
+        else:
+            raise MatchaAuthenticationError(
+                "no subscriptions found - you at least one subscription active in your Azure account."
+            )
+
+        if cache_key is not None:
+            await run_blocking(self._metadata_cache.set, cache_key, subscription_id)
+
+        return subscription_id
+
+    def _get_subscription_id(self) -> str:
+        """Get the subscription id of an authenticated client.
+
+        Raises:
+            MatchaAuthenticationError: when the client has not been authenticated.
+
+        Returns:
+            str: the subscription id.
+        """
+        if self.subscription_id is None:
+            raise MatchaAuthenticationError(
+                "internal error: the client needs to be authenticated first"
+            )
+
+        return self.subscription_id
+
+    def _get_principal_id(self) -> str:
+        """Get principal ID of the authenticated user.
+
+        Returns:
+            str: principal ID
+        """
+        if self._access_token is None:
+            raise MatchaAuthenticationError(
+                "internal error: the client needs to be authenticated first"
+            )
+
+        return decode_principal_id(self._access_token)
+
+    async def _fetch_user_roles(self) -> Set[str]:
+        """Fetch the Azure roles for the user.
+
+        Raises:
+            MatchaError: when the role assignments for a subscription can't be fetched from Azure, likely a connection issue.
+
+        Returns:
+            Set[str]: the role definition ids of the roles that the user has.
+        """
+        if self._authorization_client is None:
+            self._authorization_client = AuthorizationManagementClient(
+                self._credential, self._get_subscription_id(), **self._client_options()
+            )
+        principal_id = self._get_principal_id()
+
+        try:
+            roles = {
+                str(x.role_definition_id)
+                async for x in self._authorization_client.role_assignments.list_for_subscription(
+                    filter=f"principalId eq '{principal_id}'"
+                )
+                if x.principal_id == principal_id
+            }
+        except HttpResponseError:
+            raise MatchaError(
+                "Error - unable to get a response from Azure, make sure you have a stable connection."
+            )
+
+        return roles
+
+    async def _check_required_role_assignments(self) -> bool:
+        """Check if the user has one of the required sets of roles.
+
+        Only a successful check is stored in the metadata cache, so that newly granted roles are picked up immediately.
+
+        Returns:
+            bool: True if required roles are assigned
+
+        Raises:
+            MatchaPermissionError: when the user does not have required roles
+        """
+        subscription_id = self._get_subscription_id()
+        cache_key = self._principal_cache_key(f"role_assignments/{subscription_id}")
+        cached_check = (
+            await run_blocking(self._metadata_cache.get, cache_key)
+            if cache_key is not None
+            else None
+        )
+        if cached_check:
+            return True
+
+        user_roles = await self._fetch_user_roles()
+
+        if has_accepted_role_configuration(subscription_id, user_roles):
+            if cache_key is not None:
+                await run_blocking(self._metadata_cache.set, cache_key, True)
+            return True
+
+        raise MatchaPermissionError(MISSING_ROLES_ERROR_MESSAGE)
+
+    def _get_resource_client(self) -> ResourceManagementClient:
+        """Initialize and/or return the resource management client.
+
+        Returns:
+            ResourceManagementClient: the resource management client for the subscription.
+        """
+        if self._resource_client is None:
+            self._resource_client = ResourceManagementClient(
+                self._credential, self._get_subscription_id(), **self._client_options()
+            )
+        return self._resource_client
+
+    async def fetch_resource_groups(self) -> Dict[str, ResourceGroup]:
+        """Fetches every resource group in the subscription as Azure ResourceGroup objects in a dictionary.
+
+        Listing the subscription is expensive, prefer fetch_resource_group when looking for a single resource group.
+
+        Returns:
+            Dict[str, ResourceGroup]: A dictionary with resource group name as the key its corresponding object
+        """
+        if not self._resource_group_cache.is_complete:
+            self._resource_group_cache.fill(
+                [rg async for rg in self._get_resource_client().resource_groups.list()]
+            )
+
+        return self._resource_group_cache.existing()
+
+    async def fetch_resource_group(
+        self, resource_group_name: str
+    ) -> Optional[ResourceGroup]:
+        """Fetch a single resource group by name.
+
+        Args:
+            resource_group_name (str): Name of the Azure resource group to fetch.
+
+        Returns:
+            Optional[ResourceGroup]: the resource group, or None if it does not exist.
+        """
+        if resource_group_name not in self._resource_group_cache:
+            try:
+                resource_group: Optional[
+                    ResourceGroup
+                ] = await self._get_resource_client().resource_groups.get(
+                    resource_group_name
+                )
+            except ResourceNotFoundError:
+                resource_group = None
+
+            self._resource_group_cache.add(resource_group_name, resource_group)
+
+        return self._resource_group_cache.get(resource_group_name)
+
+    async def fetch_storage_access_key(
+        self, resource_group_name: str, storage_account_name: str
+    ) -> str:
+        """Fetches one of the storage account's access key from Azure and returns it.
+
+        Args:
+            resource_group_name (str): Name of resource group
+            storage_account_name (str): Name of storage account
+
+        Returns:
+            str: One of the access key corresponding to storage account
+        """
+        if self._storage_client is None:
+            self._storage_client = StorageManagementClient(
+                self._credential, self._get_subscription_id(), **self._client_options()
+            )
+        keys = await self._storage_client.storage_accounts.list_keys(
+            resource_group_name=resource_group_name,
+            account_name=storage_account_name,
+        )
+        return str(keys.keys[0].value)
+
+    async def fetch_connection_string(
+        self, resource_group_name: str, storage_account_name: str
+    ) -> str:
+        """Fetches and creates a connection string for a storage account.
+
+        Args:
+            resource_group_name (str): Name of resource group
+            storage_account_name (str): Name of storage account
+
+        Raises:
+            MatchaError: When the access keys for a storage account can't be fetched from Azure.
+
+        Returns:
+            str: A connection string for given storage account
+        """
+        try:
+            access_key = await self.fetch_storage_access_key(
+                resource_group_name=resource_group_name,
+                storage_account_name=storage_account_name,
+            )
+        except Exception as e:
+            raise MatchaError(f"Error - {e}.")
+
+        return f"DefaultEndpointsProtocol=https;EndpointSuffix=core.windows.net;AccountName={storage_account_name};AccountKey={access_key}"
+
+    async def fetch_resource_group_names(self) -> Set[str]:
+        """Fetch the resource group names for the current subscription_id.
+
+        This lists the whole subscription, use fetch_resource_group to check whether a single resource group exists.
+
+        Returns:
+            Set[str]: the set of resource groups the user has provisioned.
+        """
+        return set((await self.fetch_resource_groups()).keys())
+
+    async def resource_group_state(
+        self, resource_group_name: str
+    ) -> Optional[ProvisionState]:
+        """Gets the resource group state.
+
+        Args:
+            resource_group_name (str): the user inputted resource group name.
+
+        Returns:
+            ProvisionState: Resource group Enum state if it exists.
+        """
+        resource_group = await self.fetch_resource_group(resource_group_name)
+        if (
+            isinstance(resource_group, ResourceGroup)
+            and resource_group.properties is not None
+        ):
+            return ProvisionState[resource_group.properties.provisioning_state]
+
+        return None
+
+    async def resource_group_exists(self, resource_group_name: str) -> bool:
+        """Checks if an Azure resource group exists.
+
+        Args:
+            resource_group_name (str): Name of the Azure resource group to check
+
+        Returns:
+            bool: True, if the resource group exists
+        """
+        rg_state = await self.resource_group_state(resource_group_name)
+
+        return isinstance(rg_state, ProvisionState)
+
+    async def fetch_regions(self) -> Set[str]:
+        """Fetch the Azure regions, using the metadata cache where possible.
+
+        Returns:
+            set[str]: the set of all Azure regions.
+        """
+        if self._regions:
+            return self._regions
+
+        subscription_id = self._get_subscription_id()
+        cache_key = f"azure/regions/{subscription_id}"
+        cached_regions = await run_blocking(self._metadata_cache.get, cache_key)
+
+        if cached_regions:
+            self._regions = set(cached_regions)
+        else:
+            self._regions = {
+                str(region.name)
+                async for region in self._client.subscriptions.list_locations(
+                    subscription_id
+                )
+            }
+            await run_blocking(
+                self._metadata_cache.set, cache_key, sorted(self._regions)
+            )
+
+        return self._regions
+
+    async def is_valid_region(self, region: str) -> bool:
+        """Check whether the user inputted region is valid.
+
+        Args:
+            region (str): the user inputted region.
+
+        Returns:
+            bool: True/False depending on validity.
+        """
+        return region in await self.fetch_regions()
+
+    async def is_valid_resource_group(self, rg_name: str) -> bool:
+        """Check whether the user inputted resource group name is valid.
+
+        Args:
+            rg_name (str): the user inputted resource group name.
+
+        Returns:
+            bool: True/False depending on validity
+        """
+        return await self.fetch_resource_group(f"{rg_name}-resources") is None
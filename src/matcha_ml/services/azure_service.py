@@ -1,10 +1,17 @@
 """The Azure Service interface."""
+import dataclasses
+import threading
+import time
 from subprocess import DEVNULL
-from typing import Dict, List, Optional, Set, cast
+from typing import Dict, Iterable, Optional, Set, Tuple, cast
 
 import jwt
 from azure.core.credentials import AccessToken
-from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
+from azure.core.exceptions import (
+    ClientAuthenticationError,
+    HttpResponseError,
+    ResourceNotFoundError,
+)
 from azure.identity import AzureCliCredential, CredentialUnavailableError
 from azure.mgmt.authorization import AuthorizationManagementClient
 from azure.mgmt.confluent.models._confluent_management_client_enums import (  # type: ignore [import]
@@ -22,6 +29,8 @@ from matcha_ml.errors import (
     MatchaError,
     MatchaPermissionError,
 )
+from matcha_ml.services.http_transport_service import SharedHttpTransport
+from matcha_ml.services.metadata_cache_service import MetadataCache
 
 ROLE_ID_MAPPING = {
     "Owner": "8e3af657-a8ff-443c-a75c-2fe8c4bcb635",
@@ -31,19 +40,250 @@ ROLE_ID_MAPPING = {
 
 ACCEPTED_ROLE_CONFIGURATIONS = [["Owner"], ["Contributor", "User Access Administrator"]]
 
+MISSING_ROLES_ERROR_MESSAGE = f"Error - Matcha detected that you do not have the appropriate role-based permissions on Azure to run this action. You need one of the following role configurations: {ACCEPTED_ROLE_CONFIGURATIONS} note: list items containing multiple roles require all of the listed roles."
+
+# Sessions are discarded this many seconds before their access token actually expires
+TOKEN_EXPIRY_MARGIN_SECONDS = 300
+
+
+def decode_principal_id(access_token: AccessToken) -> str:
+    """Decode the principal ID of the authenticated user from an access token.
+
+    Args:
+        access_token (AccessToken): the access token of the authenticated user.
+
+    Returns:
+        str: principal ID
+    """
+    decoded_token = jwt.decode(
+        access_token.token,
+        options={"verify_signature": False},
+        algorithms=["RS256"],
+    )
+
+    return cast(str, decoded_token["oid"])
+
+
+def has_accepted_role_configuration(subscription_id: str, user_roles: Set[str]) -> bool:
+    """Check whether a set of role definition ids satisfies one of the accepted role configurations.
+
+    Args:
+        subscription_id (str): the subscription the roles are assigned in.
+        user_roles (Set[str]): the role definition ids of the roles that the user has.
+
+    Returns:
+        bool: True if every role of at least one accepted configuration is assigned.
+    """
+    for role_configuration in ACCEPTED_ROLE_CONFIGURATIONS:
+        expected_roles = {
+            f"/subscriptions/{subscription_id}/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING[role]}"
+            for role in role_configuration
+        }
+        if expected_roles.issubset(user_roles):
+            return True
+
+    return False
+
+
+@dataclasses.dataclass
+class AzureSession:
+    """An authenticated Azure session, shared by every AzureClient created in the process."""
+
+    credential: AzureCliCredential
+    subscription_client: SubscriptionClient
+    access_token: AccessToken
+    subscription_id: str
+    has_permissions: bool
+
+    def is_expired(self) -> bool:
+        """Check whether the session's access token has expired, or is about to.
+
+        Returns:
+            bool: True if the session should no longer be used.
+        """
+        return self.access_token.expires_on - TOKEN_EXPIRY_MARGIN_SECONDS <= time.time()
+
+
+class AzureSessionRegistry:
+    """A process-wide registry of authenticated Azure sessions.
+
+    Sessions are keyed by the credential type and the subscription id, where a subscription id of None refers to the
+    default subscription of the credential.
+    """
+
+    _sessions: Dict[Tuple[str, Optional[str]], AzureSession] = {}
+    lock = threading.RLock()
+
+    @classmethod
+    def get(
+        cls, credential_name: str, subscription_id: Optional[str] = None
+    ) -> Optional[AzureSession]:
+        """Get a valid session, expired sessions are evicted from the registry.
+
+        Args:
+            credential_name (str): the name of the credential type used for authentication.
+            subscription_id (Optional[str]): the subscription id, or None for the default subscription.
+
+        Returns:
+            Optional[AzureSession]: the session if one exists and is still valid, otherwise None.
+        """
+        with cls.lock:
+            key = (credential_name, subscription_id)
+            session = cls._sessions.get(key)
+            if session is not None and session.is_expired():
+                del cls._sessions[key]
+                return None
+
+            return session
+
+    @classmethod
+    def register(
+        cls,
+        credential_name: str,
+        session: AzureSession,
+        subscription_id: Optional[str] = None,
+    ) -> None:
+        """Register a session under the requested subscription id and the one it resolved to.
+
+        Args:
+            credential_name (str): the name of the credential type used for authentication.
+            session (AzureSession): the authenticated session.
+            subscription_id (Optional[str]): the subscription id that was requested, or None for the default subscription.
+        """
+        with cls.lock:
+            cls._sessions[(credential_name, subscription_id)] = session
+            cls._sessions[(credential_name, session.subscription_id)] = session
+
+    @classmethod
+    def clear(cls) -> None:
+        """Remove all sessions from the registry, forcing the next client to authenticate again."""
+        with cls.lock:
+            cls._sessions.clear()
+
+
+class ResourceGroupCache:
+    """A cache of resource groups, filled by single lookups and by listing the whole subscription.
+
+    A resource group name that maps to None is known not to exist.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty resource group cache."""
+        self._resource_groups: Dict[str, Optional[ResourceGroup]] = {}
+        self.is_complete = False
+
+    def __contains__(self, resource_group_name: object) -> bool:
+        """Check whether the existence of a resource group is known without asking Azure.
+
+        Args:
+            resource_group_name (object): the resource group name.
+
+        Returns:
+            bool: True if the cache can answer a lookup for this resource group.
+        """
+        return self.is_complete or resource_group_name in self._resource_groups
+
+    def get(self, resource_group_name: str) -> Optional[ResourceGroup]:
+        """Get a cached resource group.
+
+        Args:
+            resource_group_name (str): the resource group name.
+
+        Returns:
+            Optional[ResourceGroup]: the resource group, or None if it does not exist or was never looked up.
+        """
+        return self._resource_groups.get(resource_group_name)
+
+    def add(
+        self, resource_group_name: str, resource_group: Optional[ResourceGroup]
+    ) -> None:
+        """Record the result of a single resource group lookup.
+
+        Args:
+            resource_group_name (str): the resource group name.
+            resource_group (Optional[ResourceGroup]): the resource group, or None if it does not exist.
+        """
+        self._resource_groups[resource_group_name] = resource_group
+
+    def fill(self, resource_groups: Iterable[ResourceGroup]) -> None:
+        """Replace the cache contents with a listing of every resource group in the subscription.
+
+        Args:
+            resource_groups (Iterable[ResourceGroup]): all resource groups in the subscription.
+        """
+        self._resource_groups = {str(rg.name): rg for rg in resource_groups}
+        self.is_complete = True
+
+    def existing(self) -> Dict[str, ResourceGroup]:
+        """Get the cached resource groups that are known to exist.
+
+        Returns:
+            Dict[str, ResourceGroup]: resource group names and their corresponding objects.
+        """
+        return {
+            name: rg for name, rg in self._resource_groups.items() if rg is not None
+        }
+
+    def invalidate(self) -> None:
+        """Forget all cached resource groups."""
+        self._resource_groups = {}
+        self.is_complete = False
+
 
 class AzureClient:
-    """Azure client object to handle authentication checks and other Azure related functionality."""
+    """Azure client object to handle authentication checks and other Azure related functionality.
 
+    Authentication is performed once per process and subscription, every subsequent client reuses the session held by
+    the AzureSessionRegistry until its access token expires.
+    """
+
+    _credential: AzureCliCredential
+    _client: SubscriptionClient
     _regions: Optional[Set[str]] = None
     _access_token: Optional[AccessToken] = None
-    _resource_groups: Optional[Dict[str, ResourceGroup]] = None
+    _resource_client: Optional[ResourceManagementClient] = None
 
-    def __init__(self) -> None:
-        """Constructor for the Azure Client object."""
-        self.authenticated = self._check_authentication()
-        self.subscription_id = self._subscription_id()
-        self.has_permissions = self._check_required_role_assignments()
+    def __init__(self, subscription_id: Optional[str] = None) -> None:
+        """Constructor for the Azure Client object.
+
+        Args:
+            subscription_id (Optional[str]): the subscription to use, defaults to the first subscription of the account.
+        """
+        credential_name = AzureCliCredential.__name__
+        self._metadata_cache = MetadataCache()
+        self._resource_group_cache = ResourceGroupCache()
+
+        with AzureSessionRegistry.lock:
+            session = AzureSessionRegistry.get(credential_name, subscription_id)
+
+            if session is None:
+                self.authenticated = self._check_authentication()
+                self.subscription_id = (
+                    subscription_id
+                    if subscription_id is not None
+                    else self._subscription_id()
+                )
+                self.has_permissions = self._check_required_role_assignments()
+
+                if self._access_token is not None:
+                    AzureSessionRegistry.register(
+                        credential_name,
+                        AzureSession(
+                            credential=self._credential,
+                            subscription_client=self._client,
+                            access_token=self._access_token,
+                            subscription_id=self.subscription_id,
+                            has_permissions=self.has_permissions,
+                        ),
+                        subscription_id,
+                    )
+            else:
+                self._credential = session.credential
+                self._client = session.subscription_client
+                self._access_token = session.access_token
+                self.authenticated = True
+                self.subscription_id = session.subscription_id
+                self.has_permissions = session.has_permissions
 
     def _check_authentication(self) -> bool:
         """Check whether the user is authenticated with 'az login'.
@@ -56,7 +296,9 @@ class AzureClient:
             bool: True if the checks pass, an error is raised otherwise.
         """
         self._credential = AzureCliCredential()
-        self._client = SubscriptionClient(self._credential)
+        self._client = SubscriptionClient(
+            self._credential, transport=SharedHttpTransport.get()
+        )
 
         try:
             self._access_token = self._credential.get_token(
@@ -69,20 +311,45 @@ class AzureClient:
 
         return True
 
+    def _principal_cache_key(self, name: str) -> Optional[str]:
+        """Build a metadata cache key that is specific to the authenticated user.
+
+        Args:
+            name (str): the name of the cached item.
+
+        Returns:
+            Optional[str]: the cache key, or None if the user can't be identified.
+        """
+        if self._access_token is None:
+            return None
+
+        return f"azure/{name}/{self._get_principal_id()}"
+
     def _subscription_id(self) -> str:
-        """Fetch the subscription id.
+        """Fetch the subscription id, using the metadata cache where possible.
 
         Returns:
             str: the subscription id.
         """
+        cache_key = self._principal_cache_key("subscription_id")
+        if cache_key is not None:
+            cached_subscription_id = self._metadata_cache.get(cache_key)
+            if cached_subscription_id is not None:
+                return str(cached_subscription_id)
+
         subscriptions = self._client.subscriptions.list()
         if subscriptions:
-            return str(list(subscriptions)[0].subscription_id)
+            subscription_id = str(list(subscriptions)[0].subscription_id)
         else:
             raise MatchaAuthenticationError(
                 "no subscriptions found - you at least one subscription active in your Azure account."
             )
 
+        if cache_key is not None:
+            self._metadata_cache.set(cache_key, subscription_id)
+
+        return subscription_id
+
     def _get_principal_id(self) -> str:
         """Get principal ID of the authenticated user.
 
@@ -94,84 +361,116 @@ class AzureClient:
                 "internal error: the client needs to be authenticated first"
             )
 
-        decoded_token = jwt.decode(
-            self._access_token.token,
-            options={"verify_signature": False},
-            algorithms=["RS256"],
-        )
-        user_object_id = cast(str, decoded_token["oid"])
-
-        return user_object_id
+        return decode_principal_id(self._access_token)
 
-    def _fetch_user_roles(self) -> List[str]:
+    def _fetch_user_roles(self) -> Set[str]:
         """Fetch the Azure roles for the user.
 
+        The role assignments are filtered by Azure to those of the authenticated user, rather than listing every
+        assignment in the subscription.
+
         Raises:
             MatchaError: when the role assignments for a subscription can't be fetched from Azure, likely a connection issue.
 
         Returns:
-            List[str]: the roles that the user has.
+            Set[str]: the role definition ids of the roles that the user has.
         """
         self._authorization_client = AuthorizationManagementClient(
-            self._credential, self.subscription_id
+            self._credential, self.subscription_id, transport=SharedHttpTransport.get()
         )
         principal_id = self._get_principal_id()
 
         try:
-            role_assignments = (
-                self._authorization_client.role_assignments.list_for_subscription()
-            )
+            # the assignments are paged lazily, so errors can be raised while iterating
+            roles = {
+                str(x.role_definition_id)
+                for x in self._authorization_client.role_assignments.list_for_subscription(
+                    filter=f"principalId eq '{principal_id}'"
+                )
+                if x.principal_id == principal_id
+            }
         except HttpResponseError:
             raise MatchaError(
                 "Error - unable to get a response from Azure, make sure you have a stable connection."
             )
 
-        roles = [
-            str(x.role_definition_id)
-            for x in role_assignments
-            if x.principal_id == principal_id
-        ]
-
         return roles
 
     def _check_required_role_assignments(self) -> bool:
         """Check if the user has one of the required sets of roles.
 
+        Only a successful check is stored in the metadata cache, so that newly granted roles are picked up immediately.
+
         Returns:
             bool: True if required roles are assigned
 
         Raises:
             MatchaPermissionError: when the user does not have required roles
         """
-        for role_configuration in ACCEPTED_ROLE_CONFIGURATIONS:
-            expected_roles = [
-                f"/subscriptions/{self.subscription_id}/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING[role]}"
-                for role in role_configuration
-            ]
-            if all([role in self._fetch_user_roles() for role in expected_roles]):
-                return True
-
-        raise MatchaPermissionError(
-            f"Error - Matcha detected that you do not have the appropriate role-based permissions on Azure to run this action. You need one of the following role configurations: {ACCEPTED_ROLE_CONFIGURATIONS} note: list items containing multiple roles require all of the listed roles."
+        cache_key = self._principal_cache_key(
+            f"role_assignments/{self.subscription_id}"
         )
+        if cache_key is not None and self._metadata_cache.get(cache_key):
+            return True
+
+        user_roles = set(self._fetch_user_roles())
+
+        if has_accepted_role_configuration(self.subscription_id, user_roles):
+            if cache_key is not None:
+                self._metadata_cache.set(cache_key, True)
+            return True
+
+        raise MatchaPermissionError(MISSING_ROLES_ERROR_MESSAGE)
+
+    def _get_resource_client(self) -> ResourceManagementClient:
+        """Initialize and/or return the resource management client.
+
+        Returns:
+            ResourceManagementClient: the resource management client for the subscription.
+        """
+        if self._resource_client is None:
+            self._resource_client = ResourceManagementClient(
+                self._credential,
+                str(self.subscription_id),
+                transport=SharedHttpTransport.get(),
+            )
+        return self._resource_client
 
     def fetch_resource_groups(self) -> Dict[str, ResourceGroup]:
-        """Fetches the value of resource groups as Azure ResourceGroup objects in a dictionary.
+        """Fetches every resource group in the subscription as Azure ResourceGroup objects in a dictionary.
+
+        Listing the subscription is expensive, prefer fetch_resource_group when looking for a single resource group.
 
         Returns:
             Dict[str, ResourceGroup]: A dictionary with resource group name as the key its corresponding object
         """
-        if self._resource_groups:
-            return self._resource_groups
-        else:
-            self._resource_client = ResourceManagementClient(
-                self._credential, str(self.subscription_id)
+        if not self._resource_group_cache.is_complete:
+            self._resource_group_cache.fill(
+                self._get_resource_client().resource_groups.list()
             )
-            self._resource_groups = {
-                rg.name: rg for rg in self._resource_client.resource_groups.list()
-            }
 
-            return self._resource_groups
+        return self._resource_group_cache.existing()
+
+    def fetch_resource_group(self, resource_group_name: str) -> Optional[ResourceGroup]:
+        """Fetch a single resource group by name.
+
+        Args:
+            resource_group_name (str): Name of the Azure resource group to fetch.
+
+        Returns:
+            Optional[ResourceGroup]: the resource group, or None if it does not exist.
+        """
+        if resource_group_name not in self._resource_group_cache:
+            try:
+                resource_group: Optional[
+                    ResourceGroup
+                ] = self._get_resource_client().resource_groups.get(resource_group_name)
+            except ResourceNotFoundError:
+                resource_group = None
+
+            self._resource_group_cache.add(resource_group_name, resource_group)
+
+        return self._resource_group_cache.get(resource_group_name)
 
     def fetch_storage_access_key(
         self, resource_group_name: str, storage_account_name: str
@@ -186,7 +485,9 @@ class AzureClient:
             str: One of the access key corresponding to storage account
         """
         self._storage_client = StorageManagementClient(
-            self._credential, str(self.subscription_id)
+            self._credential,
+            str(self.subscription_id),
+            transport=SharedHttpTransport.get(),
         )
         keys = self._storage_client.storage_accounts.list_keys(
             resource_group_name=resource_group_name,
@@ -223,7 +524,7 @@ class AzureClient:
     def fetch_resource_group_names(self) -> Set[str]:
         """Fetch the resource group names for the current subscription_id.
 
-        Needed to check for duplication.
+        This lists the whole subscription, use fetch_resource_group to check whether a single resource group exists.
 
         Returns:
             Set[str]: the set of resource groups the user has provisioned.
@@ -241,13 +542,12 @@ class AzureClient:
         Returns:
             ProvisionState: Resource group Enum state if it exists.
         """
-        if resource_group_name in self.fetch_resource_groups():
-            resource_group = self.fetch_resource_groups()[resource_group_name]
-            if (
-                isinstance(resource_group, ResourceGroup)
-                and resource_group.properties is not None
-            ):
-                return ProvisionState[resource_group.properties.provisioning_state]
+        resource_group = self.fetch_resource_group(resource_group_name)
+        if (
+            isinstance(resource_group, ResourceGroup)
+            and resource_group.properties is not None
+        ):
+            return ProvisionState[resource_group.properties.provisioning_state]
 
         return None
 
@@ -265,13 +565,19 @@ class AzureClient:
         return isinstance(rg_state, ProvisionState)
 
     def fetch_regions(self) -> Set[str]:
-        """Fetch the Azure regions.
+        """Fetch the Azure regions, using the metadata cache where possible.
 
         Returns:
             set[str]: the set of all Azure regions.
         """
         if self._regions:
             return self._regions
+
+        cache_key = f"azure/regions/{self.subscription_id}"
+        cached_regions = self._metadata_cache.get(cache_key)
+
+        if cached_regions:
+            self._regions = set(cached_regions)
         else:
             self._regions = {
                 region.name
@@ -279,7 +585,9 @@ class AzureClient:
                     self.subscription_id
                 )
             }
-            return self._regions
+            self._metadata_cache.set(cache_key, sorted(self._regions))
+
+        return self._regions
 
     def is_valid_region(self, region: str) -> bool:
         """Check whether the user inputted region is valid.
@@ -301,4 +609,4 @@ class AzureClient:
         Returns:
             bool: True/False depending on validity
         """
-        return f"{rg_name}-resources" not in self.fetch_resource_group_names()
+        return self.fetch_resource_group(f"{rg_name}-resources") is None
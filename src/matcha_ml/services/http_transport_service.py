@@ -0,0 +1,228 @@
+"""A pooled HTTP transport shared by every Azure SDK client in the process."""
+import dataclasses
+import threading
+from typing import Any, Optional
+
+import requests
+from azure.core.pipeline.transport import RequestsTransport
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Number of connections kept open per host, Azure Resource Manager and the storage account are separate hosts
+DEFAULT_POOL_SIZE = 10
+
+
+@dataclasses.dataclass(frozen=True)
+class HttpPoolConfig:
+    """Connection pool settings of the shared HTTP transport.
+
+    Attributes:
+        pool_size (int): the maximum number of connections kept open per host.
+        keep_alive (bool): whether connections are reused between requests, when False every request opens a new
+            connection.
+    """
+
+    pool_size: int = DEFAULT_POOL_SIZE
+    keep_alive: bool = True
+
+
+@dataclasses.dataclass(frozen=True)
+class ConnectionStats:
+    """Counters of the shared connection pool.
+
+    Attributes:
+        connections_opened (int): the number of connections opened, each costing a TCP and TLS handshake.
+        requests_sent (int): the number of requests sent over those connections.
+    """
+
+    connections_opened: int = 0
+    requests_sent: int = 0
+
+
+class _ConnectionCounter:
+    """Counts the connections opened by the shared session, including reconnections of pooled connections."""
+
+    count = 0
+    lock = threading.Lock()
+
+    @classmethod
+    def increment(cls) -> None:
+        """Record that a connection was opened."""
+        with cls.lock:
+            cls.count += 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    """An HTTP connection that is counted every time it connects."""
+
+    def connect(self) -> None:
+        """Open the connection."""
+        _ConnectionCounter.increment()
+        super().connect()  # type: ignore [no-untyped-call]
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    """An HTTPS connection that is counted every time it connects."""
+
+    def connect(self) -> None:
+        """Open the connection."""
+        _ConnectionCounter.increment()
+        super().connect()  # type: ignore [no-untyped-call]
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    """An HTTP connection pool of counted connections."""
+
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    """An HTTPS connection pool of counted connections."""
+
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _PooledHTTPAdapter(HTTPAdapter):
+    """A requests adapter whose connection pools count the connections they open."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        """Create the pool manager, using counted connection pools.
+
+        Args:
+            *args (Any): positional arguments of HTTPAdapter.init_poolmanager.
+            **kwargs (Any): keyword arguments of HTTPAdapter.init_poolmanager.
+        """
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {  # type: ignore [attr-defined]
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+class SharedHttpTransport:
+    """A process-wide pooled HTTP transport.
+
+    The management clients used by the AzureClient and the blob clients used by AzureStorage all send their requests
+    through one requests session, so connections to a host are opened once and reused by every client instead of each
+    client paying for its own handshakes.
+    """
+
+    _config = HttpPoolConfig()
+    _session: Optional[requests.Session] = None
+    _transport: Optional[RequestsTransport] = None
+    lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, config: HttpPoolConfig) -> None:
+        """Change the pool settings, connections opened with the previous settings are closed.
+
+        Args:
+            config (HttpPoolConfig): the new pool settings.
+        """
+        with cls.lock:
+            cls._config = config
+            cls._close()
+
+    @classmethod
+    def config(cls) -> HttpPoolConfig:
+        """Get the current pool settings.
+
+        Returns:
+            HttpPoolConfig: the pool settings.
+        """
+        return cls._config
+
+    @classmethod
+    def session(cls) -> requests.Session:
+        """Get the shared requests session, creating it on first use.
+
+        Returns:
+            requests.Session: the shared session.
+        """
+        with cls.lock:
+            if cls._session is None:
+                cls._session = cls._create_session(cls._config)
+            return cls._session
+
+    @classmethod
+    def get(cls) -> RequestsTransport:
+        """Get the shared transport, to be passed as the `transport` of an Azure SDK client.
+
+        The transport does not own the session, so closing a client does not close connections used by other clients.
+
+        Returns:
+            RequestsTransport: the shared transport.
+        """
+        session = cls.session()
+        with cls.lock:
+            if cls._transport is None:
+                cls._transport = RequestsTransport(session=session, session_owner=False)
+            return cls._transport
+
+    @classmethod
+    def connection_stats(cls) -> ConnectionStats:
+        """Count the connections opened and requests sent through the shared session.
+
+        Returns:
+            ConnectionStats: the counters summed over every host.
+        """
+        with cls.lock:
+            if cls._session is None:
+                return ConnectionStats()
+
+            requests_sent = 0
+            # the same adapter is mounted for every protocol
+            adapters = {
+                id(adapter): adapter for adapter in cls._session.adapters.values()
+            }
+            for adapter in adapters.values():
+                pools = adapter.poolmanager.pools  # type: ignore [attr-defined]
+                # the pool container can't be iterated, only its keys can
+                for key in pools.keys():  # noqa: SIM118
+                    requests_sent += pools[key].num_requests
+
+            return ConnectionStats(_ConnectionCounter.count, requests_sent)
+
+    @classmethod
+    def reset(cls) -> None:
+        """Close every pooled connection and restore the default pool settings."""
+        with cls.lock:
+            cls._config = HttpPoolConfig()
+            cls._close()
+
+    @classmethod
+    def _close(cls) -> None:
+        """Close the shared session, the next client creates a new one."""
+        if cls._session is not None:
+            cls._session.close()
+        cls._session = None
+        cls._transport = None
+        with _ConnectionCounter.lock:
+            _ConnectionCounter.count = 0
+
+    @staticmethod
+    def _create_session(config: HttpPoolConfig) -> requests.Session:
+        """Create a requests session with a connection pool for each protocol.
+
+        Args:
+            config (HttpPoolConfig): the pool settings.
+
+        Returns:
+            requests.Session: the session.
+        """
+        session = requests.Session()
+        # retries are done by the retry policy of the Azure SDK pipeline
+        adapter = _PooledHTTPAdapter(
+            pool_connections=config.pool_size,
+            pool_maxsize=config.pool_size,
+            max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+        )
+        for protocol in ("http://", "https://"):
+            session.mount(protocol, adapter)
+
+        if not config.keep_alive:
+            session.headers["Connection"] = "close"
+
+        return session
@@ -0,0 +1,120 @@
+"""Metadata cache service for persisting slow-changing cloud metadata between matcha runs."""
+import contextlib
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import yaml
+
+from matcha_ml.services.global_parameters_service import GlobalParameters
+
+METADATA_CACHE_FILE_NAME = "metadata_cache.yaml"
+
+# Cloud metadata such as regions or role assignments rarely change, so a day is a safe default
+DEFAULT_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+class MetadataCache:
+    """A TTL-bounded key-value cache stored next to the global configuration file.
+
+    Each entry records the time at which it expires. Expired or unreadable entries are treated as missing, and failing
+    to write the cache never fails the command that is using it.
+    """
+
+    # Serializes read-modify-write cycles when the cache is used from several threads
+    _lock = threading.Lock()
+
+    def __init__(self, ttl: int = DEFAULT_CACHE_TTL_SECONDS) -> None:
+        """Initialize the metadata cache.
+
+        Args:
+            ttl (int): number of seconds an entry remains valid. Defaults to DEFAULT_CACHE_TTL_SECONDS.
+        """
+        self.ttl = ttl
+
+    @property
+    def cache_file_path(self) -> str:
+        """Path to the metadata cache file, which lives alongside the global configuration file.
+
+        Returns:
+            str: the metadata cache file path.
+        """
+        config_dir = os.path.dirname(GlobalParameters().default_config_file_path)
+
+        return os.path.join(config_dir, METADATA_CACHE_FILE_NAME)
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """Read all entries from the cache file.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: the cache entries, empty if the file does not exist or can't be parsed.
+        """
+        try:
+            with open(self.cache_file_path) as file:
+                entries = yaml.safe_load(file)
+        except (OSError, yaml.YAMLError):
+            return {}
+
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Write the entries to the cache file.
+
+        Args:
+            entries (Dict[str, Dict[str, Any]]): the cache entries to write.
+        """
+        tmp_file_path = f"{self.cache_file_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
+            with open(tmp_file_path, "w") as file:
+                yaml.safe_dump(entries, file)
+            # replace the file in one step, so that readers never see a partially written cache
+            os.replace(tmp_file_path, self.cache_file_path)
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value if it has not expired.
+
+        Args:
+            key (str): the cache key.
+
+        Returns:
+            Optional[Any]: the cached value, or None if it is missing or expired.
+        """
+        entry = self._read().get(key)
+
+        if not isinstance(entry, dict) or entry.get("expires_at", 0) <= time.time():
+            return None
+
+        return entry.get("value")
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value in the cache.
+
+        Args:
+            key (str): the cache key.
+            value (Any): the value to store, it must be representable in YAML.
+        """
+        with self._lock:
+            entries = self._read()
+            entries[key] = {"value": value, "expires_at": time.time() + self.ttl}
+            self._write(entries)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Remove a single entry, or every entry when no key is given.
+
+        Args:
+            key (Optional[str]): the cache key to remove. Defaults to None, which clears the whole cache.
+        """
+        with self._lock:
+            if key is None:
+                # another matcha process may remove the file at the same time
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.cache_file_path)
+                return
+
+            entries = self._read()
+            if entries.pop(key, None) is not None:
+                self._write(entries)
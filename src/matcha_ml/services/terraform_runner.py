@@ -0,0 +1,225 @@
+"""Run Terraform commands as asyncio subprocesses."""
+import asyncio
+import contextlib
+import dataclasses
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, TypeVar
+
+# Commands keep only the end of their output, which is what explains a failure
+OUTPUT_TAIL_LINES = 200
+
+# Terraform prints diagnostics as single JSON lines, which can be longer than asyncio's default limit of 64 KiB
+STREAM_LIMIT_BYTES = 2**20
+
+# How long Terraform gets to stop gracefully, releasing the state lock, after it is interrupted
+DEFAULT_INTERRUPT_GRACE_PERIOD_SECONDS = 60.0
+
+# On Windows a console interrupt cannot be sent to a single process, so the process is terminated instead
+FORWARDS_SIGINT = sys.platform != "win32"
+
+LineHandler = Callable[[str], None]
+
+T = TypeVar("T")
+
+
+@dataclasses.dataclass
+class CommandResult:
+    """The result of a command run by the AsyncTerraformRunner."""
+
+    # the command line that was run
+    command: List[str]
+
+    return_code: int
+
+    # the last OUTPUT_TAIL_LINES lines of the standard output and standard error, interleaved as they were printed
+    output: List[str]
+
+    # the number of seconds the command took
+    duration: float
+
+    # whether the command was interrupted because it ran for longer than its timeout
+    timed_out: bool = False
+
+
+class AsyncTerraformRunner:
+    """Run Terraform commands without blocking the event loop, with timeouts and graceful interruption.
+
+    Terraform is started in its own session, so a Ctrl+C in the terminal only reaches matcha. When the task awaiting a
+    command is cancelled, or the command times out, a single SIGINT is forwarded to Terraform, which then stops the
+    operations in flight and releases the state lock. It is killed if it has not exited within the grace period.
+    """
+
+    def __init__(
+        self,
+        working_dir: str,
+        env: Optional[Dict[str, str]] = None,
+        interrupt_grace_period: float = DEFAULT_INTERRUPT_GRACE_PERIOD_SECONDS,
+    ):
+        """Initialize the runner.
+
+        Args:
+            working_dir (str): the directory the commands are run in.
+            env (Optional[Dict[str, str]]): the environment of the commands. Defaults to the environment of matcha.
+            interrupt_grace_period (float): the number of seconds an interrupted command gets to exit before it is
+                killed.
+        """
+        self.working_dir = working_dir
+        self.env = env
+        self.interrupt_grace_period = interrupt_grace_period
+
+    async def run(
+        self,
+        cmds: List[str],
+        timeout: Optional[float] = None,
+        on_line: Optional[LineHandler] = None,
+    ) -> CommandResult:
+        """Run a command, consuming its output line by line as it is printed.
+
+        Args:
+            cmds (List[str]): the command line.
+            timeout (Optional[float]): the number of seconds after which the command is interrupted. Defaults to no
+                timeout.
+            on_line (Optional[LineHandler]): called with every line the command prints, without the line ending.
+
+        Returns:
+            CommandResult: the return code, the tail of the output and the duration of the command.
+        """
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *cmds,
+            cwd=self.working_dir,
+            env=self.env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            limit=STREAM_LIMIT_BYTES,
+            start_new_session=FORWARDS_SIGINT,
+        )
+
+        tail: Deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+        # the output keeps being read while an interrupted command exits, so it never blocks on a full pipe
+        reader = asyncio.ensure_future(self._read_output(process, tail, on_line))
+        timed_out = False
+
+        try:
+            await asyncio.wait_for(asyncio.shield(reader), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            await self._interrupt(process, reader)
+        except asyncio.CancelledError:
+            await self._interrupt(process, reader)
+            raise
+
+        return_code = process.returncode
+        assert return_code is not None
+
+        return CommandResult(
+            command=list(cmds),
+            # an interrupted command may still exit with 0
+            return_code=(return_code or 1) if timed_out else return_code,
+            output=list(tail),
+            duration=time.perf_counter() - start,
+            timed_out=timed_out,
+        )
+
+    @staticmethod
+    async def _read_output(
+        process: asyncio.subprocess.Process,
+        tail: Deque[str],
+        on_line: Optional[LineHandler],
+    ) -> None:
+        """Read the output of a process until it exits.
+
+        Args:
+            process (asyncio.subprocess.Process): the process.
+            tail (Deque[str]): the bounded buffer the lines are appended to.
+            on_line (Optional[LineHandler]): called with every line.
+        """
+        assert process.stdout is not None
+        async for raw_line in process.stdout:
+            line = raw_line.decode(errors="replace").rstrip("\r\n")
+            tail.append(line)
+            if on_line is not None:
+                on_line(line)
+
+        await process.wait()
+
+    async def _interrupt(
+        self, process: asyncio.subprocess.Process, reader: "asyncio.Future[None]"
+    ) -> None:
+        """Interrupt a process and wait for it to exit, killing it if it outlives the grace period.
+
+        Args:
+            process (asyncio.subprocess.Process): the process.
+            reader (asyncio.Future[None]): the task reading the output of the process.
+        """
+        if process.returncode is None:
+            if FORWARDS_SIGINT:
+                process.send_signal(signal.SIGINT)
+            else:
+                process.terminate()
+
+            try:
+                await asyncio.wait_for(process.wait(), self.interrupt_grace_period)
+            except asyncio.TimeoutError:
+                # the providers Terraform started share its session, and would keep the output open
+                if FORWARDS_SIGINT:
+                    with contextlib.suppress(ProcessLookupError):
+                        os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+
+        await reader
+
+
+def run_interruptible(main: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine to completion like asyncio.run, a Ctrl+C cancelling it rather than raising wherever it lands.
+
+    Terraform runs in its own session, so it only receives the interrupt when the task awaiting it is cancelled. Before
+    Python 3.11, asyncio.run lets the KeyboardInterrupt escape from whichever callback is running, which would leave
+    Terraform running and holding its state lock. Once the interrupted command stopped, KeyboardInterrupt is raised.
+
+    Args:
+        main (Coroutine[Any, Any, T]): the coroutine, which awaits the commands.
+
+    Returns:
+        T: the result of the coroutine.
+
+    Raises:
+        KeyboardInterrupt: when the coroutine was cancelled by a Ctrl+C.
+    """
+    interrupted = False
+
+    async def _run() -> T:
+        task = asyncio.ensure_future(main)
+
+        def _interrupt() -> None:
+            nonlocal interrupted
+            interrupted = True
+            task.cancel()
+
+        # signal handlers can only be installed from the main thread
+        if not (
+            FORWARDS_SIGINT and threading.current_thread() is threading.main_thread()
+        ):
+            return await task
+
+        loop = asyncio.get_running_loop()
+        previous_handler = signal.getsignal(signal.SIGINT)
+        loop.add_signal_handler(signal.SIGINT, _interrupt)
+        try:
+            return await task
+        finally:
+            loop.remove_signal_handler(signal.SIGINT)
+            signal.signal(signal.SIGINT, previous_handler)
+
+    try:
+        return asyncio.run(_run())
+    except asyncio.CancelledError:
+        if interrupted:
+            raise KeyboardInterrupt from None
+        raise
@@ -1,12 +1,117 @@
 """The Terraform service interface."""
+import contextlib
 import dataclasses
 import glob
+import hashlib
+import json
 import os
+import time
+from collections import deque
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
 
 import python_terraform
 
+from matcha_ml.services.global_parameters_service import GlobalParameters
+from matcha_ml.services.terraform_runner import AsyncTerraformRunner
+
+# Terraform reads the plugin cache directory from this environment variable
+PLUGIN_CACHE_DIR_ENV_VAR = "TF_PLUGIN_CACHE_DIR"
+PLUGIN_CACHE_DIR_NAME = "terraform-plugin-cache"
+
+# Written into the .terraform folder by a successful init, so it disappears with the folder it describes
+INIT_FINGERPRINT_FILE_NAME = "matcha-init.fingerprint"
+
+# Files of the module tree that change what `terraform init` installs
+MODULE_FILE_SUFFIXES = (".tf", ".tf.json", ".terraform.lock.hcl")
+
+# The plan written by `terraform plan` and applied as is, which is never uploaded with the state
+PLAN_FILE_NAME = "matcha.tfplan"
+
+NO_CHANGE_ACTIONS = (["no-op"], ["read"])
+
+# Only the last error diagnostics of a command are reported
+ERROR_DIAGNOSTICS_LIMIT = 20
+
+# Terraform's own defaults: ten concurrent resource operations, a refresh before every plan, and no waiting for the
+# state lock
+DEFAULT_PARALLELISM = 10
+DEFAULT_REFRESH = True
+DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS = 0.0
+
+# Beyond this many concurrent operations the ARM API throttles the requests rather than serving them faster
+MIN_PARALLELISM = 1
+MAX_PARALLELISM = 64
+
+# The number of seconds after which the long-running commands are interrupted
+DEFAULT_COMMAND_TIMEOUTS_SECONDS: Dict[str, float] = {
+    "apply": 2 * 60 * 60,
+    "destroy": 2 * 60 * 60,
+}
+
+TerraformEventHandler = Callable[[Dict[str, Any]], None]
+
+
+def validate_terraform_options(parallelism: int, lock_timeout: float) -> None:
+    """Check the options of the Terraform operations.
+
+    Args:
+        parallelism (int): the number of resource operations Terraform runs concurrently.
+        lock_timeout (float): the number of seconds Terraform waits for the state lock.
+
+    Raises:
+        ValueError: when the parallelism is out of bounds, or the lock timeout is negative.
+    """
+    if not MIN_PARALLELISM <= parallelism <= MAX_PARALLELISM:
+        raise ValueError(
+            f"The parallelism must be between {MIN_PARALLELISM} and {MAX_PARALLELISM}, got {parallelism}."
+        )
+
+    if lock_timeout < 0:
+        raise ValueError(f"The lock timeout must not be negative, got {lock_timeout}.")
+
+
+def default_plugin_cache_dir() -> str:
+    """Get the Terraform plugin cache directory shared by every matcha project.
+
+    The cache lives alongside the global configuration file, unless the user already set TF_PLUGIN_CACHE_DIR.
+
+    Returns:
+        str: the plugin cache directory path.
+    """
+    user_cache_dir = os.environ.get(PLUGIN_CACHE_DIR_ENV_VAR)
+    if user_cache_dir:
+        return user_cache_dir
+
+    config_dir = os.path.dirname(GlobalParameters().default_config_file_path)
+
+    return os.path.join(config_dir, PLUGIN_CACHE_DIR_NAME)
+
+
+@contextlib.contextmanager
+def plugin_cache_env(plugin_cache_dir: str) -> Iterator[None]:
+    """Point the Terraform processes started in the context at a plugin cache directory.
+
+    python_terraform passes the environment of the matcha process on to Terraform, so the variable is set on it for
+    the duration of the context only.
+
+    Args:
+        plugin_cache_dir (str): the plugin cache directory path, created if it does not exist.
+
+    Yields:
+        None
+    """
+    os.makedirs(plugin_cache_dir, exist_ok=True)
+    previous_value = os.environ.get(PLUGIN_CACHE_DIR_ENV_VAR)
+    os.environ[PLUGIN_CACHE_DIR_ENV_VAR] = plugin_cache_dir
+    try:
+        yield
+    finally:
+        if previous_value is None:
+            del os.environ[PLUGIN_CACHE_DIR_ENV_VAR]
+        else:
+            os.environ[PLUGIN_CACHE_DIR_ENV_VAR] = previous_value
+
 
 @dataclasses.dataclass
 class TerraformResult:
@@ -16,6 +121,71 @@ class TerraformResult:
     std_out: str
     std_err: str
 
+    # the number of seconds the command took
+    duration: float = 0.0
+
+    # whether the command was interrupted because it ran for longer than its timeout
+    timed_out: bool = False
+
+
+@dataclasses.dataclass
+class TerraformPlan:
+    """The result of `terraform plan` and the changes of the saved plan."""
+
+    result: TerraformResult
+
+    # the number of resources the plan creates, updates in place and deletes, a replaced resource counting as both
+    # created and deleted
+    to_add: int = 0
+    to_change: int = 0
+    to_destroy: int = 0
+
+    # whether the plan changes the outputs, which only an apply records in the state
+    changes_outputs: bool = False
+
+    @property
+    def has_changes(self) -> bool:
+        """Whether applying the plan changes anything.
+
+        Returns:
+            bool: True if the plan changes resources or outputs.
+        """
+        return bool(
+            self.to_add or self.to_change or self.to_destroy or self.changes_outputs
+        )
+
+
+def parse_plan(result: TerraformResult, plan_json: Dict[str, Any]) -> TerraformPlan:
+    """Count the changes of a plan from the JSON representation printed by `terraform show -json`.
+
+    Args:
+        result (TerraformResult): the result of `terraform plan`.
+        plan_json (Dict[str, Any]): the JSON representation of the plan.
+
+    Returns:
+        TerraformPlan: the plan and its changes.
+    """
+    plan = TerraformPlan(result)
+
+    for resource_change in plan_json.get("resource_changes", []):
+        actions = resource_change["change"]["actions"]
+        if actions in NO_CHANGE_ACTIONS:
+            continue
+
+        if "create" in actions:
+            plan.to_add += 1
+        if "delete" in actions:
+            plan.to_destroy += 1
+        if actions == ["update"]:
+            plan.to_change += 1
+
+    plan.changes_outputs = any(
+        output_change["actions"] not in NO_CHANGE_ACTIONS
+        for output_change in plan_json.get("output_changes", {}).values()
+    )
+
+    return plan
+
 
 @dataclasses.dataclass
 class TerraformConfig:
@@ -32,10 +202,33 @@ class TerraformConfig:
         """The path to the variables file."""
         return os.path.join(self.working_dir, "terraform.tfvars.json")
 
-    # if set to False terraform output will be printed to stdout/stderr
-    # else no output will be printed and (ret_code, out, err) tuple will be returned
+    # if set to False the output of init and plan will be printed to stdout/stderr
+    # else no output will be printed and (ret_code, out, err) tuple will be returned,
+    # apply and destroy always hand their output to the asyncio runner
     capture_output: bool = True
 
+    # providers downloaded by `terraform init` are kept in this directory and linked into every working directory,
+    # defaults to the plugin cache shared by every matcha project
+    plugin_cache_dir: Optional[str] = None
+
+    # the number of seconds after which a command run by the asyncio runner is interrupted, by command
+    command_timeouts: Dict[str, float] = dataclasses.field(
+        default_factory=lambda: dict(DEFAULT_COMMAND_TIMEOUTS_SECONDS)
+    )
+
+    # the number of resource operations plan, apply and destroy run concurrently
+    parallelism: int = DEFAULT_PARALLELISM
+
+    # whether plan and destroy first refresh the state from the cloud, which can be skipped when it is known to be fresh
+    refresh: bool = DEFAULT_REFRESH
+
+    # the number of seconds plan, apply and destroy wait for Terraform's state lock
+    lock_timeout: float = DEFAULT_TERRAFORM_LOCK_TIMEOUT_SECONDS
+
+    def __post_init__(self) -> None:
+        """Validate the options of the Terraform operations."""
+        validate_terraform_options(self.parallelism, self.lock_timeout)
+
 
 class TerraformService:
     """TerraformService class to provision and deprovision resources."""
@@ -129,48 +322,271 @@ class TerraformService:
         """
         return Path(os.path.join(self.config.working_dir, ".terraform"))
 
+    def get_init_fingerprint_path(self) -> Path:
+        """Get the path to the fingerprint of the inputs of the last successful `terraform init`.
+
+        Returns:
+            Path: a Path object that represents the path to the fingerprint file.
+        """
+        return self.get_tf_state_dir() / INIT_FINGERPRINT_FILE_NAME
+
+    def compute_init_fingerprint(self) -> str:
+        """Hash everything `terraform init` depends on in the working directory.
+
+        That is the Terraform files of the module tree, including local modules, the dependency lock file, the backend
+        configuration recorded in .terraform/terraform.tfstate, and the providers and modules installed in .terraform.
+
+        Returns:
+            str: the fingerprint in hexadecimal.
+        """
+        working_dir = self.config.working_dir
+        tf_state_dir = str(self.get_tf_state_dir())
+        fingerprint = hashlib.sha256()
+
+        def add_file(file_path: str) -> None:
+            fingerprint.update(os.path.relpath(file_path, working_dir).encode())
+            fingerprint.update(b"\0")
+            with open(file_path, "rb") as f:
+                fingerprint.update(hashlib.sha256(f.read()).digest())
+
+        for root, dirs, filenames in os.walk(working_dir):
+            # the installed modules are not part of the module tree
+            dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != tf_state_dir)
+            for filename in sorted(filenames):
+                if filename.endswith(MODULE_FILE_SUFFIXES):
+                    add_file(os.path.join(root, filename))
+
+        fingerprint.update(b"\0backend\0")
+        backend_state_path = os.path.join(tf_state_dir, "terraform.tfstate")
+        if os.path.isfile(backend_state_path):
+            add_file(backend_state_path)
+
+        fingerprint.update(b"\0installed\0")
+        for installed_dir in ("providers", "modules"):
+            for root, dirs, filenames in os.walk(
+                os.path.join(tf_state_dir, installed_dir)
+            ):
+                dirs.sort()
+                for name in sorted(dirs + filenames):
+                    fingerprint.update(
+                        os.path.relpath(os.path.join(root, name), tf_state_dir).encode()
+                    )
+                    fingerprint.update(b"\0")
+
+        return fingerprint.hexdigest()
+
+    def is_initialized(self) -> bool:
+        """Check whether the working directory is initialized for its current modules, lock file and backend.
+
+        Returns:
+            bool: True if the fingerprint recorded by the last successful init matches the working directory.
+        """
+        try:
+            recorded_fingerprint = self.get_init_fingerprint_path().read_text()
+        except OSError:
+            return False
+
+        return recorded_fingerprint == self.compute_init_fingerprint()
+
     def init(self) -> TerraformResult:
         """Run `terraform init` with the initialized Terraform client from the python_terraform module.
 
+        Providers are installed through the plugin cache, so a provider that any matcha project already downloaded is
+        copied locally instead of being downloaded again. Providers are installed at the versions of the dependency lock
+        file, never upgraded. A successful init records the fingerprint checked by is_initialized.
+
         Returns:
-            Tuple[int, str, str]: return code of Terraform, standard output and standard error.
+            TerraformResult: return code of Terraform, standard output, standard error and the time init took.
         """
-        ret_code, out, err = self.terraform_client.init(
+        plugin_cache_dir = self.config.plugin_cache_dir or default_plugin_cache_dir()
+
+        start = time.perf_counter()
+        with plugin_cache_env(plugin_cache_dir):
+            ret_code, out, err = self.terraform_client.init(
+                capture_output=self.config.capture_output,
+                raise_on_error=False,
+                upgrade=False,
+            )
+
+        if ret_code == 0:
+            self.get_tf_state_dir().mkdir(parents=True, exist_ok=True)
+            self.get_init_fingerprint_path().write_text(self.compute_init_fingerprint())
+
+        return TerraformResult(ret_code, out, err, time.perf_counter() - start)
+
+    @property
+    def plan_path(self) -> str:
+        """The path to the plan file written by `plan`.
+
+        Returns:
+            str: the plan file path.
+        """
+        return os.path.join(self.config.working_dir, PLAN_FILE_NAME)
+
+    def plan(self) -> TerraformPlan:
+        """Run `terraform plan`, saving the plan to a file, and read the changes of the saved plan.
+
+        Returns:
+            TerraformPlan: the result of `terraform plan`, or of `terraform show` if reading the plan failed, and the
+                changes of the plan.
+        """
+        ret_code, out, err = self.terraform_client.plan(
             capture_output=self.config.capture_output,
             raise_on_error=False,
+            detailed_exitcode=python_terraform.IsNotFlagged,
+            out=PLAN_FILE_NAME,
+            **self.get_operation_options(planning=True),
+        )
+        result = TerraformResult(ret_code, out, err)
+        if ret_code != 0:
+            return TerraformPlan(result)
+
+        # the changes are read whether or not the output of plan is captured
+        ret_code, out, err = self.terraform_client.cmd(
+            "show",
+            PLAN_FILE_NAME,
+            json=python_terraform.IsFlagged,
+            no_color=python_terraform.IsFlagged,
+            capture_output=True,
+            raise_on_error=False,
         )
+        if ret_code != 0:
+            return TerraformPlan(TerraformResult(ret_code, out, err))
+
+        return parse_plan(result, json.loads(out))
 
-        return TerraformResult(ret_code, out, err)
+    def discard_plan(self) -> None:
+        """Remove the plan file, if there is one."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.plan_path)
 
-    def apply(self) -> TerraformResult:
-        """Run `terraform apply` with the initialized Terraform client from the python_terraform module.
+    def get_operation_options(self, planning: bool) -> Dict[str, Any]:
+        """Get the options plan, apply and destroy take from the configuration.
+
+        Args:
+            planning (bool): whether the command plans the changes, and so can skip the refresh. Applying a saved plan
+                does not.
 
         Returns:
-            Tuple[int, str, str]: return code of Terraform, standard output and standard error.
+            Dict[str, Any]: the options, in the form python_terraform takes them.
         """
-        # once terraform init is success, call terraform apply
-        ret_code, out, err = self.terraform_client.apply(
-            input=False,
-            capture_output=self.config.capture_output,
-            raise_on_error=False,
-            skip_plan=True,
-            auto_approve=True,
+        options: Dict[str, Any] = {
+            "parallelism": self.config.parallelism,
+            "lock_timeout": f"{self.config.lock_timeout:g}s",
+        }
+        if planning:
+            options["refresh"] = self.config.refresh
+
+        return options
+
+    def get_command_timeout(self, command: str) -> Optional[float]:
+        """Get the number of seconds after which a Terraform command is interrupted.
+
+        Args:
+            command (str): the Terraform command, such as apply.
+
+        Returns:
+            Optional[float]: the timeout, or None for a command without one.
+        """
+        return self.config.command_timeouts.get(command)
+
+    async def run(
+        self,
+        command: str,
+        *args: str,
+        on_event: Optional[TerraformEventHandler] = None,
+        **options: Any,
+    ) -> TerraformResult:
+        """Run a Terraform command with the asyncio runner, consuming its output as it is printed.
+
+        With `on_event`, the command prints machine-readable output and every event is handed to `on_event`. Only the
+        last OUTPUT_TAIL_LINES lines are kept, together with the last ERROR_DIAGNOSTICS_LIMIT error diagnostics, which
+        are reported as the standard error of the result. The command is interrupted once it outlives its timeout.
+
+        Args:
+            command (str): the Terraform command, such as apply.
+            *args (str): the arguments of the command.
+            on_event (Optional[TerraformEventHandler]): called with every JSON event Terraform prints.
+            **options (Any): the options of the command, in the form python_terraform takes them.
+
+        Returns:
+            TerraformResult: return code of Terraform, the tail of its output, and its errors.
+        """
+        if on_event is not None:
+            options["json"] = python_terraform.IsFlagged
+        cmds = self.terraform_client.generate_cmd_string(command, *args, **options)
+        errors: Deque[str] = deque(maxlen=ERROR_DIAGNOSTICS_LIMIT)
+
+        def handle_line(line: str) -> None:
+            if on_event is None:
+                return
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                return
+            if not isinstance(event, dict):
+                return
+
+            diagnostic = event.get("diagnostic", {})
+            if diagnostic.get("severity") == "error":
+                errors.append(
+                    f"{diagnostic.get('summary', '')}: {diagnostic.get('detail', '')}"
+                )
+            on_event(event)
+
+        timeout = self.get_command_timeout(command)
+        result = await AsyncTerraformRunner(self.config.working_dir).run(
+            cmds, timeout=timeout, on_line=handle_line
+        )
+
+        std_out = "\n".join(result.output)
+        std_err = "\n".join(errors) if errors else std_out
+        if result.timed_out:
+            std_err = f"terraform {command} did not finish within {timeout:.0f} seconds and was interrupted.\n{std_err}"
+
+        return TerraformResult(
+            result.return_code, std_out, std_err, result.duration, result.timed_out
         )
 
-        return TerraformResult(ret_code, out, err)
+    async def apply_async(
+        self, plan_path: str, on_event: Optional[TerraformEventHandler] = None
+    ) -> TerraformResult:
+        """Apply a saved plan as is with the asyncio runner.
 
-    def destroy(self) -> TerraformResult:
-        """Destroy the provisioned resources with the initialized Terraform client from the python_terraform module..
+        Args:
+            plan_path (str): the plan file.
+            on_event (Optional[TerraformEventHandler]): called with every event of the machine-readable output.
 
         Returns:
-            Tuple[int, str, str]: return code of terraform, standard output and standard error.
+            TerraformResult: return code of Terraform, the tail of its output, and its errors.
         """
-        # Reference: https://github.com/beelit94/python-terraform/issues/108
-        ret_code, out, err = self.terraform_client.destroy(
-            capture_output=self.config.capture_output,
-            raise_on_error=False,
-            force=python_terraform.IsNotFlagged,
-            auto_approve=True,
+        # the variables are part of a saved plan, and Terraform refuses them when applying it
+        return await self.run(
+            "apply",
+            plan_path,
+            on_event=on_event,
+            input=False,
+            no_color=python_terraform.IsFlagged,
+            **self.get_operation_options(planning=False),
         )
 
-        return TerraformResult(ret_code, out, err)
+    async def destroy_async(
+        self, on_event: Optional[TerraformEventHandler] = None
+    ) -> TerraformResult:
+        """Destroy the provisioned resources with the asyncio runner.
+
+        Args:
+            on_event (Optional[TerraformEventHandler]): called with every event of the machine-readable output.
+
+        Returns:
+            TerraformResult: return code of Terraform, the tail of its output, and its errors.
+        """
+        return await self.run(
+            "destroy",
+            on_event=on_event,
+            input=False,
+            no_color=python_terraform.IsFlagged,
+            auto_approve=python_terraform.IsFlagged,
+            var_file=self.config.var_file,
+            **self.get_operation_options(planning=True),
+        )
@@ -1,12 +1,19 @@
 """Remote state manager module."""
 import contextlib
 import os
-from typing import Iterator, Optional
-
-from azure.core.exceptions import ResourceExistsError
+import time
+from enum import Enum
+from typing import Iterator, List, Optional
+
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
 
 from matcha_ml.cli.ui.print_messages import print_status
 from matcha_ml.cli.ui.status_message_builders import (
+    build_status,
     build_step_success_status,
     build_warning_status,
 )
@@ -17,10 +24,36 @@ from matcha_ml.config import (
     MatchaConfigComponentProperty,
     MatchaConfigService,
 )
-from matcha_ml.constants import LOCK_FILE_NAME
-from matcha_ml.errors import MatchaError
+from matcha_ml.constants import LOCK_FILE_NAME, MATCHA_STATE_PATH
+from matcha_ml.errors import MatchaError, MatchaInputError
 from matcha_ml.runners.remote_state_runner import RemoteStateRunner
-from matcha_ml.storage import AzureStorage
+from matcha_ml.state.state_lock import (
+    DEFAULT_LOCK_TIMEOUT_SECONDS,
+    DEFAULT_LOCK_TTL_SECONDS,
+    ENDED_LEASE_STATES,
+    LEASED_STATE,
+    LOCK_METADATA,
+    LOCK_QUEUE_PREFIX,
+    LeaseHeartbeat,
+    LockWaitMetrics,
+    backoff_delay,
+    new_ticket_name,
+    tickets_ahead,
+    validate_lock_timeout,
+    validate_lock_ttl,
+)
+from matcha_ml.storage import AzureStorage, LocalStorage
+from matcha_ml.storage.state_history import (
+    DEFAULT_HISTORY_RETENTION,
+    HistoryEntry,
+    validate_history_retention,
+)
+from matcha_ml.storage.storage_backend import (
+    BlobInfo,
+    StorageBackend,
+    StorageLease,
+    TransferReport,
+)
 from matcha_ml.templates import RemoteStateTemplate
 
 ALREADY_LOCKED_MESSAGE = (
@@ -28,8 +61,45 @@ ALREADY_LOCKED_MESSAGE = (
     " If you think this is a mistake, you can unlock the state by running 'matcha force-unlock'."
 )
 
+READING_WHILE_LOCKED_MESSAGE = "Remote state is locked, maybe someone else is changing it with matcha? Showing the state as it was last saved."
+
+LOCK_TIMEOUT_MESSAGE = (
+    "Remote state stayed locked for the {timeout:g} seconds matcha waited for it, maybe someone else is using matcha?"
+    " If you think this is a mistake, you can unlock the state by running 'matcha force-unlock'."
+)
+
+LOCK_LOST_MESSAGE = (
+    "The remote state lock could not be renewed for {lock_ttl} seconds ({error}), someone else may have changed the"
+    " state in the meantime."
+)
+
 REMOTE_STATE_BUCKET = "remote_state_bucket"
 CONTAINER_NAME = "container_name"
+STATE_STORAGE_MODE = "state_storage_mode"
+STATE_BACKEND = "state_backend"
+LOCAL_STATE_PATH = "local_path"
+
+
+class StateBackend(str, Enum):
+    """The storage holding the remote state.
+
+    The "azure" backend is the blob storage provisioned by matcha, the "local" backend a directory on this machine,
+    for offline use such as CI.
+    """
+
+    AZURE = "azure"
+    LOCAL = "local"
+
+
+class StateStorageMode(str, Enum):
+    """How the state is laid out in the remote state container.
+
+    In "files" mode every file of the state is a blob, in "snapshot" mode the whole state is a single compressed,
+    content-addressed archive pointed at by an index blob.
+    """
+
+    FILES = "files"
+    SNAPSHOT = "snapshot"
 
 
 class RemoteStateManager:
@@ -38,21 +108,48 @@ class RemoteStateManager:
     This class is used to interact with the remote Matcha state.
     """
 
-    _azure_storage: Optional[AzureStorage] = None
+    _storage: Optional[StorageBackend] = None
+    _lock_lease: Optional[StorageLease] = None
 
     config_path: str
 
-    def __init__(self, config_path: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        config_path: Optional[str] = None,
+        storage_mode: Optional[StateStorageMode] = None,
+        lock_ttl: int = DEFAULT_LOCK_TTL_SECONDS,
+        history_retention: int = DEFAULT_HISTORY_RETENTION,
+    ) -> None:
         """Initialize Remote State Manager.
 
         Args:
             config_path (Optional[str]): optional configuration file path.
+            storage_mode (Optional[StateStorageMode]): how the state is stored remotely, defaults to the
+                'state_storage_mode' property of the remote state bucket in the configuration, or files if it is unset.
+            lock_ttl (int): the number of seconds the lock outlives a matcha process that stopped renewing it, from 15
+                to 60. Defaults to DEFAULT_LOCK_TTL_SECONDS.
+            history_retention (int): the number of entries the history of the remote state keeps. Defaults to
+                DEFAULT_HISTORY_RETENTION.
+
+        Raises:
+            MatchaInputError: if the lock TTL is out of range, or the history retention keeps no entry.
         """
         if config_path is not None:
             self.config_path = config_path
         else:
             self.config_path = os.path.join(os.getcwd(), DEFAULT_CONFIG_NAME)
 
+        self._storage_mode = storage_mode
+
+        try:
+            validate_lock_ttl(lock_ttl)
+            validate_history_retention(history_retention)
+        except ValueError as e:
+            raise MatchaInputError(str(e))
+        self.lock_ttl = lock_ttl
+        self.history_retention = history_retention
+        self.lock_wait = LockWaitMetrics()
+
     def _configuration_file_exists(self) -> bool:
         """Check if the remote state configuration file exists.
 
@@ -77,19 +174,21 @@ class RemoteStateManager:
             raise MatchaError(f"Error while loading state configuration: {e}")
 
     @property
-    def azure_storage(self) -> AzureStorage:
-        """Azure Storage property.
+    def storage(self) -> StorageBackend:
+        """Storage property.
 
-        If it was not initialized before, it will be initialized.
+        If it was not initialized before, it will be initialized, as the backend named by the 'state_backend' property
+        of the remote state bucket: Azure blob storage by default, or a local directory given by its 'local_path'
+        property.
 
         Returns:
-            AzureStorage: to interact with blob storage on Azure.
+            StorageBackend: to interact with the storage holding the remote state.
 
         Raises:
-            MatchaError: if Azure Storage client failed to create.
+            MatchaError: if the storage client failed to create, or the backend is not a valid StateBackend.
             MatchaError: if the container name could not be found.
         """
-        if self._azure_storage is None:
+        if self._storage is None:
             try:
                 remote_state_bucket = self.configuration.find_component(
                     REMOTE_STATE_BUCKET
@@ -98,24 +197,93 @@ class RemoteStateManager:
                 if remote_state_bucket is None:
                     raise MatchaError("the remote state could not be found.")
 
-                account_name = remote_state_bucket.find_property("account_name")
-                resource_group_name = remote_state_bucket.find_property(
-                    "resource_group_name"
+                backend_property = remote_state_bucket.find_property(STATE_BACKEND)
+                backend = (
+                    StateBackend(backend_property.value)
+                    if backend_property is not None
+                    else StateBackend.AZURE
                 )
+                if backend == StateBackend.LOCAL:
+                    self._storage = self._local_storage(remote_state_bucket)
+                else:
+                    self._storage = self._azure_storage(remote_state_bucket)
+            except Exception as e:
+                raise MatchaError(f"Error while creating the storage client: {e}")
 
-                if account_name is None or resource_group_name is None:
-                    raise MatchaError(
-                        "properties of the remote state could not be found."
-                    )
+        return self._storage
 
-                self._azure_storage = AzureStorage(
-                    account_name=account_name.value,
-                    resource_group_name=resource_group_name.value,
-                )
-            except Exception as e:
-                raise MatchaError(f"Error while creating Azure Storage client: {e}")
+    @staticmethod
+    def _azure_storage(remote_state_bucket: MatchaConfigComponent) -> AzureStorage:
+        """Create the Azure blob storage holding the remote state.
+
+        Args:
+            remote_state_bucket (MatchaConfigComponent): the remote state bucket in the configuration.
 
-        return self._azure_storage
+        Returns:
+            AzureStorage: to interact with blob storage on Azure.
+
+        Raises:
+            MatchaError: if the properties of the storage account could not be found.
+        """
+        account_name = remote_state_bucket.find_property("account_name")
+        resource_group_name = remote_state_bucket.find_property("resource_group_name")
+
+        if account_name is None or resource_group_name is None:
+            raise MatchaError("properties of the remote state could not be found.")
+
+        return AzureStorage(
+            account_name=account_name.value,
+            resource_group_name=resource_group_name.value,
+        )
+
+    @staticmethod
+    def _local_storage(remote_state_bucket: MatchaConfigComponent) -> LocalStorage:
+        """Create the local directory storage holding the remote state.
+
+        Args:
+            remote_state_bucket (MatchaConfigComponent): the remote state bucket in the configuration.
+
+        Returns:
+            LocalStorage: to interact with the directory.
+
+        Raises:
+            MatchaError: if the path of the directory could not be found.
+        """
+        local_path = remote_state_bucket.find_property(LOCAL_STATE_PATH)
+        if local_path is None:
+            raise MatchaError("properties of the remote state could not be found.")
+
+        return LocalStorage(root_path=local_path.value)
+
+    @property
+    def storage_mode(self) -> StateStorageMode:
+        """The storage mode of the remote state.
+
+        Returns:
+            StateStorageMode: the mode given to the manager, or else the one in the configuration.
+
+        Raises:
+            MatchaError: if the configured mode is not a valid storage mode.
+        """
+        if self._storage_mode is not None:
+            return self._storage_mode
+
+        remote_state_bucket = self.configuration.find_component(REMOTE_STATE_BUCKET)
+        storage_mode = (
+            remote_state_bucket.find_property(STATE_STORAGE_MODE)
+            if remote_state_bucket is not None
+            else None
+        )
+        if storage_mode is None:
+            return StateStorageMode.FILES
+
+        try:
+            return StateStorageMode(storage_mode.value)
+        except ValueError:
+            raise MatchaError(
+                f"'{storage_mode.value}' is not a valid {STATE_STORAGE_MODE}, expected one of: "
+                f"{', '.join(mode.value for mode in StateStorageMode)}."
+            )
 
     def _bucket_exists(self, container_name: str) -> bool:
         """Check if a bucket for remote state management exists.
@@ -126,15 +294,15 @@ class RemoteStateManager:
         Returns:
             bool: True, if the bucket exists
         """
-        return self.azure_storage.container_exists(container_name)
+        return self.storage.container_exists(container_name)
 
     def _resource_group_exists(self) -> bool:
-        """Check if an Azure resource group already exists.
+        """Check if an Azure resource group, or the directory of a local storage, already exists.
 
         Returns:
             bool: True, if the resource group exists.
         """
-        return self.azure_storage.resource_group_exists
+        return self.storage.resource_group_exists
 
     def get_hash_remote_state(self, remote_path: str) -> str:
         """Get the hash of remote matcha state file.
@@ -149,19 +317,16 @@ class RemoteStateManager:
             MatchaError: if the remote state bucket could not be found.
             MatchaError: if the container name could not be found.
         """
-        remote_state_bucket = self.configuration.find_component(REMOTE_STATE_BUCKET)
+        container_name = self._get_container_name()
 
-        if remote_state_bucket is None:
-            raise MatchaError(
-                "the remote state could not be found, ensure there are provisioned resources."
-            )
+        if self.storage_mode == StateStorageMode.SNAPSHOT:
+            index = self.storage.get_snapshot_index(container_name)
+            if index is not None:
+                # a file missing from the snapshot never matches the local hash
+                return index.files.get(remote_path, "")
 
-        container_name = remote_state_bucket.find_property(CONTAINER_NAME)
-        if container_name is None:
-            raise MatchaError("properties of the remote state could not be found.")
-
-        return self.azure_storage.get_hash_remote_state(
-            container_name.value,
+        return self.storage.get_hash_remote_state(
+            container_name,
             remote_path,
         )
 
@@ -174,18 +339,15 @@ class RemoteStateManager:
         if not self._configuration_file_exists():
             return False
 
-        remote_state_bucket = self.configuration.find_component(REMOTE_STATE_BUCKET)
-        if remote_state_bucket is None:
+        try:
+            container_name = self._get_container_name()
+        except MatchaError:
             return False
 
         if not self._resource_group_exists():
             return False
 
-        container_name = remote_state_bucket.find_property(CONTAINER_NAME)
-        if container_name is None:
-            return False
-
-        if not self._bucket_exists(container_name.value):
+        if not self._bucket_exists(container_name):
             return False
 
         return True
@@ -260,59 +422,60 @@ class RemoteStateManager:
         template_runner.deprovision()
         MatchaConfigService.delete_matcha_config()
 
-    def download(self, dest_folder_path: str) -> None:
+    def download(self, dest_folder_path: str) -> TransferReport:
         """Download the remote state into the local matcha state directory.
 
+        Only files that differ from the remote state are transferred. In snapshot mode, a state that was uploaded file by
+        file is still downloaded.
+
         Args:
             dest_folder_path (str): Path to local matcha state directory.
 
+        Returns:
+            TransferReport: the number of blobs and bytes downloaded, and the number of files skipped and removed.
+
         Raises:
             MatchaError: if the remote state bucket could not be found.
             MatchaError: if the container name could not be found.
         """
-        remote_state_bucket = self.configuration.find_component(REMOTE_STATE_BUCKET)
+        container_name = self._get_container_name()
 
-        if remote_state_bucket is None:
-            raise MatchaError(
-                "the remote state could not be found, ensure there are provisioned resources."
+        if self.storage_mode == StateStorageMode.SNAPSHOT:
+            return self.storage.download_snapshot(
+                container_name,
+                dest_folder_path=dest_folder_path,
             )
 
-        container_name = remote_state_bucket.find_property(CONTAINER_NAME)
-        if container_name is None:
-            raise MatchaError(
-                "properties of the remote state could not be found, ensure there are provisioned resources."
-            )
-
-        self.azure_storage.download_folder(
-            container_name.value,
+        return self.storage.download_folder(
+            container_name,
             dest_folder_path=dest_folder_path,
         )
 
-    def upload(self, local_folder_path: str) -> None:
+    def upload(self, local_folder_path: str) -> TransferReport:
         """Upload the local matcha state to the remote state storage.
 
+        Only files that changed since they were last uploaded are transferred.
+
         Args:
             local_folder_path (str): Path to local matcha state directory
 
+        Returns:
+            TransferReport: the number of blobs and bytes uploaded, and the number of blobs skipped and deleted.
+
         Raises:
             MatchaError: if the remote state bucket could not be found.
             MatchaError: if the container name could not be found.
         """
-        remote_state_bucket = self.configuration.find_component(REMOTE_STATE_BUCKET)
+        container_name = self._get_container_name()
 
-        if remote_state_bucket is None:
-            raise MatchaError(
-                "the remote state could not be found, ensure there are provisioned resources."
+        if self.storage_mode == StateStorageMode.SNAPSHOT:
+            return self.storage.upload_snapshot(
+                container_name=container_name,
+                src_folder_path=local_folder_path,
             )
 
-        container_name = remote_state_bucket.find_property(CONTAINER_NAME)
-        if container_name is None:
-            raise MatchaError(
-                "properties of the remote state could not be found, ensure there are provisioned resources."
-            )
-
-        self.azure_storage.upload_folder(
-            container_name=container_name.value,
+        return self.storage.upload_folder(
+            container_name=container_name,
             src_folder_path=local_folder_path,
         )
 
@@ -331,15 +494,19 @@ class RemoteStateManager:
         yield None
 
         if not destroy:
-            self.upload(os.path.join(".matcha", "infrastructure"))
+            local_folder_path = os.path.join(".matcha", "infrastructure")
+            report = self.upload(local_folder_path)
+            self.record_history(local_folder_path, report)
 
-    def lock(self) -> None:
-        """Lock remote state.
+    def _get_container_name(self) -> str:
+        """Get the name of the remote state container from the configuration.
+
+        Returns:
+            str: the container name.
 
         Raises:
             MatchaError: if the remote state bucket could not be found.
-            MatchaError: if the container could not be found.
-            MatchaError: if the state is already locked.
+            MatchaError: if the container name could not be found.
         """
         remote_state_bucket = self.configuration.find_component(REMOTE_STATE_BUCKET)
 
@@ -354,36 +521,282 @@ class RemoteStateManager:
                 "properties of the remote state could not be found, ensure there are provisioned resources."
             )
 
+        return str(container_name.value)
+
+    def record_history(
+        self,
+        local_folder_path: str,
+        upload_report: Optional[TransferReport] = None,
+    ) -> Optional[HistoryEntry]:
+        """Record the local matcha state as an entry in the history of the remote state.
+
+        A state stored as a snapshot is recorded as a pointer to its snapshot. Otherwise, only files that no entry holds
+        yet are stored. A state that matches the latest entry is not recorded again.
+
+        Args:
+            local_folder_path (str): Path to local matcha state directory
+            upload_report (Optional[TransferReport]): the report of the upload of the state, whose blobs the history
+                copies or points at. Defaults to None, in which case the files are uploaded.
+
+        Returns:
+            Optional[HistoryEntry]: the new entry, None if the state matches the latest entry.
+        """
+        return self.storage.record_history(
+            self._get_container_name(),
+            local_folder_path,
+            uploaded_files=upload_report.files if upload_report is not None else None,
+            snapshot=upload_report.snapshot if upload_report is not None else None,
+            retention=self.history_retention,
+        )
+
+    def history(self) -> List[HistoryEntry]:
+        """List the entries of the history of the remote state, oldest first.
+
+        Returns:
+            List[HistoryEntry]: the entries.
+        """
+        return self.storage.list_history(self._get_container_name())
+
+    def restore(self, entry_id: str) -> HistoryEntry:
+        """Restore the remote state to an entry of its history, which is recorded as a new entry.
+
+        In files mode, the state files are copied from the history within the storage. In snapshot mode, the index is
+        pointed back at the entry's snapshot, which is only packed again for an entry recorded file by file. The lock
+        should be held while restoring.
+
+        Args:
+            entry_id (str): the ID of the entry to restore.
+
+        Returns:
+            HistoryEntry: the new entry, recording the restore.
+
+        Raises:
+            MatchaInputError: if the history has no entry with that ID.
+            MatchaInputError: if the entry was recorded as a snapshot, and the state is stored file by file.
+        """
+        container_name = self._get_container_name()
+        try:
+            entry = self.storage.get_history_entry(container_name, entry_id)
+        except ResourceNotFoundError:
+            raise MatchaInputError(
+                f"The remote state history has no entry '{entry_id}', run 'matcha state history' to list the entries."
+            )
+
+        if self.storage_mode == StateStorageMode.SNAPSHOT:
+            restore_entry, _ = self.storage.restore_history_snapshot(
+                container_name, entry, retention=self.history_retention
+            )
+        elif entry.snapshot is not None:
+            raise MatchaInputError(
+                f"The remote state history entry '{entry_id}' was recorded in {StateStorageMode.SNAPSHOT.value} mode,"
+                f" set the '{STATE_STORAGE_MODE}' of the remote state to restore it."
+            )
+        else:
+            restore_entry, _ = self.storage.restore_history(
+                container_name, entry, retention=self.history_retention
+            )
+
+        return restore_entry
+
+    def lock(self, timeout: float = DEFAULT_LOCK_TIMEOUT_SECONDS) -> None:
+        """Lock remote state.
+
+        The lock is a lease on the lock blob, which expires `lock_ttl` seconds after it was last renewed, so the lock of
+        a matcha process that crashed is reclaimed once it expired.
+
+        With a timeout, a locked state is waited for: the process joins a queue of waiters, which take the lock in the
+        order they joined, and retries with jittered exponential backoff. How long it waited is kept in `lock_wait`.
+
+        Args:
+            timeout (float): the number of seconds to wait for the lock, 0 to fail straight away if it is held.
+                Defaults to DEFAULT_LOCK_TIMEOUT_SECONDS.
+
+        Raises:
+            MatchaError: if the remote state bucket could not be found.
+            MatchaError: if the container could not be found.
+            MatchaError: if the state is already locked, and stays locked for the whole timeout.
+            MatchaInputError: if the timeout is negative.
+        """
+        try:
+            validate_lock_timeout(timeout)
+        except ValueError as e:
+            raise MatchaInputError(str(e))
+
+        container_name = self._get_container_name()
+
+        self.lock_wait = LockWaitMetrics(attempts=1)
+        if timeout == 0:
+            if not self._try_lock(container_name):
+                raise MatchaError(ALREADY_LOCKED_MESSAGE)
+            return
+
+        # without anyone queueing, the lock is tried before joining the queue
+        tickets = self.storage.list_blobs(container_name, LOCK_QUEUE_PREFIX)
+        if tickets_ahead(tickets, "") == 0 and self._try_lock(container_name):
+            return
+
+        self._wait_for_lock(container_name, timeout)
+
+    def _wait_for_lock(self, container_name: str, timeout: float) -> None:
+        """Queue for the lock until it is taken or the timeout has passed.
+
+        Args:
+            container_name (str): Azure Storage container name
+            timeout (float): the number of seconds to wait for the lock.
+
+        Raises:
+            MatchaError: if the state stays locked for the whole timeout.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        ticket_name = new_ticket_name()
+        self.storage.create_empty(container_name=container_name, blob_name=ticket_name)
+        ticket_lease = self.storage.acquire_lease(
+            container_name=container_name,
+            blob_name=ticket_name,
+            lease_duration=self.lock_ttl,
+        )
+        print_status(
+            build_status(
+                f"Remote state is locked, waiting up to {timeout:g} seconds for it..."
+            )
+        )
+
+        backoff_attempt = 0
+        try:
+            with LeaseHeartbeat(ticket_lease.renew, self.lock_ttl):
+                while True:
+                    tickets = self.storage.list_blobs(container_name, LOCK_QUEUE_PREFIX)
+                    self._remove_ended_tickets(container_name, tickets)
+                    ahead = tickets_ahead(tickets, ticket_name)
+                    if self.lock_wait.queue_position is None:
+                        self.lock_wait.queue_position = ahead
+
+                    if ahead == 0:
+                        self.lock_wait.attempts += 1
+                        if self._try_lock(container_name):
+                            break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise MatchaError(LOCK_TIMEOUT_MESSAGE.format(timeout=timeout))
+
+                    backoff_attempt += 1
+                    time.sleep(min(remaining, backoff_delay(backoff_attempt)))
+        finally:
+            self.lock_wait.wait_seconds = time.monotonic() - start
+            with contextlib.suppress(HttpResponseError):
+                self.storage.delete_blob(
+                    container_name=container_name,
+                    blob_name=ticket_name,
+                    lease=ticket_lease,
+                )
+
+        print_status(
+            build_step_success_status(
+                f"Locked the remote state after waiting {self.lock_wait.wait_seconds:.1f} seconds."
+            )
+        )
+
+    def _remove_ended_tickets(
+        self, container_name: str, tickets: List[BlobInfo]
+    ) -> None:
+        """Delete the queue tickets of waiters whose lease expired or was broken.
+
+        Args:
+            container_name (str): Azure Storage container name
+            tickets (List[BlobInfo]): the properties of the ticket blobs.
+        """
+        for ticket in tickets:
+            if ticket.lease_state in ENDED_LEASE_STATES:
+                # another waiter may have removed it first
+                with contextlib.suppress(HttpResponseError):
+                    self.storage.delete_blob(
+                        container_name=container_name, blob_name=ticket.name
+                    )
+
+    def _try_lock(self, container_name: str) -> bool:
+        """Try to take the lock once.
+
+        Args:
+            container_name (str): Azure Storage container name
+
+        Returns:
+            bool: True, if the lock was taken; False, if it is held by someone else.
+        """
+        try:
+            self.storage.create_empty(
+                container_name=container_name,
+                blob_name=LOCK_FILE_NAME,
+                metadata=LOCK_METADATA,
+            )
+        except ResourceExistsError:
+            if self._is_legacy_lock(container_name):
+                return False
+
         try:
-            self.azure_storage.create_empty(
-                container_name=container_name.value,
+            self._lock_lease = self.storage.acquire_lease(
+                container_name=container_name,
                 blob_name=LOCK_FILE_NAME,
+                lease_duration=self.lock_ttl,
             )
         except ResourceExistsError:
-            raise MatchaError(ALREADY_LOCKED_MESSAGE)
+            return False
+
+        return True
+
+    def _is_legacy_lock(self, container_name: str) -> bool:
+        """Check whether the lock blob was created by a version of matcha that locks without a lease.
+
+        Such a lock is held for as long as the blob exists.
+
+        Args:
+            container_name (str): Azure Storage container name
+
+        Returns:
+            bool: True, if the lock blob is not guarded by a lease.
+        """
+        try:
+            properties = self.storage.get_blob_info(
+                container_name=container_name, blob_name=LOCK_FILE_NAME
+            )
+        except ResourceNotFoundError:
+            # the lock was released in the meantime
+            return False
+
+        return not LOCK_METADATA.items() <= properties.metadata.items()
 
     def unlock(self) -> None:
         """Unlock remote state.
 
+        Releases the lock taken by this manager, or else breaks the lock whoever holds it.
+
         Raises:
             MatchaError: if the remote state bucket could not be found.
             MatchaError: if the container name could not be found.
         """
-        remote_state_bucket = self.configuration.find_component(REMOTE_STATE_BUCKET)
-
-        if remote_state_bucket is None:
-            raise MatchaError(
-                "the remote state could not be found, ensure there are provisioned resources."
-            )
+        container_name = self._get_container_name()
 
-        container_name = remote_state_bucket.find_property(CONTAINER_NAME)
-        if container_name is None:
-            raise MatchaError(
-                "properties of the remote state could not be found, ensure there are provisioned resources."
-            )
+        if self._lock_lease is not None:
+            lease, self._lock_lease = self._lock_lease, None
+            try:
+                self.storage.delete_blob(
+                    container_name=container_name,
+                    blob_name=LOCK_FILE_NAME,
+                    lease=lease,
+                )
+                return
+            except HttpResponseError:
+                # the lease was lost, so the lock is either someone else's or not held at all
+                print_status(
+                    build_warning_status(
+                        "Tried unlocking state, but the lock had expired"
+                    )
+                )
+                return
 
-        if not self.azure_storage.blob_exists(
-            container_name=container_name.value,
+        if not self.storage.blob_exists(
+            container_name=container_name,
             blob_name=LOCK_FILE_NAME,
         ):
             print_status(
@@ -391,21 +804,112 @@ class RemoteStateManager:
             )
             return
         else:
-            self.azure_storage.delete_blob(
-                container_name=container_name.value,
+            self.storage.break_lease(
+                container_name=container_name,
+                blob_name=LOCK_FILE_NAME,
+            )
+            self.storage.delete_blob(
+                container_name=container_name,
                 blob_name=LOCK_FILE_NAME,
             )
 
+    def is_locked(self) -> bool:
+        """Check whether someone holds the lock on the remote state.
+
+        Returns:
+            bool: True, if the lock blob exists with an active lease, or was created without one.
+
+        Raises:
+            MatchaError: if the remote state bucket could not be found.
+            MatchaError: if the container name could not be found.
+        """
+        container_name = self._get_container_name()
+
+        try:
+            properties = self.storage.get_blob_info(
+                container_name=container_name, blob_name=LOCK_FILE_NAME
+            )
+        except ResourceNotFoundError:
+            return False
+
+        is_leased_lock = LOCK_METADATA.items() <= properties.metadata.items()
+        return not is_leased_lock or properties.lease_state == LEASED_STATE
+
     @contextlib.contextmanager
-    def use_lock(self, destroy: bool = False) -> Iterator[None]:
+    def use_read_lock(self) -> Iterator[None]:
+        """Context manager to read the state while others may be changing it.
+
+        Readers neither take the lock nor wait for it, so they run alongside each other and alongside a writer. A
+        writer only changes the remote state when it commits on leaving `use_remote_state`, and readers go through
+        `read_committed_state`, which reads a single blob per commit, so they see the state as of the last commit.
+        """
+        if self.is_locked():
+            print_status(build_warning_status(READING_WHILE_LOCKED_MESSAGE))
+
+        yield
+
+    def read_committed_state(self, dest_folder_path: str) -> TransferReport:
+        """Download the last committed matcha state, without the rest of the state folder in files mode.
+
+        In files mode, the matcha.state file is a single blob. In snapshot mode, the whole folder is read from the
+        snapshot the index points at.
+
+        Args:
+            dest_folder_path (str): Path to the folder containing the local .matcha folder.
+
+        Returns:
+            TransferReport: the number of blobs and bytes downloaded.
+
+        Raises:
+            MatchaError: if the remote state bucket could not be found.
+            MatchaError: if the container name could not be found.
+        """
+        container_name = self._get_container_name()
+
+        if self.storage_mode == StateStorageMode.SNAPSHOT:
+            return self.storage.download_snapshot(
+                container_name, dest_folder_path=dest_folder_path
+            )
+
+        return self.storage.download_blob(
+            container_name,
+            blob_name=MATCHA_STATE_PATH,
+            dest_file_path=os.path.join(dest_folder_path, MATCHA_STATE_PATH),
+        )
+
+    @contextlib.contextmanager
+    def use_lock(
+        self,
+        destroy: bool = False,
+        timeout: float = DEFAULT_LOCK_TIMEOUT_SECONDS,
+    ) -> Iterator[None]:
         """Context manager to lock state.
 
+        The lock is renewed in the background for as long as the context is active.
+
         Args:
             destroy (bool): Flag for whether the command being run is 'destroy' or not.
+            timeout (float): the number of seconds to wait for the lock if it is held. Defaults to
+                DEFAULT_LOCK_TIMEOUT_SECONDS.
         """
-        self.lock()
+        self.lock(timeout)
+        heartbeat = LeaseHeartbeat(self._renew_lock, self.lock_ttl)
         try:
-            yield
+            with heartbeat:
+                yield
         finally:
             if not destroy:
+                if heartbeat.lost:
+                    print_status(
+                        build_warning_status(
+                            LOCK_LOST_MESSAGE.format(
+                                lock_ttl=self.lock_ttl, error=heartbeat.error
+                            )
+                        )
+                    )
                 self.unlock()
+
+    def _renew_lock(self) -> None:
+        """Renew the lease of the lock taken by this manager, restarting its TTL."""
+        if self._lock_lease is not None:
+            self._lock_lease.renew()
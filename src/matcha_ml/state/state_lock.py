@@ -0,0 +1,229 @@
+"""Lease-based locking of the remote state."""
+import dataclasses
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+from matcha_ml.constants import LOCK_FILE_NAME
+from matcha_ml.storage.storage_backend import BlobInfo
+
+# Blob leases last between 15 and 60 seconds, or forever, which a crashed client would never give back
+MIN_LOCK_TTL_SECONDS = 15
+MAX_LOCK_TTL_SECONDS = 60
+DEFAULT_LOCK_TTL_SECONDS = 60
+
+# The lease is renewed several times per TTL, so that a failed renewal is retried before the lease expires
+RENEWALS_PER_TTL = 3
+
+# Marks a lock blob as guarded by a lease; a lock blob without it was created by an older matcha and is held while it
+# exists
+LOCK_METADATA = {"matcha_lock": "lease"}
+
+# By default the lock is not waited for
+DEFAULT_LOCK_TIMEOUT_SECONDS = 0.0
+
+# Waiting for the lock retries it with exponential backoff between these bounds, jittered so that waiters spread out
+INITIAL_LOCK_BACKOFF_SECONDS = 1.0
+MAX_LOCK_BACKOFF_SECONDS = 15.0
+
+# Every process waiting for the lock holds a leased ticket blob under this prefix, only the oldest one tries the lock.
+# The prefix contains the lock file name, so that state transfers leave the tickets alone.
+LOCK_QUEUE_PREFIX = f"{LOCK_FILE_NAME}.queue/"
+
+LEASED_STATE = "leased"
+# The states of a lease that was acquired once and has since expired or been broken
+ENDED_LEASE_STATES = {"expired", "broken"}
+
+
+def validate_lock_ttl(lock_ttl: int) -> None:
+    """Check that a lock TTL is a valid lease duration.
+
+    Args:
+        lock_ttl (int): the number of seconds a lock is held without being renewed.
+
+    Raises:
+        ValueError: when the TTL is out of range.
+    """
+    if not MIN_LOCK_TTL_SECONDS <= lock_ttl <= MAX_LOCK_TTL_SECONDS:
+        raise ValueError(
+            f"The lock TTL must be between {MIN_LOCK_TTL_SECONDS} and {MAX_LOCK_TTL_SECONDS} seconds, "
+            f"got {lock_ttl}."
+        )
+
+
+def validate_lock_timeout(lock_timeout: float) -> None:
+    """Check that a lock timeout is not negative.
+
+    Args:
+        lock_timeout (float): the number of seconds to wait for the lock.
+
+    Raises:
+        ValueError: when the timeout is negative.
+    """
+    if lock_timeout < 0:
+        raise ValueError(f"The lock timeout must not be negative, got {lock_timeout}.")
+
+
+def backoff_delay(
+    attempt: int,
+    initial: float = INITIAL_LOCK_BACKOFF_SECONDS,
+    maximum: float = MAX_LOCK_BACKOFF_SECONDS,
+) -> float:
+    """Get the delay before retrying the lock, doubling with every attempt up to a maximum.
+
+    Half of the delay is random, so that processes that started waiting together retry at different times.
+
+    Args:
+        attempt (int): the number of attempts made so far, from 1.
+        initial (float): the delay after the first attempt, before jitter.
+        maximum (float): the largest delay, before jitter.
+
+    Returns:
+        float: the number of seconds to wait.
+    """
+    delay: float = min(maximum, initial * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def new_ticket_name() -> str:
+    """Name a ticket blob of the lock queue.
+
+    Returns:
+        str: the blob name.
+    """
+    return f"{LOCK_QUEUE_PREFIX}{time.time_ns():020d}-{uuid.uuid4().hex}"
+
+
+def tickets_ahead(tickets: List[BlobInfo], ticket_name: str) -> int:
+    """Count the waiters queued before a ticket.
+
+    Tickets are served in the order the storage created them, ties broken by name. A ticket counts while its lease is
+    active, so a waiter that crashed leaves the queue once its lease expired. A ticket that is missing from the list
+    queues behind every other one.
+
+    Args:
+        tickets (List[BlobInfo]): the properties of the ticket blobs.
+        ticket_name (str): the name of the waiter's own ticket.
+
+    Returns:
+        int: the number of live tickets ahead of it.
+    """
+
+    def order(ticket: BlobInfo) -> Tuple[datetime, str]:
+        creation_time = ticket.creation_time or datetime.min.replace(
+            tzinfo=timezone.utc
+        )
+        return creation_time, ticket.name
+
+    own_ticket = next(
+        (ticket for ticket in tickets if ticket.name == ticket_name), None
+    )
+
+    return sum(
+        1
+        for ticket in tickets
+        if ticket.name != ticket_name
+        and ticket.lease_state == LEASED_STATE
+        and (own_ticket is None or order(ticket) < order(own_ticket))
+    )
+
+
+@dataclasses.dataclass
+class LockWaitMetrics:
+    """How long taking the lock took.
+
+    Attributes:
+        wait_seconds (float): the number of seconds spent waiting for the lock.
+        attempts (int): the number of times the lock was tried.
+        queue_position (Optional[int]): the number of waiters ahead when joining the queue, or None if the lock was
+            taken without queueing.
+    """
+
+    wait_seconds: float = 0.0
+    attempts: int = 0
+    queue_position: Optional[int] = None
+
+
+class LeaseHeartbeat:
+    """Renews a lease on a background thread until it is stopped.
+
+    A renewal that fails is retried on the next beat, the lease is only considered lost once no renewal succeeded for
+    a whole TTL, after which another client may have reclaimed it.
+    """
+
+    def __init__(
+        self,
+        renew: Callable[[], None],
+        lock_ttl: float,
+        interval: Optional[float] = None,
+    ) -> None:
+        """Initialize the heartbeat.
+
+        Args:
+            renew (Callable[[], None]): renews the lease.
+            lock_ttl (float): the number of seconds the lease lasts without being renewed.
+            interval (Optional[float]): the number of seconds between renewals. Defaults to a third of the TTL.
+        """
+        self.renew = renew
+        self.lock_ttl = lock_ttl
+        self.interval = (
+            interval if interval is not None else lock_ttl / RENEWALS_PER_TTL
+        )
+        self.error: Optional[Exception] = None
+
+        self._last_renewed = time.monotonic()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="matcha-lock-heartbeat", daemon=True
+        )
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        """Start renewing the lease.
+
+        Returns:
+            LeaseHeartbeat: the heartbeat.
+        """
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Stop renewing the lease.
+
+        Args:
+            *args (object): the exception raised in the block, if any.
+        """
+        self.stop()
+
+    def start(self) -> None:
+        """Start renewing the lease, counting the TTL from now."""
+        self._last_renewed = time.monotonic()
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop renewing the lease and wait for a renewal in flight to finish."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def lost(self) -> bool:
+        """Whether the lease went a whole TTL without being renewed.
+
+        Returns:
+            bool: True if the lease may have expired.
+        """
+        return time.monotonic() - self._last_renewed >= self.lock_ttl
+
+    def _run(self) -> None:
+        """Renew the lease every interval until stopped."""
+        while not self._stopped.wait(self.interval):
+            try:
+                self.renew()
+            except Exception as e:
+                self.error = e
+            else:
+                self._last_renewed = time.monotonic()
+                self.error = None
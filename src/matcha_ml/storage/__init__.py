@@ -1,4 +1,7 @@
 """Storage sub-module."""
+from .async_azure_storage import AsyncAzureStorage
 from .azure_storage import AzureStorage
+from .local_storage import LocalStorage
+from .storage_backend import StorageBackend
 
-__all__ = ["AzureStorage"]
+__all__ = ["AsyncAzureStorage", "AzureStorage", "LocalStorage", "StorageBackend"]
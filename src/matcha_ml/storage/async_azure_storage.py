@@ -0,0 +1,481 @@
+"""Class to interact with Azure Storage asynchronously."""
+import asyncio
+import hashlib
+import os
+from types import TracebackType
+from typing import Awaitable, Iterable, List, Optional, Set, Type
+
+from azure.storage.blob import ContentSettings
+from azure.storage.blob.aio import BlobClient, BlobServiceClient, ContainerClient
+
+from matcha_ml.constants import LOCK_FILE_NAME
+from matcha_ml.services.async_azure_service import (
+    AsyncAzureClient,
+    AsyncTransport,
+    create_async_transport,
+    run_blocking,
+)
+from matcha_ml.storage.azure_storage import blob_hash_key, blob_info
+from matcha_ml.storage.blob_hash_store import BlobHashStore
+from matcha_ml.storage.exclusion_rules import ExclusionRules
+from matcha_ml.storage.state_history import is_history_blob
+from matcha_ml.storage.storage_backend import (
+    BlobInfo,
+    TransferReport,
+    hash_downloaded_blobs,
+    plan_download,
+    plan_upload,
+    read_file,
+    remove_stale_local_files,
+    state_blobs,
+    write_file,
+)
+
+# Number of blob transfers that are in flight at the same time
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class AsyncAzureStorage:
+    """Asynchronous counterpart of AzureStorage, built on the aio Azure Storage SDK.
+
+    Folder uploads, downloads and remote deletions transfer up to `max_concurrency` blobs at the same time. Local files
+    are read, written and hashed in the default executor, so that several storages can share one event loop. Use
+    AsyncAzureStorage.create to get a connected instance, and close it, or use it as an async context manager, to
+    release its connections.
+    """
+
+    az_client: AsyncAzureClient
+    blob_service_client: BlobServiceClient
+    resource_group_exists: bool = False
+
+    def __init__(
+        self,
+        account_name: str,
+        resource_group_name: str,
+        az_client: AsyncAzureClient,
+        transport: Optional[AsyncTransport] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> None:
+        """Initialize Azure Storage, no requests are made until it is connected.
+
+        Args:
+            account_name (str): Azure storage account name
+            resource_group_name (str): Name of resource group containing given account name
+            az_client (AsyncAzureClient): an authenticated asynchronous Azure client
+            transport (Optional[AsyncTransport]): the transport the blob service client sends its requests with,
+                defaults to a new transport.
+            max_concurrency (int): the maximum number of blob transfers in flight. Defaults to DEFAULT_MAX_CONCURRENCY.
+        """
+        self.account_name = account_name
+        self.resource_group_name = resource_group_name
+        self.az_client = az_client
+        self._transport = transport
+        self._blob_hashes = BlobHashStore()
+        self.exclusion_rules = ExclusionRules.load()
+        self.max_concurrency = max_concurrency
+        self._owns_az_client = False
+
+    @classmethod
+    async def create(
+        cls,
+        account_name: str,
+        resource_group_name: str,
+        az_client: Optional[AsyncAzureClient] = None,
+        transport: Optional[AsyncTransport] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> "AsyncAzureStorage":
+        """Create a storage instance connected to the storage account.
+
+        Args:
+            account_name (str): Azure storage account name
+            resource_group_name (str): Name of resource group containing given account name
+            az_client (Optional[AsyncAzureClient]): an authenticated asynchronous Azure client, a new client is created
+                and owned by the storage instance when none is given.
+            transport (Optional[AsyncTransport]): the transport every SDK client sends its requests with.
+            max_concurrency (int): the maximum number of blob transfers in flight. Defaults to DEFAULT_MAX_CONCURRENCY.
+
+        Returns:
+            AsyncAzureStorage: the connected storage instance.
+        """
+        owns_az_client = az_client is None
+        if az_client is None:
+            az_client = await AsyncAzureClient.create(transport=transport)
+
+        # the exclusion rules are read from the working directory when the storage is initialized
+        storage = await run_blocking(
+            cls,
+            account_name,
+            resource_group_name,
+            az_client,
+            transport,
+            max_concurrency,
+        )
+        storage._owns_az_client = owns_az_client
+        try:
+            await storage.connect()
+        except BaseException:
+            await storage.close()
+            raise
+
+        return storage
+
+    async def __aenter__(self) -> "AsyncAzureStorage":
+        """Enter the storage's context.
+
+        Returns:
+            AsyncAzureStorage: the storage instance.
+        """
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the storage when leaving its context.
+
+        Args:
+            exc_type (Optional[Type[BaseException]]): the type of the exception raised in the context, if any.
+            exc_value (Optional[BaseException]): the exception raised in the context, if any.
+            traceback (Optional[TracebackType]): the traceback of the exception raised in the context, if any.
+        """
+        await self.close()
+
+    async def connect(self) -> None:
+        """Check that the resource group exists and create a blob service client for the storage account."""
+        self.resource_group_exists = await self.az_client.resource_group_exists(
+            self.resource_group_name
+        )
+        if self.resource_group_exists:
+            _conn_str = await self.az_client.fetch_connection_string(
+                storage_account_name=self.account_name,
+                resource_group_name=self.resource_group_name,
+            )
+            self.blob_service_client = BlobServiceClient.from_connection_string(
+                conn_str=_conn_str,
+                transport=self._transport
+                if self._transport is not None
+                else create_async_transport(),
+            )
+
+    async def close(self) -> None:
+        """Close the blob service client, and the Azure client if it is owned by this instance."""
+        if hasattr(self, "blob_service_client"):
+            await self.blob_service_client.close()
+
+        if self._owns_az_client:
+            await self.az_client.close()
+
+    async def _run_concurrently(self, operations: Iterable[Awaitable[None]]) -> None:
+        """Run blob operations concurrently, with at most `max_concurrency` of them in flight.
+
+        Args:
+            operations (Iterable[Awaitable[None]]): the operations to run.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _bounded(operation: Awaitable[None]) -> None:
+            async with semaphore:
+                await operation
+
+        await asyncio.gather(*(_bounded(operation) for operation in operations))
+
+    def _get_container_client(self, container_name: str) -> ContainerClient:
+        """Get a container client using container name.
+
+        Args:
+            container_name (str): Azure storage container name
+
+        Returns:
+            ContainerClient: Container client for given container.
+        """
+        return self.blob_service_client.get_container_client(container_name)
+
+    async def container_exists(self, container_name: str) -> bool:
+        """Check if storage container exists.
+
+        Args:
+            container_name (str): Azure storage container name
+
+        Returns:
+            bool: does container exist
+        """
+        container_client = self._get_container_client(container_name)
+
+        return bool(await container_client.exists())
+
+    async def upload_file(
+        self,
+        blob_client: BlobClient,
+        src_file: str,
+        content_md5: Optional[bytes] = None,
+    ) -> None:
+        """Upload a file to Azure Storage Container.
+
+        Args:
+            blob_client (BlobClient): Container client
+            src_file (str): Path to upload the file from
+            content_md5 (Optional[bytes]): MD5 digest of the file, stored as the blob's Content-MD5. Defaults to None.
+        """
+        content_settings = (
+            ContentSettings(content_md5=bytearray(content_md5))
+            if content_md5 is not None
+            else None
+        )
+        await blob_client.upload_blob(
+            data=await run_blocking(read_file, src_file),
+            overwrite=True,
+            content_settings=content_settings,
+        )
+
+    async def upload_folder(
+        self, container_name: str, src_folder_path: str
+    ) -> TransferReport:
+        """Upload a folder to an Azure Storage Container and delete any files that are not present `src_folder_path`.
+
+        The folder is diffed against the container as by AzureStorage, files whose MD5 matches the Content-MD5 of the
+        blob already in the container are not uploaded again.
+
+        Args:
+            container_name (str): Azure storage container name
+            src_folder_path (str): Path to folder to upload all files from
+
+        Returns:
+            TransferReport: the number of blobs and bytes uploaded, the number of blobs skipped and deleted, and the
+                MD5 hash of every file uploaded or skipped.
+        """
+        container_client = self._get_container_client(container_name)
+        plan = await run_blocking(
+            plan_upload,
+            src_folder_path,
+            await self._list_blobs(container_name),
+            self.exclusion_rules,
+        )
+
+        await self._run_concurrently(
+            self.upload_file(
+                container_client.get_blob_client(blob=file_path),
+                file_path,
+                content_md5=content_md5,
+            )
+            for file_path, content_md5 in plan.uploads.items()
+        )
+
+        # Remove blobs that are not present in the local `src_folder_path``
+        plan.report.blobs_deleted = await self._sync_remote(
+            container_name=container_name, blob_set=plan.stale_blobs
+        )
+
+        return plan.report
+
+    async def download_file(self, blob_client: BlobClient, dest_file: str) -> None:
+        """Download a file from Azure Storage Container.
+
+        Args:
+            blob_client (BlobClient): Container client
+            dest_file (str): Path to download the file to
+        """
+        blob_data = await blob_client.download_blob()
+        await run_blocking(write_file, dest_file, await blob_data.readall())
+
+    async def download_folder(
+        self, container_name: str, dest_folder_path: str
+    ) -> TransferReport:
+        """Downloads a folder from Azure Storage Container.
+
+        As with AzureStorage, the local folder is reconciled with a single listing of the container, only blobs whose
+        local copy differs are downloaded and only local files that are no longer in the container are removed.
+
+        Args:
+            container_name (str): Azure storage container name
+            dest_folder_path (str): Path to folder to download all the files
+
+        Returns:
+            TransferReport: the number of blobs and bytes downloaded, and the number of files skipped and removed.
+        """
+        container_client = self._get_container_client(container_name)
+        blobs = state_blobs(
+            await self._list_blobs(container_name), self.exclusion_rules
+        )
+        unhashed_blobs = [blob for blob in blobs if blob.content_md5 is None]
+        blob_hash_scope = blob_hash_key(self.account_name, container_name)
+        known_md5s = (
+            await run_blocking(self._blob_hashes.get, blob_hash_scope, unhashed_blobs)
+            if unhashed_blobs
+            else {}
+        )
+        plan = await run_blocking(plan_download, dest_folder_path, blobs, known_md5s)
+
+        await self._run_concurrently(
+            self.download_file(
+                container_client.get_blob_client(blob=blob.name),
+                os.path.join(dest_folder_path, blob.name),
+            )
+            for blob in plan.downloads
+        )
+
+        # the hashes of the whole download are recorded at once
+        downloaded_hashes = await run_blocking(
+            hash_downloaded_blobs, dest_folder_path, plan.downloads
+        )
+        if downloaded_hashes:
+            await run_blocking(
+                self._blob_hashes.set, blob_hash_scope, downloaded_hashes
+            )
+
+        plan.report.blobs_deleted = await run_blocking(
+            self._sync_local, dest_folder_path, plan.blob_names
+        )
+
+        return plan.report
+
+    def _get_blob_client(self, container_name: str, blob_name: str) -> BlobClient:
+        """Get a blob client by name.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+
+        Returns:
+            BlobClient: a blob client
+        """
+        return self._get_container_client(container_name).get_blob_client(blob_name)
+
+    async def create_empty(self, container_name: str, blob_name: str) -> None:
+        """Create an empty blob in Azure Container.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+
+        Raises:
+            azure.core.exceptions.ResourceExistsError: when blob already exists
+        """
+        await self._get_blob_client(container_name, blob_name).upload_blob(data="")
+
+    async def blob_exists(self, container_name: str, blob_name: str) -> bool:
+        """Check whether a blob exists in a container.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+
+        Returns:
+            bool: True, if blob exists
+        """
+        return bool(await self._get_blob_client(container_name, blob_name).exists())
+
+    async def delete_blob(self, container_name: str, blob_name: str) -> None:
+        """Delete blob by name.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+        """
+        await self._get_blob_client(container_name, blob_name).delete_blob()
+
+    async def _get_blob_names(self, container_name: str) -> Set[str]:
+        """A function for return a set of blob names.
+
+        Args:
+            container_name (str): the name of the blob container to look for blobs.
+
+        Returns:
+            Set[str]: a set of blob names in the container.
+        """
+        return {
+            blob_name
+            async for blob_name in self._get_container_client(
+                container_name
+            ).list_blob_names()
+        }
+
+    async def _list_blobs(self, container_name: str) -> List[BlobInfo]:
+        """List the blobs of a container, with their properties.
+
+        Args:
+            container_name (str): the name of the blob container to look for blobs.
+
+        Returns:
+            List[BlobInfo]: the properties of every blob, with the MD5 hash of the blobs that have a Content-MD5.
+        """
+        return [
+            blob_info(properties)
+            async for properties in self._get_container_client(
+                container_name
+            ).list_blobs()
+        ]
+
+    async def get_hash_remote_state(self, container_name: str, blob_name: str) -> str:
+        """Get hash of remote matcha state file.
+
+        As with AzureStorage, the hash is read from the blob properties and the blob is only downloaded when it has no
+        Content-MD5 and its hash at its current ETag is not in the BlobHashStore.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+
+        Returns:
+            str: Hash contents of the blob in hexadecimal string
+        """
+        blob_client = self._get_blob_client(
+            container_name=container_name, blob_name=blob_name
+        )
+        blob = blob_info(await blob_client.get_blob_properties())
+        if blob.content_md5 is not None:
+            return blob.content_md5
+
+        blob_hash_scope = blob_hash_key(self.account_name, container_name)
+        known_md5s = await run_blocking(self._blob_hashes.get, blob_hash_scope, [blob])
+        known_md5 = known_md5s.get(blob.name)
+        if known_md5 is not None:
+            return known_md5
+
+        blob_data = await blob_client.download_blob()
+        remote_hash = hashlib.md5(await blob_data.readall()).hexdigest()
+
+        await run_blocking(
+            self._blob_hashes.set, blob_hash_scope, [(blob, remote_hash)]
+        )
+
+        return remote_hash
+
+    async def _sync_remote(self, container_name: str, blob_set: Set[str]) -> int:
+        """Synchronizes the remote storage with the local files.
+
+        Args:
+            container_name (str): The name of the blob container to look for blobs.
+            blob_set (Set[str]): Set of blob names to be removed on the remote storage.
+
+        Returns:
+            int: the number of blobs deleted.
+        """
+        container_client = self._get_container_client(container_name=container_name)
+        # Ensure that the lock file is not being prematurely removed from the remote bucket
+        blobs_to_delete = [
+            blob
+            for blob in blob_set
+            if LOCK_FILE_NAME not in blob and not is_history_blob(blob)
+        ]
+
+        await self._run_concurrently(
+            container_client.delete_blob(blob) for blob in blobs_to_delete
+        )
+
+        return len(blobs_to_delete)
+
+    def _sync_local(self, dest_folder_path: str, blob_names: Set[str]) -> int:
+        """Synchronizes the local .matcha folder with the remote storage files.
+
+        Args:
+            dest_folder_path (str): Path to folder containing the .matcha folder
+            blob_names (Set[str]): names of the blobs in the remote storage
+
+        Returns:
+            int: the number of files removed.
+        """
+        return remove_stale_local_files(
+            dest_folder_path, blob_names, self.exclusion_rules
+        )
@@ -1,18 +1,235 @@
 """Class to interact with Azure Storage."""
+import dataclasses
+import functools
 import hashlib
 import os
-import tempfile
-from typing import Optional, Set
-
-from azure.storage.blob import BlobClient, BlobServiceClient, ContainerClient
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager, suppress
+from http import HTTPStatus
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, TypeVar
+
+from azure.core.exceptions import (
+    AzureError,
+    HttpResponseError,
+    IncompleteReadError,
+    ResourceExistsError,
+    ServiceRequestError,
+    ServiceResponseError,
+)
+from azure.storage.blob import (
+    BlobClient,
+    BlobLeaseClient,
+    BlobProperties,
+    BlobServiceClient,
+    ContainerClient,
+    ContentSettings,
+)
 
 from matcha_ml.constants import LOCK_FILE_NAME
 from matcha_ml.services.azure_service import AzureClient
+from matcha_ml.services.http_transport_service import SharedHttpTransport
+from matcha_ml.storage.blob_hash_store import BlobHashStore
+from matcha_ml.storage.exclusion_rules import ExclusionRules
+from matcha_ml.storage.state_history import is_history_blob
+from matcha_ml.storage.storage_backend import (
+    BlobInfo,
+    StorageBackend,
+    StorageLease,
+)
+
+T = TypeVar("T")
+
+# Number of blobs an AzureStorage transfers at the same time, kept below the shared HTTP pool size
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF_SECONDS = 0.5
+
+# Number of blobs transferred at the same time by every AzureStorage in the process
+DEFAULT_MAX_CONCURRENT_TRANSFERS = 16
+
+# Status codes of transient failures, worth retrying the transfer for
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# The largest number of blobs the blob batch API deletes with a single request
+MAX_BLOBS_PER_BATCH = 256
+
+COPY_PENDING_STATUS = "pending"
+COPY_SUCCESS_STATUS = "success"
+
+
+@dataclasses.dataclass(frozen=True)
+class TransferConfig:
+    """Worker pool settings of the folder transfers of an AzureStorage.
+
+    Attributes:
+        max_workers (int): the number of blobs transferred at the same time, 1 transfers blobs one after the other.
+        max_attempts (int): the number of times a blob transfer is attempted before its error is raised.
+        retry_backoff (float): the seconds waited before the first retry, doubled for every further retry.
+    """
+
+    max_workers: int = DEFAULT_MAX_WORKERS
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS
+
+
+@dataclasses.dataclass(frozen=True)
+class BlobDeletionFailure:
+    """A blob that could not be deleted.
+
+    Attributes:
+        blob_name (str): the blob name.
+        batch_number (int): the number of the batch that deleted the blob, from 1.
+        batch_count (int): the number of batches the blobs were deleted in.
+        status_code (Optional[int]): the status code of the deletion, None if no response was received.
+        error (str): the error code of the deletion.
+    """
+
+    blob_name: str
+    batch_number: int
+    batch_count: int
+    status_code: Optional[int]
+    error: str
+
+    def __str__(self) -> str:
+        """Describe the failure.
+
+        Returns:
+            str: the blob, its batch and its error.
+        """
+        return (
+            f"{self.blob_name} (batch {self.batch_number} of {self.batch_count}): "
+            f"{self.status_code} {self.error}"
+        )
+
+
+class BlobDeletionError(AzureError):
+    """Raised when some of the blobs of a container could not be deleted."""
+
+    def __init__(
+        self,
+        container_name: str,
+        blobs_count: int,
+        failures: List[BlobDeletionFailure],
+    ) -> None:
+        """Initialize the error.
+
+        Args:
+            container_name (str): Azure storage container name
+            blobs_count (int): the number of blobs that were deleted.
+            failures (List[BlobDeletionFailure]): the blobs that could not be deleted.
+        """
+        self.failures = failures
+        super().__init__(
+            f"{len(failures)} of {blobs_count} blobs could not be deleted from the container "
+            f"'{container_name}':\n" + "\n".join(str(failure) for failure in failures)
+        )
+
+
+class TransferLimiter:
+    """A process-wide cap on the number of blob transfers in flight, shared by the worker pools of every storage."""
+
+    _max_concurrent_transfers = DEFAULT_MAX_CONCURRENT_TRANSFERS
+    _slots = threading.BoundedSemaphore(DEFAULT_MAX_CONCURRENT_TRANSFERS)
+    lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, max_concurrent_transfers: int) -> None:
+        """Change the cap, transfers already in flight keep the slot they acquired.
+
+        Args:
+            max_concurrent_transfers (int): the maximum number of blob transfers in flight.
+
+        Raises:
+            ValueError: when the cap is lower than 1.
+        """
+        if max_concurrent_transfers < 1:
+            raise ValueError("The number of concurrent transfers must be at least 1.")
+
+        with cls.lock:
+            cls._max_concurrent_transfers = max_concurrent_transfers
+            cls._slots = threading.BoundedSemaphore(max_concurrent_transfers)
+
+    @classmethod
+    def max_concurrent_transfers(cls) -> int:
+        """Get the current cap.
+
+        Returns:
+            int: the maximum number of blob transfers in flight.
+        """
+        return cls._max_concurrent_transfers
+
+    @classmethod
+    @contextmanager
+    def slot(cls) -> Iterator[None]:
+        """Hold a transfer slot, waiting for one to be released when the cap is reached.
+
+        Yields:
+            None: control is returned to the transfer.
+        """
+        with cls.lock:
+            slots = cls._slots
+
+        with slots:
+            yield
+
+
+def is_retryable(error: AzureError) -> bool:
+    """Check whether a failed transfer is worth retrying.
+
+    Args:
+        error (AzureError): the error raised by the transfer.
+
+    Returns:
+        bool: True for connection failures, interrupted bodies and transient service errors.
+    """
+    if isinstance(
+        error, (ServiceRequestError, ServiceResponseError, IncompleteReadError)
+    ):
+        return True
+
+    return (
+        isinstance(error, HttpResponseError)
+        and error.status_code in RETRYABLE_STATUS_CODES
+    )
+
+
+def blob_hash_key(account_name: str, container_name: str) -> str:
+    """Get the key under which the BlobHashStore keeps the hashes of a container's blobs without a Content-MD5.
+
+    Args:
+        account_name (str): Azure storage account name
+        container_name (str): Azure storage container name
+
+    Returns:
+        str: the container key.
+    """
+    return f"azure/{account_name}/{container_name}"
 
-IGNORE_FOLDERS = {".terraform"}
 
+def blob_info(properties: BlobProperties) -> BlobInfo:
+    """Convert the properties of an Azure blob to the properties every storage backend reports.
 
-class AzureStorage:
+    Args:
+        properties (BlobProperties): the blob's properties, as listed or fetched
+
+    Returns:
+        BlobInfo: the blob's properties
+    """
+    content_md5 = properties.content_settings.content_md5
+    return BlobInfo(
+        name=str(properties.name),
+        size=properties.size,
+        content_md5=bytes(content_md5).hex() if content_md5 else None,
+        etag=properties.etag,
+        creation_time=properties.creation_time,
+        lease_state=properties.lease.state,
+        metadata=dict(properties.metadata or {}),
+    )
+
+
+class AzureStorage(StorageBackend):
     """Class to interact with Azure blob storage."""
 
     az_client: AzureClient
@@ -20,15 +237,25 @@ class AzureStorage:
     account_name: Optional[str] = None
     resource_group_name: Optional[str] = None
 
-    def __init__(self, account_name: str, resource_group_name: str) -> None:
+    def __init__(
+        self,
+        account_name: str,
+        resource_group_name: str,
+        transfer_config: Optional[TransferConfig] = None,
+    ) -> None:
         """Initialize Azure Storage.
 
         Args:
             account_name (str): Azure storage account name
             resource_group_name (str): Name of resource group containing given account name
+            transfer_config (Optional[TransferConfig]): worker pool settings of the folder transfers. Defaults to
+                TransferConfig().
         """
         self.account_name = account_name
         self.resource_group_name = resource_group_name
+        self.transfer_config = transfer_config or TransferConfig()
+        self._blob_hashes = BlobHashStore()
+        self.exclusion_rules = ExclusionRules.load()
         self.az_client = AzureClient()
         self.resource_group_exists = self.az_client.resource_group_exists(
             resource_group_name
@@ -39,7 +266,7 @@ class AzureStorage:
                 resource_group_name=resource_group_name,
             )
             self.blob_service_client = BlobServiceClient.from_connection_string(
-                conn_str=_conn_str
+                conn_str=_conn_str, transport=SharedHttpTransport.get()
             )
 
     def _get_container_client(self, container_name: str) -> ContainerClient:
@@ -66,45 +293,29 @@ class AzureStorage:
 
         return container_client.exists()
 
-    def upload_file(self, blob_client: BlobClient, src_file: str) -> None:
+    def upload_file(
+        self,
+        blob_client: BlobClient,
+        src_file: str,
+        content_md5: Optional[bytes] = None,
+    ) -> None:
         """Upload a file to Azure Storage Container.
 
         Args:
             blob_client (BlobClient): Container client
             src_file (str): Path to upload the file from
+            content_md5 (Optional[bytes]): MD5 digest of the file, stored as the blob's Content-MD5 so that later
+                uploads can tell whether the file changed. Defaults to None.
         """
+        content_settings = (
+            ContentSettings(content_md5=bytearray(content_md5))
+            if content_md5 is not None
+            else None
+        )
         with open(src_file, "rb") as blob_data:
-            blob_client.upload_blob(data=blob_data, overwrite=True)
-
-    def upload_folder(self, container_name: str, src_folder_path: str) -> None:
-        """Upload a folder to an Azure Storage Container and delete any files that are not present `src_folder_path`.
-
-        Args:
-            container_name (str): Azure storage container name
-            src_folder_path (str): Path to folder to upload all files from
-        """
-        container_client = self._get_container_client(container_name)
-        # Get all existing blobs
-        blob_set = self._get_blob_names(container_name=container_name)
-
-        for root, _, filenames in os.walk(src_folder_path):
-            for filename in filenames:
-                file_path = os.path.join(root, filename)
-
-                # ignore uploading files in IGNORE_FOLDERS
-                if (
-                    not any(
-                        ignore_folder in file_path for ignore_folder in IGNORE_FOLDERS
-                    )
-                    and file_path in blob_set
-                ):
-                    blob_set.remove(file_path)
-
-                blob_client = container_client.get_blob_client(blob=file_path)
-                self.upload_file(blob_client, file_path)
-
-        # Remove blobs that are not present in the local `src_folder_path``
-        self._sync_remote(container_name=container_name, blob_set=blob_set)
+            blob_client.upload_blob(
+                data=blob_data, overwrite=True, content_settings=content_settings
+            )
 
     def download_file(self, blob_client: BlobClient, dest_file: str) -> None:
         """Download a file from Azure Storage Container.
@@ -117,31 +328,63 @@ class AzureStorage:
             blob_data = blob_client.download_blob()
             blob_data.readinto(my_blob)
 
-    def download_folder(self, container_name: str, dest_folder_path: str) -> None:
-        """Downloads a folder from Azure Storage Container.
+    def _run_transfers(self, transfers: List[Callable[[], None]]) -> None:
+        """Run blob transfers on a pool of `max_workers` threads, each transfer holding a slot of the TransferLimiter.
 
-        Local directory is cleared beforehand, ensuring that the local files match the remote files.
+        Once a transfer fails for good, transfers that have not started yet are cancelled.
 
         Args:
-            container_name (str): Azure storage container name
-            dest_folder_path (str): Path to folder to download all the files
+            transfers (List[Callable[[], None]]): the transfers to run.
+
+        Raises:
+            AzureError: the error of the first transfer that failed on every attempt.
         """
-        # Sync local matcha directory with remote storage
-        matcha_resources_dir = os.path.join(".matcha", "infrastructure", "resources")
-        self._sync_local(os.path.join(dest_folder_path, matcha_resources_dir))
+        if self.transfer_config.max_workers <= 1 or len(transfers) <= 1:
+            for transfer in transfers:
+                self._transfer_with_retry(transfer)
+            return
+
+        run_transfer: Callable[[Callable[[], None]], None] = self._transfer_with_retry
+        with ThreadPoolExecutor(
+            max_workers=self.transfer_config.max_workers
+        ) as executor:
+            futures = [
+                executor.submit(run_transfer, transfer) for transfer in transfers
+            ]
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in not_done:
+                future.cancel()
+
+        for future in futures:
+            error = future.exception() if future in done else None
+            if error is not None:
+                raise error
+
+    def _transfer_with_retry(self, transfer: Callable[[], T]) -> T:
+        """Run a blob transfer, retrying it with exponential backoff while it fails with a retryable error.
 
-        container_client = self._get_container_client(container_name)
+        Args:
+            transfer (Callable[[], T]): the transfer to run.
 
-        for blob in container_client.list_blobs():
-            if LOCK_FILE_NAME in str(blob.name):
-                continue
-            blob_client = container_client.get_blob_client(blob=str(blob.name))
-            file_path = os.path.join(dest_folder_path, str(blob.name))
+        Returns:
+            T: the result of the transfer.
 
-            if not os.path.exists(os.path.dirname(file_path)):
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        Raises:
+            AzureError: when the transfer fails with an error that isn't retryable, or fails on every attempt.
+        """
+        attempt = 1
+        while True:
+            try:
+                with TransferLimiter.slot():
+                    return transfer()
+            except AzureError as error:
+                if attempt >= self.transfer_config.max_attempts or not is_retryable(
+                    error
+                ):
+                    raise
 
-            self.download_file(blob_client, file_path)
+            time.sleep(self.transfer_config.retry_backoff * 2 ** (attempt - 1))
+            attempt += 1
 
     def _get_blob_client(self, container_name: str, blob_name: str) -> BlobClient:
         """Get a blob client by name.
@@ -155,17 +398,152 @@ class AzureStorage:
         """
         return self._get_container_client(container_name).get_blob_client(blob_name)
 
-    def create_empty(self, container_name: str, blob_name: str) -> None:
+    def create_empty(
+        self,
+        container_name: str,
+        blob_name: str,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> None:
         """Create an empty blob in Azure Container.
 
         Args:
             container_name (str): Azure storage container name
             blob_name (str): blob name
+            metadata (Optional[Dict[str, str]]): metadata of the blob
 
         Raises:
             azure.core.exceptions.ResourceExistsError: when blob already exists
         """
-        self._get_blob_client(container_name, blob_name).upload_blob(data="")
+        try:
+            self._get_blob_client(container_name, blob_name).upload_blob(
+                data="", metadata=metadata
+            )
+        except HttpResponseError as e:
+            # a blob with an active lease refuses the write before reporting that it exists
+            if e.status_code != HTTPStatus.PRECONDITION_FAILED:
+                raise
+            raise ResourceExistsError(message=e.message, response=e.response) from e
+
+    def get_blob(self, container_name: str, blob_name: str) -> bytes:
+        """Read the contents of a blob.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+
+        Returns:
+            bytes: the contents of the blob
+
+        Raises:
+            azure.core.exceptions.ResourceNotFoundError: when the blob does not exist
+        """
+        blob_client = self._get_blob_client(container_name, blob_name)
+        return self._transfer_with_retry(
+            lambda: bytes(blob_client.download_blob().readall())
+        )
+
+    def put_blob(self, container_name: str, blob_name: str, data: bytes) -> None:
+        """Write a blob, replacing it if it exists, with the MD5 of its contents as its Content-MD5.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+            data (bytes): the contents of the blob
+        """
+        blob_client = self._get_blob_client(container_name, blob_name)
+        self._transfer_with_retry(
+            functools.partial(
+                blob_client.upload_blob,
+                data=data,
+                overwrite=True,
+                content_settings=ContentSettings(
+                    content_md5=bytearray(hashlib.md5(data).digest())
+                ),
+            )
+        )
+
+    def copy_blob(
+        self, container_name: str, source_blob_name: str, dest_blob_name: str
+    ) -> None:
+        """Copy a blob within a container with a server-side copy, replacing the destination if it exists.
+
+        A copy within a storage account is usually complete once it is accepted, otherwise its status is polled until it
+        is.
+
+        Args:
+            container_name (str): Azure storage container name
+            source_blob_name (str): the name of the blob to copy
+            dest_blob_name (str): the name of the copy
+
+        Raises:
+            azure.core.exceptions.ResourceNotFoundError: when the source blob does not exist
+            azure.core.exceptions.HttpResponseError: when the copy failed or was aborted
+        """
+        source_client = self._get_blob_client(container_name, source_blob_name)
+        dest_client = self._get_blob_client(container_name, dest_blob_name)
+        copy_status = self._transfer_with_retry(
+            lambda: dest_client.start_copy_from_url(source_client.url)
+        ).get("copy_status")
+
+        while copy_status == COPY_PENDING_STATUS:
+            time.sleep(self.transfer_config.retry_backoff)
+            copy_status = dest_client.get_blob_properties().copy.status
+
+        if copy_status != COPY_SUCCESS_STATUS:
+            raise HttpResponseError(
+                message=f"Copying the blob '{source_blob_name}' to '{dest_blob_name}' ended as {copy_status}."
+            )
+
+    def get_blob_info(self, container_name: str, blob_name: str) -> BlobInfo:
+        """Get the properties of a blob, including its metadata and the state of its lease.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+
+        Returns:
+            BlobInfo: the blob's properties
+
+        Raises:
+            azure.core.exceptions.ResourceNotFoundError: when the blob does not exist
+        """
+        return blob_info(
+            self._get_blob_client(container_name, blob_name).get_blob_properties()
+        )
+
+    def acquire_lease(
+        self, container_name: str, blob_name: str, lease_duration: int
+    ) -> BlobLeaseClient:
+        """Acquire a lease on a blob, which expires unless it is renewed within `lease_duration` seconds.
+
+        A lease that expired, or was broken, can be acquired by anyone.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+            lease_duration (int): the number of seconds the lease lasts without being renewed, from 15 to 60
+
+        Returns:
+            BlobLeaseClient: the lease, to renew and release it
+
+        Raises:
+            azure.core.exceptions.ResourceExistsError: when another client holds an active lease on the blob
+        """
+        lease = BlobLeaseClient(self._get_blob_client(container_name, blob_name))
+        lease.acquire(lease_duration=lease_duration)
+        return lease
+
+    def break_lease(self, container_name: str, blob_name: str) -> None:
+        """Break the lease on a blob straight away, whoever holds it.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+        """
+        lease = BlobLeaseClient(self._get_blob_client(container_name, blob_name))
+        # the blob may have no lease to break
+        with suppress(ResourceExistsError):
+            lease.break_lease(lease_break_period=0)
 
     def blob_exists(self, container_name: str, blob_name: str) -> bool:
         """Check whether a blob exists in a container.
@@ -179,14 +557,22 @@ class AzureStorage:
         """
         return self._get_blob_client(container_name, blob_name).exists()
 
-    def delete_blob(self, container_name: str, blob_name: str) -> None:
+    def delete_blob(
+        self,
+        container_name: str,
+        blob_name: str,
+        lease: Optional[StorageLease] = None,
+    ) -> None:
         """Delete blob by name.
 
         Args:
             container_name (str): Azure storage container name
             blob_name (str): blob name
+            lease (Optional[StorageLease]): the active lease on the blob, if it has one
         """
-        self._get_blob_client(container_name, blob_name).delete_blob()
+        self._get_blob_client(container_name, blob_name).delete_blob(
+            lease=lease.id if lease is not None else None
+        )
 
     def _get_blob_names(self, container_name: str) -> Set[str]:
         """A function for return a set of blob names.
@@ -199,61 +585,178 @@ class AzureStorage:
         """
         return set(self._get_container_client(container_name).list_blob_names())
 
-    def get_hash_remote_state(self, container_name: str, blob_name: str) -> str:
-        """Get hash of remote matcha state file.
+    def list_blobs(
+        self, container_name: str, name_starts_with: Optional[str] = None
+    ) -> List[BlobInfo]:
+        """List the blobs of a container, with their properties.
+
+        Args:
+            container_name (str): Azure storage container name
+            name_starts_with (Optional[str]): only list the blobs whose name starts with this prefix. Defaults to None.
+
+        Returns:
+            List[BlobInfo]: the properties of every listed blob
+        """
+        return [
+            blob_info(properties)
+            for properties in self._get_container_client(container_name).list_blobs(
+                name_starts_with=name_starts_with
+            )
+        ]
+
+    def _upload_file(
+        self, container_name: str, blob_name: str, file_path: str, content_md5: bytes
+    ) -> None:
+        """Upload a file as a blob, streaming it with its MD5 as the blob's Content-MD5.
+
+        Args:
+            container_name (str): Azure storage container name
+            blob_name (str): blob name
+            file_path (str): Path to the file
+            content_md5 (bytes): MD5 digest of the file
+        """
+        self.upload_file(
+            self._get_blob_client(container_name, blob_name), file_path, content_md5
+        )
+
+    def _download_file(
+        self, container_name: str, blob_name: str, dest_file_path: str
+    ) -> None:
+        """Download a blob to a file, streaming it into the file.
 
         Args:
             container_name (str): Azure storage container name
             blob_name (str): blob name
+            dest_file_path (str): Path to download the blob to
+        """
+        os.makedirs(os.path.dirname(dest_file_path), exist_ok=True)
+        self.download_file(
+            self._get_blob_client(container_name, blob_name), dest_file_path
+        )
+
+    def _get_known_blob_md5s(
+        self, container_name: str, blobs: List[BlobInfo]
+    ) -> Dict[str, str]:
+        """Get the MD5 hashes recorded for blobs without a Content-MD5, if the blobs have not changed since.
+
+        Args:
+            container_name (str): Azure storage container name
+            blobs (List[BlobInfo]): the blobs' properties
 
         Returns:
-            str: Hash contents of the blob in hexadecimal string
+            Dict[str, str]: the MD5 hash in hexadecimal of every blob whose hash is known at its current ETag.
+        """
+        return self._blob_hashes.get(
+            blob_hash_key(str(self.account_name), container_name), blobs
+        )
+
+    def _record_blob_md5s(
+        self, container_name: str, hashes: List[Tuple[BlobInfo, str]]
+    ) -> None:
+        """Record the MD5 hashes of blobs without a Content-MD5 against their ETag, in the BlobHashStore.
+
+        Args:
+            container_name (str): Azure storage container name
+            hashes (List[Tuple[BlobInfo, str]]): every blob's properties with its MD5 hash in hexadecimal
         """
-        remote_hash = None
-        blob_client = self._get_blob_client(
-            container_name=container_name, blob_name=blob_name
+        self._blob_hashes.set(
+            blob_hash_key(str(self.account_name), container_name), hashes
         )
-        with tempfile.NamedTemporaryFile() as tmp:
-            self.download_file(blob_client, tmp.name)
-            with open(tmp.name, "rb") as fp:
-                remote_hash = hashlib.md5(fp.read()).hexdigest()
-        return remote_hash
 
-    def _sync_remote(self, container_name: str, blob_set: Set[str]) -> None:
-        """Synchronizes the remote storage with the local files.
+    def _sync_remote(self, container_name: str, blob_set: Set[str]) -> int:
+        """Delete the blobs whose file was removed locally, leaving the lock and history blobs alone.
 
-        It ignores uploading files in `.matcha` folder that are ignored in `IGNORED_FOLDERS`.
+        The blobs are deleted with the blob batch API, up to MAX_BLOBS_PER_BATCH blobs per request. A batch that the
+        account refuses as a whole is deleted blob by blob instead. Blobs that were already deleted are skipped, and
+        every batch is attempted before the failures, if any, are raised.
 
         Args:
             container_name (str): The name of the blob container to look for blobs.
             blob_set (Set[str]): Set of blob names to be removed on the remote storage.
+
+        Returns:
+            int: the number of blobs deleted.
+
+        Raises:
+            BlobDeletionError: when some of the blobs could not be deleted, listing each blob with its batch and error.
         """
         container_client = self._get_container_client(container_name=container_name)
+        # Ensure that the lock file is not being prematurely removed from the remote bucket
+        blob_names = sorted(
+            blob
+            for blob in blob_set
+            if LOCK_FILE_NAME not in blob and not is_history_blob(blob)
+        )
+        batches = [
+            blob_names[start : start + MAX_BLOBS_PER_BATCH]
+            for start in range(0, len(blob_names), MAX_BLOBS_PER_BATCH)
+        ]
+
+        blobs_deleted = 0
+        failures: List[BlobDeletionFailure] = []
+        for batch_number, batch in enumerate(batches, start=1):
+            statuses = self._delete_batch(container_client, batch)
+            for blob_name, (status_code, error) in zip(batch, statuses):
+                if status_code == HTTPStatus.ACCEPTED:
+                    blobs_deleted += 1
+                elif status_code != HTTPStatus.NOT_FOUND:
+                    failures.append(
+                        BlobDeletionFailure(
+                            blob_name, batch_number, len(batches), status_code, error
+                        )
+                    )
 
-        # Remove blobs that are not present in the local `src_folder_path``
-        for blob in blob_set:
-            # Ensure that the lock file is not being prematurely removed from the remote bucket
-            if LOCK_FILE_NAME in blob:
-                continue
-            container_client.delete_blob(blob)
+        if failures:
+            raise BlobDeletionError(container_name, len(blob_names), failures)
 
-    def _sync_local(self, dest_folder_path: str) -> None:
-        """Synchronizes the local .matcha folder with the remote storage files.
+        return blobs_deleted
 
-        It ignores deleting files in `.matcha` folder that are not present in remote storage.
+    def _delete_batch(
+        self, container_client: ContainerClient, batch: List[str]
+    ) -> List[Tuple[Optional[int], str]]:
+        """Delete a batch of blobs, with a single request if there are several of them.
 
         Args:
-            dest_folder_path (str): Path to folder containing matcha resources
+            container_client (ContainerClient): the client of the blobs' container.
+            batch (List[str]): the names of the blobs.
+
+        Returns:
+            List[Tuple[Optional[int], str]]: the status code of the deletion of every blob, in the order of the batch,
+                with the error code of the deletions that failed.
         """
-        # Clears the local matcha directory by removing all files,
-        # ensuring that it exclusively contains the files retrieved from Azure remote storage
-        if os.path.exists(dest_folder_path):
-            matcha_template_dir = os.path.join(os.getcwd(), ".matcha")
-            for root, _, filenames in os.walk(matcha_template_dir):
-                for filename in filenames:
-                    file_path = os.path.join(root, filename)
-                    # ignore deleting folders ignored in IGNORE_FOLDERS
-                    if not any(
-                        ignore_folder in file_path for ignore_folder in IGNORE_FOLDERS
-                    ) and os.path.isfile(file_path):
-                        os.remove(file_path)
+        if len(batch) > 1:
+            try:
+                responses = self._transfer_with_retry(
+                    lambda: list(
+                        container_client.delete_blobs(
+                            *batch, raise_on_any_failure=False
+                        )
+                    )
+                )
+            except HttpResponseError:
+                # accounts and emulators without the batch API refuse the whole request
+                pass
+            else:
+                # the responses of a batch come in the order of its requests
+                return [
+                    (
+                        response.status_code,
+                        response.headers.get("x-ms-error-code")
+                        or response.reason
+                        or "",
+                    )
+                    for response in responses
+                ]
+
+        statuses: List[Tuple[Optional[int], str]] = []
+        for blob_name in batch:
+            try:
+                self._transfer_with_retry(
+                    functools.partial(container_client.delete_blob, blob_name)
+                )
+                statuses.append((HTTPStatus.ACCEPTED, ""))
+            except HttpResponseError as e:
+                error = getattr(e, "error_code", None) or e.reason or str(e)
+                statuses.append((e.status_code, error))
+
+        return statuses
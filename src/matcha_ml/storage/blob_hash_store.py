@@ -0,0 +1,100 @@
+"""A store of the MD5 hashes of blobs that have no Content-MD5, kept between matcha runs."""
+import json
+import os
+import threading
+from typing import Dict, List, Tuple
+
+from matcha_ml.services.global_parameters_service import GlobalParameters
+from matcha_ml.storage.storage_backend import BlobInfo
+
+BLOB_HASH_STORE_FILE_NAME = "blob_hashes.json"
+
+
+class BlobHashStore:
+    """The MD5 hashes of blobs without a Content-MD5, each recorded against the ETag of the blob it was computed for.
+
+    A hash is valid for as long as the blob keeps its ETag, so, unlike the entries of the MetadataCache, hashes never
+    expire and are not cleared by `matcha --refresh`. The hashes of a folder transfer are read and written in one go,
+    and failing to write the store never fails the transfer.
+    """
+
+    # Serializes read-modify-write cycles when the store is used from several threads
+    _lock = threading.Lock()
+
+    @property
+    def store_file_path(self) -> str:
+        """Path to the store file, which lives alongside the global configuration file.
+
+        Returns:
+            str: the store file path.
+        """
+        config_dir = os.path.dirname(GlobalParameters().default_config_file_path)
+
+        return os.path.join(config_dir, BLOB_HASH_STORE_FILE_NAME)
+
+    def _read(self) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """Read the hashes of every container from the store file.
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, str]]]: the ETag and MD5 hash of every blob, by container, empty if the file
+                does not exist or can't be parsed.
+        """
+        try:
+            with open(self.store_file_path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries: Dict[str, Dict[str, Dict[str, str]]]) -> None:
+        """Write the hashes of every container to the store file.
+
+        Args:
+            entries (Dict[str, Dict[str, Dict[str, str]]]): the ETag and MD5 hash of every blob, by container.
+        """
+        tmp_file_path = f"{self.store_file_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.store_file_path), exist_ok=True)
+            with open(tmp_file_path, "w") as file:
+                json.dump(entries, file)
+            # replace the file in one step, so that readers never see a partially written store
+            os.replace(tmp_file_path, self.store_file_path)
+        except OSError:
+            pass
+
+    def get(self, container_key: str, blobs: List[BlobInfo]) -> Dict[str, str]:
+        """Get the hashes recorded for blobs that have not changed since.
+
+        Args:
+            container_key (str): the key of the blobs' container, unique across storage accounts.
+            blobs (List[BlobInfo]): the blobs' properties, as listed.
+
+        Returns:
+            Dict[str, str]: the MD5 hash in hexadecimal of every blob whose hash is known at its current ETag.
+        """
+        recorded = self._read().get(container_key, {})
+
+        hashes = {}
+        for blob in blobs:
+            entry = recorded.get(blob.name)
+            if isinstance(entry, dict) and entry.get("etag") == blob.etag:
+                hashes[blob.name] = str(entry["md5"])
+
+        return hashes
+
+    def set(self, container_key: str, hashes: List[Tuple[BlobInfo, str]]) -> None:
+        """Record the hashes of blobs against their ETag, with a single write of the store.
+
+        Args:
+            container_key (str): the key of the blobs' container.
+            hashes (List[Tuple[BlobInfo, str]]): every blob's properties with its MD5 hash in hexadecimal.
+        """
+        with self._lock:
+            entries = self._read()
+            recorded = entries.setdefault(container_key, {})
+            for blob, md5 in hashes:
+                # without an ETag, there is no telling whether the blob changed since
+                if blob.etag is not None:
+                    recorded[blob.name] = {"etag": blob.etag, "md5": md5}
+            self._write(entries)
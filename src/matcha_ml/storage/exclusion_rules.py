@@ -0,0 +1,101 @@
+"""Rules deciding which local files and blobs are left out of remote state transfers."""
+import fnmatch
+import os
+from typing import Iterable, List, Optional
+
+MATCHA_IGNORE_FILE_NAME = ".matchaignore"
+
+# Terraform's working directory holds provider binaries of hundreds of megabytes, which are re-created by init
+IGNORE_FOLDERS = {".terraform"}
+
+# Saved Terraform plans may hold secrets in plain text, and are only valid for the apply that follows them
+IGNORE_FILE_PATTERNS = ["*.tfplan"]
+
+DEFAULT_EXCLUDE_PATTERNS = [
+    f"{folder}/" for folder in sorted(IGNORE_FOLDERS)
+] + IGNORE_FILE_PATTERNS
+
+
+class ExclusionRules:
+    """A set of glob patterns, in the style of a .gitignore file, matched against file paths and blob names.
+
+    A pattern is matched against every run of consecutive path components, so `*.tfvars` excludes a file at any
+    depth and `resources/*.tfvars` excludes it in any folder named `resources`. A pattern ending with `/` only matches
+    folders, excluding everything inside them. Blank lines and lines starting with `#` are ignored.
+    """
+
+    def __init__(self, patterns: Iterable[str] = DEFAULT_EXCLUDE_PATTERNS) -> None:
+        """Initialize the rules.
+
+        Args:
+            patterns (Iterable[str]): the glob patterns. Defaults to DEFAULT_EXCLUDE_PATTERNS.
+        """
+        stripped_patterns = (pattern.strip() for pattern in patterns)
+        self.patterns: List[str] = [
+            pattern
+            for pattern in stripped_patterns
+            if pattern and not pattern.startswith("#")
+        ]
+
+    @classmethod
+    def load(cls, project_dir: Optional[str] = None) -> "ExclusionRules":
+        """Load the default patterns together with those in the project's .matchaignore file, if there is one.
+
+        Args:
+            project_dir (Optional[str]): the folder containing the .matchaignore file. Defaults to the working directory.
+
+        Returns:
+            ExclusionRules: the rules.
+        """
+        ignore_file_path = os.path.join(
+            project_dir if project_dir is not None else os.getcwd(),
+            MATCHA_IGNORE_FILE_NAME,
+        )
+        patterns = list(DEFAULT_EXCLUDE_PATTERNS)
+
+        if os.path.isfile(ignore_file_path):
+            with open(ignore_file_path) as ignore_file:
+                patterns.extend(ignore_file.read().splitlines())
+
+        return cls(patterns)
+
+    def is_excluded(self, path: str) -> bool:
+        """Check whether a file path or blob name is excluded.
+
+        Args:
+            path (str): the file path or blob name.
+
+        Returns:
+            bool: True if any pattern matches the path or one of the folders containing it.
+        """
+        parts = [
+            part
+            for part in path.replace(os.sep, "/").split("/")
+            if part not in ("", ".")
+        ]
+
+        return any(self._matches(pattern, parts) for pattern in self.patterns)
+
+    @staticmethod
+    def _matches(pattern: str, parts: List[str]) -> bool:
+        """Check whether a pattern matches a run of consecutive path components.
+
+        Args:
+            pattern (str): the glob pattern.
+            parts (List[str]): the path components, the last one being the file name.
+
+        Returns:
+            bool: True if the pattern matches.
+        """
+        directory_only = pattern.endswith("/")
+        pattern_parts = pattern.strip("/").split("/")
+        # a folder-only pattern must match components before the file name
+        last_start = len(parts) - len(pattern_parts) - (1 if directory_only else 0)
+
+        return any(
+            all(
+                fnmatch.fnmatchcase(part, pattern_part)
+                for part, pattern_part in zip(parts[start:], pattern_parts)
+            )
+            for start in range(last_start + 1)
+        )
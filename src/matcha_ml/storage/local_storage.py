@@ -0,0 +1,505 @@
+"""A storage backend that keeps the remote state in a local directory."""
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
+
+from matcha_ml.storage.exclusion_rules import ExclusionRules
+from matcha_ml.storage.storage_backend import (
+    BlobInfo,
+    StorageBackend,
+    StorageLease,
+    file_md5,
+    write_file,
+)
+
+BLOBS_DIR = "blobs"
+PROPERTIES_DIR = "properties"
+
+AVAILABLE_LEASE_STATE = "available"
+LEASED_LEASE_STATE = "leased"
+EXPIRED_LEASE_STATE = "expired"
+BROKEN_LEASE_STATE = "broken"
+
+
+class LocalLease:
+    """A lease on a blob of a LocalStorage."""
+
+    def __init__(
+        self,
+        storage: "LocalStorage",
+        container_name: str,
+        blob_name: str,
+        lease_id: str,
+    ) -> None:
+        """Initialize the lease.
+
+        Args:
+            storage (LocalStorage): the storage holding the blob.
+            container_name (str): storage container name
+            blob_name (str): blob name
+            lease_id (str): the id of the lease.
+        """
+        self.id = lease_id
+        self._storage = storage
+        self._container_name = container_name
+        self._blob_name = blob_name
+
+    def renew(self) -> None:
+        """Renew the lease for another lease duration."""
+        self._storage.renew_lease(self._container_name, self._blob_name, self.id)
+
+
+class LocalStorage(StorageBackend):
+    """Keeps blobs as files in a local directory, each container being a sub-directory of it.
+
+    It needs no network access, so the remote state can be used offline, in CI and in the benchmarks of the state
+    transfers. The MD5 hash, creation time, metadata and lease of every blob are kept in a properties file beside the
+    blobs of its container. Leases expire after their duration as measured by `clock`, and are kept consistent between
+    the threads of a process, not between processes.
+    """
+
+    def __init__(self, root_path: str, clock: Callable[[], float] = time.time) -> None:
+        """Initialize Local Storage.
+
+        Args:
+            root_path (str): Path to the directory holding the containers
+            clock (Callable[[], float]): the current time in seconds, against which leases expire. Defaults to
+                time.time.
+        """
+        self.root_path = root_path
+        self.clock = clock
+        self.exclusion_rules = ExclusionRules.load()
+        self.resource_group_exists = os.path.isdir(root_path)
+        self._lock = threading.RLock()
+
+    def create_container(self, container_name: str) -> None:
+        """Create a container, if it does not exist.
+
+        Args:
+            container_name (str): storage container name
+        """
+        for folder in (BLOBS_DIR, PROPERTIES_DIR):
+            os.makedirs(
+                os.path.join(self.root_path, container_name, folder), exist_ok=True
+            )
+        self.resource_group_exists = True
+
+    def container_exists(self, container_name: str) -> bool:
+        """Check if storage container exists.
+
+        Args:
+            container_name (str): storage container name
+
+        Returns:
+            bool: does container exist
+        """
+        return os.path.isdir(os.path.join(self.root_path, container_name, BLOBS_DIR))
+
+    def _blob_path(self, container_name: str, blob_name: str) -> str:
+        """Get the path of the file holding a blob.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            str: the path of the file.
+        """
+        return os.path.join(
+            self.root_path, container_name, BLOBS_DIR, *blob_name.split("/")
+        )
+
+    def _properties_path(self, container_name: str, blob_name: str) -> str:
+        """Get the path of the file holding the properties of a blob.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            str: the path of the file.
+        """
+        return (
+            os.path.join(
+                self.root_path, container_name, PROPERTIES_DIR, *blob_name.split("/")
+            )
+            + ".json"
+        )
+
+    def _read_properties(self, container_name: str, blob_name: str) -> Dict[str, Any]:
+        """Read the properties of a blob, recording them first for a blob that was written by hand.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            Dict[str, Any]: the properties.
+
+        Raises:
+            ResourceNotFoundError: when the blob does not exist.
+        """
+        blob_path = self._blob_path(container_name, blob_name)
+        if not os.path.isfile(blob_path):
+            raise ResourceNotFoundError(f"The blob '{blob_name}' does not exist.")
+
+        properties_path = self._properties_path(container_name, blob_name)
+        if os.path.isfile(properties_path):
+            with open(properties_path) as f:
+                properties: Dict[str, Any] = json.load(f)
+            return properties
+
+        properties = {
+            "content_md5": file_md5(blob_path).hex(),
+            "etag": secrets.token_hex(8),
+            "created": os.path.getmtime(blob_path),
+            "metadata": {},
+            "lease": None,
+        }
+        self._write_properties(container_name, blob_name, properties)
+        return properties
+
+    def _write_properties(
+        self, container_name: str, blob_name: str, properties: Dict[str, Any]
+    ) -> None:
+        """Record the properties of a blob.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            properties (Dict[str, Any]): the properties.
+        """
+        write_file(
+            self._properties_path(container_name, blob_name),
+            json.dumps(properties).encode(),
+        )
+
+    def _lease_state(self, properties: Dict[str, Any]) -> str:
+        """Get the state of the lease of a blob.
+
+        Args:
+            properties (Dict[str, Any]): the properties of the blob.
+
+        Returns:
+            str: available, leased, expired or broken.
+        """
+        lease = properties.get("lease")
+        if lease is None:
+            return AVAILABLE_LEASE_STATE
+        if lease["broken"]:
+            return BROKEN_LEASE_STATE
+        if lease["expires"] <= self.clock():
+            return EXPIRED_LEASE_STATE
+        return LEASED_LEASE_STATE
+
+    def _check_lease(
+        self, blob_name: str, properties: Dict[str, Any], lease: Optional[StorageLease]
+    ) -> None:
+        """Check that a write to a blob holds the blob's lease, if the write gives a lease or the blob is leased.
+
+        Args:
+            blob_name (str): blob name
+            properties (Dict[str, Any]): the properties of the blob.
+            lease (Optional[StorageLease]): the lease given with the write.
+
+        Raises:
+            HttpResponseError: when the blob is leased by someone else, or the given lease is not the blob's.
+        """
+        current_lease = properties.get("lease")
+        if lease is not None:
+            if current_lease is None or current_lease["id"] != lease.id:
+                raise HttpResponseError(
+                    f"The lease given for the blob '{blob_name}' is not its lease."
+                )
+        elif self._lease_state(properties) == LEASED_LEASE_STATE:
+            raise HttpResponseError(
+                f"There is a lease on the blob '{blob_name}' and no lease was given."
+            )
+
+    def list_blobs(
+        self, container_name: str, name_starts_with: Optional[str] = None
+    ) -> List[BlobInfo]:
+        """List the blobs of a container, with their properties.
+
+        Args:
+            container_name (str): storage container name
+            name_starts_with (Optional[str]): only list the blobs whose name starts with this prefix. Defaults to None.
+
+        Returns:
+            List[BlobInfo]: the properties of every listed blob, ordered by name
+        """
+        blobs_dir = os.path.join(self.root_path, container_name, BLOBS_DIR)
+        # blobs being written are temporary files until they are complete, so they are not walked meanwhile
+        with self._lock:
+            blob_names = sorted(
+                os.path.relpath(os.path.join(root, filename), blobs_dir).replace(
+                    os.sep, "/"
+                )
+                for root, _, filenames in os.walk(blobs_dir)
+                for filename in filenames
+            )
+
+            return [
+                self.get_blob_info(container_name, blob_name)
+                for blob_name in blob_names
+                if not name_starts_with or blob_name.startswith(name_starts_with)
+            ]
+
+    def get_blob_info(self, container_name: str, blob_name: str) -> BlobInfo:
+        """Get the properties of a blob, including its metadata and the state of its lease.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            BlobInfo: the blob's properties
+
+        Raises:
+            ResourceNotFoundError: when the blob does not exist
+        """
+        with self._lock:
+            properties = self._read_properties(container_name, blob_name)
+            return BlobInfo(
+                name=blob_name,
+                size=os.path.getsize(self._blob_path(container_name, blob_name)),
+                content_md5=properties["content_md5"],
+                etag=properties["etag"],
+                creation_time=datetime.fromtimestamp(
+                    properties["created"], tz=timezone.utc
+                ),
+                lease_state=self._lease_state(properties),
+                metadata=properties["metadata"],
+            )
+
+    def get_blob(self, container_name: str, blob_name: str) -> bytes:
+        """Read the contents of a blob.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            bytes: the contents of the blob
+
+        Raises:
+            ResourceNotFoundError: when the blob does not exist
+        """
+        try:
+            with open(self._blob_path(container_name, blob_name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"The blob '{blob_name}' does not exist.")
+
+    def put_blob(self, container_name: str, blob_name: str, data: bytes) -> None:
+        """Write a blob, replacing it if it exists, and record the MD5 hash of its contents.
+
+        A replaced blob keeps its creation time and its lease, its metadata is cleared.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            data (bytes): the contents of the blob
+
+        Raises:
+            HttpResponseError: when someone else leases the blob.
+        """
+        with self._lock:
+            properties = {"created": self.clock(), "lease": None}
+            with suppress(ResourceNotFoundError):
+                properties = self._read_properties(container_name, blob_name)
+                self._check_lease(blob_name, properties, None)
+
+            write_file(self._blob_path(container_name, blob_name), data)
+            self._write_properties(
+                container_name,
+                blob_name,
+                {
+                    "content_md5": hashlib.md5(data).hexdigest(),
+                    "etag": secrets.token_hex(8),
+                    "created": properties["created"],
+                    "metadata": {},
+                    "lease": properties["lease"],
+                },
+            )
+
+    def copy_blob(
+        self, container_name: str, source_blob_name: str, dest_blob_name: str
+    ) -> None:
+        """Copy a blob within a container, replacing the destination if it exists.
+
+        Args:
+            container_name (str): storage container name
+            source_blob_name (str): the name of the blob to copy
+            dest_blob_name (str): the name of the copy
+
+        Raises:
+            ResourceNotFoundError: when the source blob does not exist
+        """
+        with self._lock:
+            self.put_blob(
+                container_name,
+                dest_blob_name,
+                self.get_blob(container_name, source_blob_name),
+            )
+
+    def create_empty(
+        self,
+        container_name: str,
+        blob_name: str,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Create an empty blob, only if no blob of that name exists.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            metadata (Optional[Dict[str, str]]): metadata of the blob
+
+        Raises:
+            ResourceExistsError: when blob already exists
+        """
+        blob_path = self._blob_path(container_name, blob_name)
+        with self._lock:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            try:
+                with open(blob_path, "xb"):
+                    pass
+            except FileExistsError:
+                raise ResourceExistsError(f"The blob '{blob_name}' already exists.")
+
+            self._write_properties(
+                container_name,
+                blob_name,
+                {
+                    "content_md5": hashlib.md5(b"").hexdigest(),
+                    "etag": secrets.token_hex(8),
+                    "created": self.clock(),
+                    "metadata": dict(metadata or {}),
+                    "lease": None,
+                },
+            )
+
+    def blob_exists(self, container_name: str, blob_name: str) -> bool:
+        """Check whether a blob exists in a container.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            bool: True, if blob exists
+        """
+        return os.path.isfile(self._blob_path(container_name, blob_name))
+
+    def delete_blob(
+        self,
+        container_name: str,
+        blob_name: str,
+        lease: Optional[StorageLease] = None,
+    ) -> None:
+        """Delete blob by name.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            lease (Optional[StorageLease]): the active lease on the blob, if it has one
+
+        Raises:
+            HttpResponseError: when someone else leases the blob, or the given lease is not the blob's.
+        """
+        with self._lock:
+            properties = self._read_properties(container_name, blob_name)
+            self._check_lease(blob_name, properties, lease)
+
+            os.remove(self._blob_path(container_name, blob_name))
+            os.remove(self._properties_path(container_name, blob_name))
+
+    def acquire_lease(
+        self, container_name: str, blob_name: str, lease_duration: int
+    ) -> LocalLease:
+        """Acquire a lease on a blob, which expires unless it is renewed within `lease_duration` seconds.
+
+        A lease that expired, or was broken, can be acquired by anyone.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            lease_duration (int): the number of seconds the lease lasts without being renewed
+
+        Returns:
+            LocalLease: the lease, to renew it
+
+        Raises:
+            ResourceExistsError: when another client holds an active lease on the blob
+        """
+        with self._lock:
+            properties = self._read_properties(container_name, blob_name)
+            if self._lease_state(properties) == LEASED_LEASE_STATE:
+                raise ResourceExistsError(
+                    f"There is already a lease on the blob '{blob_name}'."
+                )
+
+            lease_id = secrets.token_hex(16)
+            properties["lease"] = {
+                "id": lease_id,
+                "duration": lease_duration,
+                "expires": self.clock() + lease_duration,
+                "broken": False,
+            }
+            self._write_properties(container_name, blob_name, properties)
+
+        return LocalLease(self, container_name, blob_name, lease_id)
+
+    def renew_lease(self, container_name: str, blob_name: str, lease_id: str) -> None:
+        """Renew a lease for another lease duration, which its holder can do until someone else acquires the blob.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            lease_id (str): the id of the lease
+
+        Raises:
+            ResourceExistsError: when the blob's lease is not this lease, or was broken
+        """
+        with self._lock:
+            properties = self._read_properties(container_name, blob_name)
+            lease = properties.get("lease")
+            if lease is None or lease["id"] != lease_id or lease["broken"]:
+                raise ResourceExistsError(
+                    f"The lease given for the blob '{blob_name}' is not its lease."
+                )
+
+            lease["expires"] = self.clock() + lease["duration"]
+            self._write_properties(container_name, blob_name, properties)
+
+    def break_lease(self, container_name: str, blob_name: str) -> None:
+        """Break the lease on a blob straight away, whoever holds it.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Raises:
+            ResourceNotFoundError: when the blob does not exist
+        """
+        with self._lock:
+            properties = self._read_properties(container_name, blob_name)
+            # the blob may have no lease to break
+            if self._lease_state(properties) != LEASED_LEASE_STATE:
+                return
+
+            properties["lease"]["broken"] = True
+            self._write_properties(container_name, blob_name, properties)
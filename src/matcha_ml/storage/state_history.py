@@ -0,0 +1,262 @@
+"""The history of the remote state, as content-addressed objects and the entries that list them."""
+import dataclasses
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+# Every version of a state file is an object named after its MD5 hash, so an unchanged file is only stored once
+HISTORY_BLOB_PREFIX = "history/"
+HISTORY_OBJECT_PREFIX = f"{HISTORY_BLOB_PREFIX}objects/"
+HISTORY_ENTRY_VERSION = 1
+
+# The head blob holds the retained entries and the blobs they hold their files in, so the history is read in one request
+HISTORY_HEAD_BLOB_NAME = f"{HISTORY_BLOB_PREFIX}head.json"
+HISTORY_HEAD_VERSION = 1
+
+# The number of entries kept, the oldest entries and the objects only they hold are deleted beyond it
+DEFAULT_HISTORY_RETENTION = 50
+
+HISTORY_ID_TIME_FORMAT = "%Y%m%dT%H%M%S.%fZ"
+
+
+@dataclasses.dataclass
+class HistoryEntry:
+    """A point in the history of the remote state.
+
+    Attributes:
+        id (str): the entry ID, which sorts in the order the entries were recorded.
+        created (str): when the entry was recorded, in ISO 8601 format.
+        files (Dict[str, str]): the path of every state file and its MD5 hash in hexadecimal.
+        restored_from (Optional[str]): the ID of the entry the state was restored from, if it was restored.
+        snapshot (Optional[str]): the snapshot blob holding the files, if the state was stored as a snapshot. Otherwise
+            every file is held by the object named after its hash.
+        version (int): the version of the entry format.
+    """
+
+    id: str
+    created: str
+    files: Dict[str, str]
+    restored_from: Optional[str] = None
+    snapshot: Optional[str] = None
+    version: int = HISTORY_ENTRY_VERSION
+
+    @classmethod
+    def new(
+        cls,
+        files: Dict[str, str],
+        now: Optional[datetime] = None,
+        restored_from: Optional[str] = None,
+        snapshot: Optional[str] = None,
+    ) -> "HistoryEntry":
+        """Create an entry for the state files, with an ID made of the time and the hash of the entry's contents.
+
+        Args:
+            files (Dict[str, str]): the path of every state file and its MD5 hash in hexadecimal.
+            now (Optional[datetime]): when the entry is recorded. Defaults to the current time.
+            restored_from (Optional[str]): the ID of the entry the state was restored from.
+            snapshot (Optional[str]): the snapshot blob holding the files, if the state is stored as a snapshot.
+
+        Returns:
+            HistoryEntry: the entry.
+        """
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        contents_hash = hashlib.sha256(
+            json.dumps(
+                {"files": files, "restored_from": restored_from, "snapshot": snapshot},
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+        return cls(
+            id=f"{now.strftime(HISTORY_ID_TIME_FORMAT)}-{contents_hash[:8]}",
+            created=now.isoformat(),
+            files=dict(files),
+            restored_from=restored_from,
+            snapshot=snapshot,
+        )
+
+    @property
+    def objects(self) -> Set[str]:
+        """The names of the blobs holding the entry's files.
+
+        Returns:
+            Set[str]: the snapshot blob, or the object of every file.
+        """
+        if self.snapshot is not None:
+            return {self.snapshot}
+
+        return {
+            history_object_blob_name(content_md5) for content_md5 in self.files.values()
+        }
+
+    def to_json(self) -> bytes:
+        """Serialize the entry.
+
+        Returns:
+            bytes: the entry as JSON.
+        """
+        return json.dumps(dataclasses.asdict(self), sort_keys=True).encode()
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "HistoryEntry":
+        """Deserialize an entry.
+
+        Args:
+            data (bytes): the entry as JSON.
+
+        Returns:
+            HistoryEntry: the entry.
+
+        Raises:
+            ValueError: when the entry is invalid or of a newer version.
+        """
+        try:
+            entry = cls(**json.loads(data))
+        except (TypeError, json.JSONDecodeError) as e:
+            raise ValueError(f"The remote state history entry is invalid: {e}")
+
+        if entry.version > HISTORY_ENTRY_VERSION:
+            raise ValueError(
+                f"The remote state history entry has version {entry.version}, upgrade matcha to read it."
+            )
+
+        return entry
+
+
+@dataclasses.dataclass
+class HistoryHead:
+    """The contents of the head blob: the retained entries, and the blobs that hold their files.
+
+    Attributes:
+        entries (List[HistoryEntry]): the entries, oldest first.
+        objects (List[str]): the names of the blobs the history holds, sorted: the objects of the entries recorded file
+            by file, and the snapshots of the entries recorded as a snapshot.
+        version (int): the version of the head format.
+    """
+
+    entries: List[HistoryEntry] = dataclasses.field(default_factory=list)
+    objects: List[str] = dataclasses.field(default_factory=list)
+    version: int = HISTORY_HEAD_VERSION
+
+    @property
+    def latest(self) -> Optional[HistoryEntry]:
+        """The latest entry.
+
+        Returns:
+            Optional[HistoryEntry]: the entry, None if the history is empty.
+        """
+        return self.entries[-1] if self.entries else None
+
+    def find(self, entry_id: str) -> Optional[HistoryEntry]:
+        """Find an entry by its ID.
+
+        Args:
+            entry_id (str): the entry ID.
+
+        Returns:
+            Optional[HistoryEntry]: the entry, None if the history holds no entry with that ID.
+        """
+        return next((entry for entry in self.entries if entry.id == entry_id), None)
+
+    def add(
+        self, entry: HistoryEntry, retention: int = DEFAULT_HISTORY_RETENTION
+    ) -> Set[str]:
+        """Add an entry as the latest one, and drop the oldest entries beyond the retention limit.
+
+        Args:
+            entry (HistoryEntry): the new entry, whose objects are stored.
+            retention (int): the number of entries kept. Defaults to DEFAULT_HISTORY_RETENTION.
+
+        Returns:
+            Set[str]: the blobs no retained entry holds any more, to be deleted.
+
+        Raises:
+            ValueError: when the retention is not a positive number.
+        """
+        validate_history_retention(retention)
+
+        self.entries = [*self.entries, entry][-retention:]
+        held = set().union(*(kept.objects for kept in self.entries))
+        pruned = set(self.objects) - held
+        self.objects = sorted(held)
+
+        return pruned
+
+    def to_json(self) -> bytes:
+        """Serialize the head.
+
+        Returns:
+            bytes: the head as JSON.
+        """
+        return json.dumps(dataclasses.asdict(self), sort_keys=True).encode()
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "HistoryHead":
+        """Deserialize a head.
+
+        Args:
+            data (bytes): the head as JSON.
+
+        Returns:
+            HistoryHead: the head.
+
+        Raises:
+            ValueError: when the head, or one of its entries, is invalid or of a newer version.
+        """
+        try:
+            fields: Dict[str, Any] = json.loads(data)
+            entries = [
+                HistoryEntry.from_json(json.dumps(entry).encode())
+                for entry in fields.pop("entries", [])
+            ]
+            head = cls(entries=entries, **fields)
+        except (TypeError, AttributeError, json.JSONDecodeError) as e:
+            raise ValueError(f"The remote state history is invalid: {e}")
+
+        if head.version > HISTORY_HEAD_VERSION:
+            raise ValueError(
+                f"The remote state history has version {head.version}, upgrade matcha to read it."
+            )
+
+        return head
+
+
+def validate_history_retention(retention: int) -> None:
+    """Check that a history retention keeps at least one entry.
+
+    Args:
+        retention (int): the number of entries kept.
+
+    Raises:
+        ValueError: when the retention is not a positive number.
+    """
+    if retention < 1:
+        raise ValueError(
+            f"The history retention must keep at least one entry, got {retention}."
+        )
+
+
+def history_object_blob_name(content_md5: str) -> str:
+    """Get the name of the object holding a version of a state file.
+
+    Args:
+        content_md5 (str): the MD5 hash of the file in hexadecimal.
+
+    Returns:
+        str: the blob name.
+    """
+    return f"{HISTORY_OBJECT_PREFIX}{content_md5}"
+
+
+def is_history_blob(blob_name: str) -> bool:
+    """Check whether a blob belongs to the history of the state rather than being a state file.
+
+    Args:
+        blob_name (str): blob name
+
+    Returns:
+        bool: True for the history objects and the head blob.
+    """
+    return blob_name.startswith(HISTORY_BLOB_PREFIX)
@@ -0,0 +1,231 @@
+"""Packing of the local state folder into a single compressed, content-addressed snapshot."""
+import dataclasses
+import gzip
+import hashlib
+import io
+import json
+import os
+import tarfile
+from typing import IO, Dict, Optional, cast
+
+from matcha_ml.storage.exclusion_rules import ExclusionRules
+
+# The index blob points at the current snapshot and lists the files it holds, with their MD5 hash
+SNAPSHOT_INDEX_BLOB_NAME = "matcha.index.json"
+SNAPSHOT_BLOB_PREFIX = "snapshots/"
+SNAPSHOT_INDEX_VERSION = 1
+
+
+@dataclasses.dataclass
+class SnapshotIndex:
+    """The contents of the index blob.
+
+    Attributes:
+        snapshot (str): the name of the snapshot blob.
+        files (Dict[str, str]): the path of every file in the snapshot and its MD5 hash in hexadecimal.
+        version (int): the version of the index format.
+    """
+
+    snapshot: str
+    files: Dict[str, str]
+    version: int = SNAPSHOT_INDEX_VERSION
+
+    def to_json(self) -> bytes:
+        """Serialize the index.
+
+        Returns:
+            bytes: the index as JSON.
+        """
+        return json.dumps(dataclasses.asdict(self), sort_keys=True).encode()
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "SnapshotIndex":
+        """Deserialize an index.
+
+        Args:
+            data (bytes): the index as JSON.
+
+        Returns:
+            SnapshotIndex: the index.
+
+        Raises:
+            ValueError: when the index is invalid or of a newer version.
+        """
+        try:
+            index = cls(**json.loads(data))
+        except (TypeError, json.JSONDecodeError) as e:
+            raise ValueError(f"The remote state index is invalid: {e}")
+
+        if index.version > SNAPSHOT_INDEX_VERSION:
+            raise ValueError(
+                f"The remote state index has version {index.version}, upgrade matcha to read it."
+            )
+
+        return index
+
+
+@dataclasses.dataclass
+class Snapshot:
+    """A gzip compressed tar archive of the state folder.
+
+    The archive is built deterministically, so the same files always give the same bytes and the blob can be named
+    after its SHA-256 hash.
+
+    Attributes:
+        data (bytes): the compressed archive.
+        files (Dict[str, str]): the path of every file in the archive and its MD5 hash in hexadecimal.
+    """
+
+    data: bytes
+    files: Dict[str, str]
+
+    @property
+    def name(self) -> str:
+        """The content-addressed name of the snapshot blob.
+
+        Returns:
+            str: the blob name.
+        """
+        return snapshot_blob_name(self.data)
+
+
+def snapshot_blob_name(data: bytes) -> str:
+    """Get the content-addressed blob name of a snapshot.
+
+    Args:
+        data (bytes): the compressed archive.
+
+    Returns:
+        str: the blob name.
+    """
+    return f"{SNAPSHOT_BLOB_PREFIX}{hashlib.sha256(data).hexdigest()}.tar.gz"
+
+
+def is_snapshot_blob(blob_name: str) -> bool:
+    """Check whether a blob belongs to the snapshot storage mode rather than being a state file.
+
+    Args:
+        blob_name (str): blob name
+
+    Returns:
+        bool: True for the index blob and the snapshot blobs.
+    """
+    return blob_name == SNAPSHOT_INDEX_BLOB_NAME or blob_name.startswith(
+        SNAPSHOT_BLOB_PREFIX
+    )
+
+
+def build_snapshot(
+    src_folder_path: str, exclusion_rules: Optional[ExclusionRules] = None
+) -> Snapshot:
+    """Pack a folder into a snapshot, with the same file paths as the blobs of a folder upload.
+
+    Args:
+        src_folder_path (str): Path to folder to pack all files from
+        exclusion_rules (Optional[ExclusionRules]): the files to leave out. Defaults to the rules of the working
+            directory.
+
+    Returns:
+        Snapshot: the snapshot.
+    """
+    if exclusion_rules is None:
+        exclusion_rules = ExclusionRules.load()
+
+    file_paths = sorted(
+        os.path.join(root, filename)
+        for root, _, filenames in os.walk(src_folder_path)
+        for filename in filenames
+    )
+
+    contents = {}
+    for file_path in file_paths:
+        if exclusion_rules.is_excluded(file_path):
+            continue
+
+        with open(file_path, "rb") as f:
+            contents[file_path] = f.read()
+
+    return pack_snapshot(contents)
+
+
+def pack_snapshot(contents: Dict[str, bytes]) -> Snapshot:
+    """Pack files into a snapshot, whose bytes only depend on the files' paths and contents.
+
+    Args:
+        contents (Dict[str, bytes]): the path of every file and its contents.
+
+    Returns:
+        Snapshot: the snapshot.
+    """
+    files = {}
+    buffer = io.BytesIO()
+    # mtime is fixed so that the compressed bytes only depend on the files
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as gzip_file, tarfile.open(
+        fileobj=cast(IO[bytes], gzip_file), mode="w"
+    ) as archive:
+        for file_path in sorted(contents):
+            content = contents[file_path]
+            info = tarfile.TarInfo(name=file_path.replace(os.sep, "/"))
+            info.size = len(content)
+            info.mode = 0o644
+            archive.addfile(info, io.BytesIO(content))
+            files[file_path] = hashlib.md5(content).hexdigest()
+
+    return Snapshot(data=buffer.getvalue(), files=files)
+
+
+def extract_snapshot(data: bytes, dest_folder_path: str) -> None:
+    """Unpack a snapshot into a folder, overwriting the files it holds.
+
+    Args:
+        data (bytes): the compressed archive.
+        dest_folder_path (str): Path to folder to unpack all the files into
+
+    Raises:
+        ValueError: when the archive holds anything other than files inside the folder.
+    """
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+        for member in archive.getmembers():
+            parts = member.name.split("/")
+            if not member.isfile() or os.path.isabs(member.name) or ".." in parts:
+                raise ValueError(
+                    f"The remote state snapshot holds an unexpected entry: {member.name}"
+                )
+
+            file_path = os.path.join(dest_folder_path, *parts)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            source = archive.extractfile(member)
+            if source is None:
+                continue
+            with open(file_path, "wb") as f:
+                f.write(source.read())
+
+
+def local_manifest(
+    dest_folder_path: str, exclusion_rules: Optional[ExclusionRules] = None
+) -> Dict[str, str]:
+    """Hash the files of the local .matcha folder, named as in a snapshot index.
+
+    Args:
+        dest_folder_path (str): Path to folder containing the .matcha folder
+        exclusion_rules (Optional[ExclusionRules]): the files to leave out. Defaults to the rules of the working
+            directory.
+
+    Returns:
+        Dict[str, str]: the path of every file and its MD5 hash in hexadecimal.
+    """
+    if exclusion_rules is None:
+        exclusion_rules = ExclusionRules.load()
+
+    manifest = {}
+    for root, _, filenames in os.walk(os.path.join(dest_folder_path, ".matcha")):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            name = os.path.relpath(file_path, dest_folder_path)
+            if exclusion_rules.is_excluded(name):
+                continue
+
+            with open(file_path, "rb") as f:
+                manifest[name] = hashlib.md5(f.read()).hexdigest()
+
+    return manifest
@@ -0,0 +1,1200 @@
+"""The interface of the storage holding the remote state, and the state transfers built on it."""
+import dataclasses
+import functools
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Protocol, Set, Tuple
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from matcha_ml.constants import LOCK_FILE_NAME
+from matcha_ml.storage.exclusion_rules import ExclusionRules
+from matcha_ml.storage.state_history import (
+    DEFAULT_HISTORY_RETENTION,
+    HISTORY_HEAD_BLOB_NAME,
+    HistoryEntry,
+    HistoryHead,
+    history_object_blob_name,
+    is_history_blob,
+)
+from matcha_ml.storage.state_snapshot import (
+    SNAPSHOT_INDEX_BLOB_NAME,
+    Snapshot,
+    SnapshotIndex,
+    build_snapshot,
+    extract_snapshot,
+    is_snapshot_blob,
+    local_manifest,
+    pack_snapshot,
+    snapshot_blob_name,
+)
+
+# Files are hashed in chunks, so that large files are never read into memory at once
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# The number of times a snapshot download follows the index to a newer snapshot, when a writer replaced it meanwhile
+SNAPSHOT_READ_ATTEMPTS = 3
+
+
+@dataclasses.dataclass
+class TransferReport:
+    """What a folder transfer moved between the local machine and the storage container."""
+
+    blobs_transferred: int = 0
+    bytes_transferred: int = 0
+    blobs_skipped: int = 0
+    blobs_deleted: int = 0
+
+    # the MD5 hash in hexadecimal of every file of an uploaded folder, each now held by the blob named after the file
+    # or by the snapshot, None for a download
+    files: Optional[Dict[str, str]] = dataclasses.field(
+        default=None, compare=False, repr=False
+    )
+
+    # the snapshot blob now holding an uploaded folder, None when the folder is stored file by file
+    snapshot: Optional[str] = dataclasses.field(default=None, compare=False, repr=False)
+
+
+@dataclasses.dataclass
+class BlobInfo:
+    """The properties of a blob, whichever storage backend holds it.
+
+    Attributes:
+        name (str): the blob name.
+        size (Optional[int]): the size of the blob in bytes.
+        content_md5 (Optional[str]): the MD5 hash of the blob in hexadecimal, None if the storage does not know it.
+        etag (Optional[str]): a tag that changes whenever the blob is written.
+        creation_time (Optional[datetime]): when the blob was created.
+        lease_state (Optional[str]): the state of the blob's lease: available, leased, expired or broken.
+        metadata (Dict[str, str]): the blob's metadata.
+    """
+
+    name: str
+    size: Optional[int] = None
+    content_md5: Optional[str] = None
+    etag: Optional[str] = None
+    creation_time: Optional[datetime] = None
+    lease_state: Optional[str] = None
+    metadata: Dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+class StorageLease(Protocol):
+    """A lease on a blob, which expires unless it is renewed."""
+
+    id: str
+
+    def renew(self) -> None:
+        """Renew the lease for another lease duration."""
+
+
+def file_md5(file_path: str) -> bytes:
+    """Compute the MD5 digest of a file, in the form Azure stores as a blob's Content-MD5.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        bytes: the MD5 digest
+    """
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b""):
+            md5.update(chunk)
+
+    return md5.digest()
+
+
+def read_file(file_path: str) -> bytes:
+    """Read the contents of a file.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        bytes: the contents of the file
+    """
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def write_file(dest_file_path: str, data: bytes) -> None:
+    """Write a file so that it is only replaced once all of its contents were written.
+
+    Args:
+        dest_file_path (str): Path to the file
+        data (bytes): the contents of the file
+    """
+    dest_dir = os.path.dirname(os.path.abspath(dest_file_path))
+    os.makedirs(dest_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=dest_dir, delete=False) as tmp:
+        tmp.write(data)
+    os.replace(tmp.name, dest_file_path)
+
+
+def remove_stale_local_files(
+    dest_folder_path: str,
+    blob_names: Set[str],
+    exclusion_rules: Optional[ExclusionRules] = None,
+) -> int:
+    """Remove the files of the local .matcha folder that are no longer in the remote storage.
+
+    Excluded files, such as Terraform's working directory, are kept.
+
+    Args:
+        dest_folder_path (str): Path to folder containing the .matcha folder
+        blob_names (Set[str]): names of the blobs in the remote storage
+        exclusion_rules (Optional[ExclusionRules]): the files to keep. Defaults to the rules of the working directory.
+
+    Returns:
+        int: the number of files removed.
+    """
+    if exclusion_rules is None:
+        exclusion_rules = ExclusionRules.load()
+
+    files_removed = 0
+    for root, _, filenames in os.walk(os.path.join(dest_folder_path, ".matcha")):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            blob_name = os.path.relpath(file_path, dest_folder_path)
+            if blob_name in blob_names or exclusion_rules.is_excluded(blob_name):
+                continue
+
+            os.remove(file_path)
+            files_removed += 1
+
+    return files_removed
+
+
+def local_copy_matches(
+    file_path: str, blob: BlobInfo, known_md5: Optional[str] = None
+) -> bool:
+    """Check whether a local file holds the same contents as a blob, from the blob's listed size and MD5.
+
+    Args:
+        file_path (str): Path to the local file
+        blob (BlobInfo): the blob's properties
+        known_md5 (Optional[str]): MD5 hash in hexadecimal of a blob the storage holds no MD5 for, if it was recorded
+            at the blob's current ETag. Defaults to None.
+
+    Returns:
+        bool: True if the local file does not need to be downloaded again.
+    """
+    expected_md5 = blob.content_md5 or known_md5
+    if expected_md5 is None or not os.path.isfile(file_path):
+        return False
+
+    if blob.size is not None and os.path.getsize(file_path) != blob.size:
+        return False
+
+    return file_md5(file_path).hex() == expected_md5
+
+
+@dataclasses.dataclass
+class UploadPlan:
+    """What a folder upload transfers, diffed against a single listing of the container.
+
+    Attributes:
+        report (TransferReport): the counts of the upload, but for the blobs deleted, with the MD5 hash of every file.
+        uploads (Dict[str, bytes]): the path of every file to upload, which is also its blob name, with its MD5 digest.
+        stale_blobs (Set[str]): the blobs whose file is no longer in the folder.
+    """
+
+    report: TransferReport
+    uploads: Dict[str, bytes]
+    stale_blobs: Set[str]
+
+
+@dataclasses.dataclass
+class DownloadPlan:
+    """What a folder download transfers, diffed against a single listing of the container.
+
+    Attributes:
+        report (TransferReport): the counts of the download, but for the files removed.
+        downloads (List[BlobInfo]): the blobs whose local copy differs.
+        blob_names (Set[str]): the names of every state blob, local files that are not among them are removed.
+    """
+
+    report: TransferReport
+    downloads: List[BlobInfo]
+    blob_names: Set[str]
+
+
+def plan_upload(
+    src_folder_path: str, remote_blobs: List[BlobInfo], exclusion_rules: ExclusionRules
+) -> UploadPlan:
+    """Diff a folder against the blobs of a container, whose listing carries their MD5 and serves as the manifest.
+
+    Files whose MD5 matches the hash of their blob are skipped, and excluded files are never uploaded, so that copies
+    uploaded in the past are deleted. A state stored as a snapshot is replaced by deleting its index, the snapshots are
+    left for the history, which deletes them along with the entries that point at them.
+
+    Args:
+        src_folder_path (str): Path to folder to upload all files from
+        remote_blobs (List[BlobInfo]): the properties of every blob of the container
+        exclusion_rules (ExclusionRules): the files to leave out
+
+    Returns:
+        UploadPlan: the files to upload and the blobs to delete.
+    """
+    remote_manifest = {blob.name: blob.content_md5 for blob in remote_blobs}
+    files: Dict[str, str] = {}
+    plan = UploadPlan(
+        report=TransferReport(files=files),
+        uploads={},
+        stale_blobs={
+            blob_name
+            for blob_name in remote_manifest
+            if blob_name == SNAPSHOT_INDEX_BLOB_NAME or not is_snapshot_blob(blob_name)
+        },
+    )
+
+    for root, _, filenames in os.walk(src_folder_path):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            if exclusion_rules.is_excluded(file_path):
+                continue
+
+            plan.stale_blobs.discard(file_path)
+
+            content_md5 = file_md5(file_path)
+            files[file_path] = content_md5.hex()
+            if remote_manifest.get(file_path) == content_md5.hex():
+                plan.report.blobs_skipped += 1
+                continue
+
+            plan.uploads[file_path] = content_md5
+            plan.report.blobs_transferred += 1
+            plan.report.bytes_transferred += os.path.getsize(file_path)
+
+    return plan
+
+
+def state_blobs(
+    remote_blobs: List[BlobInfo], exclusion_rules: ExclusionRules
+) -> List[BlobInfo]:
+    """Keep the blobs of a container that hold state files, leaving out the lock, snapshot, history and excluded blobs.
+
+    Args:
+        remote_blobs (List[BlobInfo]): the properties of every blob of the container
+        exclusion_rules (ExclusionRules): the files to leave out
+
+    Returns:
+        List[BlobInfo]: the state blobs.
+    """
+    return [
+        blob
+        for blob in remote_blobs
+        if not (
+            LOCK_FILE_NAME in blob.name
+            or is_snapshot_blob(blob.name)
+            or is_history_blob(blob.name)
+            or exclusion_rules.is_excluded(blob.name)
+        )
+    ]
+
+
+def plan_download(
+    dest_folder_path: str, blobs: List[BlobInfo], known_md5s: Dict[str, str]
+) -> DownloadPlan:
+    """Diff the state blobs of a container against a local folder.
+
+    Blobs whose local copy matches their size and MD5 are skipped.
+
+    Args:
+        dest_folder_path (str): Path to folder to download all the files
+        blobs (List[BlobInfo]): the state blobs, as kept by `state_blobs`
+        known_md5s (Dict[str, str]): the MD5 hash in hexadecimal recorded for blobs the storage holds no MD5 for
+
+    Returns:
+        DownloadPlan: the blobs to download, and the names of every state blob.
+    """
+    plan = DownloadPlan(
+        report=TransferReport(),
+        downloads=[],
+        blob_names={blob.name for blob in blobs},
+    )
+
+    for blob in blobs:
+        file_path = os.path.join(dest_folder_path, blob.name)
+        if local_copy_matches(file_path, blob, known_md5s.get(blob.name)):
+            plan.report.blobs_skipped += 1
+            continue
+
+        plan.downloads.append(blob)
+        plan.report.blobs_transferred += 1
+        plan.report.bytes_transferred += blob.size or 0
+
+    return plan
+
+
+def hash_downloaded_blobs(
+    dest_folder_path: str, downloads: List[BlobInfo]
+) -> List[Tuple[BlobInfo, str]]:
+    """Hash the downloaded copies of the blobs the storage holds no MD5 for, so that the next download can skip them.
+
+    Args:
+        dest_folder_path (str): Path to folder the blobs were downloaded to
+        downloads (List[BlobInfo]): the downloaded blobs
+
+    Returns:
+        List[Tuple[BlobInfo, str]]: every blob without an MD5 with the MD5 hash of its copy in hexadecimal.
+    """
+    return [
+        (blob, file_md5(os.path.join(dest_folder_path, blob.name)).hex())
+        for blob in downloads
+        if blob.content_md5 is None
+    ]
+
+
+class StorageBackend(ABC):
+    """A store of blobs in containers, which holds the remote state.
+
+    A backend implements the blob primitives: listing, reading, writing and deleting blobs, creating a blob only if it
+    does not exist, leasing blobs and hashing them. The state transfers are built on these primitives, and a backend
+    may override them with faster ones.
+
+    Every backend reports errors with the exception types of azure.core: ResourceNotFoundError for a missing blob,
+    ResourceExistsError for a blob or a lease that already exists, and HttpResponseError for a write to a blob leased
+    by someone else.
+    """
+
+    exclusion_rules: ExclusionRules
+    resource_group_exists: bool
+
+    @abstractmethod
+    def container_exists(self, container_name: str) -> bool:
+        """Check if storage container exists.
+
+        Args:
+            container_name (str): storage container name
+
+        Returns:
+            bool: does container exist
+        """
+
+    @abstractmethod
+    def list_blobs(
+        self, container_name: str, name_starts_with: Optional[str] = None
+    ) -> List[BlobInfo]:
+        """List the blobs of a container, with their properties.
+
+        Args:
+            container_name (str): storage container name
+            name_starts_with (Optional[str]): only list the blobs whose name starts with this prefix. Defaults to None.
+
+        Returns:
+            List[BlobInfo]: the properties of every listed blob
+        """
+
+    @abstractmethod
+    def get_blob_info(self, container_name: str, blob_name: str) -> BlobInfo:
+        """Get the properties of a blob, including its metadata and the state of its lease.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            BlobInfo: the blob's properties
+
+        Raises:
+            azure.core.exceptions.ResourceNotFoundError: when the blob does not exist
+        """
+
+    @abstractmethod
+    def get_blob(self, container_name: str, blob_name: str) -> bytes:
+        """Read the contents of a blob.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            bytes: the contents of the blob
+
+        Raises:
+            azure.core.exceptions.ResourceNotFoundError: when the blob does not exist
+        """
+
+    @abstractmethod
+    def put_blob(self, container_name: str, blob_name: str, data: bytes) -> None:
+        """Write a blob, replacing it if it exists, and record the MD5 hash of its contents.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            data (bytes): the contents of the blob
+        """
+
+    @abstractmethod
+    def copy_blob(
+        self, container_name: str, source_blob_name: str, dest_blob_name: str
+    ) -> None:
+        """Copy a blob within a container, without its data leaving the storage, replacing the destination if it exists.
+
+        The copy keeps the MD5 hash of the source blob.
+
+        Args:
+            container_name (str): storage container name
+            source_blob_name (str): the name of the blob to copy
+            dest_blob_name (str): the name of the copy
+
+        Raises:
+            azure.core.exceptions.ResourceNotFoundError: when the source blob does not exist
+        """
+
+    @abstractmethod
+    def create_empty(
+        self,
+        container_name: str,
+        blob_name: str,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Create an empty blob, only if no blob of that name exists.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            metadata (Optional[Dict[str, str]]): metadata of the blob
+
+        Raises:
+            azure.core.exceptions.ResourceExistsError: when blob already exists
+        """
+
+    @abstractmethod
+    def blob_exists(self, container_name: str, blob_name: str) -> bool:
+        """Check whether a blob exists in a container.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            bool: True, if blob exists
+        """
+
+    @abstractmethod
+    def delete_blob(
+        self,
+        container_name: str,
+        blob_name: str,
+        lease: Optional[StorageLease] = None,
+    ) -> None:
+        """Delete blob by name.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            lease (Optional[StorageLease]): the active lease on the blob, if it has one
+        """
+
+    @abstractmethod
+    def acquire_lease(
+        self, container_name: str, blob_name: str, lease_duration: int
+    ) -> StorageLease:
+        """Acquire a lease on a blob, which expires unless it is renewed within `lease_duration` seconds.
+
+        A lease that expired, or was broken, can be acquired by anyone.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            lease_duration (int): the number of seconds the lease lasts without being renewed, from 15 to 60
+
+        Returns:
+            StorageLease: the lease, to renew it
+
+        Raises:
+            azure.core.exceptions.ResourceExistsError: when another client holds an active lease on the blob
+        """
+
+    @abstractmethod
+    def break_lease(self, container_name: str, blob_name: str) -> None:
+        """Break the lease on a blob straight away, whoever holds it.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+        """
+
+    def get_hash_remote_state(self, container_name: str, blob_name: str) -> str:
+        """Get the MD5 hash of a blob, reading the blob only if neither the storage nor this backend know the hash.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+
+        Returns:
+            str: Hash contents of the blob in hexadecimal string
+        """
+        blob = self.get_blob_info(container_name, blob_name)
+        if blob.content_md5 is not None:
+            return blob.content_md5
+
+        known_md5 = self._get_known_blob_md5s(container_name, [blob]).get(blob.name)
+        if known_md5 is not None:
+            return known_md5
+
+        remote_hash = hashlib.md5(self.get_blob(container_name, blob_name)).hexdigest()
+        self._record_blob_md5s(container_name, [(blob, remote_hash)])
+
+        return remote_hash
+
+    def upload_folder(
+        self, container_name: str, src_folder_path: str
+    ) -> TransferReport:
+        """Upload a folder to a storage container and delete any blobs whose file is not present in `src_folder_path`.
+
+        Files whose MD5 matches the hash of the blob already in the container are not uploaded again. The other files
+        are uploaded by `_run_transfers`.
+
+        Args:
+            container_name (str): storage container name
+            src_folder_path (str): Path to folder to upload all files from
+
+        Returns:
+            TransferReport: the number of blobs and bytes uploaded, the number of blobs skipped and deleted, and the
+                MD5 hash of every file uploaded or skipped.
+        """
+        plan = plan_upload(
+            src_folder_path, self.list_blobs(container_name), self.exclusion_rules
+        )
+
+        self._run_transfers(
+            [
+                functools.partial(
+                    self._upload_file, container_name, file_path, file_path, content_md5
+                )
+                for file_path, content_md5 in plan.uploads.items()
+            ]
+        )
+
+        plan.report.blobs_deleted = self._sync_remote(container_name, plan.stale_blobs)
+
+        return plan.report
+
+    def download_folder(
+        self, container_name: str, dest_folder_path: str
+    ) -> TransferReport:
+        """Download the blobs of a storage container into a folder.
+
+        The local folder is reconciled with a single listing of the container: only blobs whose local copy differs in
+        size or MD5 are downloaded, by `_run_transfers`, and only local files that are no longer in the container are
+        removed.
+
+        Args:
+            container_name (str): storage container name
+            dest_folder_path (str): Path to folder to download all the files
+
+        Returns:
+            TransferReport: the number of blobs and bytes downloaded, and the number of files skipped and removed.
+        """
+        blobs = state_blobs(self.list_blobs(container_name), self.exclusion_rules)
+        unhashed_blobs = [blob for blob in blobs if blob.content_md5 is None]
+        known_md5s = (
+            self._get_known_blob_md5s(container_name, unhashed_blobs)
+            if unhashed_blobs
+            else {}
+        )
+        plan = plan_download(dest_folder_path, blobs, known_md5s)
+
+        self._run_transfers(
+            [
+                functools.partial(
+                    self._download_file,
+                    container_name,
+                    blob.name,
+                    os.path.join(dest_folder_path, blob.name),
+                )
+                for blob in plan.downloads
+            ]
+        )
+
+        # the hashes of the whole download are recorded at once
+        downloaded_hashes = hash_downloaded_blobs(dest_folder_path, plan.downloads)
+        if downloaded_hashes:
+            self._record_blob_md5s(container_name, downloaded_hashes)
+
+        plan.report.blobs_deleted = self._sync_local(dest_folder_path, plan.blob_names)
+
+        return plan.report
+
+    def download_blob(
+        self, container_name: str, blob_name: str, dest_file_path: str
+    ) -> TransferReport:
+        """Download a single blob, replacing the local file only once the whole blob was read.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            dest_file_path (str): Path to download the blob to
+
+        Returns:
+            TransferReport: the number of blobs and bytes downloaded.
+
+        Raises:
+            azure.core.exceptions.ResourceNotFoundError: when the blob does not exist.
+        """
+        data = self.get_blob(container_name, blob_name)
+        write_file(dest_file_path, data)
+
+        return TransferReport(blobs_transferred=1, bytes_transferred=len(data))
+
+    def get_snapshot_index(self, container_name: str) -> Optional[SnapshotIndex]:
+        """Read the index of a state stored as a snapshot.
+
+        Args:
+            container_name (str): storage container name
+
+        Returns:
+            Optional[SnapshotIndex]: the index, None if the state is not stored as a snapshot.
+        """
+        try:
+            return SnapshotIndex.from_json(
+                self.get_blob(container_name, SNAPSHOT_INDEX_BLOB_NAME)
+            )
+        except ResourceNotFoundError:
+            return None
+
+    def upload_snapshot(
+        self, container_name: str, src_folder_path: str
+    ) -> TransferReport:
+        """Upload a folder as a single compressed snapshot, pointed at by the index blob.
+
+        The snapshot is named after its hash, so an unchanged folder costs a single request to read the index. Once the
+        index points at the new snapshot, the previous snapshot, or the blobs of a state uploaded file by file, are
+        deleted.
+
+        Args:
+            container_name (str): storage container name
+            src_folder_path (str): Path to folder to upload all files from
+
+        Returns:
+            TransferReport: the number of blobs and bytes uploaded, the number of blobs skipped and deleted, and the
+                snapshot holding the folder with the MD5 hash of every file.
+        """
+        snapshot = build_snapshot(src_folder_path, self.exclusion_rules)
+        index = self.get_snapshot_index(container_name)
+
+        if index is not None and index.snapshot == snapshot.name:
+            return TransferReport(
+                blobs_skipped=1, files=snapshot.files, snapshot=snapshot.name
+            )
+
+        return self._commit_snapshot(container_name, snapshot, index)
+
+    def _commit_snapshot(
+        self,
+        container_name: str,
+        snapshot: Snapshot,
+        index: Optional[SnapshotIndex],
+        history: Optional[HistoryHead] = None,
+    ) -> TransferReport:
+        """Upload a snapshot, point the index at it and delete the state it replaces.
+
+        Args:
+            container_name (str): storage container name
+            snapshot (Snapshot): the new snapshot
+            index (Optional[SnapshotIndex]): the current index, None if the state is not stored as a snapshot
+            history (Optional[HistoryHead]): the history of the state. Defaults to None, in which case it is read.
+
+        Returns:
+            TransferReport: the number of blobs and bytes uploaded, the number of blobs deleted, and the snapshot.
+        """
+        # the snapshot is uploaded first, so the index never points at a missing snapshot
+        self.put_blob(container_name, snapshot.name, snapshot.data)
+        report = self._point_index(
+            container_name, snapshot.name, snapshot.files, index, history
+        )
+        report.blobs_transferred += 1
+        report.bytes_transferred += len(snapshot.data)
+
+        return report
+
+    def _point_index(
+        self,
+        container_name: str,
+        snapshot_name: str,
+        files: Dict[str, str],
+        index: Optional[SnapshotIndex],
+        history: Optional[HistoryHead] = None,
+    ) -> TransferReport:
+        """Point the index at a stored snapshot and delete the state it replaces, unless the history holds it.
+
+        Args:
+            container_name (str): storage container name
+            snapshot_name (str): the name of the snapshot blob
+            files (Dict[str, str]): the path of every file in the snapshot and its MD5 hash in hexadecimal
+            index (Optional[SnapshotIndex]): the current index, None if the state is not stored as a snapshot
+            history (Optional[HistoryHead]): the history of the state. Defaults to None, in which case it is read.
+
+        Returns:
+            TransferReport: the index blob uploaded, the number of blobs deleted, and the snapshot.
+        """
+        index_data = SnapshotIndex(snapshot=snapshot_name, files=files).to_json()
+        self.put_blob(container_name, SNAPSHOT_INDEX_BLOB_NAME, index_data)
+        report = TransferReport(
+            blobs_transferred=1,
+            bytes_transferred=len(index_data),
+            files=dict(files),
+            snapshot=snapshot_name,
+        )
+
+        if index is not None:
+            if history is None:
+                history = self.get_history(container_name)
+            # a snapshot that a history entry points at is kept, so restoring the entry only rewrites the index
+            stale_blobs = {index.snapshot} - set(history.objects) - {snapshot_name}
+        else:
+            stale_blobs = self._get_blob_names(container_name) - {
+                SNAPSHOT_INDEX_BLOB_NAME,
+                snapshot_name,
+            }
+        report.blobs_deleted = self._sync_remote(container_name, stale_blobs)
+
+        return report
+
+    def download_snapshot(
+        self, container_name: str, dest_folder_path: str
+    ) -> TransferReport:
+        """Download the state stored as a snapshot into a folder.
+
+        A folder that matches the index costs a single request, otherwise the snapshot is downloaded and unpacked and
+        local files that are not in it are removed. A state that is not stored as a snapshot yet is downloaded file by
+        file.
+
+        Args:
+            container_name (str): storage container name
+            dest_folder_path (str): Path to folder to download all the files
+
+        Returns:
+            TransferReport: the number of blobs and bytes downloaded, and the number of files skipped and removed.
+
+        Raises:
+            ValueError: when the snapshot does not match its content-addressed name.
+            azure.core.exceptions.ResourceNotFoundError: when the snapshot kept being replaced while it was downloaded.
+        """
+        index = self.get_snapshot_index(container_name)
+        if index is None:
+            return self.download_folder(container_name, dest_folder_path)
+
+        report = TransferReport()
+        if local_manifest(dest_folder_path, self.exclusion_rules) == index.files:
+            report.blobs_skipped = len(index.files)
+            return report
+
+        # a writer deletes the previous snapshot once the index points at the new one, which is then read instead
+        for attempt in range(1, SNAPSHOT_READ_ATTEMPTS + 1):
+            try:
+                data = self.get_blob(container_name, index.snapshot)
+                break
+            except ResourceNotFoundError:
+                new_index = self.get_snapshot_index(container_name)
+                if attempt == SNAPSHOT_READ_ATTEMPTS or new_index is None:
+                    raise
+                index = new_index
+
+        if snapshot_blob_name(data) != index.snapshot:
+            raise ValueError(
+                f"The remote state snapshot {index.snapshot} does not match its hash."
+            )
+
+        extract_snapshot(data, dest_folder_path)
+        report.blobs_transferred = 1
+        report.bytes_transferred = len(data)
+        report.blobs_deleted = self._sync_local(dest_folder_path, set(index.files))
+
+        return report
+
+    def get_history(self, container_name: str) -> HistoryHead:
+        """Read the history of the state, from its head blob.
+
+        Args:
+            container_name (str): storage container name
+
+        Returns:
+            HistoryHead: the retained entries and the blobs that hold their files, empty if no history was recorded.
+        """
+        try:
+            return HistoryHead.from_json(
+                self.get_blob(container_name, HISTORY_HEAD_BLOB_NAME)
+            )
+        except ResourceNotFoundError:
+            return HistoryHead()
+
+    def record_history(  # noqa: PLR0913, PLR0917
+        self,
+        container_name: str,
+        src_folder_path: str,
+        now: Optional[datetime] = None,
+        uploaded_files: Optional[Dict[str, str]] = None,
+        snapshot: Optional[str] = None,
+        retention: int = DEFAULT_HISTORY_RETENTION,
+    ) -> Optional[HistoryEntry]:
+        """Record the files of a folder as an entry in the history of the state.
+
+        A state stored as a snapshot is recorded as an entry pointing at the snapshot, so nothing is stored. Otherwise
+        every file is stored as an object named after its MD5 hash, and only files that no entry holds yet are stored.
+        When the folder was just uploaded file by file, the objects are copied within the storage from the uploaded
+        blobs, otherwise they are uploaded from the files. A folder that matches the latest entry is not recorded again,
+        which costs a single request to read the history.
+
+        Args:
+            container_name (str): storage container name
+            src_folder_path (str): Path to folder to record all files from
+            now (Optional[datetime]): when the entry is recorded. Defaults to the current time.
+            uploaded_files (Optional[Dict[str, str]]): the files of the folder with their MD5 hash, as reported by
+                `upload_folder` or `upload_snapshot`. Defaults to None, in which case the folder is hashed.
+            snapshot (Optional[str]): the snapshot blob holding the files, as reported by `upload_snapshot`. Defaults
+                to None, for a folder stored file by file.
+            retention (int): the number of entries kept. Defaults to DEFAULT_HISTORY_RETENTION.
+
+        Returns:
+            Optional[HistoryEntry]: the new entry, None if the folder matches the latest entry.
+        """
+        files = uploaded_files
+        if files is None:
+            files = {}
+            for root, _, filenames in os.walk(src_folder_path):
+                for filename in filenames:
+                    file_path = os.path.join(root, filename)
+                    if not self.exclusion_rules.is_excluded(file_path):
+                        files[file_path] = file_md5(file_path).hex()
+
+        history = self.get_history(container_name)
+        latest = history.latest
+        if latest is not None and latest.files == files and latest.snapshot == snapshot:
+            return None
+
+        entry = HistoryEntry.new(files, now, snapshot=snapshot)
+        # a snapshot holds the files of its entry, otherwise the files that no entry holds yet are stored as objects,
+        # which the head lists so that they are never listed from the storage
+        missing_objects: Dict[str, str] = {}
+        if snapshot is None:
+            missing_objects = {
+                history_object_blob_name(content_md5): file_path
+                for file_path, content_md5 in files.items()
+            }
+        for object_name in history.objects:
+            missing_objects.pop(object_name, None)
+
+        transfers: List[Callable[[], None]] = []
+        for object_name, file_path in sorted(missing_objects.items()):
+            if uploaded_files is not None:
+                transfers.append(
+                    functools.partial(
+                        self.copy_blob, container_name, file_path, object_name
+                    )
+                )
+            else:
+                transfers.append(
+                    functools.partial(
+                        self._upload_file,
+                        container_name,
+                        object_name,
+                        file_path,
+                        bytes.fromhex(files[file_path]),
+                    )
+                )
+
+        # the objects are stored first, so an entry never lists a missing object
+        self._run_transfers(transfers)
+        self._commit_history(container_name, history, entry, retention)
+
+        return entry
+
+    def _commit_history(
+        self,
+        container_name: str,
+        history: HistoryHead,
+        entry: HistoryEntry,
+        retention: int,
+    ) -> int:
+        """Write the history with a new entry, and delete the blobs that only the entries beyond the retention held.
+
+        Args:
+            container_name (str): storage container name
+            history (HistoryHead): the history the entry is added to
+            entry (HistoryEntry): the new entry, whose objects are stored
+            retention (int): the number of entries kept
+
+        Returns:
+            int: the number of blobs deleted.
+        """
+        pruned = history.add(entry, retention)
+        self.put_blob(container_name, HISTORY_HEAD_BLOB_NAME, history.to_json())
+
+        # the snapshot the index points at is the current state, even when no entry holds it any more
+        if any(is_snapshot_blob(blob_name) for blob_name in pruned):
+            index = self.get_snapshot_index(container_name)
+            if index is not None:
+                pruned.discard(index.snapshot)
+
+        self._run_transfers(
+            [
+                functools.partial(self.delete_blob, container_name, blob_name)
+                for blob_name in sorted(pruned)
+            ]
+        )
+
+        return len(pruned)
+
+    def list_history(self, container_name: str) -> List[HistoryEntry]:
+        """List the entries of the history of the state, oldest first.
+
+        Args:
+            container_name (str): storage container name
+
+        Returns:
+            List[HistoryEntry]: the entries.
+        """
+        return self.get_history(container_name).entries
+
+    def get_history_entry(self, container_name: str, entry_id: str) -> HistoryEntry:
+        """Read an entry of the history of the state.
+
+        Args:
+            container_name (str): storage container name
+            entry_id (str): the entry ID
+
+        Returns:
+            HistoryEntry: the entry.
+
+        Raises:
+            azure.core.exceptions.ResourceNotFoundError: when there is no entry with that ID.
+        """
+        entry = self.get_history(container_name).find(entry_id)
+        if entry is None:
+            raise ResourceNotFoundError(f"The history has no entry '{entry_id}'.")
+
+        return entry
+
+    def restore_history(
+        self,
+        container_name: str,
+        entry: HistoryEntry,
+        now: Optional[datetime] = None,
+        retention: int = DEFAULT_HISTORY_RETENTION,
+    ) -> Tuple[HistoryEntry, TransferReport]:
+        """Restore the state stored file by file to a history entry, and record the restore as a new entry.
+
+        The files that differ from the entry are copied from their objects within the storage, and the files the entry
+        does not hold are deleted, so no state data is uploaded.
+
+        Args:
+            container_name (str): storage container name
+            entry (HistoryEntry): the entry to restore, recorded file by file
+            now (Optional[datetime]): when the restore is recorded. Defaults to the current time.
+            retention (int): the number of entries kept. Defaults to DEFAULT_HISTORY_RETENTION.
+
+        Returns:
+            Tuple[HistoryEntry, TransferReport]: the entry recording the restore, and the number of blobs copied, skipped
+                and deleted.
+
+        Raises:
+            ValueError: when the entry was recorded as a snapshot, whose files have no objects to copy.
+        """
+        if entry.snapshot is not None:
+            raise ValueError(
+                f"The remote state history entry '{entry.id}' was recorded as a snapshot, and can only be restored to a"
+                " state stored as a snapshot."
+            )
+
+        remote_manifest = {
+            blob.name: blob.content_md5 for blob in self.list_blobs(container_name)
+        }
+        report = TransferReport()
+
+        for file_path, content_md5 in sorted(entry.files.items()):
+            if remote_manifest.get(file_path) == content_md5:
+                report.blobs_skipped += 1
+                continue
+
+            self.copy_blob(
+                container_name, history_object_blob_name(content_md5), file_path
+            )
+            report.blobs_transferred += 1
+
+        stale_blobs = {
+            blob_name
+            for blob_name in remote_manifest
+            if blob_name not in entry.files
+            and not is_snapshot_blob(blob_name)
+            and not is_history_blob(blob_name)
+        }
+        report.blobs_deleted = self._sync_remote(container_name, stale_blobs)
+
+        restore_entry = HistoryEntry.new(entry.files, now, restored_from=entry.id)
+        self._commit_history(
+            container_name, self.get_history(container_name), restore_entry, retention
+        )
+
+        return restore_entry, report
+
+    def restore_history_snapshot(
+        self,
+        container_name: str,
+        entry: HistoryEntry,
+        now: Optional[datetime] = None,
+        retention: int = DEFAULT_HISTORY_RETENTION,
+    ) -> Tuple[HistoryEntry, TransferReport]:
+        """Restore the state stored as a snapshot to a history entry, and record the restore as a new entry.
+
+        The history keeps the snapshot of every entry recorded as a snapshot, so the index is pointed back at it and no
+        state data is uploaded. The snapshot of an entry recorded file by file is packed from the entry's objects,
+        which are read from the storage rather than from local files.
+
+        Args:
+            container_name (str): storage container name
+            entry (HistoryEntry): the entry to restore
+            now (Optional[datetime]): when the restore is recorded. Defaults to the current time.
+            retention (int): the number of entries kept. Defaults to DEFAULT_HISTORY_RETENTION.
+
+        Returns:
+            Tuple[HistoryEntry, TransferReport]: the entry recording the restore, and the number of blobs and bytes
+                uploaded, and the number of blobs skipped and deleted.
+        """
+        history = self.get_history(container_name)
+        index = self.get_snapshot_index(container_name)
+
+        if entry.snapshot is not None:
+            snapshot_name = entry.snapshot
+            if index is not None and index.snapshot == snapshot_name:
+                report = TransferReport(blobs_skipped=1)
+            else:
+                report = self._point_index(
+                    container_name, snapshot_name, entry.files, index, history
+                )
+        else:
+            snapshot = pack_snapshot(
+                {
+                    file_path: self.get_blob(
+                        container_name, history_object_blob_name(content_md5)
+                    )
+                    for file_path, content_md5 in entry.files.items()
+                }
+            )
+            snapshot_name = snapshot.name
+            if index is not None and index.snapshot == snapshot_name:
+                report = TransferReport(blobs_skipped=1)
+            else:
+                report = self._commit_snapshot(container_name, snapshot, index, history)
+
+        restore_entry = HistoryEntry.new(
+            entry.files, now, restored_from=entry.id, snapshot=snapshot_name
+        )
+        self._commit_history(container_name, history, restore_entry, retention)
+
+        return restore_entry, report
+
+    def _upload_file(
+        self, container_name: str, blob_name: str, file_path: str, content_md5: bytes
+    ) -> None:
+        """Upload a file as a blob, the transfer run for every file a folder upload or the history stores.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            file_path (str): Path to the file
+            content_md5 (bytes): MD5 digest of the file
+        """
+        self.put_blob(container_name, blob_name, read_file(file_path))
+
+    def _download_file(
+        self, container_name: str, blob_name: str, dest_file_path: str
+    ) -> None:
+        """Download a blob to a file, the transfer `download_folder` runs for every blob whose local copy differs.
+
+        Args:
+            container_name (str): storage container name
+            blob_name (str): blob name
+            dest_file_path (str): Path to download the blob to
+        """
+        write_file(dest_file_path, self.get_blob(container_name, blob_name))
+
+    def _run_transfers(self, transfers: List[Callable[[], None]]) -> None:
+        """Run the blob transfers of a folder upload or download, or of the history, one after the other.
+
+        Backends that can transfer several blobs at the same time override this.
+
+        Args:
+            transfers (List[Callable[[], None]]): the transfers to run.
+        """
+        for transfer in transfers:
+            transfer()
+
+    def _get_known_blob_md5s(
+        self, container_name: str, blobs: List[BlobInfo]
+    ) -> Dict[str, str]:
+        """Get the MD5 hashes recorded for blobs the storage holds no MD5 for, if the blobs have not changed since.
+
+        Backends whose storage may not know a blob's MD5 override this, together with `_record_blob_md5s`.
+
+        Args:
+            container_name (str): storage container name
+            blobs (List[BlobInfo]): the blobs' properties
+
+        Returns:
+            Dict[str, str]: the MD5 hash in hexadecimal of every blob whose hash is known at its current ETag.
+        """
+        return {}
+
+    def _record_blob_md5s(
+        self, container_name: str, hashes: List[Tuple[BlobInfo, str]]
+    ) -> None:
+        """Record the MD5 hashes of blobs the storage holds no MD5 for, against their ETag.
+
+        Args:
+            container_name (str): storage container name
+            hashes (List[Tuple[BlobInfo, str]]): every blob's properties with its MD5 hash in hexadecimal
+        """
+
+    def _get_blob_names(self, container_name: str) -> Set[str]:
+        """Get the names of the blobs in a container.
+
+        Args:
+            container_name (str): the name of the blob container to look for blobs.
+
+        Returns:
+            Set[str]: a set of blob names in the container.
+        """
+        return {blob.name for blob in self.list_blobs(container_name)}
+
+    def _sync_remote(self, container_name: str, blob_set: Set[str]) -> int:
+        """Delete the blobs whose file was removed locally, leaving the lock and history blobs alone.
+
+        Args:
+            container_name (str): The name of the blob container to look for blobs.
+            blob_set (Set[str]): Set of blob names to be removed on the remote storage.
+
+        Returns:
+            int: the number of blobs deleted.
+        """
+        blobs_deleted = 0
+        for blob_name in blob_set:
+            # Ensure that the lock file is not being prematurely removed from the remote bucket
+            if LOCK_FILE_NAME in blob_name or is_history_blob(blob_name):
+                continue
+            self.delete_blob(container_name, blob_name)
+            blobs_deleted += 1
+
+        return blobs_deleted
+
+    def _sync_local(self, dest_folder_path: str, blob_names: Set[str]) -> int:
+        """Synchronizes the local .matcha folder with the remote storage files.
+
+        Local files that are not present in the remote storage are removed, except for excluded files.
+
+        Args:
+            dest_folder_path (str): Path to folder containing the .matcha folder
+            blob_names (Set[str]): names of the blobs in the remote storage
+
+        Returns:
+            int: the number of files removed.
+        """
+        return remove_stale_local_files(
+            dest_folder_path, blob_names, self.exclusion_rules
+        )
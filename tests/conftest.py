@@ -1,17 +1,40 @@
 """Reusable fixtures."""
+import asyncio
+import base64
+import dataclasses
+import hashlib
+import itertools
 import json
 import os
 import random
 import tempfile
+import time
 import uuid
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http import HTTPStatus
 from pathlib import Path
-from typing import Dict, Iterator
-from unittest.mock import PropertyMock, patch
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+from unittest.mock import MagicMock, PropertyMock, patch
+from urllib.parse import parse_qs, unquote, urlparse
 
+import jwt
 import pytest
+from azure.core.credentials import AccessToken
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
+from azure.core.pipeline.transport import AsyncHttpTransport
+from azure.core.rest import HttpRequest
+from azure.core.rest._http_response_impl_async import AsyncHttpResponseImpl
+from azure.core.utils import case_insensitive_dict
 from azure.mgmt.confluent.models._confluent_management_client_enums import (
     ProvisionState,  # type: ignore [import]
 )
+from azure.mgmt.resource.resources.models import ResourceGroup
+from azure.storage.blob import BlobProperties, ContentSettings
 from typer.testing import CliRunner
 
 from matcha_ml.config import (
@@ -21,7 +44,7 @@ from matcha_ml.config import (
     MatchaConfigService,
 )
 from matcha_ml.services import AzureClient
-from matcha_ml.services.azure_service import ROLE_ID_MAPPING
+from matcha_ml.services.azure_service import ROLE_ID_MAPPING, AzureSessionRegistry
 from matcha_ml.services.terraform_service import TerraformConfig
 from matcha_ml.state.matcha_state import (
     MATCHA_STATE_PATH,
@@ -30,6 +53,7 @@ from matcha_ml.state.matcha_state import (
     MatchaState,
     MatchaStateComponent,
 )
+from matcha_ml.storage.azure_storage import AzureStorage, TransferConfig
 
 UUID_VERSION = 4
 INTERNAL_FUNCTION_STUB = "matcha_ml.services.AzureClient"
@@ -61,6 +85,69 @@ def matcha_testing_directory() -> Iterator[str]:
     temp_dir.cleanup()
 
 
+@pytest.fixture(autouse=True)
+def mocked_metadata_cache_path() -> Iterator[str]:
+    """Mock the metadata cache file path so that tests never read or write the user's cache.
+
+    The cache is kept out of the test directory, so that tests can make assertions on its contents.
+
+    Yields:
+        str: the path to the metadata cache file used in tests.
+    """
+    with tempfile.TemporaryDirectory() as config_dir, patch(
+        "matcha_ml.services.metadata_cache_service.MetadataCache.cache_file_path",
+        new_callable=PropertyMock,
+    ) as cache_file_path:
+        cache_file_path.return_value = os.path.join(
+            config_dir, "matcha-ml", "metadata_cache.yaml"
+        )
+
+        yield cache_file_path.return_value
+
+
+@pytest.fixture(autouse=True)
+def mocked_blob_hash_store_path() -> Iterator[str]:
+    """Mock the blob hash store file path so that tests never read or write the user's store.
+
+    Yields:
+        str: the path to the blob hash store file used in tests.
+    """
+    with tempfile.TemporaryDirectory() as config_dir, patch(
+        "matcha_ml.storage.blob_hash_store.BlobHashStore.store_file_path",
+        new_callable=PropertyMock,
+    ) as store_file_path:
+        store_file_path.return_value = os.path.join(
+            config_dir, "matcha-ml", "blob_hashes.json"
+        )
+
+        yield store_file_path.return_value
+
+
+@pytest.fixture(autouse=True)
+def mocked_plugin_cache_dir() -> Iterator[str]:
+    """Mock the Terraform plugin cache directory so that tests never write to the user's configuration directory.
+
+    Yields:
+        str: the path to the plugin cache directory used in tests.
+    """
+    with tempfile.TemporaryDirectory() as config_dir, patch(
+        "matcha_ml.services.terraform_service.default_plugin_cache_dir"
+    ) as plugin_cache_dir:
+        plugin_cache_dir.return_value = os.path.join(
+            config_dir, "matcha-ml", "terraform-plugin-cache"
+        )
+
+        yield plugin_cache_dir.return_value
+
+
+@pytest.fixture(autouse=True)
+def clear_azure_session_registry() -> Iterator[None]:
+    """Ensure that Azure sessions are not shared between tests."""
+    AzureSessionRegistry.clear()
+    yield
+    AzureSessionRegistry.clear()
+
+
 @pytest.fixture(autouse=True)
 def mocked_azure_client() -> AzureClient:
     """The Azure Client with mocked variables.
@@ -71,6 +158,8 @@ def mocked_azure_client() -> AzureClient:
     with patch(f"{INTERNAL_FUNCTION_STUB}._check_authentication") as auth, patch(
         f"{INTERNAL_FUNCTION_STUB}._subscription_id"
     ) as sub, patch(f"{INTERNAL_FUNCTION_STUB}.fetch_resource_groups") as rg, patch(
+        f"{INTERNAL_FUNCTION_STUB}.fetch_resource_group"
+    ) as single_rg, patch(
         f"{INTERNAL_FUNCTION_STUB}.resource_group_state"
     ) as rg_state, patch(
         f"{INTERNAL_FUNCTION_STUB}._fetch_user_roles"
@@ -84,6 +173,9 @@ def mocked_azure_client() -> AzureClient:
         auth.return_value = True
         sub.return_value = "id"
         rg.return_value = None
+        single_rg.side_effect = lambda name: (
+            ResourceGroup(location="ukwest") if name in {"rand-resources"} else None
+        )
         rg_state.return_value = ProvisionState.SUCCEEDED
         roles.return_value = [
             f"/subscriptions/id/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING['Owner']}",
@@ -329,3 +421,909 @@ def mocked_remote_state_manager_is_state_provisioned_false():
     ) as is_state_provisioned:
         is_state_provisioned.return_value = False
         yield is_state_provisioned
+
+
+FAKE_SUBSCRIPTION_ID = "fake-subscription-id"
+FAKE_PRINCIPAL_ID = "fake-principal-id"
+
+
+class FakeAsyncCredential:
+    """An async credential that returns a token for FAKE_PRINCIPAL_ID without invoking the Azure CLI."""
+
+    def __init__(self) -> None:
+        """Initialize the credential."""
+        self.closed = False
+
+    async def get_token(self, *scopes: str, **kwargs: Any) -> AccessToken:
+        """Get an access token.
+
+        Args:
+            *scopes (str): the requested scopes.
+            **kwargs (Any): ignored keyword arguments.
+
+        Returns:
+            AccessToken: a token that decodes to FAKE_PRINCIPAL_ID.
+        """
+        token = jwt.encode(
+            {"oid": FAKE_PRINCIPAL_ID}, "a-secret-key-for-testing-purposes-only"
+        )
+        return AccessToken(token, int(time.time()) + 3600)
+
+    async def close(self) -> None:
+        """Close the credential."""
+        self.closed = True
+
+
+class _FakeStreamDownload:
+    """A stream download generator that yields the whole response body in one chunk."""
+
+    def __init__(self, pipeline: Any, response: "FakeResponse", **kwargs: Any):
+        """Initialize the stream.
+
+        Args:
+            pipeline (Any): the pipeline the response came from.
+            response (FakeResponse): the response to stream.
+            **kwargs (Any): ignored keyword arguments.
+        """
+        self.response = response
+        self.content_length = len(response.content)
+        self._chunks = [response.content]
+
+    def __aiter__(self) -> "_FakeStreamDownload":
+        """Iterate over the chunks.
+
+        Returns:
+            _FakeStreamDownload: the stream.
+        """
+        return self
+
+    async def __anext__(self) -> bytes:
+        """Get the next chunk.
+
+        Raises:
+            StopAsyncIteration: when the whole body has been yielded.
+
+        Returns:
+            bytes: the chunk.
+        """
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop()
+
+
+class FakeResponse(AsyncHttpResponseImpl):
+    """An in-memory response returned by the FakeAzureTransport."""
+
+    def __init__(
+        self,
+        request: HttpRequest,
+        status_code: int,
+        body: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        """Initialize the response.
+
+        Args:
+            request (HttpRequest): the request this is a response to.
+            status_code (int): the HTTP status code.
+            body (bytes): the response body.
+            headers (Optional[Dict[str, str]]): the response headers.
+        """
+        headers = {"Content-Length": str(len(body)), **(headers or {})}
+        super().__init__(
+            request=request,
+            internal_response=None,
+            status_code=status_code,
+            reason="OK" if status_code < HTTPStatus.BAD_REQUEST else "Error",
+            content_type=headers.get("Content-Type"),
+            headers=case_insensitive_dict(headers),
+            stream_download_generator=_FakeStreamDownload,
+        )
+        self._content = body
+        self._is_stream_consumed = True
+
+
+class FakeAzureTransport(AsyncHttpTransport):
+    """An in-memory stand-in for Azure Resource Manager and Azure Blob Storage, used by the aio SDK clients.
+
+    Every request takes `latency` seconds, and the number of requests in flight is tracked so that tests can check
+    that operations run concurrently.
+    """
+
+    def __init__(self, latency: float = 0.01) -> None:
+        """Initialize the transport.
+
+        Args:
+            latency (float): the time each request takes, in seconds.
+        """
+        self.latency = latency
+        self.resource_groups: Set[str] = {"test-resources"}
+        self.role_ids: List[str] = [ROLE_ID_MAPPING["Owner"]]
+        self.regions = ["ukwest", "uksouth"]
+        self.containers: Dict[str, Dict[str, bytes]] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __aenter__(self) -> "FakeAzureTransport":
+        """Enter the transport's context.
+
+        Returns:
+            FakeAzureTransport: the transport.
+        """
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        """Leave the transport's context.
+
+        Args:
+            *args (Any): the exception details, if any.
+        """
+
+    async def open(self) -> None:
+        """Open the transport."""
+
+    async def close(self) -> None:
+        """Close the transport."""
+
+    async def send(self, request: HttpRequest, **kwargs: Any) -> FakeResponse:
+        """Answer a request from the in-memory state.
+
+        Args:
+            request (HttpRequest): the request.
+            **kwargs (Any): ignored keyword arguments.
+
+        Returns:
+            FakeResponse: the response.
+        """
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            url = urlparse(request.url)
+            self.requests.append((request.method, unquote(url.path)))
+
+            if url.netloc == "management.azure.com":
+                return self._management_response(request, url.path)
+            return self._blob_response(request, url.path, parse_qs(url.query))
+        finally:
+            self.in_flight -= 1
+
+    def _json_response(
+        self, request: HttpRequest, status_code: int, body: Any
+    ) -> FakeResponse:
+        """Build a JSON response.
+
+        Args:
+            request (HttpRequest): the request.
+            status_code (int): the HTTP status code.
+            body (Any): the JSON body.
+
+        Returns:
+            FakeResponse: the response.
+        """
+        return FakeResponse(
+            request,
+            status_code,
+            json.dumps(body).encode(),
+            {"Content-Type": "application/json"},
+        )
+
+    def _management_response(self, request: HttpRequest, path: str) -> FakeResponse:
+        """Answer an Azure Resource Manager request.
+
+        Args:
+            request (HttpRequest): the request.
+            path (str): the request path.
+
+        Returns:
+            FakeResponse: the response.
+        """
+        subscription_path = f"/subscriptions/{FAKE_SUBSCRIPTION_ID}"
+        resource_groups_path = f"{subscription_path}/resourcegroups"
+
+        if path == "/subscriptions":
+            body: Any = {"value": [{"subscriptionId": FAKE_SUBSCRIPTION_ID}]}
+        elif path == f"{subscription_path}/locations":
+            body = {"value": [{"name": region} for region in self.regions]}
+        elif path.endswith("/providers/Microsoft.Authorization/roleAssignments"):
+            body = {
+                "value": [
+                    {
+                        "properties": {
+                            "roleDefinitionId": f"{subscription_path}/providers/Microsoft.Authorization/roleDefinitions/{role_id}",
+                            "principalId": FAKE_PRINCIPAL_ID,
+                        }
+                    }
+                    for role_id in self.role_ids
+                ]
+            }
+        elif path.endswith("/listKeys"):
+            access_key = base64.b64encode(b"fake-access-key").decode()
+            body = {"keys": [{"keyName": "key1", "value": access_key}]}
+        elif path == resource_groups_path:
+            body = {
+                "value": [
+                    self._resource_group(name) for name in sorted(self.resource_groups)
+                ]
+            }
+        elif path.startswith(f"{resource_groups_path}/"):
+            name = path[len(resource_groups_path) + 1 :]
+            if name not in self.resource_groups:
+                return self._json_response(
+                    request,
+                    404,
+                    {"error": {"code": "ResourceGroupNotFound", "message": name}},
+                )
+            body = self._resource_group(name)
+        else:
+            return self._json_response(
+                request, 404, {"error": {"code": "NotFound", "message": path}}
+            )
+
+        return self._json_response(request, 200, body)
+
+    def _resource_group(self, name: str) -> Dict[str, Any]:
+        """Build the JSON representation of a resource group.
+
+        Args:
+            name (str): the resource group name.
+
+        Returns:
+            Dict[str, Any]: the resource group.
+        """
+        return {
+            "name": name,
+            "location": "ukwest",
+            "properties": {"provisioningState": "Succeeded"},
+        }
+
+    def _blob_response(
+        self, request: HttpRequest, path: str, query: Dict[str, List[str]]
+    ) -> FakeResponse:
+        """Answer an Azure Blob Storage request.
+
+        Args:
+            request (HttpRequest): the request.
+            path (str): the request path.
+            query (Dict[str, List[str]]): the parsed query string.
+
+        Returns:
+            FakeResponse: the response.
+        """
+        container_name, _, blob_name = path.lstrip("/").partition("/")
+        blob_name = unquote(blob_name)
+
+        if container_name not in self.containers:
+            return FakeResponse(
+                request, 404, headers={"x-ms-error-code": "ContainerNotFound"}
+            )
+        blobs = self.containers[container_name]
+
+        if not blob_name:
+            return self._container_response(request, container_name, blobs, query)
+
+        if request.method == "PUT":
+            return self._put_blob_response(request, blobs, blob_name)
+
+        if blob_name not in blobs:
+            return FakeResponse(
+                request, 404, headers={"x-ms-error-code": "BlobNotFound"}
+            )
+
+        if request.method == "DELETE":
+            del blobs[blob_name]
+            return FakeResponse(request, 202, headers=self._blob_headers())
+
+        return self._get_blob_response(request, blobs[blob_name])
+
+    @staticmethod
+    def _blob_headers() -> Dict[str, str]:
+        """Build the headers every successful blob response has.
+
+        Returns:
+            Dict[str, str]: the headers.
+        """
+        return {"ETag": '"fake-etag"', "Last-Modified": formatdate(usegmt=True)}
+
+    def _container_response(
+        self,
+        request: HttpRequest,
+        container_name: str,
+        blobs: Dict[str, bytes],
+        query: Dict[str, List[str]],
+    ) -> FakeResponse:
+        """Answer a request on a container, listing its blobs when asked to.
+
+        Args:
+            request (HttpRequest): the request.
+            container_name (str): the container name.
+            blobs (Dict[str, bytes]): the blobs of the container.
+            query (Dict[str, List[str]]): the parsed query string.
+
+        Returns:
+            FakeResponse: the response.
+        """
+        if query.get("comp") != ["list"]:
+            return FakeResponse(request, 200, headers=self._blob_headers())
+
+        items = "".join(
+            f"<Blob><Name>{name}</Name><Properties><Content-Length>{len(data)}</Content-Length>"
+            f"<Content-MD5>{base64.b64encode(hashlib.md5(data).digest()).decode()}</Content-MD5>"
+            "<BlobType>BlockBlob</BlobType></Properties></Blob>"
+            for name, data in sorted(blobs.items())
+        )
+        body = (
+            f'<?xml version="1.0" encoding="utf-8"?><EnumerationResults ContainerName="{container_name}">'
+            f"<Blobs>{items}</Blobs><NextMarker /></EnumerationResults>"
+        )
+        return FakeResponse(
+            request, 200, body.encode(), {"Content-Type": "application/xml"}
+        )
+
+    def _put_blob_response(
+        self, request: HttpRequest, blobs: Dict[str, bytes], blob_name: str
+    ) -> FakeResponse:
+        """Answer an upload, honouring the If-None-Match condition.
+
+        Args:
+            request (HttpRequest): the request.
+            blobs (Dict[str, bytes]): the blobs of the container.
+            blob_name (str): the blob name.
+
+        Returns:
+            FakeResponse: the response.
+        """
+        if request.headers.get("If-None-Match") == "*" and blob_name in blobs:
+            return FakeResponse(
+                request, 409, headers={"x-ms-error-code": "BlobAlreadyExists"}
+            )
+
+        content = request.content
+        if hasattr(content, "read"):
+            content = content.read()
+        if isinstance(content, str):
+            content = content.encode()
+        blobs[blob_name] = content or b""
+        return FakeResponse(request, 201, headers=self._blob_headers())
+
+    def _get_blob_response(self, request: HttpRequest, data: bytes) -> FakeResponse:
+        """Answer a download, or a request for the properties of a blob.
+
+        Args:
+            request (HttpRequest): the request.
+            data (bytes): the blob contents.
+
+        Returns:
+            FakeResponse: the response.
+        """
+        headers = {
+            **self._blob_headers(),
+            "x-ms-blob-type": "BlockBlob",
+            "Content-Type": "application/octet-stream",
+            "Content-MD5": base64.b64encode(hashlib.md5(data).digest()).decode(),
+            "Content-Range": f"bytes 0-{max(len(data) - 1, 0)}/{len(data)}",
+        }
+        if request.method == "HEAD":
+            return FakeResponse(
+                request, 200, headers={**headers, "Content-Length": str(len(data))}
+            )
+        return FakeResponse(request, 206, data, headers)
+
+
+@pytest.fixture
+def fake_azure_transport() -> FakeAzureTransport:
+    """A fixture for an in-memory Azure transport, to be passed to the asynchronous Azure clients.
+
+    Returns:
+        FakeAzureTransport: the fake transport.
+    """
+    return FakeAzureTransport()
+
+
+@pytest.fixture
+def fake_async_credential() -> FakeAsyncCredential:
+    """A fixture for an async credential that does not invoke the Azure CLI.
+
+    Returns:
+        FakeAsyncCredential: the fake credential.
+    """
+    return FakeAsyncCredential()
+
+
+class _FakeBlobDownload:
+    """The downloader returned by FakeBlobClient.download_blob."""
+
+    def __init__(self, data: bytes) -> None:
+        """Initialize the downloader.
+
+        Args:
+            data (bytes): the blob's contents.
+        """
+        self.data = data
+
+    def readall(self) -> bytes:
+        """Read the whole blob.
+
+        Returns:
+            bytes: the blob's contents.
+        """
+        return self.data
+
+    def readinto(self, stream: Any) -> int:
+        """Write the blob to a stream.
+
+        Args:
+            stream (Any): the stream to write to.
+
+        Returns:
+            int: the number of bytes written.
+        """
+        return int(stream.write(self.data))
+
+
+FAKE_CONTAINER_URL = "https://testaccount.blob.core.windows.net/test-container"
+
+
+class FakeBlobClient:
+    """A blob client of a FakeContainerClient."""
+
+    def __init__(self, container: "FakeContainerClient", name: str) -> None:
+        """Initialize the blob client.
+
+        Args:
+            container (FakeContainerClient): the container of the blob.
+            name (str): the blob name.
+        """
+        self.container = container
+        self.name = name
+
+    def upload_blob(
+        self,
+        data: Any,
+        overwrite: bool = False,
+        content_settings: Optional[ContentSettings] = None,
+        metadata: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Store the blob.
+
+        Args:
+            data (Any): the blob's contents, as bytes, a string or a file.
+            overwrite (bool): whether an existing blob is replaced.
+            content_settings (Optional[ContentSettings]): the blob's content settings.
+            metadata (Optional[Dict[str, str]]): the blob's metadata.
+            **kwargs (Any): ignored.
+
+        Raises:
+            ResourceExistsError: when the blob exists and overwrite is False.
+        """
+        self.container.requests.append(("PUT", self.name))
+        if hasattr(data, "read"):
+            data = data.read()
+        if isinstance(data, str):
+            data = data.encode()
+        if not overwrite and self.name in self.container.blobs:
+            raise ResourceExistsError("The specified blob already exists.")
+        self.container.check_lease(self.name, kwargs.get("lease"))
+
+        content_md5 = content_settings.content_md5 if content_settings else None
+        self.container.put(self.name, bytes(data), content_md5, metadata)
+
+    @property
+    def url(self) -> str:
+        """The URL of the blob.
+
+        Returns:
+            str: the URL.
+        """
+        return f"{FAKE_CONTAINER_URL}/{self.name}"
+
+    def start_copy_from_url(self, source_url: str) -> Dict[str, str]:
+        """Copy a blob of the same container, which completes straight away.
+
+        Args:
+            source_url (str): the URL of the blob to copy.
+
+        Returns:
+            Dict[str, str]: the status of the copy.
+        """
+        self.container.requests.append(("COPY", self.name))
+        source_name = source_url[len(FAKE_CONTAINER_URL) + 1 :]
+        self.container.check_lease(self.name, None)
+        self.container.put(
+            self.name,
+            self.container.get(source_name),
+            self.container.content_md5s[source_name],
+        )
+        return {"copy_status": "success"}
+
+    def download_blob(self) -> _FakeBlobDownload:
+        """Read the blob.
+
+        Returns:
+            _FakeBlobDownload: the downloader.
+        """
+        self.container.requests.append(("GET", self.name))
+        return _FakeBlobDownload(self.container.get(self.name))
+
+    def get_blob_properties(self) -> BlobProperties:
+        """Read the blob's properties.
+
+        Returns:
+            BlobProperties: the properties.
+        """
+        self.container.requests.append(("HEAD", self.name))
+        self.container.get(self.name)
+        return self.container.properties(self.name)
+
+    def exists(self) -> bool:
+        """Check whether the blob exists.
+
+        Returns:
+            bool: True if the blob exists.
+        """
+        self.container.requests.append(("HEAD", self.name))
+        return self.name in self.container.blobs
+
+    def delete_blob(
+        self, lease: Optional[Union["FakeLeaseClient", str]] = None
+    ) -> None:
+        """Delete the blob.
+
+        Args:
+            lease (Optional[Union[FakeLeaseClient, str]]): the active lease on the blob, or its ID.
+        """
+        self.container.delete_blob(self.name, lease)
+
+
+def _http_error(status_code: int, message: str) -> HttpResponseError:
+    """Build an error response of the blob service.
+
+    Args:
+        status_code (int): the status code.
+        message (str): the error message.
+
+    Returns:
+        HttpResponseError: the error.
+    """
+    error = HttpResponseError(message=message)
+    error.status_code = status_code
+    return error
+
+
+@dataclasses.dataclass
+class FakeBatchResponse:
+    """The response to one request of a blob batch."""
+
+    status_code: int
+    reason: str = ""
+    headers: Dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+class FakeLeaseClient:
+    """A lease on a blob of a FakeContainerClient, standing in for a BlobLeaseClient."""
+
+    # uuid4 is patched by the mock_uuid fixture, so lease IDs are numbered instead
+    _lease_ids = itertools.count()
+
+    def __init__(self, client: FakeBlobClient, lease_id: Optional[str] = None) -> None:
+        """Initialize the lease client.
+
+        Args:
+            client (FakeBlobClient): the client of the leased blob.
+            lease_id (Optional[str]): the lease ID. Defaults to a new ID.
+        """
+        self.container = client.container
+        self.name = client.name
+        self.id = (
+            lease_id
+            if lease_id is not None
+            else f"lease-{next(FakeLeaseClient._lease_ids)}"
+        )
+
+    def acquire(self, lease_duration: int = -1) -> None:
+        """Acquire the lease.
+
+        Args:
+            lease_duration (int): the number of seconds the lease lasts.
+
+        Raises:
+            ResourceExistsError: when another lease is active on the blob.
+        """
+        self.container.requests.append(("LEASE", self.name))
+        self.container.get(self.name)
+        active_lease = self.container.active_lease(self.name)
+        if active_lease is not None and active_lease != self.id:
+            raise ResourceExistsError("There is already a lease present.")
+
+        self.container.leases[self.name] = (
+            self.id,
+            lease_duration,
+            self.container.time + lease_duration,
+        )
+
+    def renew(self) -> None:
+        """Renew the lease, which works while no other lease was acquired since it expired.
+
+        Raises:
+            HttpResponseError: when the lease was lost.
+        """
+        self.container.requests.append(("LEASE", self.name))
+        lease = self.container.leases.get(self.name)
+        if lease is None or lease[0] != self.id:
+            raise _http_error(409, "The lease ID specified did not match.")
+
+        self.container.leases[self.name] = (
+            self.id,
+            lease[1],
+            self.container.time + lease[1],
+        )
+
+    def break_lease(self, lease_break_period: Optional[int] = None) -> None:
+        """Break the active lease on the blob, whoever holds it.
+
+        Args:
+            lease_break_period (Optional[int]): ignored, leases are broken straight away.
+
+        Raises:
+            ResourceExistsError: when the blob has no active lease.
+        """
+        self.container.requests.append(("LEASE", self.name))
+        if self.container.active_lease(self.name) is None:
+            raise ResourceExistsError("There is currently no lease on the blob.")
+        del self.container.leases[self.name]
+
+
+class FakeContainerClient:
+    """An in-memory blob container, recording every request made to it."""
+
+    def __init__(self) -> None:
+        """Initialize an empty container."""
+        self.blobs: Dict[str, bytes] = {}
+        self.content_md5s: Dict[str, Optional[bytes]] = {}
+        self.etags: Dict[str, str] = {}
+        self.metadata: Dict[str, Dict[str, str]] = {}
+        self.creation_times: Dict[str, datetime] = {}
+        # the lease ID, duration and expiry time of every leased blob
+        self.leases: Dict[str, Tuple[str, int, float]] = {}
+        self.requests: List[Tuple[str, str]] = []
+        # the clock of lease expiries, moved forward by tests
+        self.time = 0.0
+        # an account without the blob batch API refuses batches as a whole
+        self.batch_supported = True
+        self._version = 0
+
+    def put(
+        self,
+        name: str,
+        data: bytes,
+        content_md5: Optional[bytes] = None,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Store a blob without recording a request.
+
+        Args:
+            name (str): the blob name.
+            data (bytes): the blob's contents.
+            content_md5 (Optional[bytes]): the blob's Content-MD5.
+            metadata (Optional[Dict[str, str]]): the blob's metadata.
+        """
+        self._version += 1
+        self.blobs[name] = data
+        self.content_md5s[name] = content_md5
+        self.etags[name] = f'"0x{self._version}"'
+        self.metadata[name] = dict(metadata or {})
+        self.creation_times.setdefault(
+            name, datetime.fromtimestamp(self._version, timezone.utc)
+        )
+
+    def active_lease(self, name: str) -> Optional[str]:
+        """Get the ID of the lease on a blob that has not expired.
+
+        Args:
+            name (str): the blob name.
+
+        Returns:
+            Optional[str]: the lease ID, or None if the blob has no active lease.
+        """
+        lease = self.leases.get(name)
+        if lease is None or lease[2] <= self.time:
+            return None
+        return lease[0]
+
+    def check_lease(
+        self, name: str, lease: Optional[Union[FakeLeaseClient, str]]
+    ) -> None:
+        """Check that a write to a blob carries the blob's active lease, if it has one.
+
+        Args:
+            name (str): the blob name.
+            lease (Optional[Union[FakeLeaseClient, str]]): the lease, or lease ID, given with the write.
+
+        Raises:
+            HttpResponseError: when the lease is missing or does not match.
+        """
+        active_lease = self.active_lease(name)
+        lease_id = lease.id if isinstance(lease, FakeLeaseClient) else lease
+        if lease is not None and lease_id != active_lease:
+            raise _http_error(412, "The lease ID specified did not match.")
+        if lease is None and active_lease is not None:
+            raise _http_error(412, "There is currently a lease on the blob.")
+
+    def get(self, name: str) -> bytes:
+        """Read a blob without recording a request.
+
+        Args:
+            name (str): the blob name.
+
+        Returns:
+            bytes: the blob's contents.
+
+        Raises:
+            ResourceNotFoundError: when the blob does not exist.
+        """
+        if name not in self.blobs:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        return self.blobs[name]
+
+    def properties(self, name: str) -> BlobProperties:
+        """Build the properties of a blob.
+
+        Args:
+            name (str): the blob name.
+
+        Returns:
+            BlobProperties: the properties.
+        """
+        content_md5 = self.content_md5s[name]
+        return BlobProperties(
+            name=name,
+            **{
+                "Content-Length": len(self.blobs[name]),
+                "Content-MD5": bytearray(content_md5) if content_md5 else None,
+                "ETag": self.etags[name],
+                "x-ms-creation-time": self.creation_times[name],
+                "metadata": self.metadata[name],
+                "x-ms-lease-state": "leased"
+                if self.active_lease(name) is not None
+                else "expired"
+                if name in self.leases
+                else "available",
+            },
+        )
+
+    def exists(self) -> bool:
+        """Check whether the container exists.
+
+        Returns:
+            bool: always True.
+        """
+        return True
+
+    def get_blob_client(self, blob: str) -> FakeBlobClient:
+        """Get a client for a blob.
+
+        Args:
+            blob (str): the blob name.
+
+        Returns:
+            FakeBlobClient: the blob client.
+        """
+        return FakeBlobClient(self, blob)
+
+    def list_blobs(
+        self, name_starts_with: Optional[str] = None
+    ) -> List[BlobProperties]:
+        """List the blobs with their properties.
+
+        Args:
+            name_starts_with (Optional[str]): the prefix of the blobs to list, None to list every blob.
+
+        Returns:
+            List[BlobProperties]: the properties of every blob.
+        """
+        self.requests.append(("LIST", name_starts_with or ""))
+        return [
+            self.properties(name)
+            for name in sorted(self.blobs)
+            if name.startswith(name_starts_with or "")
+        ]
+
+    def list_blob_names(self) -> List[str]:
+        """List the blob names.
+
+        Returns:
+            List[str]: the name of every blob.
+        """
+        self.requests.append(("LIST", ""))
+        return sorted(self.blobs)
+
+    def delete_blob(
+        self, blob: str, lease: Optional[Union[FakeLeaseClient, str]] = None
+    ) -> None:
+        """Delete a blob.
+
+        Args:
+            blob (str): the blob name.
+            lease (Optional[Union[FakeLeaseClient, str]]): the active lease on the blob, or its ID.
+        """
+        self.requests.append(("DELETE", blob))
+        self.get(blob)
+        self.check_lease(blob, lease)
+        del self.blobs[blob]
+        self.leases.pop(blob, None)
+        self.creation_times.pop(blob, None)
+
+    def delete_blobs(
+        self, *blobs: str, raise_on_any_failure: bool = True
+    ) -> Iterator[FakeBatchResponse]:
+        """Delete blobs with a single batch request.
+
+        Args:
+            *blobs (str): the blob names.
+            raise_on_any_failure (bool): ignored, the response of every deletion is returned.
+
+        Returns:
+            Iterator[FakeBatchResponse]: the response of every deletion, in the order of the blobs.
+
+        Raises:
+            HttpResponseError: when the container does not support batches.
+        """
+        self.requests.append(("BATCH", ",".join(blobs)))
+        if not self.batch_supported:
+            raise _http_error(400, "The blob batch API is not supported.")
+
+        responses = []
+        for blob in blobs:
+            if blob not in self.blobs:
+                responses.append(FakeBatchResponse(404, "Not Found"))
+            elif self.active_lease(blob) is not None:
+                responses.append(
+                    FakeBatchResponse(
+                        412,
+                        "Precondition Failed",
+                        {"x-ms-error-code": "LeaseIdMissing"},
+                    )
+                )
+            else:
+                del self.blobs[blob]
+                self.leases.pop(blob, None)
+                self.creation_times.pop(blob, None)
+                responses.append(FakeBatchResponse(202, "Accepted"))
+
+        return iter(responses)
+
+
+@pytest.fixture
+def fake_container() -> FakeContainerClient:
+    """A fixture for an in-memory blob container.
+
+    Returns:
+        FakeContainerClient: the fake container.
+    """
+    return FakeContainerClient()
+
+
+@pytest.fixture
+def fake_azure_storage(fake_container: FakeContainerClient) -> Iterator[AzureStorage]:
+    """A fixture for an AzureStorage whose containers are all the in-memory fake container.
+
+    Args:
+        fake_container (FakeContainerClient): the fake container.
+
+    Yields:
+        AzureStorage: the storage.
+    """
+    with patch(
+        "matcha_ml.storage.azure_storage.AzureClient.resource_group_exists",
+        return_value=False,
+    ):
+        storage = AzureStorage("testaccount", "test-resources")
+
+    storage.blob_service_client = MagicMock()
+    storage.blob_service_client.get_container_client.return_value = fake_container
+    storage.transfer_config = TransferConfig(retry_backoff=0)
+
+    with patch("matcha_ml.storage.azure_storage.BlobLeaseClient", FakeLeaseClient):
+        yield storage
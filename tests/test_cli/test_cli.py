@@ -66,3 +66,12 @@ def test_cli_invalid_argument(runner):
 
     # Check if error message is present in output
     assert "Error" in result.stdout
+
+
+def test_cli_refresh_invalidates_metadata_cache(runner):
+    """Test that the refresh option clears the metadata cache before running a command."""
+    with patch("matcha_ml.cli.cli.MetadataCache") as mock_metadata_cache:
+        result = runner.invoke(app, ["--refresh", "analytics", "opt-in"])
+
+    assert result.exit_code == 0
+    mock_metadata_cache.return_value.invalidate.assert_called_once_with()
@@ -61,3 +61,68 @@ def test_cli_destroy_command_with_no_provisioned_resources(
         "Error - resources that have not been provisioned cannot be destroyed."
         in result.stdout
     )
+
+
+def test_cli_destroy_command_passes_terraform_options(runner, matcha_testing_directory):
+    """Test that the Terraform options of the destroy command are passed on to core.destroy.
+
+    Args:
+        runner (CliRunner): typer CLI runner
+        matcha_testing_directory (str): temporary working directory.
+    """
+    os.chdir(matcha_testing_directory)
+
+    with patch("matcha_ml.cli.cli.core.destroy") as mock_destroy:
+        result = runner.invoke(
+            app,
+            [
+                "destroy",
+                "--parallelism",
+                "4",
+                "--skip-refresh-state",
+                "--lock-timeout",
+                "30",
+                "--terraform-lock-timeout",
+                "5",
+            ],
+            input="Y\n",
+        )
+
+    assert result.exit_code == 0
+    mock_destroy.assert_called_once_with(
+        lock_timeout=30.0, parallelism=4, refresh=False, terraform_lock_timeout=5.0
+    )
+
+
+def test_cli_refresh_flags_do_not_clash(runner, matcha_testing_directory):
+    """Test that the global --refresh of the metadata cache and the Terraform refresh of destroy are separate flags.
+
+    Args:
+        runner (CliRunner): typer CLI runner
+        matcha_testing_directory (str): temporary working directory.
+    """
+    os.chdir(matcha_testing_directory)
+
+    with patch("matcha_ml.cli.cli.core.destroy") as mock_destroy, patch(
+        "matcha_ml.cli.cli.MetadataCache"
+    ) as mock_metadata_cache:
+        result = runner.invoke(
+            app, ["--refresh", "destroy", "--skip-refresh-state"], input="Y\n"
+        )
+
+    assert result.exit_code == 0
+    mock_metadata_cache.return_value.invalidate.assert_called_once()
+    assert mock_destroy.call_args.kwargs["refresh"] is False
+
+
+def test_cli_destroy_command_rejects_invalid_parallelism(runner):
+    """Test that a parallelism out of bounds is rejected before anything is destroyed.
+
+    Args:
+        runner (CliRunner): typer CLI runner
+    """
+    with patch("matcha_ml.cli.cli.core.destroy") as mock_destroy:
+        result = runner.invoke(app, ["destroy", "--parallelism", "0"])
+
+    assert result.exit_code != 0
+    mock_destroy.assert_not_called()
@@ -24,7 +24,7 @@ def mock_provisioned_remote_state() -> Iterable[MagicMock]:
         mock_state_manager.get_hash_remote_state.return_value = (
             "470544910b3fe623e00d63e6314588a3"
         )
-        mock_state_manager.use_lock.return_value = MagicMock()
+        mock_state_manager.use_read_lock.return_value = MagicMock()
         yield mock_state_manager
 
 
@@ -156,7 +156,7 @@ def test_cli_get_command_hide_sensitive(
     for line in expected_output_lines:
         assert line in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_show_sensitive(
@@ -183,7 +183,7 @@ def test_cli_get_command_show_sensitive(
     for line in expected_output_lines:
         assert line in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_with_resource(
@@ -212,7 +212,7 @@ def test_cli_get_command_with_resource(
     for line in expected_output_lines[:5]:
         assert line not in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_with_invalid_resource_name(
@@ -229,7 +229,7 @@ def test_cli_get_command_with_invalid_resource_name(
     assert result.exit_code == 0
     assert "Error" and "resource type" and "does-not-exist" in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_with_resource_and_property(
@@ -254,7 +254,7 @@ def test_cli_get_command_with_resource_and_property(
     for line in expected_output_lines[-1]:
         assert line in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_with_resource_and_property_json(
@@ -283,7 +283,7 @@ def test_cli_get_command_with_resource_and_property_json(
     # Assert JSON is present and correct in cli output
     assert expected_output in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_json_no_show_sensitive(
@@ -308,7 +308,7 @@ def test_cli_get_command_json_no_show_sensitive(
     # Assert JSON is present and correct in cli output
     assert expected_output in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_yaml_no_show_sensitive(
@@ -332,7 +332,7 @@ def test_cli_get_command_yaml_no_show_sensitive(
     for line in expected_output_lines_yaml:
         assert line in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_json_show_sensitive(
@@ -362,7 +362,7 @@ def test_cli_get_command_json_show_sensitive(
     # Assert JSON is present and correct in cli output
     assert expected_output in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_yaml_show_sensitive(
@@ -390,7 +390,7 @@ def test_cli_get_command_yaml_show_sensitive(
     for line in expected_output_lines_yaml:
         assert line in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_no_show_sensitive_with_sensitive_resource(
@@ -418,7 +418,7 @@ def test_cli_get_command_no_show_sensitive_with_sensitive_resource(
     for line in expected_output_lines[5:]:
         assert line not in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_cli_get_command_show_sensitive_with_resource(
@@ -450,7 +450,7 @@ def test_cli_get_command_show_sensitive_with_resource(
     for line in expected_output_lines[5:]:
         assert line not in result.stdout
 
-    mock_provisioned_remote_state.use_lock.assert_called_once()
+    mock_provisioned_remote_state.use_read_lock.assert_called_once()
 
 
 def test_get_cli_hash_mismatch(
@@ -469,4 +469,20 @@ def test_get_cli_hash_mismatch(
     assert result.exit_code == 0
 
     # Check if remote state manager trigger download function once upon hash mismatch
-    mock_provisioned_remote_state.download.assert_called_once()
+    mock_provisioned_remote_state.read_committed_state.assert_called_once()
+
+
+def test_cli_get_command_does_not_take_the_lock(
+    runner: CliRunner, mock_provisioned_remote_state: MagicMock
+):
+    """Test that the get command reads the state without taking the exclusive lock.
+
+    Args:
+        runner (CliRunner): typer CLI runner
+        mock_provisioned_remote_state (MagicMock): mock of an RemoteStateManager instance
+    """
+    result = runner.invoke(app, ["get"])
+
+    assert result.exit_code == 0
+    mock_provisioned_remote_state.use_lock.assert_not_called()
+    mock_provisioned_remote_state.lock.assert_not_called()
@@ -0,0 +1,85 @@
+"""Test suite for the matcha state commands."""
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from matcha_ml.cli.cli import app
+from matcha_ml.errors import MatchaInputError
+from matcha_ml.storage.state_history import HistoryEntry
+
+INTERNAL_FUNCTION_STUB = "matcha_ml.core"
+
+FIRST_ENTRY = HistoryEntry(
+    id="20260101T000000.000000Z-0a1b2c3d",
+    created="2026-01-01T00:00:00+00:00",
+    files={".matcha/infrastructure/matcha.state": "0" * 32},
+)
+RESTORE_ENTRY = HistoryEntry(
+    id="20260102T000000.000000Z-4e5f6a7b",
+    created="2026-01-02T00:00:00+00:00",
+    files=FIRST_ENTRY.files,
+    restored_from=FIRST_ENTRY.id,
+)
+
+
+def test_cli_state_history_lists_entries(runner: CliRunner) -> None:
+    """Tests that matcha state history prints every entry, with the entry a restore came from.
+
+    Args:
+        runner (CliRunner): typer CLI runner
+    """
+    with patch(
+        f"{INTERNAL_FUNCTION_STUB}.state_history",
+        return_value=[FIRST_ENTRY, RESTORE_ENTRY],
+    ):
+        result = runner.invoke(app, ["state", "history"])
+
+    assert result.exit_code == 0
+    # rich wraps long lines to the width of the terminal
+    output = " ".join(result.stdout.split())
+    assert FIRST_ENTRY.id in output
+    assert f"restored from {FIRST_ENTRY.id}" in output
+
+
+def test_cli_state_restore_command_called(runner: CliRunner) -> None:
+    """Tests that matcha state restore restores the entry once the user confirms.
+
+    Args:
+        runner (CliRunner): typer CLI runner
+    """
+    with patch(
+        f"{INTERNAL_FUNCTION_STUB}.restore_state", return_value=RESTORE_ENTRY
+    ) as mock_restore:
+        result = runner.invoke(app, ["state", "restore", FIRST_ENTRY.id], input="Y\n")
+
+    assert result.exit_code == 0
+    mock_restore.assert_called_once_with(FIRST_ENTRY.id, lock_timeout=0)
+    assert RESTORE_ENTRY.id in result.stdout
+
+
+def test_cli_state_restore_command_not_called(runner: CliRunner) -> None:
+    """Tests that matcha state restore does nothing when the user does not confirm.
+
+    Args:
+        runner (CliRunner): typer CLI runner
+    """
+    with patch(f"{INTERNAL_FUNCTION_STUB}.restore_state") as mock_restore:
+        result = runner.invoke(app, ["state", "restore", FIRST_ENTRY.id], input="n\n")
+
+    assert result.exit_code == 0
+    mock_restore.assert_not_called()
+
+
+def test_cli_state_restore_unknown_entry(runner: CliRunner) -> None:
+    """Tests that matcha state restore prints the error for an entry that does not exist.
+
+    Args:
+        runner (CliRunner): typer CLI runner
+    """
+    with patch(
+        f"{INTERNAL_FUNCTION_STUB}.restore_state",
+        side_effect=MatchaInputError("The remote state history has no entry 'x'"),
+    ):
+        result = runner.invoke(app, ["state", "restore", "x"], input="Y\n")
+
+    assert "no entry 'x'" in result.output
@@ -0,0 +1,62 @@
+"""Tests for the resource progress."""
+from unittest import mock
+
+from matcha_ml.cli.ui.resource_progress import ResourceProgress
+
+
+def test_resource_progress_tracks_resources():
+    """Test that the progress adds a row per resource in flight and prints a line once it is done."""
+    progress = ResourceProgress("Applying")
+
+    with mock.patch.object(progress.progress.console, "print") as mock_print:
+        resources = ["azurerm_resource_group.rg", "azurerm_storage_account.sa"]
+        for resource in resources:
+            progress.handle_event(
+                {
+                    "type": "apply_start",
+                    "hook": {"resource": {"addr": resource}, "action": "create"},
+                }
+            )
+
+        # a row per resource, under the row of the overall progress
+        assert len(progress.progress.tasks) == len(resources) + 1
+        assert (
+            f"0 of {len(resources)} resources done"
+            in progress.progress.tasks[0].description
+        )
+
+        progress.handle_event(
+            {
+                "type": "apply_complete",
+                "hook": {
+                    "resource": {"addr": "azurerm_resource_group.rg"},
+                    "action": "create",
+                },
+            }
+        )
+        progress.handle_event(
+            {
+                "type": "apply_errored",
+                "hook": {
+                    "resource": {"addr": "azurerm_storage_account.sa"},
+                    "action": "create",
+                },
+            }
+        )
+
+    assert len(progress.progress.tasks) == 1
+    assert "1 of 2 resources done, 1 failed" in progress.progress.tasks[0].description
+    printed = " ".join(str(call.args[0]) for call in mock_print.call_args_list)
+    assert "Created azurerm_resource_group.rg" in printed
+    assert "Creating azurerm_storage_account.sa failed" in printed
+
+
+def test_resource_progress_ignores_other_events():
+    """Test that events which are not about a resource change leave the progress as it is."""
+    progress = ResourceProgress("Destroying")
+
+    progress.handle_event({"type": "version", "terraform": "1.4.6"})
+    progress.handle_event({"type": "apply_start", "hook": {}})
+
+    assert len(progress.progress.tasks) == 1
+    assert progress.progress.tasks[0].description == "Destroying"
@@ -74,7 +74,7 @@ def mock_provisioned_remote_state(uuid_for_testing: uuid.UUID) -> Iterable[Magic
             "470544910b3fe623e00d63e6314588a3"
         )
 
-        def download(path):
+        def read_committed_state(path):
             state_file_resources = {
                 "cloud": {"flavor": "azure", "resource-group-name": "test_resources"},
                 "container-registry": {
@@ -97,7 +97,7 @@ def mock_provisioned_remote_state(uuid_for_testing: uuid.UUID) -> Iterable[Magic
             with open(".matcha/infrastructure/matcha.state", "w") as f:
                 json.dump(state_file_resources, f)
 
-        mock_state_manager.download = download
+        mock_state_manager.read_committed_state = read_committed_state
         yield mock_state_manager
 
 
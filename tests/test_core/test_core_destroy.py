@@ -8,7 +8,7 @@ from unittest.mock import MagicMock
 import pytest
 
 from matcha_ml.core.core import destroy
-from matcha_ml.errors import MatchaError
+from matcha_ml.errors import MatchaError, MatchaInputError
 
 CORE_FUNCTION_STUB = "matcha_ml.core.core"
 
@@ -60,3 +60,38 @@ def test_destroy_error_handling(mock_provisioned_remote_state):
         destroy()
 
     mock_provisioned_remote_state.is_state_provisioned.assert_called_once()
+
+
+def test_destroy_passes_terraform_options(
+    mock_provisioned_remote_state: MagicMock, mock_state_file: Path
+):
+    """Test that the Terraform options are passed on to the runner, and the remote state lock gets its own timeout.
+
+    Args:
+        mock_provisioned_remote_state (MagicMock): a mocked remote state
+        mock_state_file (Path): a mocked state file in the test directory
+    """
+    with mock.patch(f"{CORE_FUNCTION_STUB}.AzureRunner") as azure_runner:
+        destroy(lock_timeout=30, parallelism=4, refresh=False, terraform_lock_timeout=5)
+
+    azure_runner.assert_called_once_with(parallelism=4, refresh=False, lock_timeout=5)
+    mock_provisioned_remote_state.use_lock.assert_called_once_with(
+        destroy=True, timeout=30
+    )
+
+
+@pytest.mark.parametrize("parallelism, lock_timeout", [(0, 0), (65, 0), (10, -1)])
+def test_destroy_rejects_invalid_terraform_options(
+    mock_provisioned_remote_state: MagicMock, parallelism: int, lock_timeout: float
+):
+    """Test that invalid Terraform options are rejected before anything is destroyed.
+
+    Args:
+        mock_provisioned_remote_state (MagicMock): a mocked remote state
+        parallelism (int): the parallelism.
+        lock_timeout (float): the lock timeout.
+    """
+    with pytest.raises(MatchaInputError):
+        destroy(parallelism=parallelism, terraform_lock_timeout=lock_timeout)
+
+    mock_provisioned_remote_state.use_lock.assert_not_called()
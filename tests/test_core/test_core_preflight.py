@@ -0,0 +1,96 @@
+"""Tests for core._preflight."""
+import threading
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from matcha_ml.core._preflight import PREFLIGHT_MAX_WORKERS, run_provision_preflight
+from matcha_ml.errors import MatchaError, MatchaInputError, MatchaPermissionError
+
+PREFLIGHT_STUB = "matcha_ml.core._preflight"
+
+
+@pytest.fixture
+def mock_remote_state_manager() -> Iterator[MagicMock]:
+    """Mock a remote state manager for a project without any remote state.
+
+    Yields:
+        MagicMock: the mocked RemoteStateManager instance.
+    """
+    remote_state_manager = MagicMock()
+    remote_state_manager.is_state_stale.return_value = False
+    remote_state_manager.is_state_provisioned.return_value = False
+    yield remote_state_manager
+
+
+def test_preflight_passes(mock_remote_state_manager: MagicMock):
+    """Test that the preflight result is clean for valid input and no remote state.
+
+    Args:
+        mock_remote_state_manager (MagicMock): the mocked RemoteStateManager instance.
+    """
+    result = run_provision_preflight("ukwest", "matcha", mock_remote_state_manager)
+
+    assert not result.is_remote_state_stale
+    assert not result.is_remote_state_provisioned
+    assert result.input_errors == []
+    result.raise_for_input_errors()
+
+
+def test_preflight_runs_checks_concurrently(mock_remote_state_manager: MagicMock):
+    """Test that the checks run at the same time, each check waits for the others to start.
+
+    Args:
+        mock_remote_state_manager (MagicMock): the mocked RemoteStateManager instance.
+    """
+    barrier = threading.Barrier(PREFLIGHT_MAX_WORKERS, timeout=5)
+
+    def _wait_for_other_checks(*args: object) -> bool:
+        barrier.wait()
+        return True
+
+    mock_remote_state_manager.is_state_stale.side_effect = _wait_for_other_checks
+
+    with patch(
+        f"{PREFLIGHT_STUB}.is_valid_prefix", side_effect=_wait_for_other_checks
+    ), patch(f"{PREFLIGHT_STUB}.region_validation", side_effect=_wait_for_other_checks):
+        result = run_provision_preflight("ukwest", "matcha", mock_remote_state_manager)
+
+    assert result.is_remote_state_stale
+    assert not result.is_remote_state_provisioned
+    mock_remote_state_manager.is_state_provisioned.assert_not_called()
+
+
+def test_preflight_collects_input_errors(mock_remote_state_manager: MagicMock):
+    """Test that invalid prefix and region are both reported, prefix first.
+
+    Args:
+        mock_remote_state_manager (MagicMock): the mocked RemoteStateManager instance.
+    """
+    mock_remote_state_manager.is_state_provisioned.return_value = True
+
+    result = run_provision_preflight("mars", "rand", mock_remote_state_manager)
+
+    assert result.is_remote_state_provisioned
+    assert [str(e) for e in result.input_errors] == [
+        "You entered a resource group name prefix that has been used before, the prefix must be unique.",
+        "A region named 'mars' does not exist.",
+    ]
+    with pytest.raises(MatchaInputError):
+        result.raise_for_input_errors()
+
+
+def test_preflight_raises_other_errors(mock_remote_state_manager: MagicMock):
+    """Test that errors other than input errors are raised straight away.
+
+    Args:
+        mock_remote_state_manager (MagicMock): the mocked RemoteStateManager instance.
+    """
+    with patch(
+        f"{PREFLIGHT_STUB}.region_validation",
+        side_effect=MatchaPermissionError("no permissions"),
+    ), pytest.raises(MatchaError) as err:
+        run_provision_preflight("ukwest", "matcha", mock_remote_state_manager)
+
+    assert str(err.value) == "no permissions"
@@ -1,7 +1,8 @@
 """Test for testing BaseRuner class."""
+import asyncio
 import os
 from unittest import mock
-from unittest.mock import MagicMock
+from unittest.mock import ANY, AsyncMock, MagicMock
 
 import pytest
 import typer
@@ -9,7 +10,7 @@ from _pytest.capture import SysCapture
 
 from matcha_ml.errors import MatchaTerraformError
 from matcha_ml.runners.base_runner import BaseRunner
-from matcha_ml.services.terraform_service import TerraformResult
+from matcha_ml.services.terraform_service import TerraformPlan, TerraformResult
 
 CLASS_STUB = "matcha_ml.runners.base_runner.BaseRunner"
 
@@ -91,8 +92,9 @@ def test_initialize_terraform(capsys: SysCapture):
     """
     template_runner = BaseRunner()
     template_runner.tf_state_dir = MagicMock()
+    template_runner.tfs.init = MagicMock(return_value=TerraformResult(0, "", ""))
 
-    with mock.patch.object(template_runner.tf_state_dir, "exists", return_value=True):
+    with mock.patch.object(template_runner.tfs, "is_initialized", return_value=True):
         expected = "has already been initialized"
 
         template_runner._initialize_terraform()
@@ -100,15 +102,37 @@ def test_initialize_terraform(capsys: SysCapture):
         captured = capsys.readouterr()
 
         assert expected in captured.out
+        template_runner.tfs.init.assert_not_called()
 
-    with mock.patch.object(template_runner.tf_state_dir, "exists", return_value=False):
-        template_runner.tfs.init = MagicMock(return_value=TerraformResult(0, "", ""))
+    with mock.patch.object(
+        template_runner.tfs, "is_initialized", return_value=False
+    ), mock.patch.object(template_runner.tf_state_dir, "exists", return_value=False):
         expected = " initialized!"
         template_runner._initialize_terraform()
 
         captured = capsys.readouterr()
 
         assert expected in captured.out
+        template_runner.tfs.init.assert_called_once()
+
+
+def test_initialize_terraform_again_when_templates_changed(capsys: SysCapture):
+    """Test that Terraform is initialized again when the .terraform folder exists but the fingerprint does not match.
+
+    Args:
+        capsys (SysCapture): fixture to capture stdout and stderr
+    """
+    template_runner = BaseRunner()
+    template_runner.tf_state_dir = MagicMock()
+    template_runner.tfs.init = MagicMock(return_value=TerraformResult(0, "", ""))
+
+    with mock.patch.object(
+        template_runner.tfs, "is_initialized", return_value=False
+    ), mock.patch.object(template_runner.tf_state_dir, "exists", return_value=True):
+        template_runner._initialize_terraform()
+
+    assert "have changed since they were initialized" in capsys.readouterr().out
+    template_runner.tfs.init.assert_called_once()
 
 
 def test_apply_terraform(capsys: SysCapture):
@@ -118,15 +142,22 @@ def test_apply_terraform(capsys: SysCapture):
         capsys (SysCapture): fixture to capture stdout and stderr
     """
     template_runner = BaseRunner()
-    template_runner.tfs.apply = MagicMock(return_value=TerraformResult(0, "", ""))
+    template_runner.tfs.plan = MagicMock(
+        return_value=TerraformPlan(TerraformResult(0, "", ""), to_add=2, to_destroy=1)
+    )
+    template_runner.tfs.apply_async = AsyncMock(return_value=TerraformResult(0, "", ""))
     expected = "Remote State resources have been provisioned!"
 
     template_runner._apply_terraform(msg="Remote State")
     captured = capsys.readouterr()
 
     assert expected in captured.out
+    assert "2 to add" in captured.out and "1 to destroy" in captured.out
+    template_runner.tfs.apply_async.assert_awaited_once_with(
+        template_runner.tfs.plan_path, on_event=ANY
+    )
 
-    template_runner.tfs.apply = MagicMock(
+    template_runner.tfs.apply_async = AsyncMock(
         return_value=TerraformResult(1, "", "Apply failed")
     )
 
@@ -138,6 +169,40 @@ def test_apply_terraform(capsys: SysCapture):
         )
 
 
+def test_apply_terraform_skips_apply_without_changes(capsys: SysCapture):
+    """Test that a plan without changes is not applied, and its plan file is removed.
+
+    Args:
+        capsys (SysCapture): fixture to capture stdout and stderr
+    """
+    template_runner = BaseRunner()
+    template_runner.tfs.plan = MagicMock(
+        return_value=TerraformPlan(TerraformResult(0, "", ""))
+    )
+    template_runner.tfs.apply_async = AsyncMock()
+    template_runner.tfs.discard_plan = MagicMock()
+
+    template_runner._apply_terraform(msg="Matcha")
+
+    assert "nothing to apply" in capsys.readouterr().out
+    template_runner.tfs.apply_async.assert_not_called()
+    template_runner.tfs.discard_plan.assert_called_once()
+
+
+def test_apply_terraform_raises_when_plan_fails():
+    """Test that a failed plan is reported, and nothing is applied."""
+    template_runner = BaseRunner()
+    template_runner.tfs.plan = MagicMock(
+        return_value=TerraformPlan(TerraformResult(1, "", "Plan failed"))
+    )
+    template_runner.tfs.apply_async = AsyncMock()
+
+    with pytest.raises(MatchaTerraformError, match="Plan failed"):
+        template_runner._apply_terraform()
+
+    template_runner.tfs.apply_async.assert_not_called()
+
+
 def test_destroy_terraform(capsys: SysCapture):
     """Test if terraform exception is captured when performing deprovision.
 
@@ -146,7 +211,9 @@ def test_destroy_terraform(capsys: SysCapture):
         template_runner (AzureTemplateRunner): a AzureTemplateRunner object instance
     """
     template_runner = BaseRunner()
-    template_runner.tfs.destroy = MagicMock(return_value=TerraformResult(0, "", ""))
+    template_runner.tfs.destroy_async = AsyncMock(
+        return_value=TerraformResult(0, "", "")
+    )
 
     expected = "Destroying your resources"
 
@@ -154,11 +221,11 @@ def test_destroy_terraform(capsys: SysCapture):
 
     captured = capsys.readouterr()
 
-    template_runner.tfs.destroy.assert_called()
+    template_runner.tfs.destroy_async.assert_awaited_once_with(on_event=ANY)
 
     assert expected in captured.out
 
-    template_runner.tfs.destroy = MagicMock(
+    template_runner.tfs.destroy_async = AsyncMock(
         return_value=TerraformResult(1, "", "Init failed")
     )
 
@@ -168,3 +235,26 @@ def test_destroy_terraform(capsys: SysCapture):
             str(exc_info.value)
             == "Terraform failed because of the following error: 'Destroy failed'."
         )
+
+
+def test_run_with_status_updates_stops_the_updates_with_the_command():
+    """Test that the facts printed while a command runs stop once the command is done."""
+
+    async def command() -> TerraformResult:
+        await asyncio.sleep(0)
+        return TerraformResult(0, "", "")
+
+    status_update_spinners = []
+
+    async def status_update(spinner: MagicMock) -> None:
+        status_update_spinners.append(spinner)
+        await asyncio.sleep(60)
+
+    spinner = MagicMock()
+    with mock.patch(
+        "matcha_ml.runners.base_runner.terraform_status_update", status_update
+    ):
+        result = asyncio.run(BaseRunner._run_with_status_updates(command(), spinner))
+
+    assert result.return_code == 0
+    assert status_update_spinners == [spinner]
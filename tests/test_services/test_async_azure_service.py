@@ -0,0 +1,196 @@
+"""Tests for the asynchronous Azure Service, run against an in-memory transport."""
+import asyncio
+import threading
+from typing import Any
+
+import pytest
+from azure.core.exceptions import ClientAuthenticationError
+from azure.core.pipeline.transport import AsyncHttpTransport
+from azure.mgmt.confluent.models._confluent_management_client_enums import (  # type: ignore [import]
+    ProvisionState,
+)
+
+from matcha_ml.errors import MatchaAuthenticationError, MatchaPermissionError
+from matcha_ml.services import AsyncAzureClient
+from matcha_ml.services.async_azure_service import run_blocking
+from matcha_ml.services.azure_service import ROLE_ID_MAPPING
+
+
+def test_create_authenticates_client(
+    fake_azure_transport: AsyncHttpTransport, fake_async_credential: Any
+):
+    """Test that creating a client authenticates it, resolves the subscription and checks the user's roles.
+
+    Args:
+        fake_azure_transport (AsyncHttpTransport): the in-memory Azure transport.
+        fake_async_credential (Any): the fake credential.
+    """
+
+    async def run() -> AsyncAzureClient:
+        async with await AsyncAzureClient.create(
+            credential=fake_async_credential, transport=fake_azure_transport
+        ) as client:
+            return client
+
+    client = asyncio.run(run())
+
+    assert client.authenticated
+    assert client.has_permissions
+    assert client.subscription_id == "fake-subscription-id"
+
+
+def test_create_raises_when_roles_are_missing(
+    fake_azure_transport: Any, fake_async_credential: Any
+):
+    """Test that an error is raised when the user has none of the accepted role configurations.
+
+    Args:
+        fake_azure_transport (Any): the in-memory Azure transport.
+        fake_async_credential (Any): the fake credential.
+    """
+    fake_azure_transport.role_ids = [ROLE_ID_MAPPING["Contributor"]]
+
+    with pytest.raises(MatchaPermissionError):
+        asyncio.run(
+            AsyncAzureClient.create(
+                credential=fake_async_credential, transport=fake_azure_transport
+            )
+        )
+
+
+def test_create_raises_when_no_access_token_is_received(
+    fake_azure_transport: AsyncHttpTransport, fake_async_credential: Any
+):
+    """Test that an authentication error is raised when the credential can't get an access token.
+
+    Args:
+        fake_azure_transport (AsyncHttpTransport): the in-memory Azure transport.
+        fake_async_credential (Any): the fake credential.
+    """
+
+    async def get_token(*scopes: str, **kwargs: Any) -> None:
+        raise ClientAuthenticationError()
+
+    fake_async_credential.get_token = get_token
+
+    with pytest.raises(MatchaAuthenticationError):
+        asyncio.run(
+            AsyncAzureClient.create(
+                credential=fake_async_credential, transport=fake_azure_transport
+            )
+        )
+
+
+def test_resource_group_lookups_run_concurrently(
+    fake_azure_transport: Any, fake_async_credential: Any
+):
+    """Test that resource group lookups awaited together are in flight at the same time.
+
+    Args:
+        fake_azure_transport (Any): the in-memory Azure transport.
+        fake_async_credential (Any): the fake credential.
+    """
+    fake_azure_transport.resource_groups = {"rg-0", "rg-2", "rg-4"}
+    names = [f"rg-{i}" for i in range(6)]
+
+    async def run() -> Any:
+        async with await AsyncAzureClient.create(
+            credential=fake_async_credential, transport=fake_azure_transport
+        ) as client:
+            fake_azure_transport.max_in_flight = 0
+            return await asyncio.gather(
+                *(client.resource_group_exists(name) for name in names)
+            )
+
+    exists = asyncio.run(run())
+
+    assert exists == [True, False, True, False, True, False]
+    assert fake_azure_transport.max_in_flight == len(names)
+
+
+def test_resource_group_state_is_cached(
+    fake_azure_transport: Any, fake_async_credential: Any
+):
+    """Test that a resource group is only fetched once per client.
+
+    Args:
+        fake_azure_transport (Any): the in-memory Azure transport.
+        fake_async_credential (Any): the fake credential.
+    """
+
+    async def run() -> Any:
+        async with await AsyncAzureClient.create(
+            credential=fake_async_credential, transport=fake_azure_transport
+        ) as client:
+            await client.resource_group_state("test-resources")
+            return await client.resource_group_state("test-resources")
+
+    assert asyncio.run(run()) == ProvisionState.SUCCEEDED
+    assert (
+        fake_azure_transport.requests.count(
+            ("GET", "/subscriptions/fake-subscription-id/resourcegroups/test-resources")
+        )
+        == 1
+    )
+
+
+def test_fetch_regions_uses_metadata_cache(
+    fake_azure_transport: Any, fake_async_credential: Any
+):
+    """Test that regions fetched by one client are read from the metadata cache by the next.
+
+    Args:
+        fake_azure_transport (Any): the in-memory Azure transport.
+        fake_async_credential (Any): the fake credential.
+    """
+
+    async def run() -> Any:
+        regions = []
+        for _ in range(2):
+            async with await AsyncAzureClient.create(
+                credential=fake_async_credential, transport=fake_azure_transport
+            ) as client:
+                regions.append(await client.fetch_regions())
+        return regions
+
+    assert asyncio.run(run()) == [{"ukwest", "uksouth"}] * 2
+    assert (
+        fake_azure_transport.requests.count(
+            ("GET", "/subscriptions/fake-subscription-id/locations")
+        )
+        == 1
+    )
+
+
+def test_fetch_connection_string(
+    fake_azure_transport: AsyncHttpTransport, fake_async_credential: Any
+):
+    """Test that the connection string is built from the storage account access key.
+
+    Args:
+        fake_azure_transport (AsyncHttpTransport): the in-memory Azure transport.
+        fake_async_credential (Any): the fake credential.
+    """
+
+    async def run() -> str:
+        async with await AsyncAzureClient.create(
+            credential=fake_async_credential, transport=fake_azure_transport
+        ) as client:
+            return await client.fetch_connection_string("test-resources", "account")
+
+    connection_string = asyncio.run(run())
+
+    assert "AccountName=account;" in connection_string
+    assert connection_string.endswith("AccountKey=ZmFrZS1hY2Nlc3Mta2V5")
+
+
+def test_run_blocking_runs_off_the_event_loop_thread():
+    """Test that a blocking function runs in another thread than the event loop, and its result is returned."""
+
+    async def run() -> Any:
+        return await run_blocking(lambda x: (x, threading.get_ident()), "result")
+
+    result, thread_id = asyncio.run(run())
+
+    assert result == "result"
+    assert thread_id != threading.get_ident()
@@ -1,18 +1,107 @@
 """Tests for the Azure Service."""
-from unittest.mock import MagicMock
+import threading
+import time
+from typing import Iterator
+from unittest.mock import MagicMock, patch
 
+import jwt
 import pytest
+from azure.core.credentials import AccessToken
+from azure.core.exceptions import ResourceNotFoundError
 from azure.mgmt.confluent.models._confluent_management_client_enums import (  # type: ignore [import]
     ProvisionState,
 )
+from azure.mgmt.resource.resources.models import (
+    ResourceGroup,
+    ResourceGroupProperties,
+)
 
 from matcha_ml.errors import MatchaPermissionError
 from matcha_ml.services import AzureClient
 from matcha_ml.services.azure_service import (
     ACCEPTED_ROLE_CONFIGURATIONS,
     ROLE_ID_MAPPING,
+    AzureSessionRegistry,
 )
 
+# Keep references to the unmocked methods, as the autouse mocked_azure_client fixture patches them
+_fetch_regions = AzureClient.fetch_regions
+_fetch_user_roles = AzureClient._fetch_user_roles
+_fetch_resource_group = AzureClient.fetch_resource_group
+_fetch_resource_groups = AzureClient.fetch_resource_groups
+_resource_group_state = AzureClient.resource_group_state
+
+
+@pytest.fixture
+def mocked_authentication() -> Iterator[MagicMock]:
+    """Mock authentication such that a valid access token is received.
+
+    Yields:
+        MagicMock: the mocked _check_authentication method.
+    """
+
+    def _authenticate(client: AzureClient) -> bool:
+        client._credential = MagicMock()
+        client._client = MagicMock()
+        client._access_token = AccessToken(
+            jwt.encode({"oid": "principal"}, "a-secret-key-for-testing-purposes-only"),
+            int(time.time()) + 3600,
+        )
+        return True
+
+    auth = MagicMock(side_effect=_authenticate)
+
+    def _check_authentication(client: AzureClient) -> bool:
+        return bool(auth(client))
+
+    # Reset the calls made when constructing the autouse mocked_azure_client
+    AzureClient._subscription_id.reset_mock()
+    AzureClient._fetch_user_roles.reset_mock()
+
+    with patch.object(AzureClient, "_check_authentication", _check_authentication):
+        yield auth
+
+
+@pytest.fixture
+def mocked_resource_client(mocked_azure_client: AzureClient) -> Iterator[MagicMock]:
+    """Mock the resource management client of a subscription containing a single resource group.
+
+    The resource group lookups of the AzureClient are left unmocked.
+
+    Args:
+        mocked_azure_client (AzureClient): the mocked AzureClient
+
+    Yields:
+        MagicMock: the mocked resource management client.
+    """
+    resource_groups = {
+        "rand-prod-resources": ResourceGroup(
+            location="ukwest",
+            properties=ResourceGroupProperties(),
+        )
+    }
+    resource_groups["rand-prod-resources"].name = "rand-prod-resources"
+    resource_groups["rand-prod-resources"].properties.provisioning_state = "Succeeded"
+
+    def _get(name: str) -> ResourceGroup:
+        if name not in resource_groups:
+            raise ResourceNotFoundError(f"Resource group '{name}' could not be found.")
+        return resource_groups[name]
+
+    resource_client = MagicMock()
+    resource_client.resource_groups.get.side_effect = _get
+    resource_client.resource_groups.list.return_value = list(resource_groups.values())
+    mocked_azure_client._resource_client = resource_client
+
+    with patch.object(
+        AzureClient, "fetch_resource_group", _fetch_resource_group
+    ), patch.object(
+        AzureClient, "fetch_resource_groups", _fetch_resource_groups
+    ), patch.object(
+        AzureClient, "resource_group_state", _resource_group_state
+    ):
+        yield resource_client
+
 
 def test_is_valid_region_valid_input(mocked_azure_client: AzureClient):
     """Test that the is_valid_region function produces the correct result with valid input.
@@ -34,28 +123,30 @@ def test_is_valid_region_invalid_input(mocked_azure_client: AzureClient):
     assert not mocked_azure_client.is_valid_region("random_region")
 
 
-def test_is_valid_resource_group_valid_input(mocked_azure_client: AzureClient):
+def test_is_valid_resource_group_valid_input(
+    mocked_azure_client: AzureClient, mocked_resource_client: MagicMock
+):
     """Test that the is_valid_resource_group function produces the correct result with valid input.
 
     Args:
         mocked_azure_client (AzureClient): the mocked AzureClient
+        mocked_resource_client (MagicMock): the mocked resource management client
     """
-    mocked_azure_client.fetch_resource_group_names = MagicMock(
-        return_value=({"rand-prod-resources"})
-    )
     assert mocked_azure_client.is_valid_resource_group("example")
+    mocked_resource_client.resource_groups.list.assert_not_called()
 
 
-def test_is_valid_resource_group_invalid_input(mocked_azure_client: AzureClient):
+def test_is_valid_resource_group_invalid_input(
+    mocked_azure_client: AzureClient, mocked_resource_client: MagicMock
+):
     """Test that the is_valid_resource_group function produces the correct result with invalid input.
 
     Args:
         mocked_azure_client (AzureClient): the mocked AzureClient
+        mocked_resource_client (MagicMock): the mocked resource management client
     """
-    mocked_azure_client.fetch_resource_group_names = MagicMock(
-        return_value=({"rand-prod-resources"})
-    )
     assert not mocked_azure_client.is_valid_resource_group("rand-prod")
+    mocked_resource_client.resource_groups.list.assert_not_called()
 
 
 def test_check_required_role_assignments_expected(mocked_azure_client: AzureClient):
@@ -141,3 +232,226 @@ def test_resource_group_exists_returns_false_when_resource_group_does_not_exist(
     """
     mocked_azure_client.resource_group_state.return_value = None
     assert not mocked_azure_client.resource_group_exists("test-resources")
+
+
+def test_azure_client_authenticates_once(mocked_authentication: MagicMock):
+    """Test that multiple Azure clients share a single authenticated session.
+
+    Args:
+        mocked_authentication (MagicMock): the mocked authentication
+    """
+    clients = [AzureClient() for _ in range(4)]
+
+    assert mocked_authentication.call_count == 1
+    assert AzureClient._subscription_id.call_count == 1
+    assert AzureClient._fetch_user_roles.call_count == 1
+    assert all(client.subscription_id == "id" for client in clients)
+    assert all(client.has_permissions for client in clients)
+
+
+def test_azure_client_authenticates_once_when_concurrent(
+    mocked_authentication: MagicMock,
+):
+    """Test that clients created concurrently still authenticate only once.
+
+    Args:
+        mocked_authentication (MagicMock): the mocked authentication
+    """
+    threads = [threading.Thread(target=AzureClient) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert mocked_authentication.call_count == 1
+
+
+def test_azure_client_reauthenticates_when_token_expired(
+    mocked_authentication: MagicMock,
+):
+    """Test that an expired session is replaced by a freshly authenticated one.
+
+    Args:
+        mocked_authentication (MagicMock): the mocked authentication
+    """
+    client = AzureClient()
+    client._access_token = AccessToken("token", int(time.time()))
+    AzureSessionRegistry.get("AzureCliCredential").access_token = client._access_token
+    authentications = mocked_authentication.call_count
+
+    _ = AzureClient()
+
+    assert mocked_authentication.call_count == authentications + 1
+
+
+def test_azure_client_session_keyed_by_subscription(mocked_authentication: MagicMock):
+    """Test that requesting a different subscription creates a new session.
+
+    Args:
+        mocked_authentication (MagicMock): the mocked authentication
+    """
+    with patch.object(
+        AzureClient, "_check_required_role_assignments", return_value=True
+    ):
+        default_client = AzureClient()
+        same_client = AzureClient(subscription_id="id")
+        other_client = AzureClient(subscription_id="other-id")
+
+    # one session per subscription
+    assert mocked_authentication.call_count == len(
+        {default_client.subscription_id, other_client.subscription_id}
+    )
+    assert default_client.subscription_id == same_client.subscription_id == "id"
+    assert other_client.subscription_id == "other-id"
+
+
+def test_role_check_is_read_from_metadata_cache(mocked_authentication: MagicMock):
+    """Test that a successful role check is reused by a later process.
+
+    Args:
+        mocked_authentication (MagicMock): the mocked authentication
+    """
+    _ = AzureClient()
+    authentications = mocked_authentication.call_count
+    AzureSessionRegistry.clear()  # simulate a new process
+    client = AzureClient()
+
+    # the new process authenticates again, but does not check the roles again
+    assert mocked_authentication.call_count == authentications + 1
+    assert AzureClient._fetch_user_roles.call_count == 1
+    assert client.has_permissions
+
+
+def test_failed_role_check_is_not_cached(mocked_authentication: MagicMock):
+    """Test that a failed role check is not stored in the metadata cache.
+
+    Args:
+        mocked_authentication (MagicMock): the mocked authentication
+    """
+    with patch.object(AzureClient, "_fetch_user_roles", return_value=[]):
+        with pytest.raises(MatchaPermissionError):
+            AzureClient()
+
+        with pytest.raises(MatchaPermissionError):
+            AzureClient()
+
+
+def test_fetch_regions_is_read_from_metadata_cache(mocked_azure_client: AzureClient):
+    """Test that regions fetched by one client are reused by another without calling Azure.
+
+    Args:
+        mocked_azure_client (AzureClient): the mocked AzureClient
+    """
+    mocked_azure_client._client = MagicMock()
+    mocked_azure_client._client.subscriptions.list_locations.return_value = [
+        MagicMock(),
+        MagicMock(),
+    ]
+    mocked_azure_client._client.subscriptions.list_locations.return_value[
+        0
+    ].name = "ukwest"
+    mocked_azure_client._client.subscriptions.list_locations.return_value[
+        1
+    ].name = "uksouth"
+
+    with patch.object(AzureClient, "fetch_regions", _fetch_regions):
+        assert mocked_azure_client.fetch_regions() == {"ukwest", "uksouth"}
+
+        other_client = AzureClient()
+        other_client._client = MagicMock()
+
+        assert other_client.fetch_regions() == {"ukwest", "uksouth"}
+        other_client._client.subscriptions.list_locations.assert_not_called()
+
+
+def test_check_required_role_assignments_fetches_roles_once(
+    mocked_azure_client: AzureClient,
+):
+    """Test that the role assignments are fetched a single time for all accepted role configurations.
+
+    Args:
+        mocked_azure_client (AzureClient): the mocked AzureClient
+    """
+    mocked_azure_client._fetch_user_roles.reset_mock()
+    mocked_azure_client._fetch_user_roles.return_value = [
+        f"/subscriptions/id/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING['Contributor']}",
+        f"/subscriptions/id/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING['User Access Administrator']}",
+    ]
+
+    assert mocked_azure_client._check_required_role_assignments()
+    assert mocked_azure_client._fetch_user_roles.call_count == 1
+
+    # Set back correct roles such that this mocked client can be reused
+    mocked_azure_client._fetch_user_roles.return_value = [
+        f"/subscriptions/id/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING['Owner']}",
+        f"/subscriptions/id/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING['Contributor']}",
+    ]
+
+
+def test_fetch_user_roles_filters_by_principal(mocked_azure_client: AzureClient):
+    """Test that role assignments are requested for the authenticated user only.
+
+    Args:
+        mocked_azure_client (AzureClient): the mocked AzureClient
+    """
+    owner_role = f"/subscriptions/id/providers/Microsoft.Authorization/roleDefinitions/{ROLE_ID_MAPPING['Owner']}"
+    mocked_azure_client._credential = MagicMock()
+
+    with patch.object(
+        AzureClient, "_get_principal_id", return_value="principal"
+    ), patch(
+        "matcha_ml.services.azure_service.AuthorizationManagementClient"
+    ) as authorization_client:
+        list_for_subscription = (
+            authorization_client.return_value.role_assignments.list_for_subscription
+        )
+        list_for_subscription.return_value = [
+            MagicMock(principal_id="principal", role_definition_id=owner_role),
+            MagicMock(principal_id="principal", role_definition_id=owner_role),
+        ]
+
+        roles = _fetch_user_roles(mocked_azure_client)
+
+    list_for_subscription.assert_called_once_with(filter="principalId eq 'principal'")
+    assert roles == {owner_role}
+
+
+def test_resource_group_state_uses_point_lookup(
+    mocked_azure_client: AzureClient, mocked_resource_client: MagicMock
+):
+    """Test that the state of a single resource group is fetched without listing the subscription, and is cached.
+
+    Args:
+        mocked_azure_client (AzureClient): the mocked AzureClient
+        mocked_resource_client (MagicMock): the mocked resource management client
+    """
+    existing_group, missing_group = "rand-prod-resources", "missing-resources"
+    for _ in range(2):
+        assert (
+            mocked_azure_client.resource_group_state(existing_group)
+            == ProvisionState.SUCCEEDED
+        )
+        assert mocked_azure_client.resource_group_state(missing_group) is None
+
+    # a single lookup per resource group, missing or not
+    assert mocked_resource_client.resource_groups.get.call_count == len(
+        {existing_group, missing_group}
+    )
+    mocked_resource_client.resource_groups.list.assert_not_called()
+
+
+def test_resource_group_lookup_is_answered_by_listing(
+    mocked_azure_client: AzureClient, mocked_resource_client: MagicMock
+):
+    """Test that once the subscription has been listed, single lookups are answered from the cache.
+
+    Args:
+        mocked_azure_client (AzureClient): the mocked AzureClient
+        mocked_resource_client (MagicMock): the mocked resource management client
+    """
+    assert set(mocked_azure_client.fetch_resource_groups()) == {"rand-prod-resources"}
+    assert mocked_azure_client.fetch_resource_group("rand-prod-resources") is not None
+    assert mocked_azure_client.fetch_resource_group("missing-resources") is None
+
+    mocked_resource_client.resource_groups.list.assert_called_once()
+    mocked_resource_client.resource_groups.get.assert_not_called()
@@ -0,0 +1,174 @@
+"""Tests for the shared HTTP transport."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from azure.core import PipelineClient
+from azure.core.rest import HttpRequest
+
+from matcha_ml.services import AzureClient
+from matcha_ml.services.http_transport_service import (
+    DEFAULT_POOL_SIZE,
+    ConnectionStats,
+    HttpPoolConfig,
+    SharedHttpTransport,
+)
+from matcha_ml.storage import AzureStorage
+
+# Keep a reference to the unmocked method, as the autouse mocked_azure_client fixture patches it
+_fetch_storage_access_key = AzureClient.fetch_storage_access_key
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    """Answers every GET request with an empty JSON object, keeping the connection open."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        """Answer a GET request."""
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        """Silence request logging.
+
+        Args:
+            format (str): the message format.
+            *args (object): the message arguments.
+        """
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_transport() -> Iterator[None]:
+    """Start and end every test with a fresh shared transport.
+
+    Yields:
+        None: control is returned to the test.
+    """
+    SharedHttpTransport.reset()
+    yield
+    SharedHttpTransport.reset()
+
+
+@pytest.fixture
+def local_server_url() -> Iterator[str]:
+    """A fixture for a local HTTP server that supports keep-alive connections.
+
+    Yields:
+        str: the server's base URL.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    server.shutdown()
+    server.server_close()
+
+
+def _send_requests(base_url: str, clients: int, requests_per_client: int) -> None:
+    """Send requests from several pipeline clients that use the shared transport.
+
+    Args:
+        base_url (str): the server's base URL.
+        clients (int): the number of clients.
+        requests_per_client (int): the number of requests each client sends.
+    """
+    for _ in range(clients):
+        client = PipelineClient(base_url, transport=SharedHttpTransport.get())
+        for _ in range(requests_per_client):
+            response = client.send_request(HttpRequest("GET", f"{base_url}/"))
+            response.raise_for_status()
+
+
+def test_connection_is_reused_across_clients(local_server_url: str):
+    """Test that requests from different clients to the same host share one connection.
+
+    Args:
+        local_server_url (str): the local server's base URL.
+    """
+    _send_requests(local_server_url, clients=3, requests_per_client=2)
+
+    assert SharedHttpTransport.connection_stats() == ConnectionStats(
+        connections_opened=1, requests_sent=6
+    )
+
+
+def test_connection_is_not_reused_without_keep_alive(local_server_url: str):
+    """Test that every request opens a new connection when keep-alive is disabled.
+
+    Args:
+        local_server_url (str): the local server's base URL.
+    """
+    SharedHttpTransport.configure(HttpPoolConfig(keep_alive=False))
+
+    _send_requests(local_server_url, clients=3, requests_per_client=2)
+
+    assert SharedHttpTransport.connection_stats() == ConnectionStats(
+        connections_opened=6, requests_sent=6
+    )
+
+
+def test_configure_sets_pool_size():
+    """Test that the configured pool size is used by the session's connection pools."""
+    pool_size = DEFAULT_POOL_SIZE + 1
+    SharedHttpTransport.configure(HttpPoolConfig(pool_size=pool_size))
+
+    adapter = SharedHttpTransport.session().get_adapter("https://management.azure.com")
+
+    assert SharedHttpTransport.config().pool_size == pool_size
+    assert adapter._pool_maxsize == pool_size
+
+
+def test_configure_replaces_transport():
+    """Test that reconfiguring the pool closes the previous session and transport."""
+    transport = SharedHttpTransport.get()
+
+    SharedHttpTransport.configure(HttpPoolConfig(pool_size=3))
+
+    assert SharedHttpTransport.get() is not transport
+    assert SharedHttpTransport.get() is SharedHttpTransport.get()
+
+
+def test_closing_a_client_keeps_the_shared_session_open(local_server_url: str):
+    """Test that a client leaving its context does not close connections that other clients use.
+
+    Args:
+        local_server_url (str): the local server's base URL.
+    """
+    with PipelineClient(local_server_url, transport=SharedHttpTransport.get()):
+        pass
+
+    _send_requests(local_server_url, clients=1, requests_per_client=1)
+
+    assert SharedHttpTransport.connection_stats().requests_sent == 1
+
+
+def test_azure_clients_share_the_transport():
+    """Test that the management clients and the blob service client are given the same transport."""
+    with patch(
+        "matcha_ml.services.azure_service.StorageManagementClient"
+    ) as storage_management_client, patch(
+        "matcha_ml.storage.azure_storage.BlobServiceClient.from_connection_string"
+    ) as from_connection_string, patch(
+        "matcha_ml.storage.azure_storage.AzureClient.fetch_connection_string",
+        return_value="conn-str",
+    ), patch(
+        "matcha_ml.storage.azure_storage.AzureClient.resource_group_exists",
+        return_value=True,
+    ):
+        az_client = AzureClient()
+        az_client._credential = MagicMock()
+        _fetch_storage_access_key(az_client, "test-resources", "account")
+        AzureStorage("account", "test-resources")
+
+    transport = SharedHttpTransport.get()
+    assert storage_management_client.call_args.kwargs["transport"] is transport
+    assert from_connection_string.call_args.kwargs["transport"] is transport
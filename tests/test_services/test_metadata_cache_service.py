@@ -0,0 +1,97 @@
+"""Tests for the Metadata Cache Service."""
+import os
+from unittest.mock import patch
+
+from matcha_ml.services.metadata_cache_service import MetadataCache
+
+
+def test_get_returns_value_that_was_set(mocked_metadata_cache_path: str):
+    """Test that a value written to the cache can be read back and is persisted to disk.
+
+    Args:
+        mocked_metadata_cache_path (str): the path to the metadata cache file used in tests.
+    """
+    MetadataCache().set("azure/regions/id", ["uksouth", "ukwest"])
+
+    assert os.path.exists(mocked_metadata_cache_path)
+    assert MetadataCache().get("azure/regions/id") == ["uksouth", "ukwest"]
+
+
+def test_get_returns_none_for_missing_key():
+    """Test that None is returned when the key is not in the cache."""
+    assert MetadataCache().get("azure/regions/id") is None
+
+
+def test_get_returns_none_when_expired():
+    """Test that an expired entry is treated as missing."""
+    cache = MetadataCache(ttl=60)
+
+    with patch("matcha_ml.services.metadata_cache_service.time.time") as mock_time:
+        mock_time.return_value = 1000.0
+        cache.set("azure/regions/id", ["uksouth"])
+
+        mock_time.return_value = 1059.0
+        assert cache.get("azure/regions/id") == ["uksouth"]
+
+        mock_time.return_value = 1060.0
+        assert cache.get("azure/regions/id") is None
+
+
+def test_get_returns_none_when_file_is_corrupt(mocked_metadata_cache_path: str):
+    """Test that an unreadable cache file is treated as an empty cache.
+
+    Args:
+        mocked_metadata_cache_path (str): the path to the metadata cache file used in tests.
+    """
+    os.makedirs(os.path.dirname(mocked_metadata_cache_path), exist_ok=True)
+    with open(mocked_metadata_cache_path, "w") as f:
+        f.write("{not: valid: yaml")
+
+    assert MetadataCache().get("azure/regions/id") is None
+
+
+def test_invalidate_key():
+    """Test that invalidating a key only removes that entry."""
+    cache = MetadataCache()
+    cache.set("azure/regions/id", ["uksouth"])
+    cache.set("azure/subscription_id/principal", "id")
+
+    cache.invalidate("azure/regions/id")
+
+    assert cache.get("azure/regions/id") is None
+    assert cache.get("azure/subscription_id/principal") == "id"
+
+
+def test_invalidate_all(mocked_metadata_cache_path: str):
+    """Test that invalidating without a key removes the cache file.
+
+    Args:
+        mocked_metadata_cache_path (str): the path to the metadata cache file used in tests.
+    """
+    cache = MetadataCache()
+    cache.set("azure/regions/id", ["uksouth"])
+
+    cache.invalidate()
+
+    assert not os.path.exists(mocked_metadata_cache_path)
+    assert cache.get("azure/regions/id") is None
+
+
+def test_invalidate_all_when_the_file_was_already_removed(
+    mocked_metadata_cache_path: str,
+):
+    """Test that clearing a cache another process removed in the meantime does not fail.
+
+    Args:
+        mocked_metadata_cache_path (str): the path to the metadata cache file used in tests.
+    """
+    cache = MetadataCache()
+    cache.set("azure/regions/id", ["uksouth"])
+
+    with patch(
+        "matcha_ml.services.metadata_cache_service.os.remove",
+        side_effect=FileNotFoundError,
+    ) as mock_remove:
+        cache.invalidate()
+
+    mock_remove.assert_called_once_with(mocked_metadata_cache_path)
@@ -0,0 +1,179 @@
+"""Tests for the asyncio Terraform runner."""
+import asyncio
+import os
+import signal
+import sys
+from typing import List
+
+import pytest
+
+from matcha_ml.services.terraform_runner import (
+    OUTPUT_TAIL_LINES,
+    AsyncTerraformRunner,
+    run_interruptible,
+)
+
+# How long the scripts run unless they are stopped
+SCRIPT_SECONDS = 30
+
+# Prints a line once SIGINT is received, then exits, like Terraform stopping gracefully
+GRACEFUL_SCRIPT = f"""
+import signal, sys, time
+def stop(signum, frame):
+    print("interrupted", flush=True)
+    sys.exit(0)
+signal.signal(signal.SIGINT, stop)
+print("started", flush=True)
+time.sleep({SCRIPT_SECONDS})
+"""
+
+# Ignores SIGINT, so it is only stopped by being killed
+STUBBORN_SCRIPT = f"""
+import signal, time
+signal.signal(signal.SIGINT, signal.SIG_IGN)
+print("started", flush=True)
+time.sleep({SCRIPT_SECONDS})
+"""
+
+requires_sigint = pytest.mark.skipif(
+    sys.platform == "win32", reason="SIGINT is only forwarded on POSIX systems"
+)
+
+
+def test_run_consumes_output_incrementally(tmp_path):
+    """Test that every line is handed over as it is printed, and only the tail of the output is kept.
+
+    Args:
+        tmp_path: temporary directory fixture.
+    """
+    line_count = OUTPUT_TAIL_LINES + 10
+    received: List[str] = []
+    runner = AsyncTerraformRunner(str(tmp_path))
+
+    result = asyncio.run(
+        runner.run(
+            [sys.executable, "-c", f"for i in range({line_count}): print(i)"],
+            on_line=received.append,
+        )
+    )
+
+    assert result.return_code == 0
+    assert not result.timed_out
+    assert received == [str(i) for i in range(line_count)]
+    assert result.output == received[-OUTPUT_TAIL_LINES:]
+    assert result.command[0] == sys.executable
+
+
+def test_run_reports_the_return_code(tmp_path):
+    """Test that a failed command reports its return code and its error output.
+
+    Args:
+        tmp_path: temporary directory fixture.
+    """
+    runner = AsyncTerraformRunner(str(tmp_path))
+
+    result = asyncio.run(
+        runner.run(
+            [sys.executable, "-c", "import sys; sys.exit('Error: boom')"],
+        )
+    )
+
+    assert result.return_code == 1
+    assert result.output == ["Error: boom"]
+
+
+@requires_sigint
+def test_run_interrupts_a_command_that_times_out(tmp_path):
+    """Test that a command outliving its timeout gets a SIGINT and is reported as failed.
+
+    Args:
+        tmp_path: temporary directory fixture.
+    """
+    runner = AsyncTerraformRunner(str(tmp_path))
+
+    result = asyncio.run(runner.run([sys.executable, "-c", GRACEFUL_SCRIPT], timeout=1))
+
+    assert result.timed_out
+    assert result.return_code != 0
+    assert result.output == ["started", "interrupted"]
+
+
+@requires_sigint
+def test_run_kills_a_command_that_ignores_the_interrupt(tmp_path):
+    """Test that a command still running after the grace period is killed.
+
+    Args:
+        tmp_path: temporary directory fixture.
+    """
+    runner = AsyncTerraformRunner(str(tmp_path), interrupt_grace_period=0.5)
+
+    result = asyncio.run(runner.run([sys.executable, "-c", STUBBORN_SCRIPT], timeout=1))
+
+    assert result.timed_out
+    assert result.return_code != 0
+    assert result.duration < SCRIPT_SECONDS
+
+
+@requires_sigint
+def test_cancelling_forwards_sigint(tmp_path):
+    """Test that cancelling the task running a command interrupts the command and waits for it to stop.
+
+    Args:
+        tmp_path: temporary directory fixture.
+    """
+    received: List[str] = []
+    runner = AsyncTerraformRunner(str(tmp_path))
+
+    async def cancel_once_started() -> None:
+        task = asyncio.ensure_future(
+            runner.run([sys.executable, "-c", GRACEFUL_SCRIPT], on_line=received.append)
+        )
+        while not received:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_once_started())
+
+    assert received == ["started", "interrupted"]
+
+
+@requires_sigint
+def test_sigint_to_matcha_is_forwarded_to_the_command(tmp_path):
+    """Test that a Ctrl+C sent to matcha while a command runs interrupts the command before KeyboardInterrupt is raised.
+
+    The SIGINT is sent from the output callback, where the default handler would raise KeyboardInterrupt inside the
+    task reading the output and leave the command running.
+
+    Args:
+        tmp_path: temporary directory fixture.
+    """
+    received: List[str] = []
+    runner = AsyncTerraformRunner(str(tmp_path))
+
+    def interrupt_once_started(line: str) -> None:
+        received.append(line)
+        if line == "started":
+            os.kill(os.getpid(), signal.SIGINT)
+
+    with pytest.raises(KeyboardInterrupt):
+        run_interruptible(
+            runner.run(
+                [sys.executable, "-c", GRACEFUL_SCRIPT], on_line=interrupt_once_started
+            )
+        )
+
+    # the command printed that it received the SIGINT, and was waited for
+    assert received == ["started", "interrupted"]
+    assert signal.getsignal(signal.SIGINT) is signal.default_int_handler
+
+
+def test_run_interruptible_returns_the_result():
+    """Test that a coroutine that is not interrupted runs to completion, as with asyncio.run."""
+
+    async def answer() -> str:
+        await asyncio.sleep(0)
+        return "done"
+
+    assert run_interruptible(answer()) == "done"
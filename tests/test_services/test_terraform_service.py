@@ -1,14 +1,23 @@
 """Tests for Terraform Service."""
+import asyncio
+import json
 import os
+from typing import Any, Callable, Dict, List, Optional
 from unittest import mock
 from unittest.mock import MagicMock
 
 import pytest
 from python_terraform import TerraformCommandError
 
+from matcha_ml.services.terraform_runner import CommandResult
 from matcha_ml.services.terraform_service import (
+    DEFAULT_COMMAND_TIMEOUTS_SECONDS,
+    PLAN_FILE_NAME,
+    PLUGIN_CACHE_DIR_ENV_VAR,
     TerraformConfig,
+    TerraformResult,
     TerraformService,
+    parse_plan,
 )
 
 
@@ -226,31 +235,307 @@ def test_init(terraform_test_config: TerraformConfig):
     tfs.terraform_client.init.assert_called()
 
 
-def test_apply(terraform_test_config: TerraformConfig):
-    """Test if service apply() calls terraform_client.apply().
+def test_init_uses_the_shared_plugin_cache(
+    terraform_test_config: TerraformConfig, mocked_plugin_cache_dir: str
+):
+    """Test that terraform init runs with the shared plugin cache, which is created, and reports how long it took.
+
+    Args:
+        terraform_test_config (TerraformConfig): test terraform service config.
+        mocked_plugin_cache_dir (str): the plugin cache directory used in tests.
+    """
+    tfs = TerraformService(terraform_test_config)
+    init_env = {}
+
+    def fake_init(**kwargs):
+        init_env.update(os.environ)
+        return 0, "", ""
+
+    tfs.terraform_client.init = MagicMock(side_effect=fake_init)
+
+    with mock.patch.dict(os.environ, clear=False):
+        os.environ.pop(PLUGIN_CACHE_DIR_ENV_VAR, None)
+        result = tfs.init()
+
+        assert PLUGIN_CACHE_DIR_ENV_VAR not in os.environ
+
+    assert init_env[PLUGIN_CACHE_DIR_ENV_VAR] == mocked_plugin_cache_dir
+    assert os.path.isdir(mocked_plugin_cache_dir)
+    assert result.duration >= 0
+
+
+def test_init_fingerprint_tracks_modules_lock_file_and_backend(
+    terraform_test_config: TerraformConfig,
+):
+    """Test that a successful init is only trusted while the modules, lock file and backend are unchanged.
+
+    Args:
+        terraform_test_config (TerraformConfig): test terraform service config.
+    """
+    working_dir = terraform_test_config.working_dir
+    files = {
+        "main.tf": 'module "aks" {}',
+        os.path.join("aks", "main.tf"): "resource {}",
+        ".terraform.lock.hcl": 'provider "azurerm" {}',
+        os.path.join(".terraform", "terraform.tfstate"): '{"backend": {}}',
+        "terraform.tfstate": "{}",
+    }
+    for file_path, content in files.items():
+        os.makedirs(
+            os.path.dirname(os.path.join(working_dir, file_path)), exist_ok=True
+        )
+        with open(os.path.join(working_dir, file_path), "w") as f:
+            f.write(content)
+
+    tfs = TerraformService(terraform_test_config)
+    tfs.terraform_client.init = MagicMock(return_value=(0, "", ""))
+
+    assert not tfs.is_initialized()
+    tfs.init()
+    tfs.terraform_client.init.assert_called_once_with(
+        capture_output=True, raise_on_error=False, upgrade=False
+    )
+    assert tfs.is_initialized()
+
+    # applying changes the Terraform state, which init does not depend on
+    with open(os.path.join(working_dir, "terraform.tfstate"), "w") as f:
+        f.write('{"resources": []}')
+    assert tfs.is_initialized()
+
+    for changed_file in (
+        os.path.join("aks", "main.tf"),
+        ".terraform.lock.hcl",
+        os.path.join(".terraform", "terraform.tfstate"),
+    ):
+        with open(os.path.join(working_dir, changed_file), "a") as f:
+            f.write("\n")
+
+        assert not tfs.is_initialized()
+        tfs.init()
+        assert tfs.is_initialized()
+
+
+def test_parse_plan_counts_resource_changes():
+    """Test that the changes of a plan are counted as Terraform does, a replacement counting as an add and a destroy."""
+    plan_json = {
+        "resource_changes": [
+            {"change": {"actions": ["create"]}},
+            {"change": {"actions": ["create"]}},
+            {"change": {"actions": ["update"]}},
+            {"change": {"actions": ["delete", "create"]}},
+            {"change": {"actions": ["delete"]}},
+            {"change": {"actions": ["no-op"]}},
+            {"change": {"actions": ["read"]}},
+        ],
+        "output_changes": {"name": {"actions": ["no-op"]}},
+    }
+
+    plan = parse_plan(TerraformResult(0, "", ""), plan_json)
+
+    assert (plan.to_add, plan.to_change, plan.to_destroy) == (3, 1, 2)
+    assert not plan.changes_outputs
+    assert plan.has_changes
+
+
+def test_parse_plan_without_resource_changes():
+    """Test that a plan that only changes outputs still has changes to apply, and an empty plan has none."""
+    result = TerraformResult(0, "", "")
+
+    assert not parse_plan(result, {}).has_changes
+    assert parse_plan(
+        result, {"output_changes": {"name": {"actions": ["create"]}}}
+    ).has_changes
+
+
+def test_plan_saves_the_plan_and_reads_its_changes(
+    terraform_test_config: TerraformConfig,
+):
+    """Test that plan writes a plan file and reads its changes with terraform show.
+
+    Args:
+        terraform_test_config (TerraformConfig): test terraform service config.
+    """
+    tfs = TerraformService(terraform_test_config)
+    tfs.terraform_client.plan = MagicMock(return_value=(0, "", ""))
+    tfs.terraform_client.cmd = MagicMock(
+        return_value=(
+            0,
+            '{"resource_changes": [{"change": {"actions": ["create"]}}]}',
+            "",
+        )
+    )
+
+    plan = tfs.plan()
+
+    assert tfs.terraform_client.plan.call_args.kwargs["out"] == PLAN_FILE_NAME
+    assert tfs.terraform_client.cmd.call_args.args == ("show", PLAN_FILE_NAME)
+    assert plan.to_add == 1
+    assert plan.has_changes
+
+
+def mock_runner(
+    lines: List[str], return_code: int = 0, timed_out: bool = False
+) -> MagicMock:
+    """Mock the asyncio runner to run a command printing the given lines.
+
+    Args:
+        lines (List[str]): the lines the command prints.
+        return_code (int): the return code of the command.
+        timed_out (bool): whether the command timed out.
+
+    Returns:
+        MagicMock: the mocked AsyncTerraformRunner class.
+    """
+
+    async def run(
+        cmds: List[str], timeout: Optional[float], on_line: Callable[[str], None]
+    ) -> CommandResult:
+        for line in lines:
+            on_line(line)
+        return CommandResult(cmds, return_code, lines, 1.0, timed_out)
+
+    runner_class = MagicMock()
+    runner_class.return_value.run = MagicMock(side_effect=run)
+    return runner_class
+
+
+def test_apply_async_streams_events(terraform_test_config: TerraformConfig):
+    """Test that apply_async runs terraform apply -json with the runner and hands every event to the handler.
 
     Args:
         terraform_test_config (TerraformConfig): test terraform service config.
     """
     tfs = TerraformService(terraform_test_config)
+    events = [
+        {"type": "version", "terraform": "1.4.6"},
+        {"type": "apply_start", "hook": {"resource": {"addr": "a.b"}}},
+        {"type": "apply_complete", "hook": {"resource": {"addr": "a.b"}}},
+    ]
+    runner_class = mock_runner(
+        [json.dumps(event) for event in events] + ["not an event"]
+    )
+    received: List[Dict[str, Any]] = []
+
+    with mock.patch(
+        "matcha_ml.services.terraform_service.AsyncTerraformRunner", runner_class
+    ):
+        result = asyncio.run(tfs.apply_async(tfs.plan_path, on_event=received.append))
+
+    runner_class.assert_called_once_with(terraform_test_config.working_dir)
+    cmds = runner_class.return_value.run.call_args.args[0]
+    assert cmds[:2] == ["terraform", "apply"]
+    assert "-json" in cmds
+    assert cmds[-1] == tfs.plan_path
+    # the variables are part of the saved plan
+    assert not any(cmd.startswith("-var-file") for cmd in cmds)
+    assert (
+        runner_class.return_value.run.call_args.kwargs["timeout"]
+        == DEFAULT_COMMAND_TIMEOUTS_SECONDS["apply"]
+    )
+    assert received == events
+    assert result.return_code == 0
+    assert result.std_out.endswith("not an event")
+
+
+def test_destroy_async_reports_error_diagnostics(
+    terraform_test_config: TerraformConfig,
+):
+    """Test that destroy_async reports the error diagnostics of a failed command.
 
-    tfs.terraform_client.apply = MagicMock(return_value=(0, "", ""))
+    Args:
+        terraform_test_config (TerraformConfig): test terraform service config.
+    """
+    tfs = TerraformService(terraform_test_config)
+    diagnostic = {
+        "type": "diagnostic",
+        "diagnostic": {"severity": "error", "summary": "Boom", "detail": "it broke"},
+    }
+    runner_class = mock_runner(["line", json.dumps(diagnostic)], return_code=1)
 
-    _ = tfs.apply()
+    with mock.patch(
+        "matcha_ml.services.terraform_service.AsyncTerraformRunner", runner_class
+    ):
+        result = asyncio.run(tfs.destroy_async(on_event=lambda event: None))
 
-    tfs.terraform_client.apply.assert_called()
+    cmds = runner_class.return_value.run.call_args.args[0]
+    assert cmds[:2] == ["terraform", "destroy"]
+    assert "-auto-approve" in cmds and "-json" in cmds
+    assert f"-var-file={terraform_test_config.var_file}" in cmds
+    assert result.return_code == 1
+    assert result.std_err == "Boom: it broke"
 
 
-def test_destroy(terraform_test_config: TerraformConfig):
-    """Test if service destroy() calls terraform_client.destroy().
+def test_run_reports_a_timeout(terraform_test_config: TerraformConfig):
+    """Test that a command interrupted by its timeout is reported as such.
 
     Args:
         terraform_test_config (TerraformConfig): test terraform service config.
     """
+    destroy_timeout = 5
+    terraform_test_config.command_timeouts["destroy"] = destroy_timeout
     tfs = TerraformService(terraform_test_config)
+    runner_class = mock_runner(["Stopping operation..."], return_code=1, timed_out=True)
+
+    with mock.patch(
+        "matcha_ml.services.terraform_service.AsyncTerraformRunner", runner_class
+    ):
+        result = asyncio.run(tfs.destroy_async())
+
+    assert runner_class.return_value.run.call_args.kwargs["timeout"] == destroy_timeout
+    assert result.timed_out
+    assert result.std_err.startswith(
+        f"terraform destroy did not finish within {destroy_timeout} seconds and was interrupted."
+    )
+
 
-    tfs.terraform_client.destroy = MagicMock(return_value=(0, "", ""))
+def test_operations_pass_the_terraform_options(terraform_test_config: TerraformConfig):
+    """Test that plan and destroy take the parallelism, refresh and lock timeout from the configuration.
 
-    _ = tfs.destroy()
+    Args:
+        terraform_test_config (TerraformConfig): test terraform service config.
+    """
+    parallelism, lock_timeout = 4, 30
+    terraform_test_config.parallelism = parallelism
+    terraform_test_config.refresh = False
+    terraform_test_config.lock_timeout = lock_timeout
+    tfs = TerraformService(terraform_test_config)
+    tfs.terraform_client.plan = MagicMock(return_value=(1, "", "error"))
+    runner_class = mock_runner([])
+
+    tfs.plan()
+    with mock.patch(
+        "matcha_ml.services.terraform_service.AsyncTerraformRunner", runner_class
+    ):
+        asyncio.run(tfs.destroy_async())
+        asyncio.run(tfs.apply_async(tfs.plan_path))
+
+    plan_options = tfs.terraform_client.plan.call_args.kwargs
+    assert plan_options["parallelism"] == parallelism
+    assert plan_options["refresh"] is False
+    assert plan_options["lock_timeout"] == f"{lock_timeout}s"
+
+    destroy_cmds, apply_cmds = (
+        call.args[0] for call in runner_class.return_value.run.call_args_list
+    )
+    assert {
+        f"-parallelism={parallelism}",
+        "-refresh=false",
+        f"-lock-timeout={lock_timeout}s",
+    } <= set(destroy_cmds)
+    # a saved plan was already refreshed, and Terraform refuses planning options when applying it
+    assert f"-parallelism={parallelism}" in apply_cmds
+    assert not any(cmd.startswith("-refresh") for cmd in apply_cmds)
+
+
+@pytest.mark.parametrize("parallelism, lock_timeout", [(0, 0), (65, 0), (10, -1)])
+def test_terraform_config_rejects_invalid_options(
+    parallelism: int, lock_timeout: float
+):
+    """Test that the configuration validates the Terraform options.
 
-    tfs.terraform_client.destroy.assert_called()
+    Args:
+        parallelism (int): the parallelism.
+        lock_timeout (float): the lock timeout.
+    """
+    with pytest.raises(ValueError):
+        TerraformConfig(parallelism=parallelism, lock_timeout=lock_timeout)
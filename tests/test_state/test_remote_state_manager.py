@@ -2,7 +2,8 @@
 import glob
 import json
 import os
-from typing import Dict, Iterator
+import threading
+from typing import Any, Dict, Iterator, List
 from unittest.mock import MagicMock, PropertyMock, patch
 
 import pytest
@@ -16,13 +17,27 @@ from matcha_ml.config import (
     MatchaConfigService,
 )
 from matcha_ml.config.matcha_config import MatchaConfigComponent
-from matcha_ml.errors import MatchaError
+from matcha_ml.constants import MATCHA_STATE_PATH
+from matcha_ml.errors import MatchaError, MatchaInputError
 from matcha_ml.runners.remote_state_runner import RemoteStateRunner
 from matcha_ml.state import RemoteStateManager
 from matcha_ml.state.remote_state_manager import (
     ALREADY_LOCKED_MESSAGE,
+    LOCAL_STATE_PATH,
     LOCK_FILE_NAME,
+    REMOTE_STATE_BUCKET,
+    STATE_BACKEND,
+    STATE_STORAGE_MODE,
+    StateStorageMode,
 )
+from matcha_ml.state.state_lock import (
+    DEFAULT_LOCK_TTL_SECONDS,
+    LOCK_METADATA,
+    LOCK_QUEUE_PREFIX,
+    LeaseHeartbeat,
+)
+from matcha_ml.storage import AzureStorage, LocalStorage
+from matcha_ml.storage.state_snapshot import SnapshotIndex
 from matcha_ml.templates.remote_state_template import SUBMODULE_NAMES
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -262,7 +277,14 @@ def test_lock_state(
     remote_state = RemoteStateManager()
     remote_state.lock()
     mock_azure_storage_instance.create_empty.assert_called_with(
-        container_name="test-container", blob_name=LOCK_FILE_NAME
+        container_name="test-container",
+        blob_name=LOCK_FILE_NAME,
+        metadata=LOCK_METADATA,
+    )
+    mock_azure_storage_instance.acquire_lease.assert_called_with(
+        container_name="test-container",
+        blob_name=LOCK_FILE_NAME,
+        lease_duration=DEFAULT_LOCK_TTL_SECONDS,
     )
 
 
@@ -301,6 +323,9 @@ def test_unlock_state(
     mock_azure_storage_instance.blob_exists.assert_called_with(
         container_name="test-container", blob_name=LOCK_FILE_NAME
     )
+    mock_azure_storage_instance.break_lease.assert_called_with(
+        container_name="test-container", blob_name=LOCK_FILE_NAME
+    )
     mock_azure_storage_instance.delete_blob.assert_called_with(
         container_name="test-container", blob_name=LOCK_FILE_NAME
     )
@@ -338,31 +363,25 @@ def test_use_lock(
     """
     os.chdir(valid_config_testing_directory)
 
-    mock_azure_storage_instance.blob_exists.return_value = False
+    lease = mock_azure_storage_instance.acquire_lease.return_value
 
     remote_state = RemoteStateManager()
     with remote_state.use_lock():
         # Test that the state was locked
         mock_azure_storage_instance.create_empty.assert_called_with(
-            container_name="test-container", blob_name=LOCK_FILE_NAME
+            container_name="test-container",
+            blob_name=LOCK_FILE_NAME,
+            metadata=LOCK_METADATA,
         )
         assert mock_azure_storage_instance.create_empty.call_count == 1
-        mock_azure_storage_instance.blob_exists.assert_not_called()
+        assert mock_azure_storage_instance.acquire_lease.call_count == 1
         mock_azure_storage_instance.delete_blob.assert_not_called()
 
-        # Set azure storage mock into a locked state
-        mock_azure_storage_instance.blob_exists.return_value = True
-
-    # Test that the state was unlocked
-    mock_azure_storage_instance.blob_exists.assert_called_with(
-        container_name="test-container", blob_name=LOCK_FILE_NAME
-    )
-    mock_azure_storage_instance.delete_blob.assert_called_with(
-        container_name="test-container", blob_name=LOCK_FILE_NAME
+    # Test that the state was unlocked by releasing the lock blob with its lease
+    mock_azure_storage_instance.blob_exists.assert_not_called()
+    mock_azure_storage_instance.delete_blob.assert_called_once_with(
+        container_name="test-container", blob_name=LOCK_FILE_NAME, lease=lease
     )
-    assert mock_azure_storage_instance.create_empty.call_count == 1
-    assert mock_azure_storage_instance.blob_exists.call_count == 1
-    assert mock_azure_storage_instance.delete_blob.call_count == 1
 
 
 def test_use_lock_on_destroy_command(
@@ -376,20 +395,11 @@ def test_use_lock_on_destroy_command(
     """
     os.chdir(valid_config_testing_directory)
 
-    mock_azure_storage_instance.blob_exists.return_value = False
-
     remote_state = RemoteStateManager()
     with remote_state.use_lock(destroy=True):
         # Test that the state was locked
-        mock_azure_storage_instance.create_empty.assert_called_with(
-            container_name="test-container", blob_name=LOCK_FILE_NAME
-        )
         assert mock_azure_storage_instance.create_empty.call_count == 1
-        mock_azure_storage_instance.blob_exists.assert_not_called()
-        mock_azure_storage_instance.delete_blob.assert_not_called()
-
-        # Set azure storage mock into a locked state
-        mock_azure_storage_instance.blob_exists.return_value = True
+        assert mock_azure_storage_instance.acquire_lease.call_count == 1
 
     # Test that the state was not unlocked
     mock_azure_storage_instance.blob_exists.assert_not_called()
@@ -397,14 +407,20 @@ def test_use_lock_on_destroy_command(
 
 
 def test_use_remote_state():
-    """Test use_remote_state context manager."""
+    """Test use_remote_state context manager, which records the uploaded state in the history."""
     remote_state_manager = RemoteStateManager()
     with patch.object(remote_state_manager, "upload") as mocked_upload, patch.object(
         remote_state_manager, "download"
-    ) as mocked_download:
+    ) as mocked_download, patch.object(
+        remote_state_manager, "record_history"
+    ) as mocked_record_history:
         with remote_state_manager.use_remote_state():
             mocked_download.assert_called_once_with(os.getcwd())
         mocked_upload.assert_called_once_with(os.path.join(".matcha", "infrastructure"))
+        mocked_record_history.assert_called_once_with(
+            os.path.join(".matcha", "infrastructure"),
+            mocked_upload.return_value,
+        )
 
 
 def test_use_remote_state_on_destroy():
@@ -412,10 +428,13 @@ def test_use_remote_state_on_destroy():
     remote_state_manager = RemoteStateManager()
     with patch.object(remote_state_manager, "upload") as mocked_upload, patch.object(
         remote_state_manager, "download"
-    ) as mocked_download:
+    ) as mocked_download, patch.object(
+        remote_state_manager, "record_history"
+    ) as mocked_record_history:
         with remote_state_manager.use_remote_state(destroy=True):
             mocked_download.assert_called_once_with(os.getcwd())
         mocked_upload.assert_not_called()
+        mocked_record_history.assert_not_called()
 
 
 def test_is_state_provisioned_returns_false_when_resource_group_does_not_exist(
@@ -490,3 +509,506 @@ def test_is_state_stale_no_resource_group(matcha_testing_directory: str):
 
         remote_state = RemoteStateManager()
         assert remote_state.is_state_stale()
+
+
+def test_storage_mode_defaults_to_files(valid_config_testing_directory: str):
+    """Test that the state is stored file by file when the configuration sets no storage mode.
+
+    Args:
+        valid_config_testing_directory (str): temporary working directory path, with valid config file
+    """
+    assert RemoteStateManager().storage_mode == StateStorageMode.FILES
+
+
+def test_storage_mode_is_read_from_configuration(
+    matcha_testing_directory: str, mocked_matcha_config_json_object: Dict
+):
+    """Test that the storage mode is read from the remote state bucket properties.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory path
+        mocked_matcha_config_json_object (Dict): the matcha.config.json contents
+    """
+    os.chdir(matcha_testing_directory)
+    mocked_matcha_config_json_object[REMOTE_STATE_BUCKET][
+        STATE_STORAGE_MODE
+    ] = "snapshot"
+    MatchaConfigService.write_matcha_config(
+        MatchaConfig.from_dict(mocked_matcha_config_json_object)
+    )
+
+    assert RemoteStateManager().storage_mode == StateStorageMode.SNAPSHOT
+
+
+def test_invalid_storage_mode_raises_error(
+    matcha_testing_directory: str, mocked_matcha_config_json_object: Dict
+):
+    """Test that an error is raised for a storage mode that does not exist.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory path
+        mocked_matcha_config_json_object (Dict): the matcha.config.json contents
+    """
+    os.chdir(matcha_testing_directory)
+    mocked_matcha_config_json_object[REMOTE_STATE_BUCKET][STATE_STORAGE_MODE] = "zip"
+    MatchaConfigService.write_matcha_config(
+        MatchaConfig.from_dict(mocked_matcha_config_json_object)
+    )
+
+    with pytest.raises(MatchaError):
+        RemoteStateManager().storage_mode
+
+
+def test_snapshot_mode_transfers_snapshots(
+    valid_config_testing_directory: str, mock_azure_storage_instance: MagicMock
+):
+    """Test that the snapshot mode uploads and downloads the state as a snapshot.
+
+    Args:
+        valid_config_testing_directory (str): temporary working directory path, with valid config file
+        mock_azure_storage_instance (MagicMock): mock of AzureStorage instance
+    """
+    remote_state_manager = RemoteStateManager(storage_mode=StateStorageMode.SNAPSHOT)
+
+    remote_state_manager.upload(".matcha")
+    remote_state_manager.download(valid_config_testing_directory)
+
+    mock_azure_storage_instance.upload_snapshot.assert_called_once_with(
+        container_name="test-container", src_folder_path=".matcha"
+    )
+    mock_azure_storage_instance.download_snapshot.assert_called_once_with(
+        "test-container", dest_folder_path=valid_config_testing_directory
+    )
+    mock_azure_storage_instance.upload_folder.assert_not_called()
+    mock_azure_storage_instance.download_folder.assert_not_called()
+
+
+def test_snapshot_mode_reads_hash_from_index(
+    valid_config_testing_directory: str, mock_azure_storage_instance: MagicMock
+):
+    """Test that in snapshot mode the hash of a remote file is read from the snapshot index.
+
+    Args:
+        valid_config_testing_directory (str): temporary working directory path, with valid config file
+        mock_azure_storage_instance (MagicMock): mock of AzureStorage instance
+    """
+    mock_azure_storage_instance.get_snapshot_index.return_value = SnapshotIndex(
+        snapshot="snapshots/abc.tar.gz", files={"matcha.state": "md5"}
+    )
+    remote_state_manager = RemoteStateManager(storage_mode=StateStorageMode.SNAPSHOT)
+
+    assert remote_state_manager.get_hash_remote_state("matcha.state") == "md5"
+    assert remote_state_manager.get_hash_remote_state("missing") == ""
+    mock_azure_storage_instance.get_hash_remote_state.assert_not_called()
+
+
+def test_local_backend_keeps_the_state_in_a_directory(
+    matcha_testing_directory: str, mocked_matcha_config_json_object: Dict
+):
+    """Test that the local backend locks, uploads and downloads the state without Azure.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory path
+        mocked_matcha_config_json_object (Dict): the matcha.config.json contents
+    """
+    os.chdir(matcha_testing_directory)
+    remote_path = os.path.join(matcha_testing_directory, "remote")
+    remote_state_bucket = mocked_matcha_config_json_object[REMOTE_STATE_BUCKET]
+    remote_state_bucket[STATE_BACKEND] = "local"
+    remote_state_bucket[LOCAL_STATE_PATH] = remote_path
+    MatchaConfigService.write_matcha_config(
+        MatchaConfig.from_dict(mocked_matcha_config_json_object)
+    )
+    LocalStorage(remote_path).create_container(remote_state_bucket["container_name"])
+
+    remote_state = RemoteStateManager()
+    assert isinstance(remote_state.storage, LocalStorage)
+    assert remote_state.is_state_provisioned()
+
+    with remote_state.use_lock(), remote_state.use_remote_state():
+        assert remote_state.is_locked()
+        os.makedirs(os.path.dirname(MATCHA_STATE_PATH))
+        with open(MATCHA_STATE_PATH, "w") as f:
+            f.write("{}")
+    assert not remote_state.is_locked()
+
+    os.remove(MATCHA_STATE_PATH)
+    remote_state.download(matcha_testing_directory)
+    assert os.path.isfile(MATCHA_STATE_PATH)
+
+
+@pytest.mark.parametrize(
+    "storage_mode", [StateStorageMode.FILES, StateStorageMode.SNAPSHOT]
+)
+def test_restore_returns_the_state_to_an_earlier_version(
+    matcha_testing_directory: str,
+    mocked_matcha_config_json_object: Dict,
+    storage_mode: StateStorageMode,
+):
+    """Test that every provision is recorded in the history, and that the state is restored to an earlier version.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory path
+        mocked_matcha_config_json_object (Dict): the matcha.config.json contents
+        storage_mode (StateStorageMode): how the state is stored remotely.
+    """
+    os.chdir(matcha_testing_directory)
+    remote_path = os.path.join(matcha_testing_directory, "remote")
+    remote_state_bucket = mocked_matcha_config_json_object[REMOTE_STATE_BUCKET]
+    remote_state_bucket[STATE_BACKEND] = "local"
+    remote_state_bucket[LOCAL_STATE_PATH] = remote_path
+    MatchaConfigService.write_matcha_config(
+        MatchaConfig.from_dict(mocked_matcha_config_json_object)
+    )
+    LocalStorage(remote_path).create_container(remote_state_bucket["container_name"])
+    remote_state = RemoteStateManager(storage_mode=storage_mode)
+
+    for state in ("first", "second"):
+        with remote_state.use_lock(), remote_state.use_remote_state():
+            os.makedirs(os.path.dirname(MATCHA_STATE_PATH), exist_ok=True)
+            with open(MATCHA_STATE_PATH, "w") as f:
+                f.write(state)
+    first, second = remote_state.history()
+
+    with remote_state.use_lock():
+        restore_entry = remote_state.restore(first.id)
+        remote_state.download(matcha_testing_directory)
+
+    with open(MATCHA_STATE_PATH) as f:
+        assert f.read() == "first"
+    assert restore_entry.restored_from == first.id
+    assert remote_state.history() == [first, second, restore_entry]
+    with pytest.raises(MatchaInputError):
+        remote_state.restore("missing")
+
+
+def test_invalid_state_backend_raises_error(
+    matcha_testing_directory: str, mocked_matcha_config_json_object: Dict
+):
+    """Test that an error is raised for a state backend that does not exist.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory path
+        mocked_matcha_config_json_object (Dict): the matcha.config.json contents
+    """
+    os.chdir(matcha_testing_directory)
+    mocked_matcha_config_json_object[REMOTE_STATE_BUCKET][STATE_BACKEND] = "s3"
+    MatchaConfigService.write_matcha_config(
+        MatchaConfig.from_dict(mocked_matcha_config_json_object)
+    )
+
+    with pytest.raises(MatchaError, match="s3"):
+        _ = RemoteStateManager().storage
+
+
+@pytest.fixture
+def leased_remote_state(
+    valid_config_testing_directory: str, fake_azure_storage: AzureStorage
+) -> RemoteStateManager:
+    """A fixture for a remote state manager whose storage is the in-memory container.
+
+    Args:
+        valid_config_testing_directory (str): temporary working directory path, with valid config file
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+
+    Returns:
+        RemoteStateManager: the remote state manager.
+    """
+    remote_state = RemoteStateManager(lock_ttl=15)
+    remote_state._storage = fake_azure_storage
+    return remote_state
+
+
+def test_lock_is_exclusive_until_released(
+    leased_remote_state: RemoteStateManager,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+):
+    """Test that a second manager cannot lock the state until the first one unlocked it.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    other_remote_state = RemoteStateManager()
+    other_remote_state._storage = fake_azure_storage
+
+    with leased_remote_state.use_lock():
+        assert fake_container.metadata[LOCK_FILE_NAME] == LOCK_METADATA
+        with pytest.raises(MatchaError, match="already locked"):
+            other_remote_state.lock()
+
+    assert LOCK_FILE_NAME not in fake_container.blobs
+    other_remote_state.lock()
+
+
+def test_expired_lock_is_reclaimed(
+    leased_remote_state: RemoteStateManager,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+):
+    """Test that the lock of a process that stopped renewing it is taken over once its TTL has passed.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    leased_remote_state.lock()
+    other_remote_state = RemoteStateManager()
+    other_remote_state._storage = fake_azure_storage
+
+    fake_container.time += leased_remote_state.lock_ttl - 1
+    with pytest.raises(MatchaError, match="already locked"):
+        other_remote_state.lock()
+
+    fake_container.time += 1
+    other_remote_state.lock()
+
+    # the crashed process can no longer release a lock that is not its own
+    leased_remote_state.unlock()
+    assert LOCK_FILE_NAME in fake_container.blobs
+
+
+def test_lock_created_without_lease_is_held(
+    leased_remote_state: RemoteStateManager, fake_container: Any
+):
+    """Test that a lock blob created by a version of matcha that does not lease it still locks the state.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_container.put(LOCK_FILE_NAME, b"")
+
+    with pytest.raises(MatchaError, match="already locked"):
+        leased_remote_state.lock()
+
+
+def test_force_unlock_breaks_the_lease(
+    leased_remote_state: RemoteStateManager,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+):
+    """Test that unlocking from a manager that does not hold the lock breaks it.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    leased_remote_state.lock()
+    other_remote_state = RemoteStateManager()
+    other_remote_state._storage = fake_azure_storage
+
+    other_remote_state.unlock()
+
+    assert LOCK_FILE_NAME not in fake_container.blobs
+
+
+def test_use_lock_warns_when_the_lease_was_lost(
+    leased_remote_state: RemoteStateManager,
+):
+    """Test that the user is warned when the lock could not be renewed for a whole TTL.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+    """
+    with patch.object(
+        LeaseHeartbeat, "lost", new_callable=PropertyMock, return_value=True
+    ), patch(
+        "matcha_ml.state.remote_state_manager.print_status"
+    ) as mocked_print_status, leased_remote_state.use_lock():
+        pass
+
+    assert "could not be renewed" in mocked_print_status.call_args_list[0].args[0]
+
+
+def test_invalid_lock_ttl_raises_error():
+    """Test that a lock TTL that is not a valid lease duration is rejected."""
+    with pytest.raises(MatchaInputError):
+        RemoteStateManager(lock_ttl=5)
+
+
+def test_invalid_history_retention_raises_error():
+    """Test that a history retention that keeps no entry is rejected."""
+    with pytest.raises(MatchaInputError):
+        RemoteStateManager(history_retention=0)
+
+
+@pytest.fixture
+def short_lock_backoff() -> Iterator[None]:
+    """A fixture for retrying the lock every 10 milliseconds.
+
+    Yields:
+        None: while the backoff is shortened.
+    """
+    with patch("matcha_ml.state.remote_state_manager.backoff_delay", return_value=0.01):
+        yield
+
+
+def queued_tickets(fake_container: Any) -> List[str]:
+    """List the tickets of the lock queue.
+
+    Args:
+        fake_container (Any): the in-memory container.
+
+    Returns:
+        List[str]: the ticket blob names.
+    """
+    return [name for name in fake_container.blobs if name.startswith(LOCK_QUEUE_PREFIX)]
+
+
+def test_lock_waits_until_released(
+    leased_remote_state: RemoteStateManager,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+    short_lock_backoff: None,
+):
+    """Test that a lock with a timeout is taken once the holder releases it, recording how long it waited.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        short_lock_backoff (None): retries the lock every 10 milliseconds.
+    """
+    leased_remote_state.lock()
+    waiting_remote_state = RemoteStateManager()
+    waiting_remote_state._storage = fake_azure_storage
+    release_after = 0.1
+    release = threading.Timer(release_after, leased_remote_state.unlock)
+    # the try before queueing, and the try that takes the lock
+    attempts_without_retries = 2
+
+    release.start()
+    waiting_remote_state.lock(timeout=5)
+    release.join()
+
+    assert waiting_remote_state.lock_wait.wait_seconds >= release_after
+    assert waiting_remote_state.lock_wait.attempts > attempts_without_retries
+    assert waiting_remote_state.lock_wait.queue_position == 0
+    assert queued_tickets(fake_container) == []
+    assert fake_container.active_lease(LOCK_FILE_NAME) is not None
+
+
+def test_lock_times_out(
+    leased_remote_state: RemoteStateManager,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+    short_lock_backoff: None,
+):
+    """Test that waiting for a lock that stays held fails once the timeout has passed, leaving the queue.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        short_lock_backoff (None): retries the lock every 10 milliseconds.
+    """
+    leased_remote_state.lock()
+    waiting_remote_state = RemoteStateManager()
+    waiting_remote_state._storage = fake_azure_storage
+
+    timeout = 0.05
+
+    with pytest.raises(MatchaError, match="stayed locked"):
+        waiting_remote_state.lock(timeout=timeout)
+
+    assert waiting_remote_state.lock_wait.wait_seconds >= timeout
+    assert queued_tickets(fake_container) == []
+
+
+def test_lock_is_taken_in_queue_order(
+    leased_remote_state: RemoteStateManager,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+    short_lock_backoff: None,
+):
+    """Test that a waiter that queued earlier goes first, until its ticket expires.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        short_lock_backoff (None): retries the lock every 10 milliseconds.
+    """
+    earlier_ticket = f"{LOCK_QUEUE_PREFIX}earlier"
+    fake_container.put(earlier_ticket, b"")
+    fake_azure_storage.acquire_lease(
+        "test-container", earlier_ticket, lease_duration=leased_remote_state.lock_ttl
+    )
+
+    with pytest.raises(MatchaError, match="stayed locked"):
+        leased_remote_state.lock(timeout=0.05)
+    assert leased_remote_state.lock_wait.queue_position == 1
+
+    # the earlier waiter crashed, and its ticket's lease expired
+    fake_container.time += leased_remote_state.lock_ttl
+    leased_remote_state.lock(timeout=5)
+
+    assert fake_container.active_lease(LOCK_FILE_NAME) is not None
+
+
+def test_negative_lock_timeout_raises_error(leased_remote_state: RemoteStateManager):
+    """Test that a negative lock timeout is rejected.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+    """
+    with pytest.raises(MatchaInputError):
+        leased_remote_state.lock(timeout=-1)
+
+
+def test_readers_run_alongside_a_writer(
+    leased_remote_state: RemoteStateManager,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+    valid_config_testing_directory: str,
+):
+    """Test that readers neither wait for nor take the lock, and read the matcha state last saved by the writer.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        valid_config_testing_directory (str): temporary working directory path, with valid config file
+    """
+    fake_container.put(MATCHA_STATE_PATH, b'{"committed": true}')
+    readers = [RemoteStateManager(), RemoteStateManager()]
+    for reader in readers:
+        reader._storage = fake_azure_storage
+
+    with leased_remote_state.use_lock(), patch(
+        "matcha_ml.state.remote_state_manager.print_status"
+    ) as mocked_print_status:
+        writer_requests = len(fake_container.requests)
+        for reader in readers:
+            with reader.use_read_lock():
+                reader.read_committed_state(valid_config_testing_directory)
+        reader_requests = fake_container.requests[writer_requests:]
+
+    with open(os.path.join(valid_config_testing_directory, MATCHA_STATE_PATH)) as f:
+        assert json.load(f) == {"committed": True}
+    assert mocked_print_status.call_count == len(readers)
+    assert {method for method, _ in reader_requests} == {"HEAD", "GET"}
+
+
+def test_is_locked(leased_remote_state: RemoteStateManager, fake_container: Any):
+    """Test that the state is locked while the lock is leased, or held by an older matcha.
+
+    Args:
+        leased_remote_state (RemoteStateManager): manager using the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    assert not leased_remote_state.is_locked()
+
+    leased_remote_state.lock()
+    assert leased_remote_state.is_locked()
+
+    fake_container.time += leased_remote_state.lock_ttl
+    assert not leased_remote_state.is_locked()
+
+    fake_container.put(LOCK_FILE_NAME, b"")
+    assert leased_remote_state.is_locked()
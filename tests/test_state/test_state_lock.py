@@ -0,0 +1,130 @@
+"""Tests for the lease-based locking of the remote state."""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import pytest
+
+from matcha_ml.state.state_lock import (
+    INITIAL_LOCK_BACKOFF_SECONDS,
+    LOCK_QUEUE_PREFIX,
+    MAX_LOCK_BACKOFF_SECONDS,
+    MAX_LOCK_TTL_SECONDS,
+    MIN_LOCK_TTL_SECONDS,
+    LeaseHeartbeat,
+    backoff_delay,
+    tickets_ahead,
+    validate_lock_timeout,
+    validate_lock_ttl,
+)
+from matcha_ml.storage.storage_backend import BlobInfo
+
+
+def ticket(name: str, created: int, lease_state: Optional[str] = "leased") -> BlobInfo:
+    """Build the properties of a ticket blob of the lock queue.
+
+    Args:
+        name (str): the ticket name, without the queue prefix.
+        created (int): the creation time, in seconds since the epoch.
+        lease_state (Optional[str]): the state of the ticket's lease.
+
+    Returns:
+        BlobInfo: the properties.
+    """
+    return BlobInfo(
+        name=f"{LOCK_QUEUE_PREFIX}{name}",
+        creation_time=datetime.fromtimestamp(created, timezone.utc),
+        lease_state=lease_state,
+    )
+
+
+@pytest.mark.parametrize(
+    "lock_ttl", [MIN_LOCK_TTL_SECONDS - 1, MAX_LOCK_TTL_SECONDS + 1]
+)
+def test_validate_lock_ttl_rejects_out_of_range(lock_ttl: int):
+    """Test that a TTL that is not a valid lease duration is rejected.
+
+    Args:
+        lock_ttl (int): the TTL.
+    """
+    with pytest.raises(ValueError):
+        validate_lock_ttl(lock_ttl)
+
+
+def test_heartbeat_renews_until_stopped():
+    """Test that the lease is renewed every interval, and no longer once the heartbeat is stopped."""
+    renewed = threading.Semaphore(0)
+
+    with LeaseHeartbeat(renewed.release, lock_ttl=15, interval=0.01) as heartbeat:
+        assert renewed.acquire(timeout=1)
+        assert renewed.acquire(timeout=1)
+
+    while renewed.acquire(blocking=False):
+        pass
+    time.sleep(0.05)
+
+    assert not renewed.acquire(blocking=False)
+    assert not heartbeat.lost
+    assert heartbeat.error is None
+
+
+def test_heartbeat_is_lost_when_renewals_fail_for_a_ttl():
+    """Test that the lease is only lost once renewals failed for a whole TTL, keeping the last error."""
+    error = RuntimeError("Connection reset")
+    failed = threading.Event()
+
+    def renew() -> None:
+        failed.set()
+        raise error
+
+    with LeaseHeartbeat(renew, lock_ttl=0.1, interval=0.01) as heartbeat:
+        assert failed.wait(timeout=1)
+        assert not heartbeat.lost
+        time.sleep(0.15)
+
+    assert heartbeat.lost
+    assert heartbeat.error is error
+
+
+def test_validate_lock_timeout_rejects_negative():
+    """Test that a negative lock timeout is rejected, and no timeout is accepted."""
+    validate_lock_timeout(0)
+
+    with pytest.raises(ValueError):
+        validate_lock_timeout(-1)
+
+
+@pytest.mark.parametrize(
+    "attempt, expected_delay",
+    [
+        (1, INITIAL_LOCK_BACKOFF_SECONDS),
+        (2, 2 * INITIAL_LOCK_BACKOFF_SECONDS),
+        (3, 4 * INITIAL_LOCK_BACKOFF_SECONDS),
+        (100, MAX_LOCK_BACKOFF_SECONDS),
+    ],
+)
+def test_backoff_delay_doubles_up_to_the_maximum(attempt: int, expected_delay: float):
+    """Test that the delay doubles with every attempt, up to the maximum, and is jittered by at most half.
+
+    Args:
+        attempt (int): the number of attempts made.
+        expected_delay (float): the delay before jitter.
+    """
+    delays = [backoff_delay(attempt) for _ in range(100)]
+
+    assert all(expected_delay / 2 <= delay <= expected_delay for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_tickets_ahead_counts_older_live_tickets():
+    """Test that only waiters that queued earlier and still hold their ticket's lease are ahead."""
+    older = [ticket("b", created=1), ticket("a", created=2)]
+    own = ticket("own", created=3)
+    live_tickets = [*older, own, ticket("later", created=4)]
+    tickets = [*live_tickets, ticket("crashed", created=0, lease_state="expired")]
+
+    assert tickets_ahead(tickets, own.name) == len(older)
+    assert tickets_ahead(tickets, older[0].name) == 0
+    # a ticket missing from the listing queues behind every live ticket
+    assert tickets_ahead(tickets, "") == len(live_tickets)
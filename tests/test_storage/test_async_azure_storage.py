@@ -0,0 +1,295 @@
+"""Tests for the AsyncAzureStorage class, run against an in-memory transport."""
+import asyncio
+import hashlib
+import os
+import threading
+from typing import Any, Awaitable, Callable, List, TypeVar
+from unittest.mock import patch
+
+import pytest
+from azure.core.exceptions import ResourceExistsError
+
+from matcha_ml.constants import LOCK_FILE_NAME
+from matcha_ml.services import AsyncAzureClient
+from matcha_ml.storage import AsyncAzureStorage
+from matcha_ml.storage.storage_backend import TransferReport, read_file, write_file
+
+T = TypeVar("T")
+
+CONTAINER_NAME = "testcontainer"
+MAX_CONCURRENCY = 4
+
+
+@pytest.fixture
+def run_with_storage(
+    fake_azure_transport: Any, fake_async_credential: Any
+) -> Callable[[Callable[[AsyncAzureStorage], Awaitable[T]]], T]:
+    """A fixture for running a coroutine function against a storage instance that uses the in-memory transport.
+
+    Args:
+        fake_azure_transport (Any): the in-memory Azure transport.
+        fake_async_credential (Any): the fake credential.
+
+    Returns:
+        Callable[[Callable[[AsyncAzureStorage], Awaitable[T]]], T]: a function that runs the coroutine function.
+    """
+    fake_azure_transport.containers[CONTAINER_NAME] = {}
+
+    def run(operation: Callable[[AsyncAzureStorage], Awaitable[T]]) -> T:
+        async def _run() -> T:
+            az_client = await AsyncAzureClient.create(
+                credential=fake_async_credential, transport=fake_azure_transport
+            )
+            async with await AsyncAzureStorage.create(
+                "testaccount",
+                "test-resources",
+                az_client=az_client,
+                transport=fake_azure_transport,
+                max_concurrency=MAX_CONCURRENCY,
+            ) as storage, az_client:
+                return await operation(storage)
+
+        return asyncio.run(_run())
+
+    return run
+
+
+@pytest.fixture
+def local_folder(matcha_testing_directory: str) -> str:
+    """A fixture for a local folder with files to upload.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory.
+
+    Returns:
+        str: the folder path.
+    """
+    os.chdir(matcha_testing_directory)
+    resources_dir = os.path.join(".matcha", "infrastructure", "resources")
+    os.makedirs(resources_dir)
+    for i in range(10):
+        with open(os.path.join(resources_dir, f"file-{i}.tf"), "w") as f:
+            f.write(f"content {i}")
+
+    return ".matcha"
+
+
+def test_create_connects_to_existing_resource_group(run_with_storage: Callable):
+    """Test that a storage instance for an existing resource group can reach its containers.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+    """
+
+    async def operation(storage: AsyncAzureStorage) -> Any:
+        return (
+            storage.resource_group_exists,
+            await storage.container_exists(CONTAINER_NAME),
+            await storage.container_exists("missing"),
+        )
+
+    assert run_with_storage(operation) == (True, True, False)
+
+
+def test_upload_folder_runs_uploads_concurrently(
+    run_with_storage: Callable, fake_azure_transport: Any, local_folder: str
+):
+    """Test that every file is uploaded with at most `max_concurrency` uploads in flight, and stale blobs are removed.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+        fake_azure_transport (Any): the in-memory Azure transport.
+        local_folder (str): the folder to upload.
+    """
+    blobs = fake_azure_transport.containers[CONTAINER_NAME]
+    blobs["stale-blob"] = b"stale"
+    blobs[LOCK_FILE_NAME] = b""
+
+    async def operation(storage: AsyncAzureStorage) -> None:
+        fake_azure_transport.max_in_flight = 0
+        await storage.upload_folder(CONTAINER_NAME, local_folder)
+
+    run_with_storage(operation)
+
+    expected_blobs = {
+        os.path.join(local_folder, "infrastructure", "resources", f"file-{i}.tf")
+        for i in range(10)
+    }
+    assert set(blobs) == expected_blobs | {LOCK_FILE_NAME}
+    assert fake_azure_transport.max_in_flight == MAX_CONCURRENCY
+
+
+def test_upload_folder_without_changes_transfers_nothing(
+    run_with_storage: Callable, fake_azure_transport: Any, local_folder: str
+):
+    """Test that uploading an unchanged folder a second time skips every file.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+        fake_azure_transport (Any): the in-memory Azure transport.
+        local_folder (str): the folder to upload.
+    """
+
+    async def operation(storage: AsyncAzureStorage) -> Any:
+        first_report = await storage.upload_folder(CONTAINER_NAME, local_folder)
+        return first_report, await storage.upload_folder(CONTAINER_NAME, local_folder)
+
+    first_report, second_report = run_with_storage(operation)
+
+    assert first_report == TransferReport(
+        blobs_transferred=10, bytes_transferred=10 * len("content 0")
+    )
+    assert second_report == TransferReport(blobs_skipped=10)
+    # like a folder uploaded by AzureStorage, every file is reported with its hash, for the history to copy it
+    assert second_report.files == {
+        os.path.join(local_folder, "infrastructure", "resources", f"file-{i}.tf"): (
+            hashlib.md5(f"content {i}".encode()).hexdigest()
+        )
+        for i in range(10)
+    }
+
+
+def test_download_folder_round_trip(
+    run_with_storage: Callable,
+    fake_azure_transport: Any,
+    local_folder: str,
+    matcha_testing_directory: str,
+):
+    """Test that downloading a folder restores the uploaded files, skipping the lock file.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+        fake_azure_transport (Any): the in-memory Azure transport.
+        local_folder (str): the folder to upload.
+        matcha_testing_directory (str): temporary working directory.
+    """
+    fake_azure_transport.containers[CONTAINER_NAME][LOCK_FILE_NAME] = b""
+    dest_folder = os.path.join(matcha_testing_directory, "download")
+
+    async def operation(storage: AsyncAzureStorage) -> None:
+        await storage.upload_folder(CONTAINER_NAME, local_folder)
+        await storage.download_folder(CONTAINER_NAME, dest_folder)
+
+    run_with_storage(operation)
+
+    dest_resources_dir = os.path.join(
+        dest_folder, local_folder, "infrastructure", "resources"
+    )
+    assert sorted(os.listdir(dest_resources_dir)) == sorted(
+        f"file-{i}.tf" for i in range(10)
+    )
+    with open(os.path.join(dest_resources_dir, "file-3.tf")) as f:
+        assert f.read() == "content 3"
+    assert not os.path.exists(os.path.join(dest_folder, LOCK_FILE_NAME))
+
+
+def test_folder_transfers_read_and_write_files_off_the_event_loop(
+    run_with_storage: Callable, local_folder: str, matcha_testing_directory: str
+):
+    """Test that the files of a folder transfer are read and written in the executor, not on the event loop's thread.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+        local_folder (str): the folder to upload.
+        matcha_testing_directory (str): temporary working directory.
+    """
+    thread_ids: List[int] = []
+
+    def recording_read_file(file_path: str) -> bytes:
+        thread_ids.append(threading.get_ident())
+        return read_file(file_path)
+
+    def recording_write_file(dest_file_path: str, data: bytes) -> None:
+        thread_ids.append(threading.get_ident())
+        write_file(dest_file_path, data)
+
+    async def operation(storage: AsyncAzureStorage) -> None:
+        await storage.upload_folder(CONTAINER_NAME, local_folder)
+        await storage.download_folder(
+            CONTAINER_NAME, os.path.join(matcha_testing_directory, "download")
+        )
+
+    with patch(
+        "matcha_ml.storage.async_azure_storage.read_file", recording_read_file
+    ), patch("matcha_ml.storage.async_azure_storage.write_file", recording_write_file):
+        run_with_storage(operation)
+
+    # every file is read once to upload it, and written once to download it
+    assert len(thread_ids) == 2 * len(
+        os.listdir(os.path.join(local_folder, "infrastructure", "resources"))
+    )
+    assert threading.get_ident() not in thread_ids
+
+
+def test_download_folder_in_sync_makes_one_request(
+    run_with_storage: Callable,
+    fake_azure_transport: Any,
+    local_folder: str,
+    matcha_testing_directory: str,
+):
+    """Test that downloading into a folder that already matches the container only lists the blobs.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+        fake_azure_transport (Any): the in-memory Azure transport.
+        local_folder (str): the folder to upload.
+        matcha_testing_directory (str): temporary working directory.
+    """
+
+    async def operation(storage: AsyncAzureStorage) -> TransferReport:
+        await storage.upload_folder(CONTAINER_NAME, local_folder)
+        fake_azure_transport.requests.clear()
+        return await storage.download_folder(CONTAINER_NAME, matcha_testing_directory)
+
+    report = run_with_storage(operation)
+
+    assert report == TransferReport(blobs_skipped=10)
+    assert fake_azure_transport.requests == [("GET", f"/{CONTAINER_NAME}")]
+
+
+def test_create_empty_raises_when_blob_exists(run_with_storage: Callable):
+    """Test that creating an empty blob fails when it already exists, as relied on by the remote state lock.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+    """
+
+    async def operation(storage: AsyncAzureStorage) -> None:
+        await storage.create_empty(CONTAINER_NAME, LOCK_FILE_NAME)
+        assert await storage.blob_exists(CONTAINER_NAME, LOCK_FILE_NAME)
+        await storage.create_empty(CONTAINER_NAME, LOCK_FILE_NAME)
+
+    with pytest.raises(ResourceExistsError):
+        run_with_storage(operation)
+
+
+def test_delete_blob(run_with_storage: Callable, fake_azure_transport: Any):
+    """Test that a deleted blob no longer exists.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+        fake_azure_transport (Any): the in-memory Azure transport.
+    """
+    fake_azure_transport.containers[CONTAINER_NAME]["blob"] = b"data"
+
+    async def operation(storage: AsyncAzureStorage) -> bool:
+        await storage.delete_blob(CONTAINER_NAME, "blob")
+        return await storage.blob_exists(CONTAINER_NAME, "blob")
+
+    assert not run_with_storage(operation)
+
+
+def test_get_hash_remote_state(run_with_storage: Callable, fake_azure_transport: Any):
+    """Test that the hash of the remote state is read from its properties, without downloading it.
+
+    Args:
+        run_with_storage (Callable): runs a coroutine function against a storage instance.
+        fake_azure_transport (Any): the in-memory Azure transport.
+    """
+    fake_azure_transport.containers[CONTAINER_NAME]["state.json"] = b'{"state": 1}'
+
+    async def operation(storage: AsyncAzureStorage) -> str:
+        return await storage.get_hash_remote_state(CONTAINER_NAME, "state.json")
+
+    assert run_with_storage(operation) == hashlib.md5(b'{"state": 1}').hexdigest()
+    assert ("GET", f"/{CONTAINER_NAME}/state.json") not in fake_azure_transport.requests
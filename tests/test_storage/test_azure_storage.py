@@ -1,12 +1,36 @@
 """Test suite to mock testing for AzureStorage class."""
+import hashlib
 import os
+import threading
+import time
+from typing import Any, Iterator
 from unittest.mock import patch
 
 import pytest
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceNotFoundError,
+    ServiceResponseError,
+)
 from azure.storage.blob import BlobProperties, BlobServiceClient
 
 from matcha_ml.services.azure_service import AzureClient
-from matcha_ml.storage.azure_storage import AzureStorage
+from matcha_ml.storage.azure_storage import (
+    DEFAULT_MAX_CONCURRENT_TRANSFERS,
+    MAX_BLOBS_PER_BATCH,
+    AzureStorage,
+    BlobDeletionError,
+    BlobDeletionFailure,
+    TransferConfig,
+    TransferLimiter,
+)
+from matcha_ml.storage.blob_hash_store import BlobHashStore
+from matcha_ml.storage.state_history import (
+    HISTORY_HEAD_BLOB_NAME,
+    HISTORY_OBJECT_PREFIX,
+    history_object_blob_name,
+)
+from matcha_ml.storage.storage_backend import TransferReport
 
 CLASS_STUB = "matcha_ml.storage.azure_storage"
 
@@ -30,6 +54,58 @@ def mock_blob_service() -> BlobServiceClient:
         yield mock_blob_service
 
 
+class InFlightCounter:
+    """Counts the calls in flight at the same time, each call taking `latency` seconds."""
+
+    def __init__(self, latency: float = 0.05) -> None:
+        """Initialize the counter.
+
+        Args:
+            latency (float): the seconds each call takes.
+        """
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args: Any, **kwargs: Any) -> None:
+        """Record a call in flight.
+
+        Args:
+            *args (Any): ignored.
+            **kwargs (Any): ignored.
+        """
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def reset_transfer_limiter() -> Iterator[None]:
+    """Restore the default cap of the transfer limiter after a test.
+
+    Yields:
+        None: control is returned to the test.
+    """
+    yield
+    TransferLimiter.configure(DEFAULT_MAX_CONCURRENT_TRANSFERS)
+
+
+def _write_files(folder: str, count: int) -> None:
+    """Write files with distinct contents to a folder.
+
+    Args:
+        folder (str): the folder.
+        count (int): the number of files.
+    """
+    for i in range(count):
+        with open(os.path.join(folder, f"file-{i}.tf"), "w") as f:
+            f.write(f"content {i}")
+
+
 def test_container_exists(
     mock_blob_service: BlobServiceClient, mocked_azure_client: AzureClient
 ):
@@ -116,7 +192,7 @@ def test_upload_folder(
         matcha_testing_directory (str): Temporary directory
         mocked_azure_client (AzureClient): mocked azure client
     """
-    # Create a test set of azure files for mocking the return value of list_blob_names method
+    # Create a test set of azure files for mocking the return value of list_blobs method
     test_azure_files = {"file_not_exist"}
 
     # Create temp files inside temp directory
@@ -132,8 +208,10 @@ def test_upload_folder(
     # Mock blob client
     mock_blob_client = mock_container_client.get_blob_client.return_value
 
-    # Mock container client list_blob_names() method, only 1 file to delete
-    mock_container_client.list_blob_names.return_value = test_azure_files
+    # Mock container client list_blobs() method, only 1 file to delete
+    mock_container_client.list_blobs.return_value = [
+        BlobProperties(name=n) for n in test_azure_files
+    ]
 
     mock_az_storage = AzureStorage("testaccount", "test-rg")
     mock_az_storage.az_client = mocked_azure_client
@@ -145,8 +223,8 @@ def test_upload_folder(
         # Check if upload_blob function is called
         mock_blob_client.upload_blob.assert_called()
 
-        # Check if list_blob_names function is called
-        mock_container_client.list_blob_names.assert_called()
+        # Check if list_blobs function is called
+        mock_container_client.list_blobs.assert_called()
 
         # Check if delete_blob function is called
         mock_container_client.delete_blob.assert_called()
@@ -160,6 +238,154 @@ def test_upload_folder(
         assert mock_container_client.delete_blob.call_count == 1
 
 
+def test_upload_folder_skips_unchanged_files(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that only files whose MD5 differs from the blob's Content-MD5 are uploaded, and that the report says so.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    unchanged_file = os.path.join(matcha_testing_directory, "unchanged.txt")
+    changed_file = os.path.join(matcha_testing_directory, "changed.txt")
+    for file_path in (unchanged_file, changed_file):
+        with open(file_path, "w") as f:
+            f.write("new content")
+
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_blob_client = mock_container_client.get_blob_client.return_value
+    mock_container_client.list_blobs.return_value = [
+        BlobProperties(
+            name=unchanged_file,
+            **{"Content-MD5": bytearray(hashlib.md5(b"new content").digest())},
+        ),
+        BlobProperties(
+            name=changed_file,
+            **{"Content-MD5": bytearray(hashlib.md5(b"old content").digest())},
+        ),
+        BlobProperties(name="deleted.txt"),
+    ]
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    report = az_storage.upload_folder("testcontainer", matcha_testing_directory)
+
+    mock_container_client.get_blob_client.assert_called_once_with(changed_file)
+    assert mock_blob_client.upload_blob.call_args.kwargs[
+        "content_settings"
+    ].content_md5 == bytearray(hashlib.md5(b"new content").digest())
+    mock_container_client.delete_blob.assert_called_once_with("deleted.txt")
+    assert report == TransferReport(
+        blobs_transferred=1,
+        bytes_transferred=len("new content"),
+        blobs_skipped=1,
+        blobs_deleted=1,
+    )
+
+
+def test_upload_folder_without_changes_transfers_nothing(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that uploading a folder that matches the container only lists the blobs.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    file_path = os.path.join(matcha_testing_directory, "main.tf")
+    with open(file_path, "w") as f:
+        f.write("content")
+
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = [
+        BlobProperties(
+            name=file_path,
+            **{"Content-MD5": bytearray(hashlib.md5(b"content").digest())},
+        )
+    ]
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    report = az_storage.upload_folder("testcontainer", matcha_testing_directory)
+
+    mock_container_client.get_blob_client.return_value.upload_blob.assert_not_called()
+    mock_container_client.delete_blob.assert_not_called()
+    assert report == TransferReport(blobs_skipped=1)
+
+
+def test_upload_folder_excludes_terraform_folder(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that provider binaries in .terraform are neither uploaded nor counted, and stale copies are deleted.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    resources_dir = os.path.join(matcha_testing_directory, "resources")
+    provider_dir = os.path.join(resources_dir, ".terraform", "providers", "azurerm")
+    os.makedirs(provider_dir)
+    provider_binary = os.path.join(provider_dir, "terraform-provider-azurerm")
+    with open(provider_binary, "wb") as f:
+        f.write(os.urandom(1024 * 1024))
+    main_file = os.path.join(resources_dir, "main.tf")
+    with open(main_file, "w") as f:
+        f.write("content")
+
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = [
+        BlobProperties(name=provider_binary)
+    ]
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    report = az_storage.upload_folder("testcontainer", matcha_testing_directory)
+
+    mock_container_client.get_blob_client.assert_called_once_with(main_file)
+    mock_container_client.delete_blob.assert_called_once_with(provider_binary)
+    assert report.bytes_transferred == os.path.getsize(main_file)
+    assert report == TransferReport(
+        blobs_transferred=1, bytes_transferred=len("content"), blobs_deleted=1
+    )
+
+
+def test_upload_folder_excludes_matchaignore_patterns(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that files matching a pattern of the .matchaignore file are not uploaded.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    os.chdir(matcha_testing_directory)
+    with open(".matchaignore", "w") as f:
+        f.write("*.tfvars\n")
+    os.makedirs("resources")
+    for file_name in ("main.tf", "secrets.tfvars"):
+        with open(os.path.join("resources", file_name), "w") as f:
+            f.write("content")
+
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = []
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    report = az_storage.upload_folder("testcontainer", "resources")
+
+    mock_container_client.get_blob_client.assert_called_once_with(
+        os.path.join("resources", "main.tf")
+    )
+    assert report == TransferReport(
+        blobs_transferred=1, bytes_transferred=len("content")
+    )
+
+
 def test_download_file(
     mock_blob_service: BlobServiceClient,
     matcha_testing_directory: str,
@@ -273,7 +499,7 @@ def test_create_empty(mock_blob_service: BlobServiceClient) -> None:
     )
     mock_container_client.get_blob_client.assert_called_once_with("testblob")
     mock_blob_client.upload_blob.assert_called_once_with(
-        data=""
+        data="", metadata=None
     )  # Check that blob is uploaded and empty
 
 
@@ -351,7 +577,9 @@ def test_delete_blob(mock_blob_service: BlobServiceClient) -> None:
         "testcontainer"
     )
     mock_container_client.get_blob_client.assert_called_with("testblob")
-    mock_blob_client.delete_blob.assert_called_once_with()  # Check that blob is uploaded and empty
+    mock_blob_client.delete_blob.assert_called_once_with(
+        lease=None
+    )  # Check that blob is uploaded and empty
 
 
 def test_get_blob_names(mock_blob_service: BlobServiceClient) -> None:
@@ -407,7 +635,7 @@ def test_sync_remote(mock_blob_service: BlobServiceClient) -> None:
 def test_sync_local(
     mock_blob_service: BlobServiceClient, matcha_testing_directory: str
 ) -> None:
-    """Test that sync local removes the matcha directory.
+    """Test that sync local removes the files of the matcha directory that are not in the remote storage.
 
     Args:
         mock_blob_service (BlobServiceClient): Mocked blob service client.
@@ -438,7 +666,7 @@ def test_sync_local(
     assert os.path.exists(test_file_path)
 
     az_storage = AzureStorage("testaccount", "test-rg")
-    az_storage._sync_local(matcha_resources_dir)
+    az_storage._sync_local(matcha_testing_directory, set())
 
     # Check if terraform cache are not deleted and all other files are deleted
     assert os.path.exists(matcha_resources_tf_cache_dir)
@@ -529,3 +757,619 @@ def test_download_folder_does_not_retrieve_matcha_lock_file(
         # Check that the matcha.lock file does not exist in local but "file_only_exist_azure" does
         assert "matcha.lock" not in os.listdir(matcha_testing_directory)
         assert "file_only_exist_azure" in os.listdir(matcha_testing_directory)
+
+
+def test_download_folder_skips_excluded_blobs(
+    mock_blob_service: BlobServiceClient,
+    matcha_testing_directory: str,
+    mocked_azure_client: AzureClient,
+):
+    """Test that blobs in a .terraform folder, uploaded by an earlier version, are not downloaded.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+        mocked_azure_client (AzureClient): mocked azure client
+    """
+    os.chdir(matcha_testing_directory)
+    excluded_blob = os.path.join("resources", ".terraform", "providers", "binary")
+    included_blob = os.path.join("resources", "main.tf")
+
+    mock_container_client = mock_blob_service.get_container_client.return_value
+    mock_container_client.list_blobs.return_value = [
+        BlobProperties(name=n) for n in (excluded_blob, included_blob)
+    ]
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    az_storage.az_client = mocked_azure_client
+    with patch.object(AzureStorage, "_get_container_client") as mock_fn:
+        mock_fn.return_value = mock_container_client
+        az_storage.download_folder("testcontainer", matcha_testing_directory)
+
+    mock_container_client.get_blob_client.assert_called_once_with(included_blob)
+    assert not os.path.exists(os.path.join(matcha_testing_directory, excluded_blob))
+
+
+def test_download_folder_in_sync_only_lists_blobs(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that downloading into a folder that matches the container makes a single list call.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    os.chdir(matcha_testing_directory)
+    blob_name = os.path.join(".matcha", "infrastructure", "main.tf")
+    os.makedirs(os.path.dirname(blob_name))
+    with open(blob_name, "w") as f:
+        f.write("content")
+
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = [
+        BlobProperties(
+            name=blob_name,
+            **{
+                "Content-Length": len("content"),
+                "Content-MD5": bytearray(hashlib.md5(b"content").digest()),
+            },
+        )
+    ]
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    report = az_storage.download_folder("testcontainer", matcha_testing_directory)
+
+    mock_container_client.list_blobs.assert_called_once()
+    mock_container_client.get_blob_client.assert_not_called()
+    assert os.path.exists(blob_name)
+    assert report == TransferReport(blobs_skipped=1)
+
+
+def test_download_folder_downloads_changed_and_removes_deleted_files(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that only blobs whose local copy differs are downloaded, and only files gone remotely are removed.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    os.chdir(matcha_testing_directory)
+    infrastructure_dir = os.path.join(".matcha", "infrastructure")
+    os.makedirs(infrastructure_dir)
+    file_contents = {"unchanged.tf": "content", "changed.tf": "old", "gone.tf": "x"}
+    for file_name, content in file_contents.items():
+        with open(os.path.join(infrastructure_dir, file_name), "w") as f:
+            f.write(content)
+
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = [
+        BlobProperties(
+            name=os.path.join(infrastructure_dir, file_name),
+            **{
+                "Content-Length": len(content),
+                "Content-MD5": bytearray(hashlib.md5(content.encode()).digest()),
+            },
+        )
+        for file_name, content in (("unchanged.tf", "content"), ("changed.tf", "new"))
+    ]
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    report = az_storage.download_folder("testcontainer", matcha_testing_directory)
+
+    mock_container_client.get_blob_client.assert_called_once_with(
+        os.path.join(infrastructure_dir, "changed.tf")
+    )
+    assert sorted(os.listdir(infrastructure_dir)) == ["changed.tf", "unchanged.tf"]
+    assert report == TransferReport(
+        blobs_transferred=1,
+        bytes_transferred=len("new"),
+        blobs_skipped=1,
+        blobs_deleted=1,
+    )
+
+
+def test_download_folder_skips_blob_without_content_md5_until_etag_changes(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that a blob without a Content-MD5 is downloaded again only once its ETag changes.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    os.chdir(matcha_testing_directory)
+    blob_name = os.path.join(".matcha", "infrastructure", "main.tf")
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_blob_client = mock_container_client.get_blob_client.return_value
+    mock_blob_client.download_blob.return_value.readinto.side_effect = (
+        lambda stream: stream.write(b"content")
+    )
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    etags = ["0x1", "0x1", "0x2"]
+    for etag in etags:
+        mock_container_client.list_blobs.return_value = [
+            BlobProperties(
+                name=blob_name, **{"Content-Length": len("content"), "ETag": etag}
+            )
+        ]
+        az_storage.download_folder("testcontainer", matcha_testing_directory)
+
+    # a download per version of the blob
+    assert mock_blob_client.download_blob.call_count == len(set(etags))
+    with open(blob_name) as f:
+        assert f.read() == "content"
+
+
+def test_download_folder_records_blob_hashes_with_a_single_write(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that the hashes of the blobs without a Content-MD5 of a download are written to the store at once.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    os.chdir(matcha_testing_directory)
+    blob_names = [
+        os.path.join(".matcha", "infrastructure", f"file_{i}.tf") for i in range(4)
+    ]
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = [
+        BlobProperties(
+            name=blob_name, **{"Content-Length": len("content"), "ETag": "0x1"}
+        )
+        for blob_name in blob_names
+    ]
+    mock_container_client.get_blob_client.return_value.download_blob.return_value.readinto.side_effect = lambda stream: stream.write(
+        b"content"
+    )
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+    with patch.object(
+        BlobHashStore, "_write", autospec=True, side_effect=BlobHashStore._write
+    ) as mock_write:
+        az_storage.download_folder("testcontainer", matcha_testing_directory)
+
+    mock_write.assert_called_once()
+    assert az_storage._get_known_blob_md5s(
+        "testcontainer", az_storage.list_blobs("testcontainer")
+    ) == {blob_name: hashlib.md5(b"content").hexdigest() for blob_name in blob_names}
+
+
+def test_get_hash_remote_state_uses_content_md5(
+    mock_blob_service: BlobServiceClient,
+) -> None:
+    """Test that the remote state hash is read from the blob properties without downloading the blob.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+    """
+    mock_blob_client = (
+        mock_blob_service.return_value.get_container_client.return_value.get_blob_client.return_value
+    )
+    mock_blob_client.get_blob_properties.return_value = BlobProperties(
+        **{"Content-MD5": bytearray(hashlib.md5(b"state").digest())}
+    )
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+
+    assert (
+        az_storage.get_hash_remote_state("testcontainer", "matcha.state")
+        == hashlib.md5(b"state").hexdigest()
+    )
+    mock_blob_client.download_blob.assert_not_called()
+
+
+def test_get_hash_remote_state_without_content_md5_is_cached_by_etag(
+    mock_blob_service: BlobServiceClient,
+) -> None:
+    """Test that a blob without a Content-MD5 is only downloaded again once its ETag changes.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+    """
+    mock_blob_client = (
+        mock_blob_service.return_value.get_container_client.return_value.get_blob_client.return_value
+    )
+    mock_blob_client.get_blob_properties.return_value = BlobProperties(
+        name="matcha.state", ETag="etag-1"
+    )
+    mock_blob_client.download_blob.return_value.readall.return_value = b"state"
+
+    az_storage = AzureStorage("testaccount", "test-rg")
+
+    for _ in range(2):
+        assert (
+            az_storage.get_hash_remote_state("testcontainer", "matcha.state")
+            == hashlib.md5(b"state").hexdigest()
+        )
+    assert mock_blob_client.download_blob.call_count == 1
+
+    mock_blob_client.get_blob_properties.return_value = BlobProperties(
+        name="matcha.state", ETag="etag-2"
+    )
+    mock_blob_client.download_blob.reset_mock()
+    az_storage.get_hash_remote_state("testcontainer", "matcha.state")
+
+    # the changed blob is downloaded again
+    assert mock_blob_client.download_blob.call_count == 1
+
+
+def test_upload_folder_runs_uploads_in_parallel(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that files are uploaded by `max_workers` threads at the same time.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    file_count, max_workers = 8, 4
+    _write_files(matcha_testing_directory, file_count)
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = []
+    counter = InFlightCounter()
+    mock_container_client.get_blob_client.return_value.upload_blob.side_effect = counter
+
+    az_storage = AzureStorage(
+        "testaccount",
+        "test-rg",
+        transfer_config=TransferConfig(max_workers=max_workers),
+    )
+    report = az_storage.upload_folder("testcontainer", matcha_testing_directory)
+
+    assert report.blobs_transferred == file_count
+    assert counter.max_in_flight == max_workers
+
+
+def test_transfers_are_capped_across_workers(
+    mock_blob_service: BlobServiceClient,
+    matcha_testing_directory: str,
+    reset_transfer_limiter: None,
+):
+    """Test that the process-wide cap of the transfer limiter bounds the transfers of a larger worker pool.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+        reset_transfer_limiter (None): restores the default cap
+    """
+    max_concurrent_transfers = 2
+    TransferLimiter.configure(max_concurrent_transfers)
+    _write_files(matcha_testing_directory, 8)
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = []
+    counter = InFlightCounter()
+    mock_container_client.get_blob_client.return_value.upload_blob.side_effect = counter
+
+    az_storage = AzureStorage(
+        "testaccount", "test-rg", transfer_config=TransferConfig(max_workers=8)
+    )
+    az_storage.upload_folder("testcontainer", matcha_testing_directory)
+
+    assert counter.max_in_flight == max_concurrent_transfers
+
+
+def test_transfer_limiter_rejects_invalid_cap():
+    """Test that the transfer limiter needs at least one slot."""
+    with pytest.raises(ValueError):
+        TransferLimiter.configure(0)
+
+
+def test_download_folder_retries_transient_errors(
+    mock_blob_service: BlobServiceClient,
+    matcha_testing_directory: str,
+    mocked_azure_client: AzureClient,
+):
+    """Test that a blob whose download is interrupted is downloaded again.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+        mocked_azure_client (AzureClient): mocked azure client
+    """
+    os.chdir(matcha_testing_directory)
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = [BlobProperties(name="main.tf")]
+    mock_blob_client = mock_container_client.get_blob_client.return_value
+    attempts = [
+        ServiceResponseError("Connection reset"),
+        mock_blob_client.download_blob.return_value,
+    ]
+    mock_blob_client.download_blob.side_effect = attempts
+
+    az_storage = AzureStorage(
+        "testaccount", "test-rg", transfer_config=TransferConfig(retry_backoff=0)
+    )
+    az_storage.download_folder("testcontainer", matcha_testing_directory)
+
+    assert mock_blob_client.download_blob.call_count == len(attempts)
+
+
+def test_download_folder_raises_after_last_attempt(
+    mock_blob_service: BlobServiceClient,
+    matcha_testing_directory: str,
+    mocked_azure_client: AzureClient,
+):
+    """Test that the error of a blob that fails on every attempt is raised.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+        mocked_azure_client (AzureClient): mocked azure client
+    """
+    os.chdir(matcha_testing_directory)
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = [BlobProperties(name="main.tf")]
+    mock_blob_client = mock_container_client.get_blob_client.return_value
+    mock_blob_client.download_blob.side_effect = ServiceResponseError(
+        "Connection reset"
+    )
+
+    max_attempts = 3
+    az_storage = AzureStorage(
+        "testaccount",
+        "test-rg",
+        transfer_config=TransferConfig(max_attempts=max_attempts, retry_backoff=0),
+    )
+    with pytest.raises(ServiceResponseError):
+        az_storage.download_folder("testcontainer", matcha_testing_directory)
+
+    assert mock_blob_client.download_blob.call_count == max_attempts
+
+
+def test_upload_folder_does_not_retry_permanent_errors(
+    mock_blob_service: BlobServiceClient, matcha_testing_directory: str
+):
+    """Test that an error that would fail again, such as a missing container, is raised on the first attempt.
+
+    Args:
+        mock_blob_service (BlobServiceClient): Mocked blob service client
+        matcha_testing_directory (str): Temporary directory
+    """
+    _write_files(matcha_testing_directory, 1)
+    mock_container_client = (
+        mock_blob_service.return_value.get_container_client.return_value
+    )
+    mock_container_client.list_blobs.return_value = []
+    mock_blob_client = mock_container_client.get_blob_client.return_value
+    mock_blob_client.upload_blob.side_effect = ResourceNotFoundError("No container")
+
+    az_storage = AzureStorage(
+        "testaccount", "test-rg", transfer_config=TransferConfig(retry_backoff=0)
+    )
+    with pytest.raises(ResourceNotFoundError):
+        az_storage.upload_folder("testcontainer", matcha_testing_directory)
+
+    assert mock_blob_client.upload_blob.call_count == 1
+
+
+def test_acquire_lease_raises_while_leased(
+    fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that a blob can only be leased by one client until its lease expires.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_container.put("testblob", b"")
+    fake_azure_storage.acquire_lease("testcontainer", "testblob", lease_duration=15)
+
+    with pytest.raises(ResourceExistsError):
+        fake_azure_storage.acquire_lease("testcontainer", "testblob", lease_duration=15)
+
+    fake_container.time += 15
+    fake_azure_storage.acquire_lease("testcontainer", "testblob", lease_duration=15)
+
+
+def test_break_lease(fake_azure_storage: AzureStorage, fake_container: Any):
+    """Test that breaking a lease frees the blob, and breaking a blob without a lease does nothing.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_container.put("testblob", b"")
+    fake_azure_storage.acquire_lease("testcontainer", "testblob", lease_duration=15)
+
+    fake_azure_storage.break_lease("testcontainer", "testblob")
+    fake_azure_storage.break_lease("testcontainer", "testblob")
+
+    fake_azure_storage.delete_blob("testcontainer", "testblob")
+    assert "testblob" not in fake_container.blobs
+
+
+def test_sync_remote_deletes_in_batches(
+    fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that stale blobs are deleted with one batch request per MAX_BLOBS_PER_BATCH blobs.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    stale_blobs = {f"stale/{i:04d}" for i in range(MAX_BLOBS_PER_BATCH * 2 + 10)}
+    for blob_name in stale_blobs | {"matcha.lock"}:
+        fake_container.put(blob_name, b"")
+
+    blobs_deleted = fake_azure_storage._sync_remote(
+        "testcontainer", stale_blobs | {"matcha.lock"}
+    )
+
+    assert blobs_deleted == len(stale_blobs)
+    assert [request for request, _ in fake_container.requests] == ["BATCH"] * 3
+    assert set(fake_container.blobs) == {"matcha.lock"}
+
+
+def test_sync_remote_deletes_one_by_one_without_batch_support(
+    fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that a batch refused as a whole is deleted blob by blob.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_container.batch_supported = False
+    stale_blobs = {"stale/1", "stale/2", "stale/3"}
+    for blob_name in stale_blobs:
+        fake_container.put(blob_name, b"")
+
+    blobs_deleted = fake_azure_storage._sync_remote("testcontainer", stale_blobs)
+
+    assert blobs_deleted == len(stale_blobs)
+    assert fake_container.requests == [("BATCH", "stale/1,stale/2,stale/3")] + [
+        ("DELETE", blob_name) for blob_name in sorted(stale_blobs)
+    ]
+    assert fake_container.blobs == {}
+
+
+def test_sync_remote_reports_the_blobs_that_failed(
+    fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that every batch is attempted, and the blobs that could not be deleted are reported with their batch.
+
+    Blobs that were already deleted are not failures.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    stale_blobs = {f"stale/{i:04d}" for i in range(MAX_BLOBS_PER_BATCH + 2)}
+    for blob_name in stale_blobs - {"stale/0000"}:
+        fake_container.put(blob_name, b"")
+    leased_blob = f"stale/{MAX_BLOBS_PER_BATCH:04d}"
+    fake_azure_storage.acquire_lease("testcontainer", leased_blob, lease_duration=15)
+
+    with pytest.raises(BlobDeletionError) as error:
+        fake_azure_storage._sync_remote("testcontainer", stale_blobs)
+
+    assert error.value.failures == [
+        BlobDeletionFailure(leased_blob, 2, 2, 412, "LeaseIdMissing")
+    ]
+    assert f"{leased_blob} (batch 2 of 2): 412 LeaseIdMissing" in str(error.value)
+    assert set(fake_container.blobs) == {leased_blob}
+
+
+def test_restore_history_copies_blobs_without_uploading_them(
+    fake_azure_storage: AzureStorage, fake_container: Any, matcha_testing_directory: str
+):
+    """Test that restoring a history entry copies the changed files from their objects and deletes the new files.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        matcha_testing_directory (str): Temporary directory
+    """
+    os.chdir(matcha_testing_directory)
+    src_folder = os.path.join(".matcha", "infrastructure")
+    state_file = os.path.join(src_folder, "matcha.state")
+    new_file = os.path.join(src_folder, "new.tf")
+    os.makedirs(src_folder)
+    with open(state_file, "w") as f:
+        f.write("first")
+    fake_azure_storage.upload_folder("testcontainer", src_folder)
+    entry = fake_azure_storage.record_history("testcontainer", src_folder)
+    assert entry is not None
+
+    with open(state_file, "w") as f:
+        f.write("second")
+    with open(new_file, "w") as f:
+        f.write("new")
+    fake_azure_storage.upload_folder("testcontainer", src_folder)
+    fake_azure_storage.record_history("testcontainer", src_folder)
+    fake_container.requests.clear()
+
+    restore_entry, report = fake_azure_storage.restore_history("testcontainer", entry)
+
+    assert fake_container.blobs[state_file] == b"first"
+    assert new_file not in fake_container.blobs
+    assert report == TransferReport(blobs_transferred=1, blobs_deleted=1)
+    assert ("COPY", state_file) in fake_container.requests
+    assert [
+        blob_name for request, blob_name in fake_container.requests if request == "PUT"
+    ] == [HISTORY_HEAD_BLOB_NAME]
+    assert restore_entry.restored_from == entry.id
+    assert restore_entry.files == entry.files
+
+
+def test_record_history_copies_the_uploaded_blobs(
+    fake_azure_storage: AzureStorage, fake_container: Any, matcha_testing_directory: str
+):
+    """Test that the history of a folder that was just uploaded is stored by copying its blobs, without uploading them.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        matcha_testing_directory (str): Temporary directory
+    """
+    os.chdir(matcha_testing_directory)
+    src_folder = os.path.join(".matcha", "infrastructure")
+    state_file = os.path.join(src_folder, "matcha.state")
+    os.makedirs(src_folder)
+    with open(state_file, "w") as f:
+        f.write("state")
+    report = fake_azure_storage.upload_folder("testcontainer", src_folder)
+    fake_container.requests.clear()
+
+    entry = fake_azure_storage.record_history(
+        "testcontainer", src_folder, uploaded_files=report.files
+    )
+
+    assert entry is not None
+    assert entry.files == {state_file: hashlib.md5(b"state").hexdigest()}
+    assert [request for request in fake_container.requests if request[0] == "COPY"] == [
+        ("COPY", history_object_blob_name(entry.files[state_file]))
+    ]
+    assert [
+        blob_name for request, blob_name in fake_container.requests if request == "PUT"
+    ] == [HISTORY_HEAD_BLOB_NAME]
+    assert ("LIST", HISTORY_OBJECT_PREFIX) not in fake_container.requests
+
+
+def test_record_history_of_an_unchanged_folder_reads_the_head_only(
+    fake_azure_storage: AzureStorage, fake_container: Any, matcha_testing_directory: str
+):
+    """Test that recording a folder that matches the latest entry costs a single request, without any listing.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        matcha_testing_directory (str): Temporary directory
+    """
+    os.chdir(matcha_testing_directory)
+    src_folder = os.path.join(".matcha", "infrastructure")
+    os.makedirs(src_folder)
+    with open(os.path.join(src_folder, "matcha.state"), "w") as f:
+        f.write("state")
+    report = fake_azure_storage.upload_folder("testcontainer", src_folder)
+    fake_azure_storage.record_history(
+        "testcontainer", src_folder, uploaded_files=report.files
+    )
+    fake_container.requests.clear()
+
+    entry = fake_azure_storage.record_history(
+        "testcontainer", src_folder, uploaded_files=report.files
+    )
+
+    assert entry is None
+    assert fake_container.requests == [("GET", HISTORY_HEAD_BLOB_NAME)]
@@ -0,0 +1,59 @@
+"""Tests for the store of the MD5 hashes of blobs without a Content-MD5."""
+import os
+
+from matcha_ml.services.metadata_cache_service import MetadataCache
+from matcha_ml.storage.blob_hash_store import BlobHashStore
+from matcha_ml.storage.storage_backend import BlobInfo
+
+CONTAINER_KEY = "azure/testaccount/testcontainer"
+
+
+def test_get_returns_hashes_that_were_set(mocked_blob_hash_store_path: str):
+    """Test that recorded hashes are persisted to disk and read back for blobs that kept their ETag.
+
+    Args:
+        mocked_blob_hash_store_path (str): the path to the blob hash store file used in tests.
+    """
+    blobs = [BlobInfo(name="a.tf", etag="0x1"), BlobInfo(name="b.tf", etag="0x1")]
+    BlobHashStore().set(CONTAINER_KEY, [(blobs[0], "md5-a"), (blobs[1], "md5-b")])
+
+    assert os.path.exists(mocked_blob_hash_store_path)
+    assert BlobHashStore().get(CONTAINER_KEY, blobs) == {
+        "a.tf": "md5-a",
+        "b.tf": "md5-b",
+    }
+
+
+def test_get_skips_blobs_whose_etag_changed():
+    """Test that the hash of a blob that was written since it was hashed is unknown."""
+    store = BlobHashStore()
+    store.set(CONTAINER_KEY, [(BlobInfo(name="a.tf", etag="0x1"), "md5-a")])
+
+    assert store.get(CONTAINER_KEY, [BlobInfo(name="a.tf", etag="0x2")]) == {}
+    assert (
+        store.get("azure/other/testcontainer", [BlobInfo(name="a.tf", etag="0x1")])
+        == {}
+    )
+
+
+def test_hashes_survive_a_metadata_cache_refresh():
+    """Test that clearing the metadata cache, as `matcha --refresh` does, keeps the recorded hashes."""
+    blob = BlobInfo(name="a.tf", etag="0x1")
+    BlobHashStore().set(CONTAINER_KEY, [(blob, "md5-a")])
+
+    MetadataCache().invalidate()
+
+    assert BlobHashStore().get(CONTAINER_KEY, [blob]) == {"a.tf": "md5-a"}
+
+
+def test_get_returns_nothing_when_file_is_corrupt(mocked_blob_hash_store_path: str):
+    """Test that an unreadable store is treated as empty.
+
+    Args:
+        mocked_blob_hash_store_path (str): the path to the blob hash store file used in tests.
+    """
+    os.makedirs(os.path.dirname(mocked_blob_hash_store_path), exist_ok=True)
+    with open(mocked_blob_hash_store_path, "w") as f:
+        f.write("{not json")
+
+    assert BlobHashStore().get(CONTAINER_KEY, [BlobInfo(name="a.tf")]) == {}
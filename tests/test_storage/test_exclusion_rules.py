@@ -0,0 +1,88 @@
+"""Tests for the exclusion rules of remote state transfers."""
+import os
+
+import pytest
+
+from matcha_ml.storage.exclusion_rules import MATCHA_IGNORE_FILE_NAME, ExclusionRules
+
+
+@pytest.mark.parametrize(
+    "path, excluded",
+    [
+        (".matcha/infrastructure/resources/.terraform/providers/azurerm", True),
+        (".terraform/terraform.tfstate", True),
+        (".matcha/infrastructure/resources/main.tf", False),
+        (".matcha/infrastructure/resources/.terraform.lock.hcl", False),
+        (".terraform", False),
+        (".matcha/infrastructure/resources/matcha.tfplan", True),
+    ],
+)
+def test_default_rules_exclude_terraform_folders(path: str, excluded: bool):
+    """Test that the default rules exclude everything inside a .terraform folder, at any depth, and saved plans.
+
+    Args:
+        path (str): the path to check.
+        excluded (bool): the expected result.
+    """
+    assert ExclusionRules().is_excluded(path) == excluded
+
+
+@pytest.mark.parametrize(
+    "pattern, path, excluded",
+    [
+        ("*.tfvars", ".matcha/infrastructure/resources/terraform.tfvars", True),
+        ("*.tfvars", ".matcha/infrastructure/resources/main.tf", False),
+        ("resources/*.tfvars", ".matcha/infrastructure/resources/a.tfvars", True),
+        ("resources/*.tfvars", ".matcha/infrastructure/a.tfvars", False),
+        ("cache/", ".matcha/cache/file.txt", True),
+        ("cache/", ".matcha/cache", False),
+        ("cache", ".matcha/cache", True),
+        ("tmp-?", "./.matcha/tmp-1/file.txt", True),
+    ],
+)
+def test_glob_patterns(pattern: str, path: str, excluded: bool):
+    """Test that glob patterns are matched against consecutive path components.
+
+    Args:
+        pattern (str): the glob pattern.
+        path (str): the path to check.
+        excluded (bool): the expected result.
+    """
+    assert ExclusionRules([pattern]).is_excluded(path) == excluded
+
+
+def test_blank_lines_and_comments_are_ignored():
+    """Test that blank lines and comments are not treated as patterns."""
+    rules = ExclusionRules(["", "  ", "# *.tf", " *.log "])
+
+    assert rules.patterns == ["*.log"]
+
+
+def test_load_reads_matchaignore_file(matcha_testing_directory: str):
+    """Test that the patterns of the .matchaignore file are added to the default patterns.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory.
+    """
+    with open(
+        os.path.join(matcha_testing_directory, MATCHA_IGNORE_FILE_NAME), "w"
+    ) as f:
+        f.write("# local overrides\n*.tfvars\n")
+
+    rules = ExclusionRules.load(matcha_testing_directory)
+
+    assert rules.patterns == [".terraform/", "*.tfplan", "*.tfvars"]
+    assert rules.is_excluded("resources/.terraform/plugin")
+    assert rules.is_excluded("resources/terraform.tfvars")
+
+
+def test_load_without_matchaignore_file(matcha_testing_directory: str):
+    """Test that only the default patterns are loaded when there is no .matchaignore file.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory.
+    """
+    assert ExclusionRules.load(matcha_testing_directory).patterns == [
+        ".terraform/",
+        "*.tfplan",
+    ]
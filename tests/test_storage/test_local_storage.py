@@ -0,0 +1,562 @@
+"""Tests for the storage backend keeping the remote state in a local directory."""
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, List
+
+import pytest
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
+
+from matcha_ml.constants import LOCK_FILE_NAME
+from matcha_ml.storage import LocalStorage
+from matcha_ml.storage.state_history import (
+    HISTORY_HEAD_BLOB_NAME,
+    HISTORY_OBJECT_PREFIX,
+    history_object_blob_name,
+)
+from matcha_ml.storage.state_snapshot import SNAPSHOT_INDEX_BLOB_NAME
+from matcha_ml.storage.storage_backend import TransferReport
+
+CONTAINER_NAME = "test-container"
+STATE_FILES = {
+    os.path.join(".matcha", "infrastructure", "matcha.state"): b'{"state": 1}',
+    os.path.join(".matcha", "infrastructure", "aks", "main.tf"): b"resource {}",
+}
+
+
+class FakeClock:
+    """A clock that only moves when a test moves it."""
+
+    def __init__(self) -> None:
+        """Start the clock at 1000 seconds."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Get the current time.
+
+        Returns:
+            float: the current time in seconds.
+        """
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """A fixture for the clock the leases expire against.
+
+    Returns:
+        FakeClock: the clock.
+    """
+    return FakeClock()
+
+
+@pytest.fixture
+def local_storage(matcha_testing_directory: str, clock: FakeClock) -> LocalStorage:
+    """A fixture for a local storage with an empty container.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory path
+        clock (FakeClock): the clock the leases expire against.
+
+    Returns:
+        LocalStorage: the storage.
+    """
+    storage = LocalStorage(
+        os.path.join(matcha_testing_directory, "remote"), clock=clock
+    )
+    storage.create_container(CONTAINER_NAME)
+    return storage
+
+
+@pytest.fixture
+def state_folder(matcha_testing_directory: str) -> Iterator[str]:
+    """A fixture for a working directory holding a local state folder.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory path
+
+    Yields:
+        str: the working directory.
+    """
+    working_dir = os.path.join(matcha_testing_directory, "project")
+    for file_path, content in STATE_FILES.items():
+        full_path = os.path.join(working_dir, file_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(content)
+
+    os.chdir(working_dir)
+    yield working_dir
+
+
+def blob_names(storage: LocalStorage) -> List[str]:
+    """Get the names of the blobs in the test container.
+
+    Args:
+        storage (LocalStorage): the storage.
+
+    Returns:
+        List[str]: the blob names.
+    """
+    return [blob.name for blob in storage.list_blobs(CONTAINER_NAME)]
+
+
+def test_container_exists(local_storage: LocalStorage):
+    """Test that only created containers exist.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+    """
+    assert local_storage.resource_group_exists
+    assert local_storage.container_exists(CONTAINER_NAME)
+    assert not local_storage.container_exists("missing")
+
+
+def test_put_get_and_delete_blob(local_storage: LocalStorage):
+    """Test that a written blob is read back and listed with its hash, until it is deleted.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+    """
+    local_storage.put_blob(CONTAINER_NAME, "folder/blob", b"data")
+
+    assert local_storage.get_blob(CONTAINER_NAME, "folder/blob") == b"data"
+    assert local_storage.blob_exists(CONTAINER_NAME, "folder/blob")
+    (blob,) = local_storage.list_blobs(CONTAINER_NAME)
+    assert blob.name == "folder/blob"
+    assert blob.size == len(b"data")
+    assert blob.content_md5 == hashlib.md5(b"data").hexdigest()
+    assert local_storage.get_hash_remote_state(CONTAINER_NAME, "folder/blob") == (
+        hashlib.md5(b"data").hexdigest()
+    )
+
+    local_storage.delete_blob(CONTAINER_NAME, "folder/blob")
+
+    assert not local_storage.blob_exists(CONTAINER_NAME, "folder/blob")
+    assert local_storage.list_blobs(CONTAINER_NAME) == []
+    with pytest.raises(ResourceNotFoundError):
+        local_storage.get_blob(CONTAINER_NAME, "folder/blob")
+
+
+def test_list_blobs_by_prefix(local_storage: LocalStorage):
+    """Test that listing by prefix leaves out the other blobs.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+    """
+    for blob_name in ("a/1", "a/2", "b/1"):
+        local_storage.put_blob(CONTAINER_NAME, blob_name, b"")
+
+    assert [blob.name for blob in local_storage.list_blobs(CONTAINER_NAME, "a/")] == [
+        "a/1",
+        "a/2",
+    ]
+
+
+def test_create_empty_raises_when_blob_exists(local_storage: LocalStorage):
+    """Test that creating a blob only succeeds once, and records its metadata.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+    """
+    local_storage.create_empty(CONTAINER_NAME, LOCK_FILE_NAME, {"key": "value"})
+
+    with pytest.raises(ResourceExistsError):
+        local_storage.create_empty(CONTAINER_NAME, LOCK_FILE_NAME)
+
+    assert local_storage.get_blob_info(CONTAINER_NAME, LOCK_FILE_NAME).metadata == {
+        "key": "value"
+    }
+
+
+def test_lease_blocks_others_until_it_expires(
+    local_storage: LocalStorage, clock: FakeClock
+):
+    """Test that a leased blob can only be leased or deleted by its holder, until the lease expired.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        clock (FakeClock): the clock the leases expire against.
+    """
+    local_storage.create_empty(CONTAINER_NAME, LOCK_FILE_NAME)
+    lease = local_storage.acquire_lease(CONTAINER_NAME, LOCK_FILE_NAME, 15)
+
+    assert local_storage.get_blob_info(CONTAINER_NAME, LOCK_FILE_NAME).lease_state == (
+        "leased"
+    )
+    with pytest.raises(ResourceExistsError):
+        local_storage.acquire_lease(CONTAINER_NAME, LOCK_FILE_NAME, 15)
+    with pytest.raises(HttpResponseError):
+        local_storage.delete_blob(CONTAINER_NAME, LOCK_FILE_NAME)
+    with pytest.raises(HttpResponseError):
+        local_storage.put_blob(CONTAINER_NAME, LOCK_FILE_NAME, b"")
+
+    clock.now += 10
+    lease.renew()
+    clock.now += 10
+    with pytest.raises(ResourceExistsError):
+        local_storage.acquire_lease(CONTAINER_NAME, LOCK_FILE_NAME, 15)
+
+    clock.now += 10
+    assert local_storage.get_blob_info(CONTAINER_NAME, LOCK_FILE_NAME).lease_state == (
+        "expired"
+    )
+    other_lease = local_storage.acquire_lease(CONTAINER_NAME, LOCK_FILE_NAME, 15)
+    with pytest.raises(ResourceExistsError):
+        lease.renew()
+    with pytest.raises(HttpResponseError):
+        local_storage.delete_blob(CONTAINER_NAME, LOCK_FILE_NAME, lease=lease)
+
+    local_storage.delete_blob(CONTAINER_NAME, LOCK_FILE_NAME, lease=other_lease)
+    assert not local_storage.blob_exists(CONTAINER_NAME, LOCK_FILE_NAME)
+
+
+def test_break_lease(local_storage: LocalStorage):
+    """Test that breaking a lease frees the blob straight away, and that a blob without a lease can be broken.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+    """
+    local_storage.create_empty(CONTAINER_NAME, LOCK_FILE_NAME)
+    local_storage.break_lease(CONTAINER_NAME, LOCK_FILE_NAME)
+    lease = local_storage.acquire_lease(CONTAINER_NAME, LOCK_FILE_NAME, 60)
+
+    local_storage.break_lease(CONTAINER_NAME, LOCK_FILE_NAME)
+
+    assert local_storage.get_blob_info(CONTAINER_NAME, LOCK_FILE_NAME).lease_state == (
+        "broken"
+    )
+    with pytest.raises(ResourceExistsError):
+        lease.renew()
+    local_storage.delete_blob(CONTAINER_NAME, LOCK_FILE_NAME)
+
+
+def test_folder_round_trip(
+    local_storage: LocalStorage, state_folder: str, matcha_testing_directory: str
+):
+    """Test that an uploaded folder is downloaded into another working directory, and that unchanged files are skipped.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+        matcha_testing_directory (str): temporary working directory path
+    """
+    src_folder = os.path.join(".matcha", "infrastructure")
+    local_storage.create_empty(CONTAINER_NAME, LOCK_FILE_NAME)
+
+    report = local_storage.upload_folder(CONTAINER_NAME, src_folder)
+
+    assert report == TransferReport(
+        blobs_transferred=2,
+        bytes_transferred=sum(len(content) for content in STATE_FILES.values()),
+    )
+    assert set(blob_names(local_storage)) == set(STATE_FILES) | {LOCK_FILE_NAME}
+    assert local_storage.upload_folder(CONTAINER_NAME, src_folder) == TransferReport(
+        blobs_skipped=2
+    )
+
+    dest_folder = os.path.join(matcha_testing_directory, "other")
+    report = local_storage.download_folder(CONTAINER_NAME, dest_folder)
+
+    assert report.blobs_transferred == len(STATE_FILES)
+    for file_path, content in STATE_FILES.items():
+        with open(os.path.join(dest_folder, file_path), "rb") as f:
+            assert f.read() == content
+    assert local_storage.download_folder(CONTAINER_NAME, dest_folder) == TransferReport(
+        blobs_skipped=2
+    )
+
+
+def test_folder_transfers_run_through_the_transfer_hook(
+    local_storage: LocalStorage, state_folder: str, matcha_testing_directory: str
+):
+    """Test that the blob transfers of a folder upload and download are all handed to `_run_transfers`.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+        matcha_testing_directory (str): temporary working directory path
+    """
+    batches: List[int] = []
+    run_transfers = local_storage._run_transfers
+
+    def record_transfers(transfers: List[Callable[[], None]]) -> None:
+        batches.append(len(transfers))
+        run_transfers(transfers)
+
+    local_storage._run_transfers = record_transfers  # type: ignore[method-assign]
+
+    local_storage.upload_folder(
+        CONTAINER_NAME, os.path.join(".matcha", "infrastructure")
+    )
+    local_storage.download_folder(
+        CONTAINER_NAME, os.path.join(matcha_testing_directory, "other")
+    )
+
+    assert batches == [len(STATE_FILES), len(STATE_FILES)]
+
+
+def test_snapshot_round_trip(
+    local_storage: LocalStorage, state_folder: str, matcha_testing_directory: str
+):
+    """Test that a folder uploaded as a snapshot is downloaded into another working directory.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+        matcha_testing_directory (str): temporary working directory path
+    """
+    src_folder = os.path.join(".matcha", "infrastructure")
+
+    local_storage.upload_snapshot(CONTAINER_NAME, src_folder)
+
+    index = local_storage.get_snapshot_index(CONTAINER_NAME)
+    assert index is not None
+    assert set(blob_names(local_storage)) == {SNAPSHOT_INDEX_BLOB_NAME, index.snapshot}
+    assert local_storage.upload_snapshot(CONTAINER_NAME, src_folder) == (
+        TransferReport(blobs_skipped=1)
+    )
+
+    dest_folder = os.path.join(matcha_testing_directory, "other")
+    local_storage.download_snapshot(CONTAINER_NAME, dest_folder)
+
+    for file_path, content in STATE_FILES.items():
+        with open(os.path.join(dest_folder, file_path), "rb") as f:
+            assert f.read() == content
+
+
+def test_record_history_stores_each_file_version_once(
+    local_storage: LocalStorage, state_folder: str
+):
+    """Test that the history only stores the files that changed, and skips a state that matches the latest entry.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+    """
+    src_folder = os.path.join(".matcha", "infrastructure")
+    state_file = os.path.join(src_folder, "matcha.state")
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    first = local_storage.record_history(CONTAINER_NAME, src_folder, now)
+    assert local_storage.record_history(CONTAINER_NAME, src_folder, now) is None
+
+    with open(state_file, "wb") as f:
+        f.write(b'{"state": 2}')
+    second = local_storage.record_history(
+        CONTAINER_NAME, src_folder, now + timedelta(seconds=1)
+    )
+
+    assert first is not None and second is not None
+    assert local_storage.list_history(CONTAINER_NAME) == [first, second]
+    # an object per file of the first entry, and one for the changed state file
+    assert (
+        len(local_storage.list_blobs(CONTAINER_NAME, HISTORY_OBJECT_PREFIX))
+        == len(STATE_FILES) + 1
+    )
+    assert second.files[state_file] != first.files[state_file]
+    assert local_storage.get_history_entry(CONTAINER_NAME, first.id) == first
+
+
+def test_restore_history_snapshot(local_storage: LocalStorage, state_folder: str):
+    """Test that a state stored as a snapshot is restored to a history entry, and the history blobs are kept.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+    """
+    src_folder = os.path.join(".matcha", "infrastructure")
+    local_storage.upload_snapshot(CONTAINER_NAME, src_folder)
+    entry = local_storage.record_history(CONTAINER_NAME, src_folder)
+    assert entry is not None
+    first_index = local_storage.get_snapshot_index(CONTAINER_NAME)
+
+    with open(os.path.join(src_folder, "matcha.state"), "wb") as f:
+        f.write(b'{"state": 2}')
+    local_storage.upload_snapshot(CONTAINER_NAME, src_folder)
+
+    restore_entry, _ = local_storage.restore_history_snapshot(CONTAINER_NAME, entry)
+
+    assert local_storage.get_snapshot_index(CONTAINER_NAME) == first_index
+    assert restore_entry.restored_from == entry.id
+    assert {
+        history_entry.id for history_entry in local_storage.list_history(CONTAINER_NAME)
+    } == {entry.id, restore_entry.id}
+    assert len(local_storage.list_blobs(CONTAINER_NAME, HISTORY_OBJECT_PREFIX)) == len(
+        set(entry.files.values())
+    )
+
+
+def test_restore_history_snapshot_points_the_index_at_the_kept_snapshot(
+    local_storage: LocalStorage, state_folder: str
+):
+    """Test that the history of a state stored as a snapshot keeps the snapshots, which a restore points the index at.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+    """
+    src_folder = os.path.join(".matcha", "infrastructure")
+    entries = []
+    for state in (b'{"state": 1}', b'{"state": 2}'):
+        with open(os.path.join(src_folder, "matcha.state"), "wb") as f:
+            f.write(state)
+        report = local_storage.upload_snapshot(CONTAINER_NAME, src_folder)
+        entries.append(
+            local_storage.record_history(
+                CONTAINER_NAME,
+                src_folder,
+                uploaded_files=report.files,
+                snapshot=report.snapshot,
+            )
+        )
+    first, second = entries
+    assert first is not None and second is not None
+
+    # the history points at the snapshots, which hold the files, instead of storing objects
+    assert set(blob_names(local_storage)) == {
+        SNAPSHOT_INDEX_BLOB_NAME,
+        HISTORY_HEAD_BLOB_NAME,
+        first.snapshot,
+        second.snapshot,
+    }
+
+    restore_entry, restore_report = local_storage.restore_history_snapshot(
+        CONTAINER_NAME, first
+    )
+
+    index = local_storage.get_snapshot_index(CONTAINER_NAME)
+    assert index is not None
+    assert (index.snapshot, index.files) == (first.snapshot, first.files)
+    # only the index is uploaded
+    assert restore_report == TransferReport(
+        blobs_transferred=1, bytes_transferred=len(index.to_json())
+    )
+    assert (restore_entry.restored_from, restore_entry.snapshot) == (
+        first.id,
+        first.snapshot,
+    )
+    assert local_storage.list_history(CONTAINER_NAME) == [first, second, restore_entry]
+    # a state stored file by file has no objects to copy the files of a snapshot entry from
+    with pytest.raises(ValueError):
+        local_storage.restore_history(CONTAINER_NAME, first)
+
+
+def test_record_history_prunes_the_entries_beyond_the_retention(
+    local_storage: LocalStorage, state_folder: str
+):
+    """Test that the oldest entries are dropped beyond the retention, with the objects that only they held.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+    """
+    retention = 2
+    src_folder = os.path.join(".matcha", "infrastructure")
+    state_file = os.path.join(src_folder, "matcha.state")
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    entries = []
+    for state in range(retention + 1):
+        with open(state_file, "w") as f:
+            f.write(f'{{"state": {state}}}')
+        entries.append(
+            local_storage.record_history(
+                CONTAINER_NAME,
+                src_folder,
+                now + timedelta(seconds=state),
+                retention=retention,
+            )
+        )
+
+    assert local_storage.list_history(CONTAINER_NAME) == entries[1:]
+    objects = {
+        blob.name
+        for blob in local_storage.list_blobs(CONTAINER_NAME, HISTORY_OBJECT_PREFIX)
+    }
+    assert objects == {
+        history_object_blob_name(content_md5)
+        for entry in entries[1:]
+        if entry is not None
+        for content_md5 in entry.files.values()
+    }
+    assert entries[0] is not None
+    assert history_object_blob_name(entries[0].files[state_file]) not in objects
+
+
+def test_record_history_prunes_snapshots_but_the_current_one(
+    local_storage: LocalStorage, state_folder: str
+):
+    """Test that the snapshot of a dropped entry is deleted, unless the index still points at it.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+    """
+    src_folder = os.path.join(".matcha", "infrastructure")
+    report = local_storage.upload_snapshot(CONTAINER_NAME, src_folder)
+    local_storage.record_history(
+        CONTAINER_NAME,
+        src_folder,
+        uploaded_files=report.files,
+        snapshot=report.snapshot,
+        retention=1,
+    )
+
+    # an entry of the same files recorded file by file drops the entry that held the current snapshot
+    local_storage.record_history(CONTAINER_NAME, src_folder, retention=1)
+
+    assert report.snapshot in blob_names(local_storage)
+
+    with open(os.path.join(src_folder, "matcha.state"), "wb") as f:
+        f.write(b'{"state": 2}')
+    new_report = local_storage.upload_snapshot(CONTAINER_NAME, src_folder)
+    local_storage.record_history(
+        CONTAINER_NAME,
+        src_folder,
+        uploaded_files=new_report.files,
+        snapshot=new_report.snapshot,
+        retention=1,
+    )
+
+    snapshots = {
+        blob_name
+        for blob_name in blob_names(local_storage)
+        if blob_name.endswith(".tar.gz")
+    }
+    assert snapshots == {new_report.snapshot}
+    assert local_storage.list_blobs(CONTAINER_NAME, HISTORY_OBJECT_PREFIX) == []
+
+
+def test_upload_folder_keeps_the_snapshots_of_the_history(
+    local_storage: LocalStorage, state_folder: str
+):
+    """Test that a state stored as a snapshot, then file by file, deletes the index but keeps the history's snapshot.
+
+    Args:
+        local_storage (LocalStorage): storage with an empty container.
+        state_folder (str): working directory holding a local state folder.
+    """
+    src_folder = os.path.join(".matcha", "infrastructure")
+    report = local_storage.upload_snapshot(CONTAINER_NAME, src_folder)
+    entry = local_storage.record_history(
+        CONTAINER_NAME,
+        src_folder,
+        uploaded_files=report.files,
+        snapshot=report.snapshot,
+    )
+    assert entry is not None
+
+    local_storage.upload_folder(CONTAINER_NAME, src_folder)
+
+    assert SNAPSHOT_INDEX_BLOB_NAME not in blob_names(local_storage)
+    assert report.snapshot in blob_names(local_storage)
+
+    local_storage.restore_history_snapshot(CONTAINER_NAME, entry)
+
+    index = local_storage.get_snapshot_index(CONTAINER_NAME)
+    assert index is not None and index.snapshot == entry.snapshot
@@ -0,0 +1,377 @@
+"""Tests for the snapshot storage mode of the remote state."""
+import io
+import os
+import tarfile
+from typing import Any, Dict
+from unittest.mock import patch
+
+import pytest
+
+from matcha_ml.constants import LOCK_FILE_NAME
+from matcha_ml.storage import AzureStorage
+from matcha_ml.storage.state_snapshot import (
+    SNAPSHOT_INDEX_BLOB_NAME,
+    SNAPSHOT_INDEX_VERSION,
+    SnapshotIndex,
+    build_snapshot,
+    extract_snapshot,
+    local_manifest,
+)
+from matcha_ml.storage.storage_backend import TransferReport
+
+CONTAINER_NAME = "testcontainer"
+INFRASTRUCTURE_DIR = os.path.join(".matcha", "infrastructure")
+STATE_FILES = {
+    os.path.join(INFRASTRUCTURE_DIR, "matcha.state"): "{}",
+    os.path.join(INFRASTRUCTURE_DIR, "resources", "main.tf"): "main",
+    os.path.join(INFRASTRUCTURE_DIR, "resources", "aks", "main.tf"): "aks",
+}
+
+
+def write_files(files: Dict[str, str]) -> None:
+    """Write files relative to the working directory.
+
+    Args:
+        files (Dict[str, str]): the path and contents of every file.
+    """
+    for file_path, content in files.items():
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(content)
+
+
+def read_files(folder: str) -> Dict[str, str]:
+    """Read every file of the .matcha folder in a folder.
+
+    Args:
+        folder (str): the folder containing the .matcha folder.
+
+    Returns:
+        Dict[str, str]: the path and contents of every file, relative to the folder.
+    """
+    files = {}
+    for root, _, filenames in os.walk(os.path.join(folder, ".matcha")):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            with open(file_path) as f:
+                files[os.path.relpath(file_path, folder)] = f.read()
+    return files
+
+
+@pytest.fixture
+def state_folder(matcha_testing_directory: str) -> str:
+    """A fixture for a working directory holding a matcha state folder.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory.
+
+    Returns:
+        str: the working directory.
+    """
+    os.chdir(matcha_testing_directory)
+    write_files(STATE_FILES)
+    write_files(
+        {os.path.join(INFRASTRUCTURE_DIR, "resources", ".terraform", "plugin"): "bin"}
+    )
+    return matcha_testing_directory
+
+
+def test_build_snapshot_is_deterministic(state_folder: str):
+    """Test that the same files always give the same snapshot, which leaves out excluded files.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+    """
+    snapshot = build_snapshot(INFRASTRUCTURE_DIR)
+
+    assert build_snapshot(INFRASTRUCTURE_DIR).data == snapshot.data
+    assert sorted(snapshot.files) == sorted(STATE_FILES)
+    assert snapshot.name.startswith("snapshots/")
+    assert snapshot.name.endswith(".tar.gz")
+
+
+def test_extract_snapshot_restores_files(
+    state_folder: str, matcha_testing_directory: str
+):
+    """Test that extracting a snapshot in another folder restores the files, with the same paths.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        matcha_testing_directory (str): temporary working directory.
+    """
+    snapshot = build_snapshot(INFRASTRUCTURE_DIR)
+    dest_folder = os.path.join(matcha_testing_directory, "dest")
+
+    extract_snapshot(snapshot.data, dest_folder)
+
+    assert read_files(dest_folder) == STATE_FILES
+    assert local_manifest(dest_folder) == snapshot.files
+
+
+def test_extract_snapshot_rejects_paths_outside_the_folder(
+    matcha_testing_directory: str,
+):
+    """Test that a snapshot with an entry outside of the destination folder is rejected.
+
+    Args:
+        matcha_testing_directory (str): temporary working directory.
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        info = tarfile.TarInfo(name="../escaped")
+        archive.addfile(info, io.BytesIO(b""))
+
+    with pytest.raises(ValueError):
+        extract_snapshot(buffer.getvalue(), matcha_testing_directory)
+
+
+def test_snapshot_index_round_trip():
+    """Test that an index is read back as it was written."""
+    index = SnapshotIndex(snapshot="snapshots/abc.tar.gz", files={"a": "md5"})
+
+    assert SnapshotIndex.from_json(index.to_json()) == index
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"not json",
+        b'{"files": {}}',
+        f'{{"snapshot": "s", "files": {{}}, "version": {SNAPSHOT_INDEX_VERSION + 1}}}'.encode(),
+    ],
+)
+def test_snapshot_index_rejects_invalid_index(data: bytes):
+    """Test that an index that is invalid, or written by a newer version, is rejected.
+
+    Args:
+        data (bytes): the index as JSON.
+    """
+    with pytest.raises(ValueError):
+        SnapshotIndex.from_json(data)
+
+
+def test_upload_snapshot_replaces_per_file_blobs(
+    state_folder: str, fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that a snapshot upload leaves only the index, the snapshot and the lock in the container.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_azure_storage.upload_folder(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    fake_container.put(LOCK_FILE_NAME, b"")
+
+    report = fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+
+    snapshot = build_snapshot(INFRASTRUCTURE_DIR)
+    assert set(fake_container.blobs) == {
+        LOCK_FILE_NAME,
+        SNAPSHOT_INDEX_BLOB_NAME,
+        snapshot.name,
+    }
+    # the snapshot and its index
+    assert report.blobs_transferred == len({snapshot.name, SNAPSHOT_INDEX_BLOB_NAME})
+    assert report.blobs_deleted == len(STATE_FILES)
+
+
+def test_upload_unchanged_snapshot_reads_the_index_only(
+    state_folder: str, fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that uploading an unchanged state costs a single request.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    fake_container.requests.clear()
+
+    report = fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+
+    assert report == TransferReport(blobs_skipped=1)
+    assert fake_container.requests == [("GET", SNAPSHOT_INDEX_BLOB_NAME)]
+
+
+def test_upload_changed_snapshot_deletes_previous_snapshot(
+    state_folder: str, fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that the previous snapshot is deleted once the index points at the new one.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    write_files({os.path.join(INFRASTRUCTURE_DIR, "matcha.state"): "changed"})
+
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+
+    snapshot = build_snapshot(INFRASTRUCTURE_DIR)
+    assert set(fake_container.blobs) == {SNAPSHOT_INDEX_BLOB_NAME, snapshot.name}
+
+
+def test_download_snapshot_reconciles_local_folder(
+    state_folder: str,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+    matcha_testing_directory: str,
+):
+    """Test that a download restores the snapshot's files and removes local files that are not in it.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        matcha_testing_directory (str): temporary working directory.
+    """
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    dest_folder = os.path.join(matcha_testing_directory, "dest")
+    write_files({os.path.join(dest_folder, INFRASTRUCTURE_DIR, "stale.tf"): "stale"})
+
+    report = fake_azure_storage.download_snapshot(CONTAINER_NAME, dest_folder)
+
+    assert read_files(dest_folder) == STATE_FILES
+    assert report.blobs_transferred == 1
+    assert report.blobs_deleted == 1
+
+
+def test_download_snapshot_in_sync_reads_the_index_only(
+    state_folder: str, fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that downloading into a folder that matches the index costs a single request.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    fake_container.requests.clear()
+
+    report = fake_azure_storage.download_snapshot(CONTAINER_NAME, state_folder)
+
+    assert report == TransferReport(blobs_skipped=len(STATE_FILES))
+    assert fake_container.requests == [("GET", SNAPSHOT_INDEX_BLOB_NAME)]
+
+
+def test_download_snapshot_without_index_downloads_files(
+    state_folder: str,
+    fake_azure_storage: AzureStorage,
+    matcha_testing_directory: str,
+):
+    """Test that a state uploaded file by file is downloaded file by file.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        matcha_testing_directory (str): temporary working directory.
+    """
+    fake_azure_storage.upload_folder(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    dest_folder = os.path.join(matcha_testing_directory, "dest")
+
+    report = fake_azure_storage.download_snapshot(CONTAINER_NAME, dest_folder)
+
+    assert read_files(dest_folder) == STATE_FILES
+    assert report.blobs_transferred == len(STATE_FILES)
+
+
+def test_download_snapshot_rejects_corrupt_snapshot(
+    state_folder: str, fake_azure_storage: AzureStorage, fake_container: Any
+):
+    """Test that a snapshot that does not match its content-addressed name is rejected.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+    """
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    snapshot_name = build_snapshot(INFRASTRUCTURE_DIR).name
+    fake_container.put(snapshot_name, b"corrupt")
+    write_files({os.path.join(INFRASTRUCTURE_DIR, "matcha.state"): "changed"})
+
+    with pytest.raises(ValueError):
+        fake_azure_storage.download_snapshot(CONTAINER_NAME, state_folder)
+
+
+def test_download_folder_ignores_snapshot_blobs(
+    state_folder: str,
+    fake_azure_storage: AzureStorage,
+    matcha_testing_directory: str,
+):
+    """Test that a per-file download does not write the index or snapshots into the local folder.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        matcha_testing_directory (str): temporary working directory.
+    """
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    dest_folder = os.path.join(matcha_testing_directory, "dest")
+
+    report = fake_azure_storage.download_folder(CONTAINER_NAME, dest_folder)
+
+    assert report.blobs_transferred == 0
+    assert not os.path.exists(dest_folder)
+
+
+def test_download_snapshot_follows_a_replaced_snapshot(
+    state_folder: str,
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+    matcha_testing_directory: str,
+):
+    """Test that a snapshot deleted by a writer between reading the index and the snapshot is read from the new index.
+
+    Args:
+        state_folder (str): working directory holding a state folder.
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        matcha_testing_directory (str): temporary working directory.
+    """
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    stale_index = fake_azure_storage.get_snapshot_index(CONTAINER_NAME)
+    write_files({os.path.join(INFRASTRUCTURE_DIR, "matcha.state"): "changed"})
+    fake_azure_storage.upload_snapshot(CONTAINER_NAME, INFRASTRUCTURE_DIR)
+    dest_folder = os.path.join(matcha_testing_directory, "dest")
+
+    with patch.object(
+        fake_azure_storage,
+        "get_snapshot_index",
+        side_effect=[
+            stale_index,
+            fake_azure_storage.get_snapshot_index(CONTAINER_NAME),
+        ],
+    ):
+        fake_azure_storage.download_snapshot(CONTAINER_NAME, dest_folder)
+
+    assert read_files(dest_folder) == {
+        **STATE_FILES,
+        os.path.join(INFRASTRUCTURE_DIR, "matcha.state"): "changed",
+    }
+
+
+def test_download_blob_writes_a_single_file(
+    fake_azure_storage: AzureStorage,
+    fake_container: Any,
+    matcha_testing_directory: str,
+):
+    """Test that a single blob is downloaded to a file, creating its folder.
+
+    Args:
+        fake_azure_storage (AzureStorage): storage backed by the in-memory container.
+        fake_container (Any): the in-memory container.
+        matcha_testing_directory (str): temporary working directory.
+    """
+    fake_container.put("folder/blob", b"data")
+    dest_file = os.path.join(matcha_testing_directory, "dest", "blob")
+
+    report = fake_azure_storage.download_blob(CONTAINER_NAME, "folder/blob", dest_file)
+
+    with open(dest_file, "rb") as f:
+        assert f.read() == b"data"
+    assert report == TransferReport(blobs_transferred=1, bytes_transferred=4)